@@ -0,0 +1,38 @@
+"""
+Fusiona terceros duplicados (mismo NIT escrito con puntos, DV o espacios)
+re-apuntando sus movimientos, facturas y facturas recibidas al sobreviviente.
+"""
+from django.core.management.base import BaseCommand
+from apps.accounting.services.third_party_service import dedupe_third_parties
+from apps.tenants.models import Client
+
+
+class Command(BaseCommand):
+    help = 'Deduplica terceros por NIT canónico y re-apunta sus referencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--client', type=int, help='ID del tenant (por defecto todos los activos)')
+        parser.add_argument('--dry-run', action='store_true', help='Solo muestra los grupos de duplicados')
+
+    def handle(self, *args, **options):
+        if options['client']:
+            client_ids = [options['client']]
+        else:
+            client_ids = list(Client.objects.filter(is_active=True).values_list('id', flat=True))
+
+        for client_id in client_ids:
+            result = dedupe_third_parties(client_id, dry_run=options['dry_run'])
+            for suspect in result['suspects']:
+                self.stdout.write(self.style.WARNING(
+                    f"Tenant {client_id}: {suspect['third_party']} podría ser {suspect['matches']} con el DV pegado (revisar)"
+                ))
+            if options['dry_run']:
+                for survivor, duplicates in result['preview']:
+                    self.stdout.write(f"Tenant {client_id}: {survivor} <- {duplicates}")
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f"Tenant {client_id}: {result['groups']} grupos, {result['merged']} fusionados, "
+                f"{result['linked_invoices']} facturas recibidas enlazadas"
+            ))
+            for error in result['errors']:
+                self.stdout.write(self.style.WARNING(f"  {error['survivor']} <- {error['duplicates']}: {error['error']}"))
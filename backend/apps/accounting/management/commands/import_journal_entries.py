@@ -0,0 +1,46 @@
+"""
+Importa comprobantes contables desde un archivo CSV/XLSX (migraciones desde
+otros programas contables). Procesa el archivo en línea, sin Celery.
+"""
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from apps.accounting.services.import_service import JournalImportService, ImportFileError
+from apps.tenants.utils import tenant_context
+
+
+class Command(BaseCommand):
+    help = 'Importa comprobantes contables desde CSV/XLSX (carga masiva)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('client_id', type=int, help='ID del tenant')
+        parser.add_argument('path', help='Ruta del archivo CSV o XLSX')
+        parser.add_argument('--draft', action='store_true', help='Importar como borrador (sin contabilizar)')
+        parser.add_argument('--user', help='Usuario responsable (username)')
+        parser.add_argument('--errors', help='Archivo JSON donde guardar los errores por fila')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"Usuario no encontrado: {options['user']}")
+
+        with tenant_context(options['client_id']):
+            service = JournalImportService(options['client_id'], user=user, post_entries=not options['draft'])
+            try:
+                with open(options['path'], 'rb') as stream:
+                    result = service.run(stream, options['path'])
+            except (OSError, ImportFileError) as e:
+                raise CommandError(str(e))
+
+        if options['errors']:
+            with open(options['errors'], 'w', encoding='utf-8') as f:
+                json.dump(result['errors'], f, ensure_ascii=False, indent=2)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Filas: {result['total_rows']} | Comprobantes: {result['imported_entries']} | "
+            f"Movimientos: {result['imported_lines']} | Rechazados: {result['rejected_entries']} | "
+            f"Filas con error: {result['error_count']}"
+        ))
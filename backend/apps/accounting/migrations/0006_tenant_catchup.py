@@ -0,0 +1,231 @@
+# Generated by Django 4.2.9 on 2026-10-19 17:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+import hashlib
+
+
+def backfill_identification_hash(apps, schema_editor):
+    # Filas existentes: el hash se calcula en save(), aquí se completa antes del unique
+    ThirdParty = apps.get_model('accounting', 'ThirdParty')
+    for tp in ThirdParty.objects.filter(identification_number_hash='').only('id', 'identification_number'):
+        tp.identification_number_hash = hashlib.sha256(tp.identification_number.encode('utf-8')).hexdigest()
+        tp.save(update_fields=['identification_number_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        ('accounting', '0005_accountingtemplate_accountingtemplateline'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='account',
+            name='accounting__code_c93a8f_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='journalentry',
+            name='accounting__date_e3f521_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='journalentry',
+            name='accounting__status_0a2ff9_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='journalentry',
+            name='accounting__entry_t_5e6cde_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='journalentryline',
+            name='accounting__entry_i_cd64dc_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='journalentryline',
+            name='accounting__account_6fdc67_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='thirdparty',
+            name='accounting__identif_505949_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='accountdianconfiguration',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='client',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, to='tenants.client'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='accountclass',
+            name='client',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, to='tenants.client'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='accountdianconfiguration',
+            name='client',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, to='tenants.client'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='accountgroup',
+            name='client',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, to='tenants.client'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='accountingdocumenttype',
+            name='client',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, related_name='accounting_document_types', to='tenants.client'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='accountingtemplate',
+            name='client',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, to='tenants.client'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='accountingtemplateline',
+            name='client',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, to='tenants.client'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='costcenter',
+            name='client',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, to='tenants.client'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='client',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, to='tenants.client'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='journalentryline',
+            name='client',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, to='tenants.client'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='thirdparty',
+            name='client',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, to='tenants.client'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='thirdparty',
+            name='identification_number_hash',
+            field=models.CharField(blank=True, max_length=64, verbose_name='Hash del Número de Identificación'),
+        ),
+        migrations.RunPython(backfill_identification_hash, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='account',
+            name='code',
+            field=models.CharField(max_length=20, verbose_name='Código'),
+        ),
+        migrations.AlterField(
+            model_name='accountclass',
+            name='code',
+            field=models.CharField(max_length=1, verbose_name='Código'),
+        ),
+        migrations.AlterField(
+            model_name='accountgroup',
+            name='code',
+            field=models.CharField(max_length=2, verbose_name='Código'),
+        ),
+        migrations.AlterField(
+            model_name='accountingdocumenttype',
+            name='code',
+            field=models.CharField(max_length=10, verbose_name='Código/Prefijo'),
+        ),
+        migrations.AlterField(
+            model_name='costcenter',
+            name='code',
+            field=models.CharField(max_length=20, verbose_name='Código'),
+        ),
+        migrations.AlterField(
+            model_name='journalentry',
+            name='number',
+            field=models.CharField(max_length=50, verbose_name='Número'),
+        ),
+        migrations.AlterField(
+            model_name='thirdparty',
+            name='identification_number',
+            field=models.CharField(max_length=20, verbose_name='Número de Identificación'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='account',
+            unique_together={('client', 'code')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='accountclass',
+            unique_together={('client', 'code')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='accountdianconfiguration',
+            unique_together={('client', 'account', 'dian_format', 'dian_concept')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='accountgroup',
+            unique_together={('client', 'code')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='accountingdocumenttype',
+            unique_together={('client', 'code')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='accountingtemplate',
+            unique_together={('client', 'name')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='costcenter',
+            unique_together={('client', 'code')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='journalentry',
+            unique_together={('client', 'number')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='journalentryline',
+            unique_together={('entry', 'line_number')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='thirdparty',
+            unique_together={('client', 'identification_number_hash')},
+        ),
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(fields=['client', 'code'], name='accounting__client__c6ff9b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['client', 'date'], name='accounting__client__f11bcb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['client', 'status'], name='accounting__client__dc3dee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['client', 'entry_type'], name='accounting__client__e24ed8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalentryline',
+            index=models.Index(fields=['client', 'entry', 'line_number'], name='accounting__client__34818e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalentryline',
+            index=models.Index(fields=['client', 'account'], name='accounting__client__dbc3e0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thirdparty',
+            index=models.Index(fields=['client', 'identification_number_hash'], name='accounting__client__f1b45b_idx'),
+        ),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 4.2.9 on 2026-10-19 17:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+PUC_LEVELS = [('class_code', 1), ('group_code', 2), ('account_code', 4), ('subaccount_code', 6)]
+
+
+def backfill_hierarchy(apps, schema_editor):
+    Account = apps.get_model('accounting', 'Account')
+    CostCenter = apps.get_model('accounting', 'CostCenter')
+    CostCenterClosure = apps.get_model('accounting', 'CostCenterClosure')
+
+    accounts = list(Account.objects.only('id', 'code'))
+    for account in accounts:
+        code = account.code.strip()
+        for field, length in PUC_LEVELS:
+            setattr(account, field, code[:length] if len(code) >= length else '')
+    Account.objects.bulk_update(accounts, [field for field, _ in PUC_LEVELS], batch_size=1000)
+
+    parents = dict(CostCenter.objects.values_list('id', 'parent_id'))
+    clients = dict(CostCenter.objects.values_list('id', 'client_id'))
+    links = []
+    for node_id in parents:
+        ancestor_id, depth, seen = node_id, 0, set()
+        while ancestor_id is not None and ancestor_id not in seen:
+            seen.add(ancestor_id)
+            links.append(CostCenterClosure(
+                client_id=clients[node_id], ancestor_id=ancestor_id, descendant_id=node_id, depth=depth,
+            ))
+            ancestor_id, depth = parents.get(ancestor_id), depth + 1
+    CostCenterClosure.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        ('accounting', '0006_tenant_catchup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CostCenterClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField(default=0, verbose_name='Profundidad')),
+            ],
+            options={
+                'verbose_name': 'Jerarquía de Centro de Costo',
+                'verbose_name_plural': 'Jerarquía de Centros de Costo',
+            },
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='account_code',
+            field=models.CharField(blank=True, editable=False, max_length=4, verbose_name='Cuenta (Prefijo)'),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='class_code',
+            field=models.CharField(blank=True, editable=False, max_length=1, verbose_name='Clase (Prefijo)'),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='group_code',
+            field=models.CharField(blank=True, editable=False, max_length=2, verbose_name='Grupo (Prefijo)'),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='subaccount_code',
+            field=models.CharField(blank=True, editable=False, max_length=6, verbose_name='Subcuenta (Prefijo)'),
+        ),
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(fields=['client', 'class_code'], name='acc_account_class_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(fields=['client', 'group_code'], name='acc_account_group_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(fields=['client', 'account_code'], name='acc_account_account_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(fields=['client', 'subaccount_code'], name='acc_account_subaccount_idx'),
+        ),
+        migrations.AddField(
+            model_name='costcenterclosure',
+            name='ancestor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='accounting.costcenter'),
+        ),
+        migrations.AddField(
+            model_name='costcenterclosure',
+            name='client',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.client'),
+        ),
+        migrations.AddField(
+            model_name='costcenterclosure',
+            name='descendant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='accounting.costcenter'),
+        ),
+        migrations.AddIndex(
+            model_name='costcenterclosure',
+            index=models.Index(fields=['client', 'descendant', 'depth'], name='acc_cc_closure_desc_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='costcenterclosure',
+            unique_together={('ancestor', 'descendant')},
+        ),
+        migrations.RunPython(backfill_hierarchy, migrations.RunPython.noop),
+    ]
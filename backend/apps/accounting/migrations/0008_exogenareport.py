@@ -0,0 +1,35 @@
+# Generated by Django 4.2.9 on 2026-10-19 17:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        ('accounting', '0007_hierarchy_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExogenaReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(verbose_name='Año Gravable')),
+                ('sequence', models.PositiveIntegerField(default=1, verbose_name='Número de Envío')),
+                ('xml_file', models.FileField(upload_to='exogena/', verbose_name='Archivo XML')),
+                ('row_count', models.IntegerField(default=0, verbose_name='Registros')),
+                ('total_value', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Valor Total')),
+                ('generated_at', models.DateTimeField(auto_now=True, verbose_name='Generado')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.client')),
+                ('dian_format', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='accounting.dianformat', verbose_name='Formato')),
+            ],
+            options={
+                'verbose_name': 'Archivo de Exógena',
+                'verbose_name_plural': 'Archivos de Exógena',
+                'ordering': ['year', 'dian_format__code', 'sequence'],
+                'unique_together': {('client', 'year', 'dian_format', 'sequence')},
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.9 on 2026-10-19 17:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tenants', '0001_initial'),
+        ('accounting', '0008_exogenareport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FiscalPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(verbose_name='Año')),
+                ('month', models.PositiveSmallIntegerField(verbose_name='Mes')),
+                ('start_date', models.DateField(verbose_name='Fecha Inicial')),
+                ('end_date', models.DateField(verbose_name='Fecha Final')),
+                ('status', models.CharField(choices=[('OPEN', 'Abierto'), ('CLOSED', 'Cerrado')], default='OPEN', max_length=10, verbose_name='Estado')),
+                ('closed_at', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Cierre')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.client')),
+                ('closed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Cerrado por')),
+                ('closing_entry', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='closed_fiscal_periods', to='accounting.journalentry', verbose_name='Asiento de Cierre')),
+            ],
+            options={
+                'verbose_name': 'Periodo Contable',
+                'verbose_name_plural': 'Periodos Contables',
+                'ordering': ['year', 'month'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ClosingBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('debit', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='Débitos Acumulados')),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='Créditos Acumulados')),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='closing_balances', to='accounting.account', verbose_name='Cuenta')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.client')),
+                ('cost_center', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='accounting.costcenter', verbose_name='Centro de Costo')),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='closing_balances', to='accounting.fiscalperiod', verbose_name='Periodo')),
+                ('third_party', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='accounting.thirdparty', verbose_name='Tercero')),
+            ],
+            options={
+                'verbose_name': 'Saldo de Cierre',
+                'verbose_name_plural': 'Saldos de Cierre',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='fiscalperiod',
+            index=models.Index(fields=['client', 'status', 'end_date'], name='acc_period_status_end_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='fiscalperiod',
+            unique_together={('client', 'year', 'month')},
+        ),
+        migrations.AddIndex(
+            model_name='closingbalance',
+            index=models.Index(fields=['client', 'period', 'account'], name='acc_closing_period_acc_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='closingbalance',
+            unique_together={('period', 'account', 'third_party', 'cost_center')},
+        ),
+    ]
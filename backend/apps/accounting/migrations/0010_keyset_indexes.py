@@ -0,0 +1,21 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0009_fiscal_period_close'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='journalentry',
+            name='accounting__client__f11bcb_idx',
+        ),
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['client', '-date', '-id'], name='acc_je_client_date_idx'),
+        ),
+    ]
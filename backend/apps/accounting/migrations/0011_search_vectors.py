@@ -0,0 +1,53 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:08
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+from apps.common.search import search_trigger_sql, trigram_index_sql, run_on_postgres
+
+THIRD_PARTY_SEARCH = search_trigger_sql('accounting_thirdparty', [
+    ('A', ['identification_number', 'business_name', 'trade_name']),
+    ('B', ['first_name', 'middle_name', 'surname', 'second_surname']),
+    ('C', ['email']),
+])
+JOURNAL_ENTRY_SEARCH = search_trigger_sql('accounting_journalentry', [
+    ('A', ['number', 'reference', 'external_reference']),
+    ('B', ['description']),
+])
+# Columnas de SearchFilter (icontains) en ThirdPartyViewSet y JournalEntryViewSet
+THIRD_PARTY_TRGM = trigram_index_sql('accounting_thirdparty', [
+    'first_name', 'surname', 'business_name', 'trade_name', 'email',
+])
+JOURNAL_ENTRY_TRGM = trigram_index_sql('accounting_journalentry', ['number', 'description'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0010_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journalentry',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='thirdparty',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='thirdparty',
+            index=models.Index(fields=['client', 'identification_number'], name='acc_tp_nit_prefix_idx', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.RunPython(
+            run_on_postgres(THIRD_PARTY_SEARCH[0] + JOURNAL_ENTRY_SEARCH[0]),
+            run_on_postgres(THIRD_PARTY_SEARCH[1] + JOURNAL_ENTRY_SEARCH[1]),
+        ),
+        migrations.RunPython(
+            run_on_postgres(THIRD_PARTY_TRGM[0] + JOURNAL_ENTRY_TRGM[0]),
+            run_on_postgres(THIRD_PARTY_TRGM[1] + JOURNAL_ENTRY_TRGM[1]),
+        ),
+    ]
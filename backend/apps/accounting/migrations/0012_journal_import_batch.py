@@ -0,0 +1,43 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounting', '0011_search_vectors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JournalImportBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to='journal_imports/', verbose_name='Archivo')),
+                ('original_name', models.CharField(blank=True, max_length=255, verbose_name='Nombre del Archivo')),
+                ('post_entries', models.BooleanField(default=True, verbose_name='Contabilizar Comprobantes')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('PROCESSING', 'Procesando'), ('DONE', 'Terminado'), ('FAILED', 'Fallido')], default='PENDING', max_length=20, verbose_name='Estado')),
+                ('total_rows', models.IntegerField(default=0, verbose_name='Filas Leídas')),
+                ('imported_entries', models.IntegerField(default=0, verbose_name='Comprobantes Importados')),
+                ('imported_lines', models.IntegerField(default=0, verbose_name='Movimientos Importados')),
+                ('rejected_entries', models.IntegerField(default=0, verbose_name='Comprobantes Rechazados')),
+                ('error_count', models.IntegerField(default=0, verbose_name='Filas con Error')),
+                ('errors', models.JSONField(blank=True, default=list, verbose_name='Errores')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Inicio')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.client')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Cargado por')),
+            ],
+            options={
+                'verbose_name': 'Importación de Comprobantes',
+                'verbose_name_plural': 'Importaciones de Comprobantes',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -3,12 +3,13 @@ from django.contrib.auth.models import User
 from django.db.models import Sum
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from decimal import Decimal
-import hashlib
 
 from apps.common.managers import TenantAwareManager
+from apps.common.utils import nit_check_digit, canonical_identification, identification_hash
 
 
 class AccountClass(models.Model):
@@ -135,6 +136,14 @@ class Account(models.Model):
         verbose_name="Cuenta Padre"
     )
 
+    # Índice jerárquico del PUC: prefijos del código por nivel, calculados en save().
+    # Permiten consolidar por clase/grupo/cuenta/subcuenta con igualdad indexada
+    # en lugar de `code__startswith`.
+    class_code = models.CharField(max_length=1, blank=True, editable=False, verbose_name="Clase (Prefijo)")
+    group_code = models.CharField(max_length=2, blank=True, editable=False, verbose_name="Grupo (Prefijo)")
+    account_code = models.CharField(max_length=4, blank=True, editable=False, verbose_name="Cuenta (Prefijo)")
+    subaccount_code = models.CharField(max_length=6, blank=True, editable=False, verbose_name="Subcuenta (Prefijo)")
+
     # Naturaleza de la cuenta
     NATURE_CHOICES = [
         ('DEBITO', 'Débito'),
@@ -209,22 +218,48 @@ class Account(models.Model):
             models.Index(fields=['client', 'code']),
             models.Index(fields=['account_type']),
             models.Index(fields=['is_active']),
+            models.Index(fields=['client', 'class_code'], name='acc_account_class_idx'),
+            models.Index(fields=['client', 'group_code'], name='acc_account_group_idx'),
+            models.Index(fields=['client', 'account_code'], name='acc_account_account_idx'),
+            models.Index(fields=['client', 'subaccount_code'], name='acc_account_subaccount_idx'),
         ]
 
+    # Longitud del código PUC por nivel y su columna de prefijo
+    PUC_LEVELS = [
+        ('class_code', 1),
+        ('group_code', 2),
+        ('account_code', 4),
+        ('subaccount_code', 6),
+    ]
+
     def __str__(self):
         return f"{self.code} - {self.name}"
 
-    def get_balance(self):
-        """Calcula el saldo actual de la cuenta."""
-        from django.db.models import Sum, Q
+    @classmethod
+    def hierarchy_prefixes(cls, code):
+        """Prefijos del código por nivel PUC (vacío si el código es más corto)."""
+        code = (code or '').strip()
+        return {field: code[:length] if len(code) >= length else '' for field, length in cls.PUC_LEVELS}
+
+    def save(self, *args, **kwargs):
+        for field, value in self.hierarchy_prefixes(self.code).items():
+            setattr(self, field, value)
+        if kwargs.get('update_fields') is not None and 'code' in kwargs['update_fields']:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {f for f, _ in self.PUC_LEVELS}
+        super().save(*args, **kwargs)
+
+    def ancestor_codes(self):
+        """Códigos de las cuentas ancestro (niveles 4, 6, 8...) excluyendo la propia."""
+        return [self.code[:length] for length in range(4, len(self.code), 2)]
 
-        debits = self.journal_entry_lines.filter(
-            entry__status='POSTED'
-        ).aggregate(total=Sum('debit'))['total'] or Decimal('0')
+    def get_balance(self, as_of=None):
+        """
+        Calcula el saldo de la cuenta (a la fecha `as_of` o actual).
+        Parte del último saldo de cierre y suma solo el movimiento posterior.
+        """
+        from apps.accounting.services.closing_service import account_balances
 
-        credits = self.journal_entry_lines.filter(
-            entry__status='POSTED'
-        ).aggregate(total=Sum('credit'))['total'] or Decimal('0')
+        debits, credits = account_balances([self.pk], as_of=as_of).get(self.pk, (Decimal('0'), Decimal('0')))
 
         if self.nature == 'DEBITO':
             return debits - credits
@@ -232,10 +267,43 @@ class Account(models.Model):
             return credits - debits
 
     def get_full_path(self):
-        """Retorna la ruta completa de la cuenta."""
-        if self.parent:
-            return f"{self.parent.get_full_path()} > {self.name}"
-        return f"{self.account_group.account_class.name} > {self.account_group.name} > {self.name}"
+        """Retorna la ruta completa de la cuenta (la cuenta y, si es auxiliar, sus ancestros: dos consultas)."""
+        return Account.render_paths(Account.objects.filter(pk=self.pk))[self.pk]
+
+    @classmethod
+    def render_paths(cls, queryset=None):
+        """
+        Ruta completa (Clase > Grupo > Cuenta > ... > Nombre) para todas las cuentas
+        del queryset, resolviendo ancestros por prefijo de código.
+        Para el árbol completo del tenant se ejecuta una sola consulta.
+
+        Returns:
+            dict {account_id: ruta}
+        """
+        queryset = cls.objects.all() if queryset is None else queryset
+        rows = list(queryset.values(
+            'id', 'code', 'name',
+            'account_group__name', 'account_group__account_class__name',
+        ))
+        names = {row['code']: row['name'] for row in rows}
+
+        # Subconjuntos del árbol: traer los ancestros faltantes en una consulta extra
+        missing = {
+            row['code'][:length]
+            for row in rows
+            for length in range(4, len(row['code']), 2)
+        } - names.keys()
+        if missing:
+            names.update(cls.objects.filter(code__in=missing).values_list('code', 'name'))
+
+        paths = {}
+        for row in rows:
+            parts = [row['account_group__account_class__name'], row['account_group__name']]
+            parts += [names[row['code'][:length]] for length in range(4, len(row['code']), 2)
+                      if row['code'][:length] in names]
+            parts.append(row['name'])
+            paths[row['id']] = ' > '.join(parts)
+        return paths
 
 
 
@@ -290,6 +358,91 @@ class CostCenter(models.Model):
     def __str__(self):
         return f"{self.code} - {self.name}"
 
+    def save(self, *args, **kwargs):
+        is_new = self.pk is None
+        parent_changed = False
+        if not is_new:
+            previous_parent_id = CostCenter.objects.filter(pk=self.pk).values_list('parent_id', flat=True).first()
+            parent_changed = previous_parent_id != self.parent_id
+
+        if self.parent_id and not is_new and CostCenterClosure.objects.filter(
+            ancestor_id=self.pk, descendant_id=self.parent_id
+        ).exists():
+            raise ValueError("El centro de costo padre no puede ser un descendiente del mismo centro.")
+
+        super().save(*args, **kwargs)
+
+        if is_new or parent_changed:
+            self.rebuild_closure(is_new)
+
+    def rebuild_closure(self, is_new=False):
+        """
+        Mantiene la tabla de cierre para este nodo y su subárbol:
+        elimina los vínculos con los ancestros anteriores y crea los del nuevo padre.
+        """
+        if is_new:
+            CostCenterClosure.objects.create(client_id=self.client_id, ancestor=self, descendant=self, depth=0)
+
+        subtree = list(CostCenterClosure.objects.filter(ancestor=self).values_list('descendant_id', 'depth'))
+        subtree_ids = [descendant_id for descendant_id, _ in subtree]
+        CostCenterClosure.objects.filter(descendant_id__in=subtree_ids).exclude(ancestor_id__in=subtree_ids).delete()
+
+        if self.parent_id:
+            ancestors = CostCenterClosure.objects.filter(descendant_id=self.parent_id).values_list('ancestor_id', 'depth')
+            CostCenterClosure.objects.bulk_create([
+                CostCenterClosure(
+                    client_id=self.client_id,
+                    ancestor_id=ancestor_id,
+                    descendant_id=descendant_id,
+                    depth=ancestor_depth + descendant_depth + 1,
+                )
+                for ancestor_id, ancestor_depth in ancestors
+                for descendant_id, descendant_depth in subtree
+            ])
+
+    def get_full_path(self):
+        """Retorna la ruta completa del centro de costo (una sola consulta)."""
+        return CostCenter.render_paths([self.pk]).get(self.pk, self.name)
+
+    @classmethod
+    def render_paths(cls, ids=None):
+        """
+        Ruta completa (Raíz > ... > Nombre) de los centros de costo indicados
+        (o de todo el árbol del tenant) en una sola consulta sobre la tabla de cierre.
+
+        Returns:
+            dict {cost_center_id: ruta}
+        """
+        links = CostCenterClosure.objects.all()
+        if ids is not None:
+            links = links.filter(descendant_id__in=ids)
+        paths = {}
+        for descendant_id, name in links.order_by('descendant_id', '-depth').values_list('descendant_id', 'ancestor__name'):
+            paths.setdefault(descendant_id, []).append(name)
+        return {descendant_id: ' > '.join(names) for descendant_id, names in paths.items()}
+
+
+class CostCenterClosure(models.Model):
+    """
+    Tabla de cierre (closure table) de la jerarquía de Centros de Costo.
+    Una fila por cada par ancestro-descendiente (incluido el propio nodo, depth=0),
+    de modo que consolidar un subárbol es un join por igualdad.
+    """
+    client = models.ForeignKey('tenants.Client', on_delete=models.CASCADE)
+    ancestor = models.ForeignKey(CostCenter, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(CostCenter, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveIntegerField(default=0, verbose_name="Profundidad")
+
+    objects = TenantAwareManager()
+
+    class Meta:
+        verbose_name = "Jerarquía de Centro de Costo"
+        verbose_name_plural = "Jerarquía de Centros de Costo"
+        unique_together = ('ancestor', 'descendant')
+        indexes = [
+            models.Index(fields=['client', 'descendant', 'depth'], name='acc_cc_closure_desc_idx'),
+        ]
+
 
 class ThirdParty(models.Model):
     """
@@ -481,6 +634,8 @@ class ThirdParty(models.Model):
 
     # Metadata
     notes = models.TextField(blank=True, verbose_name="Notas")
+    # Documento de búsqueda (tsvector); lo mantiene un trigger en PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
 
     objects = TenantAwareManager()
 
@@ -491,6 +646,9 @@ class ThirdParty(models.Model):
         unique_together = ('client', 'identification_number_hash')
         indexes = [
             models.Index(fields=['client', 'identification_number_hash']),
+            # Búsqueda por prefijo de NIT (LIKE 'xxx%')
+            models.Index(fields=['client', 'identification_number'], name='acc_tp_nit_prefix_idx',
+                         opclasses=['int8_ops', 'varchar_pattern_ops']),
             models.Index(fields=['party_type']),
             models.Index(fields=['person_type']),
             models.Index(fields=['tax_regime']),
@@ -524,30 +682,20 @@ class ThirdParty(models.Model):
         """
         if self.identification_type != '31':
             return ''
-
-        nit = self.identification_number.strip()
-        if not nit.isdigit():
-            return ''
-
-        # Algoritmo Módulo 11 DIAN
-        # Pesos alineados a la derecha (NIT invertido): 3, 7, 13...
-        weights = [3, 7, 13, 17, 19, 23, 29, 37, 41, 43, 47, 53, 59, 67, 71]
-        total = sum(int(digit) * weight for digit, weight in zip(reversed(nit), weights))
-        remainder = total % 11
-
-        if remainder in (0, 1):
-            return str(remainder)
-        return str(11 - remainder)
+        return nit_check_digit(self.identification_number)
 
     def save(self, *args, **kwargs):
         """Validaciones y hashing antes de guardar"""
+        # Número canónico: el mismo que usan las cargas masivas y la deduplicación
+        self.identification_number = canonical_identification(self.identification_number, self.identification_type)
+
         # Auto-calcular DV si es NIT y no está definido
         if self.identification_type == '31' and not self.check_digit:
             self.check_digit = self.calculate_check_digit()
 
         # Generar hash del número de identificación
         if self.identification_number:
-            self.identification_number_hash = hashlib.sha256(self.identification_number.encode('utf-8')).hexdigest()
+            self.identification_number_hash = identification_hash(self.identification_number)
 
         # Validar que si es Persona Jurídica tenga business_name
         if self.person_type == 1 and not self.business_name:
@@ -658,6 +806,8 @@ class JournalEntry(models.Model):
     # Metadata
     notes = models.TextField(blank=True, verbose_name="Notas")
     attachments = models.JSONField(default=list, blank=True, verbose_name="Adjuntos")
+    # Documento de búsqueda (tsvector); lo mantiene un trigger en PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
 
     objects = TenantAwareManager()
 
@@ -667,7 +817,7 @@ class JournalEntry(models.Model):
         ordering = ['-date', '-number']
         unique_together = ('client', 'number')
         indexes = [
-            models.Index(fields=['client', 'date']),
+            models.Index(fields=['client', '-date', '-id'], name='acc_je_client_date_idx'),
             models.Index(fields=['client', 'status']),
             models.Index(fields=['client', 'entry_type']),
         ]
@@ -703,6 +853,10 @@ class JournalEntry(models.Model):
                     raise ValidationError("El asiento contable debe tener al menos un movimiento.")
 
     def save(self, *args, **kwargs):
+        # Periodo cerrado: no se permite contabilizar ni anular asientos contabilizados
+        if (self.status == 'POSTED' or (self.status == 'CANCELLED' and self.posted_at)) \
+                and FiscalPeriod.is_date_closed(self.date):
+            raise ValidationError(f"El periodo contable de la fecha {self.date} está cerrado.")
         if self.status == 'POSTED' and not self.posted_at:
             from django.utils import timezone
             self.posted_at = timezone.now()
@@ -780,6 +934,11 @@ class JournalEntryLine(models.Model):
     def __str__(self):
         return f"{self.entry.number} - Línea {self.line_number} - {self.account.code}"
 
+    def save(self, *args, **kwargs):
+        if self.entry.status == 'POSTED' and FiscalPeriod.is_date_closed(self.entry.date):
+            raise ValidationError(f"El periodo contable de la fecha {self.entry.date} está cerrado.")
+        super().save(*args, **kwargs)
+
 
 class AccountingTemplate(models.Model):
     """
@@ -861,4 +1020,162 @@ class AccountingTemplateLine(models.Model):
         ordering = ['id']
 
     def __str__(self):
-        return f"{self.template.name} - {self.account.code}"
\ No newline at end of file
+        return f"{self.template.name} - {self.account.code}"
+
+class ExogenaReport(models.Model):
+    """
+    Archivo XML de Información Exógena (Medios Magnéticos) generado por formato y año.
+    Un formato puede dividirse en varios envíos (`sequence`) por el límite de registros DIAN.
+    """
+    client = models.ForeignKey('tenants.Client', on_delete=models.CASCADE)
+    year = models.IntegerField(verbose_name="Año Gravable")
+    dian_format = models.ForeignKey(DianFormat, on_delete=models.PROTECT, verbose_name="Formato")
+    sequence = models.PositiveIntegerField(default=1, verbose_name="Número de Envío")
+    xml_file = models.FileField(upload_to='exogena/', verbose_name="Archivo XML")
+    row_count = models.IntegerField(default=0, verbose_name="Registros")
+    total_value = models.DecimalField(max_digits=20, decimal_places=2, default=0, verbose_name="Valor Total")
+    generated_at = models.DateTimeField(auto_now=True, verbose_name="Generado")
+
+    objects = TenantAwareManager()
+
+    class Meta:
+        verbose_name = "Archivo de Exógena"
+        verbose_name_plural = "Archivos de Exógena"
+        ordering = ['year', 'dian_format__code', 'sequence']
+        unique_together = ('client', 'year', 'dian_format', 'sequence')
+
+    def __str__(self):
+        return f"Exógena {self.year} - Formato {self.dian_format.code} ({self.sequence})"
+
+
+class FiscalPeriod(models.Model):
+    """
+    Periodo contable mensual. Al cerrarse se guardan los saldos de cierre
+    (ClosingBalance) y se bloquea la contabilización de asientos en sus fechas.
+    """
+    STATUS_CHOICES = [
+        ('OPEN', 'Abierto'),
+        ('CLOSED', 'Cerrado'),
+    ]
+
+    client = models.ForeignKey('tenants.Client', on_delete=models.CASCADE)
+    year = models.IntegerField(verbose_name="Año")
+    month = models.PositiveSmallIntegerField(verbose_name="Mes")
+    start_date = models.DateField(verbose_name="Fecha Inicial")
+    end_date = models.DateField(verbose_name="Fecha Final")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='OPEN', verbose_name="Estado")
+
+    closing_entry = models.ForeignKey(
+        JournalEntry,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='closed_fiscal_periods',
+        verbose_name="Asiento de Cierre"
+    )
+    closed_at = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de Cierre")
+    closed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Cerrado por")
+
+    objects = TenantAwareManager()
+
+    class Meta:
+        verbose_name = "Periodo Contable"
+        verbose_name_plural = "Periodos Contables"
+        ordering = ['year', 'month']
+        unique_together = ('client', 'year', 'month')
+        indexes = [
+            models.Index(fields=['client', 'status', 'end_date'], name='acc_period_status_end_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.year}-{self.month:02d} ({self.get_status_display()})"
+
+    @classmethod
+    def closed_until(cls):
+        """
+        Fin del último periodo cerrado. Todo lo anterior queda bloqueado aunque
+        no tenga periodo propio: los saldos parten del último snapshot de cierre
+        y solo suman movimientos posteriores a esa fecha.
+        """
+        return (
+            cls.objects.filter(status='CLOSED').order_by('-end_date')
+            .values_list('end_date', flat=True).first()
+        )
+
+    @classmethod
+    def is_date_closed(cls, value):
+        if value is None:
+            return False
+        closed_until = cls.closed_until()
+        return closed_until is not None and value <= closed_until
+
+
+class ClosingBalance(models.Model):
+    """
+    Saldo acumulado (débitos y créditos desde el inicio) al cierre de un periodo,
+    por cuenta, tercero y centro de costo. Los saldos se calculan desde el
+    último cierre más el movimiento de los periodos abiertos.
+    """
+    client = models.ForeignKey('tenants.Client', on_delete=models.CASCADE)
+    period = models.ForeignKey(FiscalPeriod, on_delete=models.CASCADE, related_name='closing_balances', verbose_name="Periodo")
+    account = models.ForeignKey(Account, on_delete=models.PROTECT, related_name='closing_balances', verbose_name="Cuenta")
+    third_party = models.ForeignKey(ThirdParty, on_delete=models.PROTECT, null=True, blank=True, verbose_name="Tercero")
+    cost_center = models.ForeignKey(CostCenter, on_delete=models.PROTECT, null=True, blank=True, verbose_name="Centro de Costo")
+    debit = models.DecimalField(max_digits=18, decimal_places=2, default=0, verbose_name="Débitos Acumulados")
+    credit = models.DecimalField(max_digits=18, decimal_places=2, default=0, verbose_name="Créditos Acumulados")
+
+    objects = TenantAwareManager()
+
+    class Meta:
+        verbose_name = "Saldo de Cierre"
+        verbose_name_plural = "Saldos de Cierre"
+        unique_together = ('period', 'account', 'third_party', 'cost_center')
+        indexes = [
+            models.Index(fields=['client', 'period', 'account'], name='acc_closing_period_acc_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.period} - {self.account.code}"
+
+
+class JournalImportBatch(models.Model):
+    """
+    Importación masiva de comprobantes desde un archivo CSV/XLSX.
+    Guarda el resultado del proceso y los errores por fila; los comprobantes
+    con errores se rechazan sin abortar el resto del archivo.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pendiente'),
+        ('PROCESSING', 'Procesando'),
+        ('DONE', 'Terminado'),
+        ('FAILED', 'Fallido'),
+    ]
+
+    client = models.ForeignKey('tenants.Client', on_delete=models.CASCADE)
+    file = models.FileField(upload_to='journal_imports/', verbose_name="Archivo")
+    original_name = models.CharField(max_length=255, blank=True, verbose_name="Nombre del Archivo")
+    post_entries = models.BooleanField(default=True, verbose_name="Contabilizar Comprobantes")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING', verbose_name="Estado")
+
+    # Resultado
+    total_rows = models.IntegerField(default=0, verbose_name="Filas Leídas")
+    imported_entries = models.IntegerField(default=0, verbose_name="Comprobantes Importados")
+    imported_lines = models.IntegerField(default=0, verbose_name="Movimientos Importados")
+    rejected_entries = models.IntegerField(default=0, verbose_name="Comprobantes Rechazados")
+    error_count = models.IntegerField(default=0, verbose_name="Filas con Error")
+    errors = models.JSONField(default=list, blank=True, verbose_name="Errores")
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Cargado por")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Inicio")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Fin")
+
+    objects = TenantAwareManager()
+
+    class Meta:
+        verbose_name = "Importación de Comprobantes"
+        verbose_name_plural = "Importaciones de Comprobantes"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.original_name or self.file.name} ({self.get_status_display()})"
@@ -1,8 +1,12 @@
+from decimal import Decimal
+
 from rest_framework import serializers
+from apps.common.mixins import DynamicFieldsMixin
 from apps.accounting.models import (
     Account, AccountClass, AccountGroup, AccountDianConfiguration,
     CostCenter, ThirdParty, JournalEntry, JournalEntryLine,
-    DianFormat, DianConcept, AccountingTemplate, AccountingTemplateLine, AccountingDocumentType
+    DianFormat, DianConcept, AccountingTemplate, AccountingTemplateLine, AccountingDocumentType,
+    ExogenaReport, FiscalPeriod, JournalImportBatch
 )
 
 
@@ -48,16 +52,33 @@ class AccountGroupSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class AccountSerializer(serializers.ModelSerializer):
+class AccountListSerializer(serializers.ListSerializer):
+    """Calcula los saldos de todas las cuentas del listado en una sola pasada."""
+
+    def to_representation(self, data):
+        from apps.accounting.services.closing_service import account_balances
+
+        accounts = list(data.all() if hasattr(data, 'all') else data)
+        if 'balance' in self.child.fields:
+            self.child.balances = account_balances([account.pk for account in accounts])
+        return super().to_representation(accounts)
+
+
+class AccountSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     balance = serializers.SerializerMethodField()
     dian_configurations = AccountDianConfigurationSerializer(many=True, required=False)
     
     class Meta:
         model = Account
         fields = '__all__'
+        list_serializer_class = AccountListSerializer
     
     def get_balance(self, obj):
-        return obj.get_balance()
+        balances = getattr(self, 'balances', None)
+        if balances is None:
+            return obj.get_balance()
+        debits, credits = balances.get(obj.pk, (Decimal('0'), Decimal('0')))
+        return debits - credits if obj.nature == 'DEBITO' else credits - debits
     
     def create(self, validated_data):
         dian_configs = validated_data.pop('dian_configurations', [])
@@ -92,7 +113,7 @@ class CostCenterSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class ThirdPartySerializer(serializers.ModelSerializer):
+class ThirdPartySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     check_digit = serializers.CharField(read_only=True)  # Auto-calculado
     full_name = serializers.SerializerMethodField()
     
@@ -136,7 +157,7 @@ class JournalEntryLineSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class JournalEntrySerializer(serializers.ModelSerializer):
+class JournalEntrySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     lines = JournalEntryLineSerializer(many=True, read_only=True)
     total_debit = serializers.SerializerMethodField()
     total_credit = serializers.SerializerMethodField()
@@ -149,14 +170,18 @@ class JournalEntrySerializer(serializers.ModelSerializer):
         model = JournalEntry
         fields = '__all__'
     
+    # Los totales llegan anotados desde JournalEntryViewSet; fuera de él
+    # se calculan con los métodos del modelo.
     def get_total_debit(self, obj):
-        return obj.get_total_debit()
+        total = getattr(obj, '_total_debit', None)
+        return obj.get_total_debit() if total is None else total
     
     def get_total_credit(self, obj):
-        return obj.get_total_credit()
+        total = getattr(obj, '_total_credit', None)
+        return obj.get_total_credit() if total is None else total
     
     def get_is_balanced(self, obj):
-        return obj.is_balanced()
+        return self.get_total_debit(obj) == self.get_total_credit(obj)
 
     def get_source_document_info(self, obj):
         """Retorna info básica del documento origen si existe"""
@@ -222,3 +247,30 @@ class AccountingTemplateSerializer(serializers.ModelSerializer):
         
         return instance
 
+
+class ExogenaReportSerializer(serializers.ModelSerializer):
+    format_code = serializers.CharField(source='dian_format.code', read_only=True)
+    format_name = serializers.CharField(source='dian_format.name', read_only=True)
+
+    class Meta:
+        model = ExogenaReport
+        fields = ['id', 'year', 'dian_format', 'format_code', 'format_name', 'sequence',
+                  'xml_file', 'row_count', 'total_value', 'generated_at']
+        read_only_fields = fields
+
+
+class FiscalPeriodSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FiscalPeriod
+        fields = ['id', 'year', 'month', 'start_date', 'end_date', 'status',
+                  'closing_entry', 'closed_at', 'closed_by']
+        read_only_fields = fields
+
+
+class JournalImportBatchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = JournalImportBatch
+        fields = ['id', 'original_name', 'post_entries', 'status', 'total_rows', 'imported_entries',
+                  'imported_lines', 'rejected_entries', 'error_count', 'errors',
+                  'created_by', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
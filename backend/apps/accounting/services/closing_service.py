@@ -0,0 +1,216 @@
+import calendar
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Sum, Value, DecimalField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.accounting.models import (
+    Account, FiscalPeriod, ClosingBalance, JournalEntry, JournalEntryLine,
+)
+
+ZERO = Value(Decimal('0'), output_field=DecimalField(max_digits=18, decimal_places=2))
+DIMENSIONS = ('account_id', 'third_party_id', 'cost_center_id')
+
+
+def latest_closed_period(as_of=None):
+    """Último periodo cerrado cuyo fin es <= as_of (o el último cerrado)."""
+    periods = FiscalPeriod.objects.filter(status='CLOSED')
+    if as_of is not None:
+        periods = periods.filter(end_date__lte=as_of)
+    return periods.order_by('-end_date').first()
+
+
+def account_balances(account_ids, as_of=None):
+    """
+    Débitos y créditos acumulados por cuenta a la fecha `as_of`.
+    Parte de los saldos de cierre del último periodo cerrado y agrega solo
+    el movimiento posterior, de modo que el costo depende de la actividad
+    de los periodos abiertos y no del histórico completo.
+
+    Returns:
+        dict {account_id: (debitos, creditos)}
+    """
+    account_ids = list(account_ids)
+    period = latest_closed_period(as_of)
+    totals = {}
+
+    if period:
+        snapshot = (
+            ClosingBalance.objects.filter(period=period, account_id__in=account_ids)
+            .values('account_id')
+            .annotate(d=Sum('debit'), c=Sum('credit'))
+        )
+        for row in snapshot:
+            totals[row['account_id']] = (row['d'], row['c'])
+
+    lines = JournalEntryLine.objects.filter(entry__status='POSTED', account_id__in=account_ids)
+    if period:
+        lines = lines.filter(entry__date__gt=period.end_date)
+    if as_of is not None:
+        lines = lines.filter(entry__date__lte=as_of)
+
+    for row in lines.values('account_id').annotate(d=Coalesce(Sum('debit'), ZERO), c=Coalesce(Sum('credit'), ZERO)):
+        debit, credit = totals.get(row['account_id'], (Decimal('0'), Decimal('0')))
+        totals[row['account_id']] = (debit + row['d'], credit + row['c'])
+
+    return totals
+
+
+class FiscalCloseService:
+    """
+    Cierre de periodos (mensual) y de año contable.
+
+    Debe ejecutarse dentro de un contexto de tenant.
+    """
+
+    def __init__(self, client_id, user=None):
+        self.client_id = client_id
+        self.user = user
+
+    def get_period(self, year, month):
+        last_day = calendar.monthrange(year, month)[1]
+        period, _ = FiscalPeriod.objects.get_or_create(
+            client_id=self.client_id, year=year, month=month,
+            defaults={'start_date': date(year, month, 1), 'end_date': date(year, month, last_day)},
+        )
+        return period
+
+    @transaction.atomic
+    def close_period(self, year, month):
+        """
+        Cierra el periodo: escribe los saldos acumulados por cuenta, tercero y
+        centro de costo y bloquea la contabilización en sus fechas.
+        """
+        period = FiscalPeriod.objects.select_for_update().get(pk=self.get_period(year, month).pk)
+        if period.status == 'CLOSED':
+            raise ValueError(f"El periodo {period.year}-{period.month:02d} ya está cerrado.")
+        previous = latest_closed_period(period.start_date)
+        if FiscalPeriod.objects.filter(status='OPEN', end_date__lt=period.start_date).exists() or \
+                (previous and previous.end_date + timedelta(days=1) != period.start_date):
+            raise ValueError("Existen periodos anteriores abiertos. Ciérrelos en orden.")
+
+        balances = self._cumulative_balances(period)
+        ClosingBalance.objects.filter(period=period).delete()
+        ClosingBalance.objects.bulk_create([
+            ClosingBalance(
+                client_id=self.client_id, period=period,
+                account_id=key[0], third_party_id=key[1], cost_center_id=key[2],
+                debit=debit, credit=credit,
+            )
+            for key, (debit, credit) in balances.items()
+        ], batch_size=1000)
+
+        period.status = 'CLOSED'
+        period.closed_at = timezone.now()
+        period.closed_by = self.user
+        period.save()
+        return period
+
+    def _cumulative_balances(self, period):
+        """Saldos de cierre anteriores + movimiento contabilizado hasta el fin del periodo."""
+        previous = latest_closed_period(period.start_date)
+        totals = {}
+        if previous:
+            for row in ClosingBalance.objects.filter(period=previous).values(*DIMENSIONS, 'debit', 'credit'):
+                totals[tuple(row[d] for d in DIMENSIONS)] = (row['debit'], row['credit'])
+
+        lines = JournalEntryLine.objects.filter(entry__status='POSTED', entry__date__lte=period.end_date)
+        if previous:
+            lines = lines.filter(entry__date__gt=previous.end_date)
+        grouped = lines.values(*DIMENSIONS).annotate(
+            d=Coalesce(Sum('debit'), ZERO), c=Coalesce(Sum('credit'), ZERO)
+        ).order_by()
+        for row in grouped:
+            key = tuple(row[d] for d in DIMENSIONS)
+            debit, credit = totals.get(key, (Decimal('0'), Decimal('0')))
+            totals[key] = (debit + row['d'], credit + row['c'])
+        return totals
+
+    @transaction.atomic
+    def close_year(self, year, generate_closing_entry=True):
+        """
+        Cierra los periodos abiertos del año. Opcionalmente genera antes el
+        asiento de cierre que traslada las cuentas de resultado al patrimonio
+        (utilidad o pérdida del ejercicio).
+        """
+        for month in range(1, 12):
+            if self.get_period(year, month).status == 'OPEN':
+                self.close_period(year, month)
+
+        december = self.get_period(year, 12)
+        entry = None
+        if generate_closing_entry and december.status == 'OPEN':
+            entry = self.create_closing_entry(year)
+
+        if december.status == 'OPEN':
+            december = self.close_period(year, 12)
+        if entry:
+            december.closing_entry = entry
+            december.save(update_fields=['closing_entry'])
+        return december
+
+    def create_closing_entry(self, year):
+        config = settings.ACCOUNTING_CONFIG
+        number = f"CIERRE-{year}"
+        if JournalEntry.objects.filter(number=number).exclude(status='CANCELLED').exists():
+            raise ValueError(f"Ya existe el asiento de cierre {number}.")
+
+        year_end = date(year, 12, 31)
+        result_accounts = Account.objects.filter(class_code__in=config['RESULT_CLASSES'])
+        balances = account_balances(result_accounts.values_list('id', flat=True), as_of=year_end)
+
+        entry = JournalEntry.objects.create(
+            client_id=self.client_id, number=number, entry_type='CIERRE', date=year_end,
+            description=f"Cierre de cuentas de resultado del año {year}", status='DRAFT',
+            created_by=self.user,
+        )
+        line_number, net = 0, Decimal('0')
+        for account_id, (debit, credit) in sorted(balances.items()):
+            balance = debit - credit
+            if not balance:
+                continue
+            line_number += 1
+            JournalEntryLine.objects.create(
+                client_id=self.client_id, entry=entry, line_number=line_number, account_id=account_id,
+                description=f"Cierre {year}",
+                debit=-balance if balance < 0 else Decimal('0'),
+                credit=balance if balance > 0 else Decimal('0'),
+            )
+            net += balance
+
+        if net:
+            # net > 0: gastos mayores (pérdida); net < 0: ingresos mayores (utilidad)
+            code = config['LOSS_ACCOUNT'] if net > 0 else config['PROFIT_ACCOUNT']
+            equity_account = Account.objects.filter(account_code=code, allows_movement=True).order_by('code').first()
+            if not equity_account:
+                raise ValueError(f"No existe la cuenta {code} para el resultado del ejercicio.")
+            JournalEntryLine.objects.create(
+                client_id=self.client_id, entry=entry, line_number=line_number + 1, account=equity_account,
+                description=f"Resultado del ejercicio {year}",
+                debit=net if net > 0 else Decimal('0'),
+                credit=-net if net < 0 else Decimal('0'),
+            )
+
+        entry.status = 'POSTED'
+        entry.posted_by = self.user
+        entry.save()
+        return entry
+
+    @transaction.atomic
+    def reopen_period(self, year, month):
+        """Reabre el periodo y todos los posteriores cerrados (sus saldos dejan de ser válidos)."""
+        period = self.get_period(year, month)
+        from apps.taxes.signals import reopen_declarations
+
+        to_reopen = FiscalPeriod.objects.select_for_update().filter(status='CLOSED', start_date__gte=period.start_date)
+        last_end = to_reopen.aggregate(last=Max('end_date'))['last']
+        ClosingBalance.objects.filter(period__in=to_reopen).delete()
+        reopened = to_reopen.update(status='OPEN', closed_at=None, closed_by=None)
+        # update() no dispara post_save: las declaraciones definitivas se reabren aquí
+        if last_end:
+            reopen_declarations(self.client_id, period.start_date, last_end)
+        return reopened
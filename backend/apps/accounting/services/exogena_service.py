@@ -0,0 +1,238 @@
+import tempfile
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Sum, F, Case, When, DecimalField
+from django.utils import timezone
+from lxml import etree
+
+from apps.accounting.models import DianFormat, JournalEntryLine, ExogenaReport
+
+# Elemento XML de cada registro y atributo del valor por formato
+FORMAT_ELEMENTS = {
+    '1001': ('pagos', 'pago'),
+    '1003': ('retefte', 'ret'),
+    '1005': ('iva', 'imp'),
+    '1006': ('iva', 'imp'),
+    '1007': ('ingresos', 'ingp'),
+    '1008': ('cxc', 'sal'),
+    '1009': ('cxp', 'sal'),
+    '2276': ('rentr', 'pasa'),
+}
+DEFAULT_ELEMENT = ('reg', 'valor')
+
+# Valor con el signo de la naturaleza de la cuenta
+SIGNED_AMOUNT = Sum(
+    Case(
+        When(account__nature='DEBITO', then=F('debit') - F('credit')),
+        default=F('credit') - F('debit'),
+        output_field=DecimalField(max_digits=20, decimal_places=2),
+    )
+)
+
+THIRD_PARTY_FIELDS = [
+    'third_party_id',
+    'third_party__identification_type',
+    'third_party__identification_number',
+    'third_party__check_digit',
+    'third_party__surname',
+    'third_party__second_surname',
+    'third_party__first_name',
+    'third_party__middle_name',
+    'third_party__business_name',
+    'third_party__address',
+    'third_party__department_code',
+    'third_party__city_code',
+    'third_party__country_code',
+]
+
+
+class ExogenaGenerator:
+    """
+    Generador de Información Exógena (Medios Magnéticos) de un año gravable.
+
+    Por cada formato DIAN vigente se ejecuta una sola consulta agrupada por
+    concepto y tercero sobre JournalEntryLine (vía AccountDianConfiguration).
+    Los terceros por debajo de la cuantía mínima se agrupan en "cuantías
+    menores" (NIT 222222222) y el XML se escribe en streaming (lxml.xmlfile),
+    dividido en envíos de máximo ROW_LIMIT registros.
+
+    Debe ejecutarse dentro de un contexto de tenant.
+    """
+
+    def __init__(self, client_id, year):
+        self.client_id = client_id
+        self.year = year
+        self.config = settings.EXOGENA_CONFIG
+        self.row_limit = self.config['ROW_LIMIT']
+
+    def formats(self):
+        """Última versión de cada formato vigente para el año."""
+        latest = {}
+        for dian_format in DianFormat.objects.filter(valid_from__lte=self.year).order_by('code', '-valid_from', '-version'):
+            latest.setdefault(dian_format.code, dian_format)
+        return list(latest.values())
+
+    def generate_all(self):
+        """Genera todos los formatos con cuentas configuradas. Retorna {formato: registros}."""
+        return {dian_format.code: self.generate(dian_format) for dian_format in self.formats()}
+
+    # ------------------------------------------------------------------
+    # Agregación
+    # ------------------------------------------------------------------
+    def aggregate(self, dian_format):
+        """
+        Consulta agrupada (concepto, tercero) para el formato.
+        Los formatos de saldos toman todo el histórico hasta el 31 de diciembre.
+        """
+        year_end = date(self.year, 12, 31)
+        lines = JournalEntryLine.objects.filter(
+            entry__status='POSTED',
+            entry__date__lte=year_end,
+            account__dian_configurations__dian_format=dian_format,
+        )
+        if dian_format.code not in self.config['BALANCE_FORMATS']:
+            lines = lines.filter(entry__date__gte=date(self.year, 1, 1))
+
+        return (
+            lines
+            .values('account__dian_configurations__dian_concept__code', *THIRD_PARTY_FIELDS)
+            .annotate(amount=SIGNED_AMOUNT)
+            .order_by('account__dian_configurations__dian_concept__code', 'third_party__identification_number')
+        )
+
+    def records(self, dian_format):
+        """
+        Registros del formato listos para XML. Los terceros bajo la cuantía
+        mínima (o sin tercero) se acumulan por concepto y se emiten al final.
+        """
+        threshold = Decimal(str(self.config['THRESHOLDS'].get(dian_format.code, 0)))
+        minor_amounts = {}
+
+        for row in self.aggregate(dian_format).iterator(chunk_size=self.row_limit):
+            concept = row['account__dian_configurations__dian_concept__code']
+            amount = row['amount'] or Decimal('0')
+            if not amount:
+                continue
+            if row['third_party_id'] is None or abs(amount) < threshold:
+                minor_amounts[concept] = minor_amounts.get(concept, Decimal('0')) + amount
+                continue
+            yield self._third_party_record(concept, row, amount)
+
+        for concept, amount in sorted(minor_amounts.items()):
+            if amount:
+                yield self._minor_amounts_record(concept, amount)
+
+    def _third_party_record(self, concept, row, amount):
+        is_company = bool(row['third_party__business_name'])
+        return {
+            'cpt': concept,
+            'tdoc': row['third_party__identification_type'],
+            'nid': row['third_party__identification_number'],
+            'dv': row['third_party__check_digit'] or '',
+            'apl1': '' if is_company else row['third_party__surname'] or '',
+            'apl2': '' if is_company else row['third_party__second_surname'] or '',
+            'nom1': '' if is_company else row['third_party__first_name'] or '',
+            'nom2': '' if is_company else row['third_party__middle_name'] or '',
+            'raz': row['third_party__business_name'] or '',
+            'dir': row['third_party__address'] or '',
+            'dpto': row['third_party__department_code'] or '',
+            'mun': (row['third_party__city_code'] or '')[-3:],
+            'pais': row['third_party__country_code'] or '169',
+            'amount': amount,
+        }
+
+    def _minor_amounts_record(self, concept, amount):
+        return {
+            'cpt': concept,
+            'tdoc': self.config['MINOR_AMOUNTS_ID_TYPE'],
+            'nid': self.config['MINOR_AMOUNTS_NIT'],
+            'dv': '', 'apl1': '', 'apl2': '', 'nom1': '', 'nom2': '',
+            'raz': 'CUANTIAS MENORES',
+            'dir': '', 'dpto': '', 'mun': '', 'pais': '169',
+            'amount': amount,
+        }
+
+    # ------------------------------------------------------------------
+    # XML
+    # ------------------------------------------------------------------
+    def generate(self, dian_format):
+        """Escribe los envíos del formato (máx. ROW_LIMIT registros c/u) y los registra."""
+        chunk, sequence, total_rows = [], 0, 0
+        for record in self.records(dian_format):
+            chunk.append(record)
+            if len(chunk) >= self.row_limit:
+                sequence += 1
+                self._write_chunk(dian_format, sequence, chunk)
+                total_rows += len(chunk)
+                chunk = []
+        if chunk:
+            sequence += 1
+            self._write_chunk(dian_format, sequence, chunk)
+            total_rows += len(chunk)
+
+        # Envíos sobrantes de una generación anterior más grande (fila y archivo)
+        surplus = ExogenaReport.objects.filter(year=self.year, dian_format=dian_format, sequence__gt=sequence)
+        for report in surplus:
+            if report.xml_file:
+                report.xml_file.delete(save=False)
+        surplus.delete()
+        return total_rows
+
+    def _write_chunk(self, dian_format, sequence, records):
+        element, value_attr = FORMAT_ELEMENTS.get(dian_format.code, DEFAULT_ELEMENT)
+        values = [self._pesos(r['amount']) for r in records]
+
+        with tempfile.TemporaryFile() as output:
+            with etree.xmlfile(output, encoding='ISO-8859-1') as xf:
+                xf.write_declaration()
+                with xf.element('mas', nsmap={'xsi': 'http://www.w3.org/2001/XMLSchema-instance'}):
+                    xf.write(self._header(dian_format, sequence, len(records), sum(values)))
+                    for record, value in zip(records, values):
+                        attrs = {k: str(v) for k, v in record.items() if k != 'amount'}
+                        attrs[value_attr] = str(value)
+                        xf.write(etree.Element(element, attrs))
+            output.seek(0)
+            self._store(dian_format, sequence, output, len(records), sum(values))
+
+    def _header(self, dian_format, sequence, row_count, total):
+        header = etree.Element('Cab')
+        for tag, value in [
+            ('Ano', self.year),
+            ('CodCpt', 1),
+            ('Formato', dian_format.code),
+            ('Version', dian_format.version),
+            ('NumEnvio', sequence),
+            ('FecEnvio', timezone.localtime().strftime('%Y-%m-%dT%H:%M:%S')),
+            ('FecInicial', f"{self.year}-01-01"),
+            ('FecFinal', f"{self.year}-12-31"),
+            ('ValorTotal', total),
+            ('CantReg', row_count),
+        ]:
+            etree.SubElement(header, tag).text = str(value)
+        return header
+
+    def _filename(self, dian_format, sequence):
+        # Dmuisca_ + concepto(2) + formato(5) + versión(2) + año(4) + consecutivo(8)
+        return f"Dmuisca_01{int(dian_format.code):05d}{dian_format.version:02d}{self.year}{sequence:08d}.xml"
+
+    @transaction.atomic
+    def _store(self, dian_format, sequence, fileobj, row_count, total):
+        report, _ = ExogenaReport.objects.get_or_create(
+            client_id=self.client_id, year=self.year, dian_format=dian_format, sequence=sequence,
+        )
+        if report.xml_file:
+            report.xml_file.delete(save=False)
+        report.xml_file.save(f"{self.client_id}/{self._filename(dian_format, sequence)}", File(fileobj), save=False)
+        report.row_count = row_count
+        report.total_value = total
+        report.save()
+        return report
+
+    @staticmethod
+    def _pesos(amount):
+        # La DIAN recibe valores en pesos enteros
+        return int(Decimal(amount).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
@@ -0,0 +1,49 @@
+from decimal import Decimal
+from django.db.models import Sum, Value, DecimalField
+from django.db.models.functions import Coalesce
+
+# Nivel PUC -> columna de prefijo en Account (ver Account.PUC_LEVELS)
+LEVEL_FIELDS = {
+    'class': 'class_code',
+    'group': 'group_code',
+    'account': 'account_code',
+    'subaccount': 'subaccount_code',
+}
+
+ZERO = Value(Decimal('0'), output_field=DecimalField(max_digits=18, decimal_places=2))
+
+
+def level_field(level):
+    if level not in LEVEL_FIELDS:
+        raise ValueError(f"Nivel PUC no soportado: {level}. Use uno de {list(LEVEL_FIELDS)}")
+    return f"account__{LEVEL_FIELDS[level]}"
+
+
+def filter_by_prefix(lines, level, codes):
+    """
+    Filtra líneas de asiento por prefijos PUC de un nivel (igualdad indexada).
+    Ej: filter_by_prefix(lines, 'class', ['5', '6'])
+    """
+    return lines.filter(**{f"{level_field(level)}__in": list(codes)})
+
+
+def rollup(lines, level):
+    """
+    Consolida débitos y créditos de un queryset de JournalEntryLine al nivel
+    PUC indicado, agrupando por la columna de prefijo (una consulta).
+
+    Returns:
+        dict {prefijo: {'debit': Decimal, 'credit': Decimal}}
+    """
+    field = level_field(level)
+    grouped = (
+        lines.values(field)
+        .annotate(debit=Coalesce(Sum('debit'), ZERO), credit=Coalesce(Sum('credit'), ZERO))
+        .order_by(field)
+    )
+    return {row[field]: {'debit': row['debit'], 'credit': row['credit']} for row in grouped}
+
+
+def filter_by_cost_center(lines, cost_center):
+    """Líneas del centro de costo y de todo su subárbol (join por la tabla de cierre)."""
+    return lines.filter(cost_center__ancestor_links__ancestor=cost_center)
@@ -0,0 +1,416 @@
+import csv
+import io
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.accounting.models import (
+    Account, CostCenter, FiscalPeriod, JournalEntry, JournalEntryLine, ThirdParty,
+)
+from apps.common.search import is_postgres
+from apps.common.tabular import clean_text, iter_table, normalize_header, parse_amount, parse_date
+from apps.common.utils import normalize_nit
+from apps.reports.signals import ledger_bulk_written
+
+ZERO = Decimal('0')
+
+# Encabezados aceptados (en minúsculas, sin tildes) -> columna interna
+HEADER_ALIASES = {
+    'comprobante': 'number', 'numero': 'number', 'number': 'number',
+    'fecha': 'date', 'date': 'date',
+    'tipo': 'entry_type', 'entry_type': 'entry_type',
+    'descripcion': 'description', 'description': 'description',
+    'referencia': 'reference', 'reference': 'reference',
+    'cuenta': 'account', 'account': 'account',
+    'nit': 'nit', 'tercero': 'nit', 'third_party': 'nit',
+    'centro_costo': 'cost_center', 'centro de costo': 'cost_center', 'cost_center': 'cost_center',
+    'detalle': 'detail', 'detail': 'detail',
+    'debito': 'debit', 'debit': 'debit',
+    'credito': 'credit', 'credit': 'credit',
+    'base': 'base', 'base_amount': 'base',
+}
+REQUIRED_COLUMNS = ('number', 'date', 'account', 'debit', 'credit')
+COLUMNS = ('number', 'date', 'entry_type', 'description', 'reference', 'account',
+           'nit', 'cost_center', 'detail', 'debit', 'credit', 'base')
+ENTRY_TYPES = {code for code, _ in JournalEntry.ENTRY_TYPE_CHOICES}
+
+# En CSV, COPY lee un campo vacío sin comillas como NULL: los textos vacíos
+# (referencia, descripción) se fuerzan a '' porque sus columnas son NOT NULL
+COPY_ENTRY_SQL = "COPY journal_import_entry FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (description, reference))"
+COPY_LINE_SQL = "COPY journal_import_line FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (description))"
+
+
+class ImportFileError(ValueError):
+    """El archivo no se puede leer (formato o encabezados inválidos)."""
+
+
+# ----------------------------------------------------------------------
+# Lectura en streaming
+# ----------------------------------------------------------------------
+def _header_map(header):
+    mapping = {index: HEADER_ALIASES.get(normalize_header(name)) for index, name in enumerate(header)}
+    mapping = {index: column for index, column in mapping.items() if column}
+    missing = set(REQUIRED_COLUMNS) - set(mapping.values())
+    if missing:
+        raise ImportFileError(f"Faltan columnas obligatorias: {', '.join(sorted(missing))}")
+    return mapping
+
+
+def iter_rows(stream, filename):
+    """
+    Lee el archivo fila a fila sin cargarlo completo en memoria.
+    Produce (número de fila, dict con las columnas internas).
+    """
+    reader = iter_table(stream, filename)
+    try:
+        header = next(reader)
+    except StopIteration:
+        raise ImportFileError("El archivo está vacío.")
+    mapping = _header_map(header)
+
+    for row_number, values in enumerate(reader, start=2):
+        if not values or all(value in (None, '') for value in values):
+            continue
+        row = dict.fromkeys(COLUMNS)
+        for index, column in mapping.items():
+            if index < len(values):
+                row[column] = values[index]
+        yield row_number, row
+
+
+# ----------------------------------------------------------------------
+# Importación
+# ----------------------------------------------------------------------
+class JournalImportService:
+    """
+    Importación masiva de comprobantes contables.
+
+    1. Lee el archivo en streaming y lo procesa por lotes de comprobantes
+       completos (ACCOUNTING_CONFIG['IMPORT_BATCH_SIZE'] filas aprox.). Las
+       líneas de un mismo comprobante deben venir contiguas.
+    2. Resuelve cuentas, NIT y centros de costo contra diccionarios cargados
+       una sola vez.
+    3. Valida por columnas (tipos, cuentas de movimiento, tercero/centro de
+       costo requeridos, periodos cerrados) y el cuadre por comprobante.
+    4. Carga los comprobantes válidos: en PostgreSQL con COPY a tablas
+       temporales y un INSERT ... SELECT; en otros motores con bulk_create.
+
+    Un comprobante con cualquier fila inválida se rechaza completo y el error
+    se informa por fila. Debe ejecutarse dentro de un contexto de tenant.
+    """
+
+    def __init__(self, client_id, user=None, post_entries=True):
+        self.client_id = client_id
+        self.user = user
+        self.post_entries = post_entries
+        config = settings.ACCOUNTING_CONFIG
+        self.batch_size = config.get('IMPORT_BATCH_SIZE', 5000)
+        self.max_errors = config.get('IMPORT_MAX_ERRORS', 1000)
+
+        self.result = {
+            'total_rows': 0, 'imported_entries': 0, 'imported_lines': 0,
+            'rejected_entries': 0, 'error_count': 0, 'errors': [],
+        }
+        self._seen_numbers = set()
+        self._load_lookups()
+
+    def _load_lookups(self):
+        self.accounts = {
+            code: (pk, allows_movement and is_active, requires_third_party, requires_cost_center)
+            for pk, code, allows_movement, is_active, requires_third_party, requires_cost_center
+            in Account.objects.values_list(
+                'id', 'code', 'allows_movement', 'is_active', 'requires_third_party', 'requires_cost_center'
+            ).iterator()
+        }
+        self.third_parties = {
+            normalize_nit(nit): pk
+            for pk, nit in ThirdParty.objects.values_list('id', 'identification_number').iterator()
+        }
+        self.cost_centers = dict(CostCenter.objects.filter(is_active=True).values_list('code', 'id'))
+        self.closed_until = FiscalPeriod.closed_until()
+
+    # ------------------------------------------------------------------
+    def run(self, stream, filename):
+        """Procesa el archivo completo y devuelve el resumen con los errores por fila."""
+        chunk, current = [], None
+        for row_number, row in iter_rows(stream, filename):
+            self.result['total_rows'] += 1
+            number = clean_text(row['number'])
+            if number != current and len(chunk) >= self.batch_size:
+                self._process_chunk(chunk)
+                chunk = []
+            current = number
+            chunk.append((row_number, row))
+        if chunk:
+            self._process_chunk(chunk)
+        return self.result
+
+    def _add_error(self, row_number, number, message):
+        errors = self.result['errors']
+        if errors and errors[-1]['row'] == row_number:
+            errors[-1]['errors'].append(message)
+            return
+        self.result['error_count'] += 1
+        if len(errors) < self.max_errors:
+            errors.append({'row': row_number, 'entry': number, 'errors': [message]})
+
+    def _is_closed(self, value):
+        # Mismo criterio que FiscalPeriod.is_date_closed, sin una consulta por fila
+        return self.closed_until is not None and value <= self.closed_until
+
+    # ------------------------------------------------------------------
+    # Validación por columnas
+    # ------------------------------------------------------------------
+    def _process_chunk(self, chunk):
+        rows = [number for number, _ in chunk]
+        columns = {name: [row[name] for _, row in chunk] for name in COLUMNS}
+
+        numbers = [clean_text(value) for value in columns['number']]
+        dates = [parse_date(value) for value in columns['date']]
+        entry_types = [clean_text(value).upper() or 'DIARIO' for value in columns['entry_type']]
+        account_codes = [clean_text(value) for value in columns['account']]
+        nits = [normalize_nit(clean_text(value)) for value in columns['nit']]
+        cost_center_codes = [clean_text(value) for value in columns['cost_center']]
+        debits = [parse_amount(value) for value in columns['debit']]
+        credits = [parse_amount(value) for value in columns['credit']]
+        bases = [parse_amount(value) for value in columns['base']]
+
+        accounts = [self.accounts.get(code) for code in account_codes]
+        third_party_ids = [self.third_parties.get(nit) if nit else None for nit in nits]
+        cost_center_ids = [self.cost_centers.get(code) if code else None for code in cost_center_codes]
+
+        # Comprobantes repetidos: ya existentes en la BD o no contiguos en el archivo
+        chunk_numbers = set(numbers) - {''}
+        existing = set(
+            JournalEntry.objects.filter(number__in=chunk_numbers).values_list('number', flat=True)
+        )
+        repeated = (chunk_numbers & self._seen_numbers) | existing
+        self._seen_numbers |= chunk_numbers
+        started, previous = set(), None
+        for number in numbers:
+            if number != previous:
+                if number in started:
+                    repeated.add(number)
+                started.add(number)
+                previous = number
+
+        invalid = set()
+        for i, row_number in enumerate(rows):
+            number = numbers[i]
+            checks = [
+                (not number, "Número de comprobante vacío."),
+                (number in existing, f"El comprobante {number} ya existe."),
+                (number in repeated and number not in existing,
+                 f"Las líneas del comprobante {number} no están contiguas en el archivo."),
+                (dates[i] is None, f"Fecha inválida: '{clean_text(columns['date'][i])}'."),
+                (self.post_entries and dates[i] is not None and self._is_closed(dates[i]),
+                 f"El periodo contable de la fecha {dates[i]} está cerrado."),
+                (entry_types[i] not in ENTRY_TYPES, f"Tipo de comprobante inválido: '{entry_types[i]}'."),
+                (accounts[i] is None, f"La cuenta '{account_codes[i]}' no existe."),
+                (accounts[i] is not None and not accounts[i][1],
+                 f"La cuenta '{account_codes[i]}' no permite movimientos o está inactiva."),
+                (nits[i] and third_party_ids[i] is None, f"El tercero con NIT '{nits[i]}' no existe."),
+                (accounts[i] is not None and accounts[i][2] and not nits[i],
+                 f"La cuenta '{account_codes[i]}' requiere tercero."),
+                (cost_center_codes[i] and cost_center_ids[i] is None,
+                 f"El centro de costo '{cost_center_codes[i]}' no existe."),
+                (accounts[i] is not None and accounts[i][3] and not cost_center_codes[i],
+                 f"La cuenta '{account_codes[i]}' requiere centro de costo."),
+                (debits[i] is None or credits[i] is None or bases[i] is None, "Valor numérico inválido."),
+            ]
+            if debits[i] is not None and credits[i] is not None:
+                checks += [
+                    (debits[i] < 0 or credits[i] < 0, "Débito y crédito no pueden ser negativos."),
+                    ((debits[i] > 0) == (credits[i] > 0), "La línea debe tener débito o crédito (solo uno)."),
+                ]
+            for failed, message in checks:
+                if failed:
+                    self._add_error(row_number, number, message)
+                    invalid.add(number)
+
+        # Cuadre por comprobante
+        totals = defaultdict(lambda: [ZERO, ZERO])
+        first_row = {}
+        for i, number in enumerate(numbers):
+            first_row.setdefault(number, i)
+            if number not in invalid:
+                totals[number][0] += debits[i]
+                totals[number][1] += credits[i]
+        for number, (debit, credit) in totals.items():
+            if debit != credit:
+                self._add_error(
+                    rows[first_row[number]], number,
+                    f"El comprobante {number} no está balanceado. Débitos: {debit}, Créditos: {credit}",
+                )
+                invalid.add(number)
+
+        # Comprobantes y líneas válidos
+        entries, lines = {}, []
+        for i, number in enumerate(numbers):
+            if number in invalid:
+                continue
+            if number not in entries:
+                entries[number] = {
+                    'number': number,
+                    'entry_type': entry_types[i],
+                    'date': dates[i],
+                    'description': clean_text(columns['description'][i]) or f"Importación {number}",
+                    'reference': clean_text(columns['reference'][i])[:100],
+                    'lines': 0,
+                }
+            entries[number]['lines'] += 1
+            lines.append({
+                'number': number,
+                'line_number': entries[number]['lines'],
+                'account_id': accounts[i][0],
+                'third_party_id': third_party_ids[i],
+                'cost_center_id': cost_center_ids[i],
+                'description': (clean_text(columns['detail'][i]) or entries[number]['description'])[:500],
+                'debit': debits[i],
+                'credit': credits[i],
+                'base_amount': bases[i],
+            })
+
+        self.result['rejected_entries'] += len(invalid - {''})
+        if entries:
+            self._load(list(entries.values()), lines)
+            self.result['imported_entries'] += len(entries)
+            self.result['imported_lines'] += len(lines)
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+    def _load(self, entries, lines):
+        with transaction.atomic():
+            if is_postgres():
+                self._copy_load(entries, lines)
+            else:
+                self._bulk_load(entries, lines)
+            if self.post_entries:
+                ledger_bulk_written(self.client_id, min(entry['date'] for entry in entries))
+
+    def _entry_status(self):
+        now = timezone.now()
+        if self.post_entries:
+            return 'POSTED', self.user.pk if self.user else None, now
+        return 'DRAFT', None, None
+
+    def _bulk_load(self, entries, lines):
+        status, posted_by_id, posted_at = self._entry_status()
+        created = JournalEntry.objects.bulk_create([
+            JournalEntry(
+                client_id=self.client_id, number=e['number'], entry_type=e['entry_type'], date=e['date'],
+                description=e['description'], reference=e['reference'], status=status,
+                created_by=self.user, posted_by_id=posted_by_id, posted_at=posted_at,
+            )
+            for e in entries
+        ], batch_size=1000)
+        ids = {entry.number: entry.pk for entry in created}
+        JournalEntryLine.objects.bulk_create([
+            JournalEntryLine(
+                client_id=self.client_id, entry_id=ids[line['number']],
+                **{key: value for key, value in line.items() if key != 'number'},
+            )
+            for line in lines
+        ], batch_size=1000)
+
+    def _copy_payload(self, entries, lines):
+        """Archivos CSV de comprobantes y líneas para COPY (ids vacíos = NULL)."""
+        entry_csv = io.StringIO()
+        writer = csv.writer(entry_csv)
+        for e in entries:
+            writer.writerow([e['number'], e['entry_type'], e['date'].isoformat(), e['description'], e['reference']])
+        line_csv = io.StringIO()
+        writer = csv.writer(line_csv)
+        for line in lines:
+            writer.writerow([
+                line['number'], line['line_number'], line['account_id'],
+                '' if line['third_party_id'] is None else line['third_party_id'],
+                '' if line['cost_center_id'] is None else line['cost_center_id'],
+                line['description'], line['debit'], line['credit'], line['base_amount'],
+            ])
+        entry_csv.seek(0)
+        line_csv.seek(0)
+        return entry_csv, line_csv
+
+    def _copy_load(self, entries, lines):
+        """COPY a tablas temporales y un solo INSERT ... SELECT por tabla."""
+        status, posted_by_id, posted_at = self._entry_status()
+        entry_table = JournalEntry._meta.db_table
+        line_table = JournalEntryLine._meta.db_table
+        entry_csv, line_csv = self._copy_payload(entries, lines)
+
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS journal_import_entry (
+                    number varchar(50), entry_type varchar(20), date date,
+                    description text, reference varchar(100)
+                ) ON COMMIT DROP
+            """)
+            cursor.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS journal_import_line (
+                    number varchar(50), line_number integer, account_id bigint,
+                    third_party_id bigint, cost_center_id bigint, description varchar(500),
+                    debit numeric(15, 2), credit numeric(15, 2), base_amount numeric(15, 2)
+                ) ON COMMIT DROP
+            """)
+            cursor.copy_expert(COPY_ENTRY_SQL, entry_csv)
+            cursor.copy_expert(COPY_LINE_SQL, line_csv)
+            cursor.execute(f"""
+                WITH inserted AS (
+                    INSERT INTO {entry_table} (
+                        client_id, number, entry_type, date, description, reference, external_reference,
+                        status, created_by_id, posted_by_id, posted_at, notes, attachments,
+                        created_at, updated_at
+                    )
+                    SELECT %s, number, entry_type, date, description, reference, '',
+                           %s, %s, %s, %s, '', '[]'::jsonb, now(), now()
+                    FROM journal_import_entry
+                    RETURNING id, number
+                )
+                INSERT INTO {line_table} (
+                    client_id, entry_id, line_number, account_id, third_party_id, cost_center_id,
+                    description, debit, credit, base_amount, metadata, created_at, updated_at
+                )
+                SELECT %s, inserted.id, l.line_number, l.account_id, l.third_party_id, l.cost_center_id,
+                       l.description, l.debit, l.credit, l.base_amount, '{{}}'::jsonb, now(), now()
+                FROM journal_import_line l
+                JOIN inserted ON inserted.number = l.number
+            """, [
+                self.client_id, status, self.user.pk if self.user else None, posted_by_id, posted_at,
+                self.client_id,
+            ])
+            cursor.execute("TRUNCATE journal_import_entry, journal_import_line")
+
+
+def run_import_batch(batch):
+    """Procesa un JournalImportBatch y guarda el resultado en él."""
+    batch.status = 'PROCESSING'
+    batch.started_at = timezone.now()
+    batch.save(update_fields=['status', 'started_at'])
+
+    service = JournalImportService(batch.client_id, user=batch.created_by, post_entries=batch.post_entries)
+    try:
+        with batch.file.open('rb') as stream:
+            result = service.run(stream, batch.original_name or batch.file.name)
+        batch.status = 'DONE'
+    except ImportFileError as e:
+        result = service.result
+        result['errors'].insert(0, {'row': 1, 'entry': '', 'errors': [str(e)]})
+        result['error_count'] += 1
+        batch.status = 'FAILED'
+    except Exception:
+        # Error inesperado: el lote no debe quedar en PROCESSING
+        batch.status = 'FAILED'
+        batch.finished_at = timezone.now()
+        batch.save(update_fields=['status', 'finished_at'])
+        raise
+
+    for field, value in result.items():
+        setattr(batch, field, value)
+    batch.finished_at = timezone.now()
+    batch.save()
+    return batch
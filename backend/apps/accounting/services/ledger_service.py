@@ -0,0 +1,194 @@
+import csv
+import json
+import tempfile
+from decimal import Decimal
+
+from django.db.models import Sum, F, Window, Value, DecimalField
+from django.db.models.functions import Coalesce
+from django.db.models.expressions import RowRange
+
+from apps.accounting.models import Account, JournalEntryLine
+from apps.tenants.utils import tenant_context
+
+CENTS = Decimal('0.01')
+ZERO = Value(Decimal('0'), output_field=DecimalField(max_digits=18, decimal_places=2))
+
+# Filas por lote leídas del cursor del servidor
+CHUNK_SIZE = 2000
+
+# Límite de filas por hoja en Excel (1.048.576 incluyendo encabezado)
+XLSX_MAX_ROWS = 1_048_575
+
+LEDGER_COLUMNS = [
+    ('account_code', 'Cuenta'),
+    ('account_name', 'Nombre Cuenta'),
+    ('date', 'Fecha'),
+    ('entry_number', 'Comprobante'),
+    ('line_number', 'Línea'),
+    ('third_party', 'Tercero'),
+    ('third_party_name', 'Nombre Tercero'),
+    ('cost_center', 'Centro de Costo'),
+    ('description', 'Detalle'),
+    ('debit', 'Débito'),
+    ('credit', 'Crédito'),
+    ('balance', 'Saldo'),
+]
+
+
+class GeneralLedgerService:
+    """
+    Libro Auxiliar por cuenta con saldo acumulado.
+
+    - El saldo inicial por cuenta se precalcula en una sola consulta agrupada.
+    - El saldo corrido lo calcula la BD con una función de ventana (SUM OVER)
+      particionada por cuenta.
+    - Las filas se leen con `iterator()` (cursor del servidor en PostgreSQL),
+      por lo que la memoria es constante sin importar el tamaño del libro.
+
+    Debe ejecutarse dentro de un contexto de tenant.
+    """
+
+    def __init__(self, date_from, date_to, account_from=None, account_to=None, third_party_id=None):
+        self.date_from = date_from
+        self.date_to = date_to
+        self.account_from = account_from
+        self.account_to = account_to
+        self.third_party_id = third_party_id
+
+    def _base_lines(self):
+        lines = JournalEntryLine.objects.filter(entry__status='POSTED')
+        if self.account_from:
+            lines = lines.filter(account__code__gte=self.account_from)
+        if self.account_to:
+            # Incluye las subcuentas del código final (ej. hasta 2408 incluye 240801)
+            lines = lines.filter(account__code__lte=f"{self.account_to}\uffff")
+        if self.third_party_id:
+            lines = lines.filter(third_party_id=self.third_party_id)
+        return lines
+
+    def opening_balances(self):
+        """Saldo (débito - crédito) anterior a `date_from`, por cuenta."""
+        return dict(
+            self._base_lines()
+            .filter(entry__date__lt=self.date_from)
+            .values('account_id')
+            .annotate(balance=Coalesce(Sum('debit'), ZERO) - Coalesce(Sum('credit'), ZERO))
+            .values_list('account_id', 'balance')
+        )
+
+    def lines(self):
+        """Movimientos del periodo con saldo corrido (débito - crédito) por cuenta."""
+        ordering = [F('entry__date').asc(), F('entry_id').asc(), F('line_number').asc(), F('id').asc()]
+        return (
+            self._base_lines()
+            .filter(entry__date__gte=self.date_from, entry__date__lte=self.date_to)
+            .annotate(running=Window(
+                expression=Sum(F('debit') - F('credit')),
+                partition_by=[F('account_id')],
+                order_by=ordering,
+                frame=RowRange(start=None, end=0),
+            ))
+            .values(
+                'account_id', 'account__code', 'account__name',
+                'entry__date', 'entry__number', 'line_number',
+                'third_party__identification_number', 'third_party__business_name',
+                'third_party__first_name', 'third_party__surname',
+                'cost_center__code', 'description', 'debit', 'credit', 'running',
+            )
+            .order_by('account__code', *ordering)
+        )
+
+    def rows(self):
+        """
+        Genera las filas del libro (dicts con las claves de LEDGER_COLUMNS).
+        El saldo se expresa según la naturaleza de la cuenta.
+        """
+        openings = self.opening_balances()
+        credit_nature = set(
+            Account.objects.filter(nature='CREDITO').values_list('id', flat=True)
+        )
+
+        for line in self.lines().iterator(chunk_size=CHUNK_SIZE):
+            account_id = line['account_id']
+            balance = openings.get(account_id, Decimal('0')) + Decimal(line['running'] or 0)
+            if account_id in credit_nature:
+                balance = -balance
+            name = line['third_party__business_name'] or ' '.join(
+                filter(None, [line['third_party__first_name'], line['third_party__surname']])
+            )
+            yield {
+                'account_code': line['account__code'],
+                'account_name': line['account__name'],
+                'date': line['entry__date'],
+                'entry_number': line['entry__number'],
+                'line_number': line['line_number'],
+                'third_party': line['third_party__identification_number'] or '',
+                'third_party_name': name,
+                'cost_center': line['cost_center__code'] or '',
+                'description': line['description'],
+                'debit': line['debit'],
+                'credit': line['credit'],
+                'balance': balance.quantize(CENTS),
+            }
+
+
+class _Echo:
+    """Pseudo-buffer para csv.writer: devuelve la línea en lugar de escribirla."""
+
+    def write(self, value):
+        return value
+
+
+def _in_tenant(client_id, generator_factory):
+    # El middleware limpia el tenant antes de que se consuma la respuesta
+    # en streaming; el generador restablece el contexto mientras itera.
+    with tenant_context(client_id):
+        yield from generator_factory()
+
+
+def stream_csv(client_id, service):
+    def generate():
+        writer = csv.writer(_Echo())
+        yield '\ufeff' + writer.writerow([label for _, label in LEDGER_COLUMNS])
+        for row in service.rows():
+            yield writer.writerow([row[key] for key, _ in LEDGER_COLUMNS])
+    return _in_tenant(client_id, generate)
+
+
+def stream_jsonl(client_id, service):
+    def generate():
+        for row in service.rows():
+            yield json.dumps(row, default=str, ensure_ascii=False) + '\n'
+    return _in_tenant(client_id, generate)
+
+
+def build_xlsx(client_id, service):
+    """
+    Escribe el libro en un XLSX con openpyxl en modo write-only (las filas
+    se vuelcan a disco, no se mantienen en memoria) y devuelve el archivo
+    temporal posicionado al inicio. Se abre una hoja nueva al superar el
+    límite de filas de Excel.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    header = [label for _, label in LEDGER_COLUMNS]
+    sheet, sheet_rows, sheet_number = None, XLSX_MAX_ROWS, 0
+
+    with tenant_context(client_id):
+        for row in service.rows():
+            if sheet_rows >= XLSX_MAX_ROWS:
+                sheet_number += 1
+                sheet = workbook.create_sheet(title=f"Auxiliar {sheet_number}")
+                sheet.append(header)
+                sheet_rows = 0
+            sheet.append([row[key] for key, _ in LEDGER_COLUMNS])
+            sheet_rows += 1
+
+    if sheet is None:
+        workbook.create_sheet(title="Auxiliar 1").append(header)
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
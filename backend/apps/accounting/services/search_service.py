@@ -0,0 +1,152 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, Q, Value, FloatField
+
+from apps.accounting.models import ThirdParty, JournalEntry
+from apps.common.search import SEARCH_CONFIG, is_postgres, prefix_tsquery
+from apps.common.utils import normalize_nit
+from apps.invoicing.models import Invoice
+
+MIN_QUERY_LENGTH = 2
+MAX_LIMIT = 50
+
+# Número de documento: 'FE-1023', 'FE1023' o '1023'
+DOCUMENT_NUMBER = re.compile(r'^\s*([A-Za-z]*)\s*-?\s*(\d+)\s*$')
+
+THIRD_PARTY_FIELDS = [
+    'id', 'identification_type', 'identification_number', 'check_digit',
+    'business_name', 'trade_name', 'first_name', 'surname', 'person_type',
+]
+THIRD_PARTY_TEXT_FIELDS = ['business_name', 'trade_name', 'first_name', 'surname', 'email']
+
+
+def _display_name(row, prefix=''):
+    return row[f'{prefix}business_name'] or ' '.join(
+        filter(None, [row[f'{prefix}first_name'], row[f'{prefix}surname']])
+    )
+
+
+class SearchService:
+    """
+    Búsqueda tipo typeahead y transversal (terceros, facturas y asientos).
+
+    En PostgreSQL usa el `search_vector` mantenido por trigger (consulta de
+    prefijos con ranking) y el índice de prefijo del NIT; en otros motores
+    recurre a `icontains`. Debe ejecutarse dentro de un contexto de tenant.
+    """
+
+    def __init__(self, text, limit=10):
+        self.text = (text or '').strip()
+        self.limit = max(1, min(int(limit), MAX_LIMIT))
+        self.postgres = is_postgres()
+        self.tsquery = prefix_tsquery(self.text)
+
+    @property
+    def is_searchable(self):
+        return len(self.text) >= MIN_QUERY_LENGTH
+
+    def search_all(self):
+        return {
+            'third_parties': self.third_parties(),
+            'invoices': self.invoices(),
+            'journal_entries': self.journal_entries(),
+        }
+
+    # ------------------------------------------------------------------
+    # Texto libre
+    # ------------------------------------------------------------------
+    def _ranked(self, queryset, fields, vector='search_vector'):
+        """Filtra por texto y anota `rank` (0 en motores sin full-text)."""
+        if self.postgres and self.tsquery:
+            query = SearchQuery(self.tsquery, search_type='raw', config=SEARCH_CONFIG)
+            return (
+                queryset.filter(**{vector: query})
+                .annotate(rank=SearchRank(F(vector), query))
+                .order_by('-rank')
+            )
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f'{field}__icontains': self.text})
+        return queryset.filter(condition).annotate(rank=Value(0.0, output_field=FloatField()))
+
+    @staticmethod
+    def _merge(*groups, limit):
+        seen, merged = set(), []
+        for group in groups:
+            for row in group:
+                if row['id'] not in seen:
+                    seen.add(row['id'])
+                    merged.append(row)
+        return merged[:limit]
+
+    # ------------------------------------------------------------------
+    # Entidades
+    # ------------------------------------------------------------------
+    def third_parties(self):
+        """Coincidencias por prefijo de NIT (sin DV) primero, luego por nombre."""
+        if not self.is_searchable:
+            return []
+        base = ThirdParty.objects.filter(is_active=True)
+
+        by_nit = []
+        nit = normalize_nit(self.text)
+        if nit.isdigit():
+            by_nit = list(
+                base.filter(identification_number__startswith=nit)
+                .annotate(rank=Value(1.0, output_field=FloatField()))
+                .order_by('identification_number')
+                .values(*THIRD_PARTY_FIELDS, 'rank')[:self.limit]
+            )
+
+        by_text = []
+        if len(by_nit) < self.limit:
+            by_text = list(
+                self._ranked(base, THIRD_PARTY_TEXT_FIELDS).values(*THIRD_PARTY_FIELDS, 'rank')[:self.limit]
+            )
+
+        rows = self._merge(by_nit, by_text, limit=self.limit)
+        for row in rows:
+            row['name'] = _display_name(row)
+        return rows
+
+    def invoices(self):
+        """Por número (con o sin prefijo) o por nombre/NIT del cliente."""
+        if not self.is_searchable:
+            return []
+        fields = ['id', 'prefix', 'number', 'issue_date', 'total', 'status', 'customer_id',
+                  'customer__business_name', 'customer__first_name', 'customer__surname']
+        base = Invoice.objects.all()
+
+        by_number = []
+        match = DOCUMENT_NUMBER.match(self.text)
+        if match:
+            prefix, number = match.groups()
+            invoices = base.filter(number=int(number))
+            if prefix:
+                invoices = invoices.filter(prefix__iexact=prefix)
+            by_number = list(invoices.order_by('-issue_date', '-id').values(*fields)[:self.limit])
+
+        by_customer = []
+        if len(by_number) < self.limit:
+            customers = self._ranked(
+                base, [f'customer__{f}' for f in THIRD_PARTY_TEXT_FIELDS] + ['customer__identification_number'],
+                vector='customer__search_vector',
+            )
+            by_customer = list(customers.order_by('-rank', '-issue_date', '-id').values(*fields)[:self.limit])
+
+        rows = self._merge(by_number, by_customer, limit=self.limit)
+        for row in rows:
+            row['customer_name'] = _display_name(row, prefix='customer__')
+            for key in ('customer__business_name', 'customer__first_name', 'customer__surname'):
+                del row[key]
+        return rows
+
+    def journal_entries(self):
+        if not self.is_searchable:
+            return []
+        entries = self._ranked(JournalEntry.objects.all(), ['number', 'reference', 'description'])
+        return list(
+            entries.order_by('-rank', '-date', '-id')
+            .values('id', 'number', 'entry_type', 'date', 'description', 'status', 'rank')[:self.limit]
+        )
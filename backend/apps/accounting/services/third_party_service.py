@@ -0,0 +1,293 @@
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.accounting.models import ThirdParty, ClosingBalance
+from apps.common.utils import canonical_identification, identification_hash, nit_check_digit
+from apps.tenants.utils import tenant_context
+
+logger = logging.getLogger(__name__)
+
+# Campos que identifican al tercero; el resto se puede actualizar en el upsert
+IDENTITY_FIELDS = {'id', 'client', 'identification_type', 'identification_number', 'identification_number_hash'}
+UPDATABLE_FIELDS = [
+    field.name for field in ThirdParty._meta.concrete_fields
+    if field.name not in IDENTITY_FIELDS | {'created_at', 'updated_at', 'search_vector'}
+]
+
+
+def _prepare(records):
+    """
+    Normaliza un lote de registros por columnas: número canónico, DV y hash.
+    Los registros con el mismo número se fusionan (el último valor no vacío gana).
+    """
+    types = [record.get('identification_type') or '31' for record in records]
+    numbers = [
+        canonical_identification(record.get('identification_number'), id_type)
+        for record, id_type in zip(records, types)
+    ]
+    hashes = [identification_hash(number) for number in numbers]
+    check_digits = [nit_check_digit(number) if id_type == '31' else '' for number, id_type in zip(numbers, types)]
+
+    merged = {}
+    for record, id_type, number, hash_, check_digit in zip(records, types, numbers, hashes, check_digits):
+        if not number:
+            continue
+        row = merged.setdefault(hash_, {})
+        row.update({key: value for key, value in record.items() if value not in (None, '')})
+        row.update({
+            'identification_type': id_type,
+            'identification_number': number,
+            'identification_number_hash': hash_,
+            'check_digit': record.get('check_digit') or check_digit,
+        })
+    return merged
+
+
+def _validate(row):
+    if row.get('person_type') == 1 and not row.get('business_name'):
+        return "Persona Jurídica debe tener Razón Social (business_name)"
+    if row.get('person_type') == 2 and (not row.get('first_name') or not row.get('surname')):
+        return "Persona Natural debe tener al menos Primer Nombre y Primer Apellido"
+    if not row.get('party_type') or not row.get('person_type'):
+        return "Tipo de tercero y tipo de persona son obligatorios"
+    return None
+
+
+class ThirdPartyBulkService:
+    """
+    Alta y actualización masiva de terceros.
+
+    La normalización, el DV y el hash se calculan por lote (no en `save()`)
+    y la escritura es un INSERT ... ON CONFLICT (client, identification_number_hash),
+    de modo que cargar miles de proveedores no cuesta una consulta por fila
+    y un mismo NIT con distinto formato nunca crea un duplicado.
+    """
+
+    def __init__(self, client_id, batch_size=1000):
+        self.client_id = client_id
+        self.batch_size = batch_size
+
+    def upsert(self, records, update=True):
+        """
+        records: lista de dicts con los campos de ThirdParty.
+        update=False solo crea los que no existen (no modifica los existentes).
+
+        Returns:
+            dict {'ids': {numero_canonico: id}, 'errors': [{'identification_number', 'error'}]}
+        """
+        rows = _prepare(records)
+        errors, objects, fields = [], [], set()
+        for row in rows.values():
+            error = _validate(row)
+            if error:
+                errors.append({'identification_number': row['identification_number'], 'error': error})
+                continue
+            fields.update(row)
+            objects.append(ThirdParty(client_id=self.client_id, **row))
+
+        if objects:
+            options = {'ignore_conflicts': True}
+            update_fields = [name for name in UPDATABLE_FIELDS if name in fields]
+            if update and update_fields:
+                options = {
+                    'update_conflicts': True,
+                    'unique_fields': ['client', 'identification_number_hash'],
+                    'update_fields': update_fields + ['updated_at'],
+                }
+            with tenant_context(self.client_id), transaction.atomic():
+                ThirdParty.objects.bulk_create(objects, batch_size=self.batch_size, **options)
+
+        with tenant_context(self.client_id):
+            ids = dict(
+                ThirdParty.objects.filter(identification_number_hash__in=[obj.identification_number_hash for obj in objects])
+                .values_list('identification_number', 'id')
+            )
+        return {'ids': ids, 'errors': errors}
+
+
+def get_or_create_third_party(client_id, identification_number, defaults=None, identification_type='31'):
+    """
+    Reemplazo de `ThirdParty.objects.get_or_create` por NIT: busca por el hash
+    del número canónico y, si no existe, lo crea con `defaults`.
+
+    Returns:
+        (third_party, created)
+    """
+    number = canonical_identification(identification_number, identification_type)
+    if not number:
+        raise ValueError("Número de identificación vacío.")
+    hash_ = identification_hash(number)
+    with tenant_context(client_id):
+        third_party = ThirdParty.objects.filter(identification_number_hash=hash_).first()
+        if third_party:
+            return third_party, False
+
+        record = dict(defaults or {})
+        record.update({'identification_type': identification_type, 'identification_number': number})
+        result = ThirdPartyBulkService(client_id).upsert([record], update=False)
+        if result['errors']:
+            raise ValueError(result['errors'][0]['error'])
+        return ThirdParty.objects.get(identification_number_hash=hash_), True
+
+
+# ----------------------------------------------------------------------
+# Deduplicación
+# ----------------------------------------------------------------------
+def _canonical_rows(client_id):
+    with tenant_context(client_id):
+        rows = list(ThirdParty.objects.order_by('id').values_list('id', 'identification_type', 'identification_number'))
+    return [(pk, id_type, canonical_identification(number, id_type), number) for pk, id_type, number in rows]
+
+
+def find_duplicate_groups(client_id):
+    """
+    Grupos de terceros duplicados del tenant: [(sobreviviente_id, [duplicados_id])].
+    Solo se agrupan números con la misma forma canónica. Sobrevive el
+    registro cuyo número ya está en forma canónica y, entre ellos, el más
+    antiguo.
+    """
+    groups = defaultdict(list)
+    for pk, id_type, number, raw in _canonical_rows(client_id):
+        groups[number].append((raw != number, pk))
+
+    result = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        members.sort()
+        result.append((members[0][1], [pk for _, pk in members[1:]]))
+    return result
+
+
+def find_suspected_duplicates(client_id):
+    """
+    NIT que podrían tener el DV pegado ('9001234567' junto a '900123456'):
+    [{'third_party': id, 'matches': id}]. No se fusionan porque el último
+    dígito puede ser parte del número; se informan para revisión manual.
+    """
+    rows = _canonical_rows(client_id)
+    by_number = {}
+    for pk, id_type, number, _ in rows:
+        if id_type == '31':
+            by_number.setdefault(number, pk)
+    return [
+        {'third_party': pk, 'matches': by_number[number[:-1]]}
+        for pk, id_type, number, _ in rows
+        if id_type == '31' and len(number) > 6 and number[:-1] in by_number
+        and nit_check_digit(number[:-1]) == number[-1]
+    ]
+
+
+def _related_fields():
+    """Llaves foráneas (y uno a uno) que apuntan a ThirdParty."""
+    return [relation for relation in ThirdParty._meta.related_objects if not relation.many_to_many]
+
+
+def _merge_closing_balances(survivor_id, duplicate_ids):
+    """Suma los saldos de cierre de los duplicados en el sobreviviente (llave única por tercero)."""
+    balances = ClosingBalance._base_manager.filter(third_party_id__in=duplicate_ids)
+    for balance in balances:
+        target = ClosingBalance._base_manager.filter(
+            period_id=balance.period_id, account_id=balance.account_id,
+            cost_center_id=balance.cost_center_id, third_party_id=survivor_id,
+        ).first()
+        if target is None:
+            balance.third_party_id = survivor_id
+            balance.save(update_fields=['third_party'])
+            continue
+        target.debit += balance.debit
+        target.credit += balance.credit
+        target.save(update_fields=['debit', 'credit'])
+        balance.delete()
+
+
+def merge_third_parties(client_id, survivor_id, duplicate_ids):
+    """
+    Re-apunta todas las referencias (movimientos contables, facturas,
+    facturas recibidas, pagos, empleados...) de los duplicados al
+    sobreviviente, elimina los duplicados y deja el número en forma canónica.
+
+    Returns:
+        dict {modelo: filas re-apuntadas}
+    """
+    moved = {}
+    with tenant_context(client_id), transaction.atomic():
+        survivor = ThirdParty.objects.select_for_update().get(pk=survivor_id)
+        duplicates = list(ThirdParty.objects.filter(pk__in=duplicate_ids).values_list('id', flat=True))
+
+        for relation in _related_fields():
+            model, field = relation.related_model, relation.field
+            if model is ClosingBalance:
+                _merge_closing_balances(survivor.pk, duplicates)
+                continue
+            queryset = model._base_manager.filter(**{f'{field.name}__in': duplicates})
+            if field.one_to_one:
+                # Uno a uno (perfil de empleado): no se pueden fusionar dos perfiles
+                existing = queryset.count() + model._base_manager.filter(**{field.name: survivor.pk}).count()
+                if existing > 1:
+                    raise ValueError(
+                        f"{model._meta.verbose_name}: el tercero {survivor.pk} y sus duplicados tienen registro propio."
+                    )
+            count = queryset.update(**{field.name: survivor.pk})
+            if count:
+                moved[model._meta.label] = moved.get(model._meta.label, 0) + count
+
+        ThirdParty.objects.filter(pk__in=duplicates).delete()
+
+        number = canonical_identification(survivor.identification_number, survivor.identification_type)
+        ThirdParty.objects.filter(pk=survivor.pk).update(
+            identification_number=number,
+            identification_number_hash=identification_hash(number),
+            check_digit=nit_check_digit(number) if survivor.identification_type == '31' else survivor.check_digit,
+            updated_at=timezone.now(),
+        )
+    return moved
+
+
+def link_received_invoices(client_id):
+    """Asocia las facturas recibidas sin tercero al proveedor por NIT canónico."""
+    from apps.electronic_events.models import ReceivedInvoice
+
+    with tenant_context(client_id):
+        suppliers = dict(ThirdParty.objects.values_list('identification_number', 'id'))
+    pending = ReceivedInvoice.objects.filter(client_id=client_id, third_party__isnull=True).values_list('id', 'issuer_nit')
+
+    by_supplier = defaultdict(list)
+    for pk, issuer_nit in pending.iterator():
+        third_party_id = suppliers.get(canonical_identification(issuer_nit))
+        if third_party_id:
+            by_supplier[third_party_id].append(pk)
+
+    linked = 0
+    for third_party_id, invoice_ids in by_supplier.items():
+        linked += ReceivedInvoice.objects.filter(pk__in=invoice_ids).update(third_party_id=third_party_id)
+    return linked
+
+
+def dedupe_third_parties(client_id, dry_run=False):
+    """Deduplica los terceros de un tenant y enlaza las facturas recibidas."""
+    groups = find_duplicate_groups(client_id)
+    result = {
+        'groups': len(groups), 'merged': 0, 'moved': {}, 'errors': [], 'linked_invoices': 0,
+        'suspects': find_suspected_duplicates(client_id),
+    }
+    if dry_run:
+        result['preview'] = groups
+        return result
+
+    for survivor_id, duplicate_ids in groups:
+        try:
+            moved = merge_third_parties(client_id, survivor_id, duplicate_ids)
+        except ValueError as e:
+            result['errors'].append({'survivor': survivor_id, 'duplicates': duplicate_ids, 'error': str(e)})
+            continue
+        result['merged'] += len(duplicate_ids)
+        for label, count in moved.items():
+            result['moved'][label] = result['moved'].get(label, 0) + count
+
+    result['linked_invoices'] = link_received_invoices(client_id)
+    logger.info(f"Deduplicación de terceros tenant {client_id}: {result['merged']} fusionados")
+    return result
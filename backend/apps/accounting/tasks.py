@@ -0,0 +1,72 @@
+from celery import shared_task
+from django.conf import settings
+from apps.tenants.models import Client
+from apps.tenants.utils import run_for_tenants, tenant_context
+from .services.exogena_service import ExogenaGenerator
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def generate_exogena(client_id, year):
+    """Genera los archivos de Exógena de un tenant para el año gravable."""
+    with tenant_context(client_id):
+        result = ExogenaGenerator(client_id, year).generate_all()
+    logger.info(f"Exógena {year}: tenant {client_id} -> {result}")
+    return result
+
+
+@shared_task
+def generate_exogena_batch(year, client_ids=None):
+    """
+    Genera la Exógena del año para muchos tenants en paralelo
+    (concurrencia acotada por EXOGENA_CONFIG['MAX_WORKERS']).
+    """
+    if client_ids is None:
+        client_ids = list(Client.objects.filter(is_active=True).values_list('id', flat=True))
+    logger.info(f"Exógena {year}: iniciando lote para {len(client_ids)} tenants...")
+
+    results = run_for_tenants(
+        lambda client_id: ExogenaGenerator(client_id, year).generate_all(),
+        client_ids,
+        max_workers=settings.EXOGENA_CONFIG.get('MAX_WORKERS', 4),
+    )
+
+    errors = [cid for cid, result in results.items() if isinstance(result, Exception)]
+    if errors:
+        logger.warning(f"Exógena {year}: {len(errors)} tenants con errores: {errors}")
+    return f"Tenants: {len(client_ids)}, Errors: {len(errors)}"
+
+
+@shared_task
+def import_journal_entries(client_id, batch_id):
+    """Procesa una importación masiva de comprobantes (JournalImportBatch)."""
+    from .models import JournalImportBatch
+    from .services.import_service import run_import_batch
+
+    with tenant_context(client_id):
+        batch = run_import_batch(JournalImportBatch.objects.get(pk=batch_id))
+    logger.info(
+        f"Importación {batch_id}: tenant {client_id} -> {batch.imported_entries} comprobantes, "
+        f"{batch.imported_lines} movimientos, {batch.error_count} filas con error"
+    )
+    return batch.status
+
+
+@shared_task
+def dedupe_third_parties(client_id=None):
+    """
+    Fusiona terceros duplicados (mismo NIT con distinto formato) de un tenant,
+    o de todos los tenants activos si no se indica.
+    """
+    from .services.third_party_service import dedupe_third_parties as dedupe
+
+    client_ids = [client_id] if client_id else list(Client.objects.filter(is_active=True).values_list('id', flat=True))
+    merged = 0
+    for cid in client_ids:
+        result = dedupe(cid)
+        merged += result['merged']
+        if result['errors']:
+            logger.warning(f"Deduplicación de terceros tenant {cid}: {len(result['errors'])} grupos sin fusionar")
+    return f"Tenants: {len(client_ids)}, Merged: {merged}"
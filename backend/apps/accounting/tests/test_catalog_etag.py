@@ -0,0 +1,74 @@
+import gzip
+import json
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from apps.common.tests import TenantTestCase
+from apps.accounting.models import Account, AccountClass, AccountGroup, DianFormat
+from apps.common.mixins import catalog_versions
+from apps.common.renderers import FastJSONRenderer
+
+
+class CatalogETagTests(TenantTestCase):
+    """Catálogos con ETag/If-None-Match, renderer orjson y compresión."""
+
+    def setUp(self):
+        super().setUp()
+
+        for code in ('1001', '1003', '1007'):
+            DianFormat.objects.create(code=code, name=f"Formato {code}", valid_from=2025)
+
+        user = User.objects.create_user(username='contador', password='password123')
+        self.api = APIClient()
+        self.api.force_authenticate(user=user)
+        self.api.credentials(HTTP_X_CLIENT_ID=str(self.tenant.id))
+
+    def test_not_modified_until_catalog_changes(self):
+        response = self.api.get('/api/accounting/dian-formats/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = self.api.get('/api/accounting/dian-formats/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        # Los clientes devuelven el ETag débil que deja la compresión
+        response = self.api.get('/api/accounting/dian-formats/', HTTP_IF_NONE_MATCH=f'W/{etag}')
+        self.assertEqual(response.status_code, 304)
+
+        DianFormat.objects.create(code='2276', name="Formato 2276", valid_from=2025)
+        response = self.api.get('/api/accounting/dian-formats/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['count'], 4)
+
+    def test_tenant_catalogs_are_versioned_per_tenant(self):
+        other = self.create_tenant(name="Otra Empresa", nit="900654321")
+        mine = catalog_versions(['accounting.Account', 'accounting.DianFormat'])
+        theirs = catalog_versions(['accounting.Account'], other.id)
+
+        account_class = AccountClass.objects.create(client=other, code='1', name='Activo', nature='DEBITO')
+        group = AccountGroup.objects.create(client=other, account_class=account_class, code='11', name='Disponible')
+        Account.objects.create(client=other, account_group=group, code='111005', name='Bancos', level=4,
+                               nature='DEBITO', account_type='ACTIVO')
+
+        self.assertEqual(catalog_versions(['accounting.Account', 'accounting.DianFormat']), mine)
+        self.assertNotEqual(catalog_versions(['accounting.Account'], other.id), theirs)
+
+    def test_account_balances_are_not_tagged(self):
+        # El saldo depende de los movimientos: solo se etiqueta el catálogo sin saldo
+        self.assertNotIn('ETag', self.api.get('/api/accounting/accounts/'))
+        self.assertIn('ETag', self.api.get('/api/accounting/accounts/', {'fields': 'id,code,name'}))
+        self.assertNotIn('ETag', self.api.get('/api/accounting/accounts/', {'fields': 'id,code,balance'}))
+
+    def test_gzip_negotiated(self):
+        response = self.api.get('/api/accounting/dian-formats/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertEqual(json.loads(gzip.decompress(response.content))['count'], 3)
+
+    def test_renderer_handles_decimal_and_dates(self):
+        content = FastJSONRenderer().render({'total': Decimal('1500.50'), 'date': date(2026, 1, 31), 'ids': {1: 'a'}})
+        # Mismo resultado que el encoder de DRF (Decimal crudo -> número)
+        self.assertEqual(json.loads(content), {'total': 1500.5, 'date': '2026-01-31', 'ids': {'1': 'a'}})
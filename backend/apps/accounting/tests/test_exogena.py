@@ -0,0 +1,85 @@
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+from django.conf import settings
+from django.test import override_settings
+from lxml import etree
+from apps.common.tests import TenantTestCase
+from apps.accounting.models import (
+    AccountClass, AccountGroup, Account, AccountDianConfiguration, DianFormat, DianConcept,
+    ThirdParty, JournalEntry, JournalEntryLine, ExogenaReport,
+)
+from apps.accounting.services.exogena_service import ExogenaGenerator
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ExogenaGeneratorTests(TenantTestCase):
+    """Formato 1001: agrupación por concepto/tercero, cuantías menores y envíos."""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+
+        self.format = DianFormat.objects.create(code='1001', name='Pagos', version=10, valid_from=2025)
+        concept = DianConcept.objects.create(format=self.format, code='5002', name='Honorarios')
+        expenses = AccountClass.objects.create(client=self.tenant, code='5', name='Gastos', nature='DEBITO')
+        group = AccountGroup.objects.create(client=self.tenant, account_class=expenses, code='51', name='Administración')
+        account = Account.objects.create(
+            client=self.tenant, account_group=group, code='511025', name='Honorarios Asesoría', level=4,
+            nature='DEBITO', account_type='GASTO',
+        )
+        AccountDianConfiguration.objects.create(client=self.tenant, account=account, dian_format=self.format, dian_concept=concept)
+
+        self.entry = JournalEntry.objects.create(
+            client=self.tenant, number='1', entry_type='DIARIO', date=date(2025, 6, 30),
+            description='Honorarios', status='POSTED',
+        )
+        amounts = [('900111222', Decimal('5000000')), ('900333444', Decimal('1200000')),
+                   ('10203040', Decimal('60000')), ('10203050', Decimal('30000'))]
+        for line_number, (nit, amount) in enumerate(amounts, start=1):
+            third_party = ThirdParty.objects.create(
+                client=self.tenant, party_type='PROVEEDOR', person_type=1, identification_type='31',
+                identification_number=nit, business_name=f"Proveedor {nit}", address='Calle 1',
+            )
+            JournalEntryLine.objects.create(
+                client=self.tenant, entry=self.entry, line_number=line_number, account=account,
+                third_party=third_party, description='Honorarios', debit=amount, credit=0,
+            )
+
+    def test_records_group_minor_amounts(self):
+        records = list(ExogenaGenerator(self.tenant.id, 2025).records(self.format))
+
+        self.assertEqual([r['nid'] for r in records], ['900111222', '900333444', settings.EXOGENA_CONFIG['MINOR_AMOUNTS_NIT']])
+        self.assertEqual(records[-1]['amount'], Decimal('90000'))
+
+    def test_generate_splits_files_at_row_limit(self):
+        with override_settings(EXOGENA_CONFIG={**settings.EXOGENA_CONFIG, 'ROW_LIMIT': 2}):
+            rows = ExogenaGenerator(self.tenant.id, 2025).generate_all()
+
+        self.assertEqual(rows, {'1001': 3})
+        reports = list(ExogenaReport.objects.order_by('sequence'))
+        self.assertEqual([r.row_count for r in reports], [2, 1])
+        self.assertTrue(reports[0].xml_file.name.endswith('Dmuisca_010100110202500000001.xml'))
+
+        root = etree.parse(reports[0].xml_file.path).getroot()
+        self.assertEqual(root.findtext('Cab/CantReg'), '2')
+        self.assertEqual(root.findtext('Cab/ValorTotal'), '6200000')
+        self.assertEqual([e.get('pago') for e in root.findall('pagos')], ['5000000', '1200000'])
+
+    def test_regeneration_removes_surplus_files(self):
+        with override_settings(EXOGENA_CONFIG={**settings.EXOGENA_CONFIG, 'ROW_LIMIT': 2}):
+            ExogenaGenerator(self.tenant.id, 2025).generate_all()
+        surplus = ExogenaReport.objects.get(sequence=2)
+        storage, name = surplus.xml_file.storage, surplus.xml_file.name
+        self.assertTrue(storage.exists(name))
+
+        self.assertEqual(ExogenaGenerator(self.tenant.id, 2025).generate_all(), {'1001': 3})
+        self.assertEqual(list(ExogenaReport.objects.values_list('sequence', flat=True)), [1])
+        self.assertFalse(storage.exists(name))
@@ -0,0 +1,89 @@
+from datetime import date
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from apps.common.tests import TenantTestCase
+from apps.accounting.models import (
+    AccountClass, AccountGroup, Account, JournalEntry, JournalEntryLine, FiscalPeriod, ClosingBalance,
+)
+from apps.accounting.services.closing_service import FiscalCloseService
+
+
+class FiscalCloseTests(TenantTestCase):
+    """Cierre de periodos: saldos de cierre, bloqueo y asiento de cierre anual."""
+
+    def setUp(self):
+        super().setUp()
+
+        self.bank = self._account('1', 'Activo', 'DEBITO', '11', '111005', 'ACTIVO')
+        self.income = self._account('4', 'Ingresos', 'CREDITO', '41', '413505', 'INGRESO')
+        self.expense = self._account('5', 'Gastos', 'DEBITO', '51', '513505', 'GASTO')
+        self.profit = self._account('3', 'Patrimonio', 'CREDITO', '36', '360505', 'PATRIMONIO')
+
+        self._entry('1', date(2025, 1, 10), self.bank, self.income, Decimal('1000'))
+        self._entry('2', date(2025, 2, 10), self.bank, self.income, Decimal('500'))
+        self._entry('3', date(2025, 2, 20), self.expense, self.bank, Decimal('300'))
+        self.service = FiscalCloseService(self.tenant.id)
+
+    def _account(self, class_code, class_name, nature, group_code, code, account_type):
+        account_class, _ = AccountClass.objects.get_or_create(
+            client=self.tenant, code=class_code, defaults={'name': class_name, 'nature': nature},
+        )
+        group = AccountGroup.objects.create(client=self.tenant, account_class=account_class, code=group_code, name=group_code)
+        return Account.objects.create(
+            client=self.tenant, account_group=group, code=code, name=code, level=4,
+            nature=nature, account_type=account_type,
+        )
+
+    def _entry(self, number, entry_date, debit_account, credit_account, amount):
+        entry = JournalEntry.objects.create(
+            client=self.tenant, number=number, entry_type='DIARIO', date=entry_date, description=number,
+        )
+        JournalEntryLine.objects.create(client=self.tenant, entry=entry, line_number=1, account=debit_account,
+                                        description=number, debit=amount, credit=0)
+        JournalEntryLine.objects.create(client=self.tenant, entry=entry, line_number=2, account=credit_account,
+                                        description=number, debit=0, credit=amount)
+        entry.status = 'POSTED'
+        entry.save()
+        return entry
+
+    def test_close_period_writes_snapshot_and_locks_dates(self):
+        self.service.close_period(2025, 1)
+
+        snapshot = ClosingBalance.objects.get(period__month=1, account=self.bank)
+        self.assertEqual((snapshot.debit, snapshot.credit), (Decimal('1000'), Decimal('0')))
+
+        with self.assertRaises(ValidationError):
+            self._entry('4', date(2025, 1, 31), self.bank, self.income, Decimal('10'))
+
+        with self.assertRaises(ValueError):
+            self.service.close_period(2025, 3)  # febrero sigue abierto
+
+    def test_dates_before_the_first_close_are_locked(self):
+        # Enero de 2025 es el primer cierre: un asiento de 2024 quedaría fuera de todos los saldos
+        self.service.close_period(2025, 1)
+        with self.assertRaises(ValidationError):
+            self._entry('4', date(2024, 12, 31), self.bank, self.income, Decimal('10'))
+        self.assertFalse(FiscalPeriod.is_date_closed(date(2025, 2, 1)))
+
+    def test_balance_starts_from_latest_snapshot(self):
+        self.service.close_period(2025, 1)
+        self.service.close_period(2025, 2)
+
+        with self.assertNumQueries(3):
+            self.assertEqual(self.bank.get_balance(), Decimal('1200'))
+        self.assertEqual(self.bank.get_balance(as_of=date(2025, 1, 31)), Decimal('1000'))
+
+    def test_close_year_moves_result_to_equity(self):
+        december = self.service.close_year(2025)
+
+        self.assertEqual(FiscalPeriod.objects.filter(year=2025, status='CLOSED').count(), 12)
+        entry = december.closing_entry
+        self.assertEqual(entry.entry_type, 'CIERRE')
+        self.assertTrue(entry.is_balanced())
+        self.assertEqual(entry.lines.get(account=self.profit).credit, Decimal('1200'))
+        self.assertEqual(self.income.get_balance(), Decimal('0'))
+        self.assertEqual(self.expense.get_balance(), Decimal('0'))
+        self.assertEqual(self.profit.get_balance(), Decimal('1200'))
+
+        self.assertEqual(self.service.reopen_period(2025, 11), 2)
+        self.assertFalse(ClosingBalance.objects.filter(period__month__in=[11, 12]).exists())
@@ -0,0 +1,73 @@
+from datetime import date
+from decimal import Decimal
+import json
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from apps.common.tests import TenantTestCase
+from apps.accounting.models import AccountClass, AccountGroup, Account, JournalEntry, JournalEntryLine
+from apps.accounting.services.ledger_service import GeneralLedgerService
+
+
+class GeneralLedgerTests(TenantTestCase):
+    """Libro Auxiliar: saldo inicial precalculado y saldo corrido por ventana."""
+
+    def setUp(self):
+        super().setUp()
+
+        cls_1 = AccountClass.objects.create(client=self.tenant, code='1', name='Activo', nature='DEBITO')
+        cls_4 = AccountClass.objects.create(client=self.tenant, code='4', name='Ingresos', nature='CREDITO')
+        grp_11 = AccountGroup.objects.create(client=self.tenant, account_class=cls_1, code='11', name='Disponible')
+        grp_41 = AccountGroup.objects.create(client=self.tenant, account_class=cls_4, code='41', name='Operacionales')
+        self.bank = Account.objects.create(
+            client=self.tenant, account_group=grp_11, code='111005', name='Bancos', level=4,
+            nature='DEBITO', account_type='ACTIVO',
+        )
+        self.income = Account.objects.create(
+            client=self.tenant, account_group=grp_41, code='413505', name='Ventas', level=4,
+            nature='CREDITO', account_type='INGRESO',
+        )
+
+        self._entry('1', date(2026, 1, 15), Decimal('1000'))
+        self._entry('2', date(2026, 2, 10), Decimal('250'))
+        self._entry('3', date(2026, 2, 20), Decimal('100'))
+        self._entry('4', date(2026, 3, 5), Decimal('999'), status='DRAFT')
+
+    def _entry(self, number, entry_date, amount, status='POSTED'):
+        entry = JournalEntry.objects.create(
+            client=self.tenant, number=number, entry_type='DIARIO', date=entry_date,
+            description=f"Venta {number}", status=status,
+        )
+        JournalEntryLine.objects.create(client=self.tenant, entry=entry, line_number=1, account=self.bank,
+                                        description='Recaudo', debit=amount, credit=0)
+        JournalEntryLine.objects.create(client=self.tenant, entry=entry, line_number=2, account=self.income,
+                                        description='Ingreso', debit=0, credit=amount)
+
+    def test_running_balance_starts_from_opening(self):
+        service = GeneralLedgerService(date(2026, 2, 1), date(2026, 3, 31))
+        rows = list(service.rows())
+
+        self.assertEqual([r['account_code'] for r in rows], ['111005', '111005', '413505', '413505'])
+        self.assertEqual([r['balance'] for r in rows], [Decimal('1250'), Decimal('1350'), Decimal('1250'), Decimal('1350')])
+
+    def test_filters_by_account_range(self):
+        service = GeneralLedgerService(date(2026, 1, 1), date(2026, 12, 31), account_from='4', account_to='4135')
+        self.assertEqual({r['account_code'] for r in service.rows()}, {'413505'})
+
+    def test_streams_jsonl_and_csv(self):
+        user = User.objects.create_user(username='auditor', password='password123')
+        api = APIClient()
+        api.force_authenticate(user=user)
+        api.credentials(HTTP_X_CLIENT_ID=str(self.tenant.id))
+
+        response = api.get('/api/accounting/general-ledger/', {
+            'date_from': '2026-01-01', 'date_to': '2026-12-31', 'account_from': '1105', 'account_to': '1110', 'output': 'jsonl',
+        })
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(l) for l in b''.join(response.streaming_content).decode('utf-8').splitlines()]
+        self.assertEqual([l['balance'] for l in lines], ['1000.00', '1250.00', '1350.00'])
+
+        response = api.get('/api/accounting/general-ledger/', {'date_from': '2026-01-01', 'date_to': '2026-12-31'})
+        self.assertEqual(len(b''.join(response.streaming_content).decode('utf-8').splitlines()), 7)
+
+        response = api.get('/api/accounting/general-ledger/', {'date_from': '2026-12-31', 'date_to': '2026-01-01'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,59 @@
+from apps.common.tests import TenantTestCase
+from apps.accounting.models import AccountClass, AccountGroup, Account, CostCenter, CostCenterClosure
+
+
+class HierarchyIndexTests(TenantTestCase):
+    """Índice jerárquico del PUC (prefijos) y tabla de cierre de centros de costo."""
+
+    def setUp(self):
+        super().setUp()
+
+        account_class = AccountClass.objects.create(client=self.tenant, code='5', name='Gastos', nature='DEBITO')
+        self.group = AccountGroup.objects.create(client=self.tenant, account_class=account_class, code='51', name='Operacionales de Administración')
+        self.account = self._account('5135', 'Servicios', level=3)
+        self.subaccount = self._account('513525', 'Acueducto y Alcantarillado', level=4, parent=self.account)
+        self.auxiliary = self._account('51352501', 'Acueducto Sede Norte', level=5, parent=self.subaccount)
+
+    def _account(self, code, name, level, parent=None):
+        return Account.objects.create(
+            client=self.tenant, account_group=self.group, code=code, name=name,
+            level=level, parent=parent, nature='DEBITO', account_type='GASTO',
+        )
+
+    def test_prefix_columns_are_maintained_on_save(self):
+        self.assertEqual(
+            (self.auxiliary.class_code, self.auxiliary.group_code, self.auxiliary.account_code, self.auxiliary.subaccount_code),
+            ('5', '51', '5135', '513525'),
+        )
+        self.assertEqual(self.account.subaccount_code, '')
+        self.assertEqual(Account.objects.filter(class_code='5', account_code='5135').count(), 3)
+
+    def test_render_paths_for_whole_tree_in_one_query(self):
+        with self.assertNumQueries(1):
+            paths = Account.render_paths()
+        self.assertEqual(
+            paths[self.auxiliary.id],
+            'Gastos > Operacionales de Administración > Servicios > Acueducto y Alcantarillado > Acueducto Sede Norte',
+        )
+        self.assertEqual(self.auxiliary.get_full_path(), paths[self.auxiliary.id])
+
+    def test_cost_center_closure_follows_reparenting(self):
+        root = CostCenter.objects.create(client=self.tenant, code='01', name='Administración')
+        other = CostCenter.objects.create(client=self.tenant, code='02', name='Ventas')
+        child = CostCenter.objects.create(client=self.tenant, code='0101', name='Contabilidad', parent=root)
+        leaf = CostCenter.objects.create(client=self.tenant, code='010101', name='Nómina', parent=child)
+
+        self.assertEqual(leaf.get_full_path(), 'Administración > Contabilidad > Nómina')
+        self.assertEqual(CostCenterClosure.objects.filter(ancestor=root).count(), 3)
+
+        child.parent = other
+        child.save()
+
+        self.assertEqual(CostCenter.render_paths()[leaf.id], 'Ventas > Contabilidad > Nómina')
+        self.assertEqual(CostCenterClosure.objects.filter(ancestor=root).count(), 1)
+        self.assertEqual(CostCenterClosure.objects.get(ancestor=other, descendant=leaf).depth, 2)
+
+        # Ciclo: Ventas no puede colgar de su propio descendiente
+        other.parent = leaf
+        with self.assertRaises(ValueError):
+            other.save()
@@ -0,0 +1,181 @@
+import io
+import tempfile
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.test import override_settings
+from django.conf import settings
+from openpyxl import Workbook
+from apps.common.tests import TenantTestCase
+from apps.accounting.models import (
+    CostCenter, ThirdParty, JournalEntry, JournalEntryLine, FiscalPeriod, JournalImportBatch,
+)
+from apps.accounting.services.import_service import (
+    COPY_ENTRY_SQL, COPY_LINE_SQL, JournalImportService, ImportFileError, run_import_batch,
+)
+from apps.reports.models import ReportSnapshot
+
+HEADER = "comprobante;fecha;tipo;descripcion;cuenta;nit;centro_costo;debito;credito\n"
+
+
+class JournalImportTests(TenantTestCase):
+    """Importación masiva de comprobantes con errores por fila."""
+
+    def setUp(self):
+        super().setUp()
+
+        self.create_account('1', 'DEBITO', '11', '111005', 'ACTIVO')
+        self.create_account('4', 'CREDITO', '41', '413505', 'INGRESO', requires_third_party=True)
+        self.create_account('5', 'DEBITO', '51', '513505', 'GASTO', requires_cost_center=True)
+        CostCenter.objects.create(client=self.tenant, code='ADM', name='Administración')
+        ThirdParty.objects.create(
+            client=self.tenant, identification_type='31', identification_number='900555111',
+            person_type=1, business_name='Cliente SAS',
+        )
+
+    def _run(self, content, filename='import.csv', **kwargs):
+        service = JournalImportService(self.tenant.id, **kwargs)
+        return service.run(io.BytesIO(content.encode('utf-8')), filename)
+
+    def test_imports_valid_entries_and_reports_row_errors(self):
+        content = HEADER + (
+            "CI-1;2025-03-01;DIARIO;Venta;111005;;;1.500,50;\n"
+            "CI-1;2025-03-01;DIARIO;Venta;413505;900555111-7;;;1.500,50\n"
+            # Descuadrado
+            "CI-2;02/03/2025;;Gasto;513505;;ADM;200;\n"
+            "CI-2;02/03/2025;;Gasto;111005;;;;150\n"
+            # Cuenta inexistente y centro de costo requerido
+            "CI-3;2025-03-03;DIARIO;Gasto;999999;;;100;\n"
+            "CI-3;2025-03-03;DIARIO;Gasto;513505;;;;100\n"
+            "CI-4;2025-03-04;AJUSTE;Gasto;513505;;ADM;80;\n"
+            "CI-4;2025-03-04;AJUSTE;Gasto;111005;;;;80\n"
+        )
+        result = self._run(content)
+
+        self.assertEqual(result['total_rows'], 8)
+        self.assertEqual(result['imported_entries'], 2)
+        self.assertEqual(result['imported_lines'], 4)
+        self.assertEqual(result['rejected_entries'], 2)
+        errors = {error['row']: error['errors'] for error in result['errors']}
+        self.assertIn('no está balanceado', errors[4][0])
+        self.assertIn("La cuenta '999999' no existe.", errors[6])
+        self.assertIn("La cuenta '513505' requiere centro de costo.", errors[7])
+
+        entry = JournalEntry.objects.get(number='CI-1')
+        self.assertEqual(entry.status, 'POSTED')
+        self.assertTrue(entry.is_balanced())
+        line = entry.lines.get(line_number=2)
+        self.assertEqual(line.third_party.identification_number, '900555111')
+        self.assertEqual(line.credit, Decimal('1500.50'))
+        self.assertEqual(JournalEntry.objects.get(number='CI-4').entry_type, 'AJUSTE')
+
+        # Reimportar el mismo archivo: los comprobantes ya existen
+        result = self._run(content)
+        self.assertEqual(result['imported_entries'], 0)
+        self.assertEqual(JournalEntryLine.objects.count(), 4)
+
+    @override_settings(ACCOUNTING_CONFIG={**settings.ACCOUNTING_CONFIG, 'IMPORT_BATCH_SIZE': 2})
+    def test_xlsx_in_small_batches_keeps_entries_whole(self):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['Comprobante', 'Fecha', 'Cuenta', 'Débito', 'Crédito', 'Centro de Costo'])
+        for number in range(1, 4):
+            sheet.append([f'X-{number}', '2025-04-01', '513505', 100, None, 'ADM'])
+            sheet.append([f'X-{number}', '2025-04-01', '111005', 60, None, None])
+            sheet.append([f'X-{number}', '2025-04-01', '111005', None, 160, None])
+        stream = io.BytesIO()
+        workbook.save(stream)
+        stream.seek(0)
+
+        result = JournalImportService(self.tenant.id, post_entries=False).run(stream, 'import.xlsx')
+
+        self.assertEqual(result['errors'], [])
+        self.assertEqual(JournalEntry.objects.filter(status='DRAFT').count(), 3)
+        self.assertEqual(list(JournalEntry.objects.get(number='X-2').lines.values_list('line_number', flat=True)), [1, 2, 3])
+
+    def test_rejects_dates_up_to_the_last_closed_period(self):
+        FiscalPeriod.objects.create(client=self.tenant, year=2025, month=2, status='CLOSED',
+                                    start_date=date(2025, 2, 1), end_date=date(2025, 2, 28))
+        content = HEADER + (
+            "CI-1;2024-06-01;DIARIO;Ajuste;111005;;;100;\n"
+            "CI-1;2024-06-01;DIARIO;Ajuste;413505;900555111;;;100\n"
+            "CI-2;2025-03-01;DIARIO;Venta;111005;;;100;\n"
+            "CI-2;2025-03-01;DIARIO;Venta;413505;900555111;;;100\n"
+        )
+        result = self._run(content)
+
+        self.assertEqual(result['imported_entries'], 1)
+        self.assertIn("El periodo contable de la fecha 2024-06-01 está cerrado.", result['errors'][0]['errors'])
+
+    def test_rejects_non_contiguous_lines_within_a_batch(self):
+        content = HEADER + (
+            "CI-1;2025-03-01;DIARIO;Venta;111005;;;100;\n"
+            "CI-2;2025-03-02;DIARIO;Venta;111005;;;50;\n"
+            "CI-2;2025-03-02;DIARIO;Venta;413505;900555111;;;50\n"
+            "CI-1;2025-03-01;DIARIO;Venta;413505;900555111;;;100\n"
+        )
+        result = self._run(content)
+
+        self.assertEqual((result['imported_entries'], result['rejected_entries']), (1, 1))
+        errors = {error['row']: error['errors'] for error in result['errors']}
+        self.assertIn("Las líneas del comprobante CI-1 no están contiguas en el archivo.", errors[5])
+        self.assertFalse(JournalEntry.objects.filter(number='CI-1').exists())
+
+    def test_posted_import_marks_ledger_snapshots_stale(self):
+        snapshot = ReportSnapshot.objects.create(client=self.tenant, report_type='TRIAL_BALANCE',
+                                                 as_of=date(2025, 3, 31), data_file='report_snapshots/tb.bin')
+        content = HEADER + (
+            "CI-1;2025-03-01;DIARIO;Venta;111005;;;100;\n"
+            "CI-1;2025-03-01;DIARIO;Venta;413505;900555111;;;100\n"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self._run(content)
+        snapshot.refresh_from_db()
+        self.assertEqual((snapshot.is_stale, snapshot.stale_reason), (True, 'LATE_ENTRY'))
+
+    def test_copy_payload_keeps_empty_texts_not_null(self):
+        service = JournalImportService(self.tenant.id)
+        entries = [{'number': 'CI-1', 'entry_type': 'DIARIO', 'date': date(2025, 3, 1),
+                    'description': '', 'reference': ''}]
+        lines = [{'number': 'CI-1', 'line_number': 1, 'account_id': 7, 'third_party_id': None,
+                  'cost_center_id': None, 'description': '', 'debit': Decimal('100.00'),
+                  'credit': Decimal('0.00'), 'base_amount': Decimal('0.00')}]
+        entry_csv, line_csv = service._copy_payload(entries, lines)
+
+        self.assertEqual(entry_csv.read(), 'CI-1,DIARIO,2025-03-01,,\r\n')
+        self.assertEqual(line_csv.read(), 'CI-1,1,7,,,,100.00,0.00,0.00\r\n')
+        # Sin comillas, COPY leería esos textos como NULL: se fuerzan a ''
+        self.assertIn('FORCE_NOT_NULL (description, reference)', COPY_ENTRY_SQL)
+        self.assertIn('FORCE_NOT_NULL (description)', COPY_LINE_SQL)
+
+    def test_single_separator_with_three_digits_is_thousands_and_nan_is_rejected(self):
+        content = HEADER + (
+            "CI-1;2025-03-01;DIARIO;Venta;111005;;;1.500;\n"
+            "CI-1;2025-03-01;DIARIO;Venta;413505;900555111;;;1,500\n"
+            "CI-2;2025-03-02;DIARIO;Venta;111005;;;nan;\n"
+            "CI-2;2025-03-02;DIARIO;Venta;413505;900555111;;;NaN\n"
+        )
+        result = self._run(content)
+
+        self.assertEqual((result['imported_entries'], result['rejected_entries']), (1, 1))
+        self.assertEqual(JournalEntry.objects.get(number='CI-1').get_total_debit(), Decimal('1500.00'))
+        self.assertIn("Valor numérico inválido.", result['errors'][0]['errors'])
+
+    def test_unexpected_error_marks_batch_failed(self):
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            batch = JournalImportBatch.objects.create(
+                client=self.tenant, original_name='import.csv',
+                file=ContentFile(HEADER.encode('utf-8'), name='import.csv'),
+            )
+            with mock.patch.object(JournalImportService, 'run', side_effect=RuntimeError('sin conexión')):
+                with self.assertRaises(RuntimeError):
+                    run_import_batch(batch)
+
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, 'FAILED')
+        self.assertIsNotNone(batch.finished_at)
+
+    def test_missing_columns(self):
+        with self.assertRaises(ImportFileError):
+            self._run("comprobante;fecha;cuenta\nA;2025-01-01;111005\n")
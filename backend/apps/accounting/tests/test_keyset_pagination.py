@@ -0,0 +1,50 @@
+from datetime import date
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from apps.common.tests import TenantTestCase
+from apps.accounting.models import JournalEntry
+
+
+class KeysetPaginationTests(TenantTestCase):
+    """Paginación por cursor (fecha, id) sin COUNT ni OFFSET."""
+
+    def setUp(self):
+        super().setUp()
+
+        # Varios asientos comparten fecha: el id desempata dentro del cursor
+        for i in range(7):
+            JournalEntry.objects.create(
+                client=self.tenant, number=f"CD-{i}", entry_type='DIARIO',
+                date=date(2026, 1, 10) if i < 5 else date(2026, 2, 1), description=f"Asiento {i}",
+            )
+
+        user = User.objects.create_user(username='contador', password='password123')
+        self.api = APIClient()
+        self.api.force_authenticate(user=user)
+        self.api.credentials(HTTP_X_CLIENT_ID=str(self.tenant.id))
+
+    def _get(self, url, params=None):
+        response = self.api.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_walks_forward_and_back_without_gaps(self):
+        expected = list(JournalEntry.objects.order_by('-date', '-id').values_list('number', flat=True))
+
+        response = self._get('/api/accounting/journal-entries/', {'page_size': 3, 'fields': 'id,number'})
+        self.assertEqual(response['X-Estimated-Count'], '7')
+        pages = [response.json()]
+        while pages[-1]['next']:
+            pages.append(self._get(pages[-1]['next']).json())
+
+        self.assertEqual([len(page['results']) for page in pages], [3, 3, 1])
+        self.assertEqual([row['number'] for page in pages for row in page['results']], expected)
+        self.assertIsNone(pages[0]['previous'])
+
+        back = self._get(pages[2]['previous']).json()
+        self.assertEqual(back['results'], pages[1]['results'])
+        self.assertIsNotNone(back['next'])
+
+    def test_invalid_cursor(self):
+        response = self.api.get('/api/accounting/journal-entries/', {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, 404)
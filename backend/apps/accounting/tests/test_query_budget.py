@@ -0,0 +1,207 @@
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.common.tests import TenantTestCase
+from apps.tenants.utils import set_current_client_id
+from apps.accounting.models import AccountClass, AccountGroup, Account, JournalEntry, JournalEntryLine, ThirdParty
+from apps.electronic_events.models import ReceivedInvoice
+from apps.invoicing.models import DianResolution, Invoice, InvoiceLine
+from apps.payroll.models import Employee, PayrollDetail, PayrollDocument, PayrollPeriod
+from apps.treasury.models import BankAccount, PaymentOut, PaymentOutDetail
+
+
+class QueryBudgetTests(TenantTestCase):
+    """Los listados no deben crecer en consultas con el número de filas (N+1)."""
+
+    def setUp(self):
+        super().setUp()
+
+        cls_1 = AccountClass.objects.create(client=self.tenant, code='1', name='Activo', nature='DEBITO')
+        cls_4 = AccountClass.objects.create(client=self.tenant, code='4', name='Ingresos', nature='CREDITO')
+        grp_11 = AccountGroup.objects.create(client=self.tenant, account_class=cls_1, code='11', name='Disponible')
+        grp_41 = AccountGroup.objects.create(client=self.tenant, account_class=cls_4, code='41', name='Operacionales')
+        self.bank = Account.objects.create(
+            client=self.tenant, account_group=grp_11, code='111005', name='Bancos', level=4,
+            nature='DEBITO', account_type='ACTIVO',
+        )
+        self.income = Account.objects.create(
+            client=self.tenant, account_group=grp_41, code='413505', name='Ventas', level=4,
+            nature='CREDITO', account_type='INGRESO',
+        )
+        self.entries = 0
+        self.parties = 0
+
+        user = User.objects.create_user(username='contador', password='password123')
+        self.api = APIClient()
+        self.api.force_authenticate(user=user)
+        self.api.credentials(HTTP_X_CLIENT_ID=str(self.tenant.id))
+
+    def _add_entries(self, count):
+        for _ in range(count):
+            self.entries += 1
+            entry = JournalEntry.objects.create(
+                client=self.tenant, number=str(self.entries), entry_type='DIARIO', date=date(2026, 1, 15),
+                description=f"Venta {self.entries}", status='POSTED',
+            )
+            JournalEntryLine.objects.create(client=self.tenant, entry=entry, line_number=1, account=self.bank,
+                                            description='Recaudo', debit=Decimal('100'), credit=0)
+            JournalEntryLine.objects.create(client=self.tenant, entry=entry, line_number=2, account=self.income,
+                                            description='Ingreso', debit=0, credit=Decimal('100'))
+
+    def _count_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get(url, params or {})
+        set_current_client_id(self.tenant.id)  # el middleware limpia el tenant al terminar
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.json()
+
+    def test_journal_entry_list_has_constant_queries(self):
+        self._add_entries(2)
+        few, _ = self._count_queries('/api/accounting/journal-entries/')
+        self._add_entries(8)
+        many, data = self._count_queries('/api/accounting/journal-entries/')
+
+        self.assertEqual(few, many)
+        self.assertEqual(len(data['results']), 10)
+        first = data['results'][0]
+        self.assertEqual(Decimal(first['total_debit']), Decimal('100'))
+        self.assertTrue(first['is_balanced'])
+        self.assertEqual({line['account_code'] for line in first['lines']}, {'111005', '413505'})
+
+    def test_account_list_balances_in_bulk(self):
+        self._add_entries(3)
+        few, _ = self._count_queries('/api/accounting/accounts/')
+        for i in range(5):
+            Account.objects.create(
+                client=self.tenant, account_group=self.bank.account_group, code=f'11100{6 + i}',
+                name=f'Banco {i}', level=4, nature='DEBITO', account_type='ACTIVO',
+            )
+        many, data = self._count_queries('/api/accounting/accounts/')
+
+        self.assertEqual(few, many)
+        balances = {row['code']: row['balance'] for row in data}
+        self.assertEqual(Decimal(balances['111005']), Decimal('300'))
+        self.assertEqual(Decimal(balances['413505']), Decimal('300'))
+
+    def test_sparse_fields_and_values_fast_path(self):
+        self._add_entries(3)
+        _, data = self._count_queries('/api/accounting/journal-entries/', {'fields': 'id,number,total_debit'})
+        self.assertEqual(set(data['results'][0]), {'id', 'number', 'total_debit'})
+        self.assertEqual(Decimal(data['results'][0]['total_debit']), Decimal('100'))
+
+        _, data = self._count_queries('/api/accounting/journal-entries/', {'fields': 'id,number', 'expand': 'lines'})
+        self.assertEqual(set(data['results'][0]), {'id', 'number', 'lines'})
+        self.assertEqual(len(data['results'][0]['lines']), 2)
+
+    # Mismo presupuesto para los listados de facturas, terceros, recepción, nómina y pagos
+
+    def _party(self, party_type='CLIENTE'):
+        self.parties += 1
+        return ThirdParty.objects.create(
+            client=self.tenant, party_type=party_type, person_type=1, identification_type='31',
+            identification_number=str(900000000 + self.parties), business_name=f"Tercero {self.parties}",
+            default_account=self.income,
+        )
+
+    def _assert_constant(self, url, add, few=2, many=8):
+        add(few)
+        queries_few, _ = self._count_queries(url)
+        add(many)
+        queries_many, data = self._count_queries(url)
+        self.assertEqual(queries_few, queries_many)
+        rows = data['results'] if isinstance(data, dict) else data
+        self.assertEqual(len(rows), few + many)
+        return rows
+
+    def test_invoice_list(self):
+        resolution = DianResolution.objects.create(
+            client=self.tenant, document_type='INVOICE', resolution_number='18760000001', prefix='FE',
+            number_from=1, number_to=1000, current_number=1, date_from=date(2026, 1, 1), date_to=date(2027, 1, 1),
+        )
+
+        def add(count):
+            for _ in range(count):
+                invoice = Invoice.objects.create(
+                    client=self.tenant, resolution=resolution, prefix='FE', number=Invoice.objects.count() + 1,
+                    customer=self._party(), issue_date=date(2026, 3, 1), payment_due_date=date(2026, 3, 31),
+                    total=Decimal('119000'),
+                )
+                InvoiceLine.objects.create(
+                    invoice=invoice, description='Servicio', quantity=1, unit_price=Decimal('100000'),
+                    tax_rate=Decimal('19'), subtotal=Decimal('100000'), tax_amount=Decimal('19000'),
+                    total=Decimal('119000'),
+                )
+
+        rows = self._assert_constant('/api/invoicing/invoices/', add)
+        self.assertEqual(len(rows[0]['lines']), 1)
+
+    def test_third_party_list(self):
+        def add(count):
+            for _ in range(count):
+                self._party()
+
+        self._assert_constant('/api/accounting/third-parties/', add)
+
+    def test_received_invoice_list(self):
+        supplier = self._party('PROVEEDOR')
+
+        def add(count):
+            for _ in range(count):
+                number = f"FV-{ReceivedInvoice.objects.count() + 1}"
+                ReceivedInvoice.objects.create(
+                    client=self.tenant, issuer_nit=supplier.identification_number, issuer_name='Proveedor SAS',
+                    third_party=supplier, invoice_number=number, cufe=f'cufe-{number}',
+                    issue_date=date(2026, 3, 1), subtotal_amount=Decimal('1000'), total_amount=Decimal('1000'),
+                    xml_file='inbox/xml/test.xml',
+                )
+
+        self._assert_constant('/api/radian/invoices/', add)
+
+    def test_payroll_document_list(self):
+        period = PayrollPeriod.objects.create(name='Marzo 2026', start_date=date(2026, 3, 1),
+                                              end_date=date(2026, 3, 30), payment_date=date(2026, 3, 30),
+                                              status='LIQUIDATED')
+
+        def add(count):
+            for _ in range(count):
+                code = f"EMP_{Employee.objects.count() + 1:03d}"
+                employee = Employee.objects.create(
+                    third_party=self._party('EMPLEADO'), code=code, contract_type='INDEFINIDO',
+                    start_date=date(2025, 1, 1), base_salary=Decimal('2000000'), health_entity='Sura',
+                    pension_entity='Porvenir', severance_entity='Porvenir', arl_entity='Sura', position='Analista',
+                )
+                document = PayrollDocument.objects.create(
+                    period=period, employee=employee, conseccutive=0, accrued_total=Decimal('2000000'),
+                    deductions_total=Decimal('160000'), net_total=Decimal('1840000'),
+                )
+                PayrollDetail.objects.create(document=document, concept_type='EARNING', dian_code='Basico',
+                                             description='Salario', quantity=30, value=Decimal('2000000'))
+
+        rows = self._assert_constant('/api/payroll/documents/', add)
+        self.assertEqual(len(rows[0]['details']), 1)
+
+    def test_payment_out_list(self):
+        supplier = self._party('PROVEEDOR')
+        bank_account = BankAccount.objects.create(
+            client=self.tenant, name='Corriente', account_number='123', bank_name='Bancolombia', gl_account=self.bank,
+        )
+
+        def add(count):
+            for _ in range(count):
+                number = f"FV-{ReceivedInvoice.objects.count() + 1}"
+                invoice = ReceivedInvoice.objects.create(
+                    client=self.tenant, issuer_nit=supplier.identification_number, issuer_name='Proveedor SAS',
+                    third_party=supplier, invoice_number=number, cufe=f'cufe-{number}',
+                    issue_date=date(2026, 3, 1), subtotal_amount=Decimal('1000'), total_amount=Decimal('1000'),
+                    xml_file='inbox/xml/test.xml',
+                )
+                payment = PaymentOut.objects.create(
+                    client=self.tenant, payment_date=date(2026, 3, 15), third_party=supplier,
+                    bank_account=bank_account, total_amount=Decimal('1000'),
+                )
+                PaymentOutDetail.objects.create(payment_out=payment, invoice=invoice, amount_paid=Decimal('1000'))
+
+        self._assert_constant('/api/treasury/payments/', add)
@@ -0,0 +1,83 @@
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+from apps.common.tests import TenantTestCase
+from apps.accounting.models import ThirdParty, JournalEntry
+from apps.common.search import prefix_tsquery
+from apps.common.utils import normalize_nit, nit_check_digit
+from apps.invoicing.models import DianResolution, Invoice
+
+
+class NitNormalizerTests(TestCase):
+
+    def test_normalize_strips_separators_and_check_digit(self):
+        self.assertEqual(normalize_nit('900.123.456-7'), '900123456')
+        self.assertEqual(normalize_nit(' 900 123 456 '), '900123456')
+        self.assertEqual(normalize_nit(None), '')
+
+    def test_check_digit(self):
+        self.assertEqual(nit_check_digit('900123456'), '8')
+        self.assertEqual(nit_check_digit('800.197.268'), '4')
+        self.assertEqual(nit_check_digit('ABC'), '')
+
+    def test_prefix_tsquery_is_sanitized(self):
+        self.assertEqual(prefix_tsquery("Juan  Pér'ez & |"), 'juan:* & pér:* & ez:*')
+
+
+class SearchTests(TenantTestCase):
+    """Typeahead de terceros y búsqueda transversal (ruta icontains en SQLite)."""
+
+    def setUp(self):
+        super().setUp()
+
+        common = dict(client=self.tenant, department_code='11', city_code='11001', postal_code='110111',
+                      address='Calle 1', email='contacto@example.com', phone='3000000')
+        self.acme = ThirdParty.objects.create(
+            identification_type='31', identification_number='900555111', person_type=1,
+            business_name='Acme Suministros SAS', **common,
+        )
+        self.juan = ThirdParty.objects.create(
+            identification_type='13', identification_number='1020304050', person_type=2,
+            first_name='Juan', surname='Acevedo', **common,
+        )
+        resolution = DianResolution.objects.create(
+            client=self.tenant, document_type='INVOICE', resolution_number='18760000001', prefix='FE',
+            number_from=1, number_to=1000, current_number=1, date_from=date(2026, 1, 1), date_to=date(2027, 1, 1),
+        )
+        Invoice.objects.create(
+            client=self.tenant, resolution=resolution, prefix='FE', number=1023, customer=self.acme,
+            issue_date=date(2026, 3, 1), payment_due_date=date(2026, 3, 31), total=Decimal('119000'),
+        )
+        JournalEntry.objects.create(
+            client=self.tenant, number='CD-77', entry_type='DIARIO', date=date(2026, 3, 2),
+            description='Compra a Acme',
+        )
+
+        user = User.objects.create_user(username='contador', password='password123')
+        self.api = APIClient()
+        self.api.force_authenticate(user=user)
+        self.api.credentials(HTTP_X_CLIENT_ID=str(self.tenant.id))
+
+    def test_typeahead_matches_nit_prefix_without_check_digit(self):
+        response = self.api.get('/api/accounting/third-parties/typeahead/', {'q': '900.555-'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()], [self.acme.id])
+
+        response = self.api.get('/api/accounting/third-parties/typeahead/', {'q': 'aceve'})
+        self.assertEqual([row['name'] for row in response.json()], ['Juan Acevedo'])
+
+    def test_global_search_returns_all_entities(self):
+        response = self.api.get('/api/accounting/search/', {'q': 'acme'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([row['id'] for row in data['third_parties']], [self.acme.id])
+        self.assertEqual([row['customer_name'] for row in data['invoices']], ['Acme Suministros SAS'])
+        self.assertEqual([row['number'] for row in data['journal_entries']], ['CD-77'])
+
+        data = self.api.get('/api/accounting/search/', {'q': 'FE-1023'}).json()
+        self.assertEqual([row['number'] for row in data['invoices']], [1023])
+
+        data = self.api.get('/api/accounting/search/', {'q': 'a'}).json()
+        self.assertEqual(data, {'third_parties': [], 'invoices': [], 'journal_entries': []})
@@ -0,0 +1,84 @@
+from datetime import date
+from decimal import Decimal
+from apps.common.tests import TenantTestCase
+from apps.accounting.models import (
+    AccountClass, AccountGroup, Account, ThirdParty, JournalEntry, JournalEntryLine,
+)
+from apps.accounting.services.third_party_service import (
+    ThirdPartyBulkService, get_or_create_third_party, dedupe_third_parties,
+)
+from apps.electronic_events.models import ReceivedInvoice
+
+
+class ThirdPartyBulkTests(TenantTestCase):
+    """Upsert masivo de terceros por NIT canónico y fusión de duplicados."""
+
+    def setUp(self):
+        super().setUp()
+        self.service = ThirdPartyBulkService(self.tenant.id)
+
+    def _supplier(self, nit, name='Proveedor SAS'):
+        return {'identification_number': nit, 'business_name': name, 'party_type': 'PROVEEDOR', 'person_type': 1}
+
+    def test_upsert_normalizes_and_updates_in_place(self):
+        result = self.service.upsert([
+            self._supplier('900.555.111-4'),
+            self._supplier('900555111', name='Proveedor Nuevo SAS'),
+            self._supplier('800 200 300'),
+            {'identification_number': '123', 'party_type': 'CLIENTE', 'person_type': 2},
+        ])
+
+        self.assertEqual(set(result['ids']), {'900555111', '800200300'})
+        self.assertEqual(len(result['errors']), 1)
+        supplier = ThirdParty.objects.get(identification_number='900555111')
+        self.assertEqual(supplier.business_name, 'Proveedor Nuevo SAS')
+        self.assertEqual(supplier.check_digit, supplier.calculate_check_digit())
+
+        self.service.upsert([self._supplier('900555111-4', name='Proveedor Final SAS')])
+        self.assertEqual(ThirdParty.objects.count(), 2)
+        self.assertEqual(ThirdParty.objects.get(pk=supplier.pk).business_name, 'Proveedor Final SAS')
+
+        # El get_or_create de los puntos de entrada usa la misma llave
+        found, created = get_or_create_third_party(self.tenant.id, '900.555.111', defaults=self._supplier(''))
+        self.assertFalse(created)
+        self.assertEqual(found.pk, supplier.pk)
+
+    def test_dedupe_repoints_lines_and_received_invoices(self):
+        survivor = ThirdParty.objects.create(client=self.tenant, identification_type='31',
+                                             identification_number='900555111', **self._names())
+        check_digit = survivor.check_digit
+        # Duplicados heredados de la normalización anterior (sin pasar por save)
+        ThirdParty.objects.bulk_create([
+            ThirdParty(client=self.tenant, identification_type='31', identification_number='900.555.111',
+                       identification_number_hash='legacy-1', **self._names()),
+            ThirdParty(client=self.tenant, identification_type='31', identification_number=f'900555111{check_digit}',
+                       identification_number_hash='legacy-2', **self._names()),
+        ])
+        duplicates = list(ThirdParty.objects.exclude(pk=survivor.pk).order_by('pk'))
+
+        account_class = AccountClass.objects.create(client=self.tenant, code='2', name='Pasivo', nature='CREDITO')
+        group = AccountGroup.objects.create(client=self.tenant, account_class=account_class, code='22', name='Proveedores')
+        account = Account.objects.create(client=self.tenant, account_group=group, code='220505', name='Nacionales',
+                                         level=4, nature='CREDITO', account_type='PASIVO')
+        entry = JournalEntry.objects.create(client=self.tenant, number='1', entry_type='DIARIO',
+                                            date=date(2025, 1, 10), description='Compra')
+        for number, third_party in enumerate(duplicates, start=1):
+            JournalEntryLine.objects.create(client=self.tenant, entry=entry, line_number=number, account=account,
+                                            third_party=third_party, description='Compra', debit=0, credit=Decimal('10'))
+        ReceivedInvoice.objects.create(client=self.tenant, issuer_nit='900.555.111-4', issuer_name='Proveedor SAS',
+                                       invoice_number='FE-1', cufe='cufe-1', issue_date=date(2025, 1, 10),
+                                       total_amount=Decimal('10'))
+
+        result = dedupe_third_parties(self.tenant.id)
+
+        # El DV pegado no se fusiona: el último dígito podría ser del número
+        self.assertEqual((result['groups'], result['merged']), (1, 1))
+        self.assertEqual(result['suspects'], [{'third_party': duplicates[1].pk, 'matches': survivor.pk}])
+        self.assertEqual(list(ThirdParty.objects.order_by('pk').values_list('pk', flat=True)),
+                         [survivor.pk, duplicates[1].pk])
+        self.assertEqual(JournalEntryLine.objects.filter(third_party=survivor).count(), 1)
+        self.assertEqual(ReceivedInvoice.objects.get(cufe='cufe-1').third_party_id, survivor.pk)
+        self.assertEqual(result['linked_invoices'], 1)
+
+    def _names(self):
+        return {'business_name': 'Proveedor SAS', 'party_type': 'PROVEEDOR', 'person_type': 1}
@@ -13,10 +13,15 @@ router.register(r'accounting-templates', views.AccountingTemplateViewSet, basena
 # Rutas para DIAN (dropdowns)
 router.register(r'dian-formats', views.DianFormatViewSet, basename='dian-format')
 router.register(r'dian-concepts', views.DianConceptViewSet, basename='dian-concept')
+router.register(r'exogena', views.ExogenaReportViewSet, basename='exogena')
+router.register(r'fiscal-periods', views.FiscalPeriodViewSet, basename='fiscal-period')
+router.register(r'journal-imports', views.JournalImportViewSet, basename='journal-import')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('balance-sheet/', views.balance_sheet, name='balance-sheet'),
     path('trial-balance/', views.trial_balance, name='trial-balance'),
     path('income-statement/', views.income_statement, name='income-statement'),
+    path('general-ledger/', views.general_ledger, name='general-ledger'),
+    path('search/', views.global_search, name='global-search'),
 ]
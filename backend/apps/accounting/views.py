@@ -1,24 +1,30 @@
 from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
-from django.db.models import Sum, Q
+from django.db.models import Sum, Q, Value, DecimalField
+from django.db.models.functions import Coalesce
 from apps.accounting.models import (
     Account, CostCenter, ThirdParty, JournalEntry,
-    DianFormat, DianConcept, AccountingTemplate, AccountingDocumentType
+    DianFormat, DianConcept, AccountingTemplate, AccountingDocumentType, ExogenaReport,
+    FiscalPeriod, JournalImportBatch
 )
 from apps.accounting.serializers import (
     AccountSerializer, CostCenterSerializer,
     ThirdPartySerializer, JournalEntrySerializer,
     DianFormatSerializer, DianConceptSerializer,
-    AccountingTemplateSerializer, AccountingDocumentTypeSerializer
+    AccountingTemplateSerializer, AccountingDocumentTypeSerializer, ExogenaReportSerializer,
+    FiscalPeriodSerializer, JournalImportBatchSerializer
 )
 from apps.accounting.filters import DianConceptFilter
+from apps.common.mixins import QueryPlanMixin, CatalogETagMixin, requested_fields
+from apps.common.pagination import KeysetPagination
 from django_filters.rest_framework import DjangoFilterBackend
 
 
-class DianFormatViewSet(viewsets.ModelViewSet):
+class DianFormatViewSet(CatalogETagMixin, viewsets.ModelViewSet):
     """ViewSet para gestionar Formatos DIAN"""
     serializer_class = DianFormatSerializer
+    catalog_models = ['accounting.DianFormat']
     permission_classes = [permissions.IsAuthenticated]
     search_fields = ['code', 'name']
 
@@ -26,9 +32,10 @@ class DianFormatViewSet(viewsets.ModelViewSet):
         return DianFormat.objects.all()
 
 
-class DianConceptViewSet(viewsets.ModelViewSet):
+class DianConceptViewSet(CatalogETagMixin, viewsets.ModelViewSet):
     """ViewSet para gestionar Conceptos DIAN"""
     serializer_class = DianConceptSerializer
+    catalog_models = ['accounting.DianConcept']
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_class = DianConceptFilter
@@ -38,12 +45,25 @@ class DianConceptViewSet(viewsets.ModelViewSet):
         return DianConcept.objects.all()
 
 
-class AccountViewSet(viewsets.ModelViewSet):
+class AccountViewSet(CatalogETagMixin, QueryPlanMixin, viewsets.ModelViewSet):
     serializer_class = AccountSerializer
+    catalog_models = ['accounting.Account', 'accounting.AccountDianConfiguration']
     permission_classes = [permissions.IsAuthenticated]
     filterset_fields = ['account_type', 'is_active', 'level']
     search_fields = ['code', 'name']
     pagination_class = None  # Deshabilitar paginación para cargar todo el árbol de cuentas
+    prefetch_related_plan = {
+        'dian_configurations': ['dian_configurations__dian_format', 'dian_configurations__dian_concept'],
+    }
+    values_fields = {
+        'id': 'id', 'code': 'code', 'name': 'name', 'nature': 'nature', 'level': 'level',
+        'parent': 'parent_id', 'allows_movement': 'allows_movement', 'is_active': 'is_active',
+    }
+
+    def use_catalog_etag(self, request):
+        # El saldo depende de los movimientos, no del catálogo: sin ETag si se devuelve
+        selected = requested_fields(request)
+        return selected is not None and 'balance' not in selected
 
     def get_queryset(self):
         return Account.objects.all()
@@ -58,24 +78,69 @@ class CostCenterViewSet(viewsets.ModelViewSet):
         return CostCenter.objects.all()
 
 
-class ThirdPartyViewSet(viewsets.ModelViewSet):
+class ThirdPartyViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     serializer_class = ThirdPartySerializer
     permission_classes = [permissions.IsAuthenticated]
     filterset_fields = ['party_type', 'person_type', 'identification_type', 'tax_regime', 'is_active']
     search_fields = ['identification_number', 'first_name', 'surname', 'business_name', 'trade_name', 'email']
+    values_fields = {
+        'id': 'id', 'identification_type': 'identification_type',
+        'identification_number': 'identification_number', 'check_digit': 'check_digit',
+        'business_name': 'business_name', 'first_name': 'first_name', 'surname': 'surname',
+        'email': 'email', 'is_active': 'is_active',
+    }
 
     def get_queryset(self):
         return ThirdParty.objects.all()
 
+    @action(detail=False, methods=['get'])
+    def typeahead(self, request):
+        """
+        Autocompletado rankeado: ?q=<nit o nombre>&limit=10.
+        El NIT se compara por prefijo, sin puntos ni dígito de verificación.
+        """
+        from apps.accounting.services.search_service import SearchService
+
+        try:
+            service = SearchService(request.query_params.get('q'), request.query_params.get('limit', 10))
+        except ValueError:
+            return Response({'error': "Parámetro 'limit' inválido."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(service.third_parties())
+
+
+AMOUNT_ZERO = Value(0, output_field=DecimalField(max_digits=18, decimal_places=2))
+ENTRY_TOTALS = {
+    '_total_debit': Coalesce(Sum('lines__debit'), AMOUNT_ZERO),
+    '_total_credit': Coalesce(Sum('lines__credit'), AMOUNT_ZERO),
+}
 
-class JournalEntryViewSet(viewsets.ModelViewSet):
+
+class JournalEntryViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     serializer_class = JournalEntrySerializer
     permission_classes = [permissions.IsAuthenticated]
     filterset_fields = ['status', 'entry_type', 'date']
     search_fields = ['number', 'description']
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-date', '-id')
+    select_related_plan = {'source_document_info': ['content_type']}
+    prefetch_related_plan = {
+        'lines': ['lines__account'],
+        'source_document_info': ['content_object'],
+    }
+    annotation_plan = {
+        'total_debit': ENTRY_TOTALS,
+        'total_credit': ENTRY_TOTALS,
+        'is_balanced': ENTRY_TOTALS,
+    }
+    values_fields = {
+        'id': 'id', 'number': 'number', 'entry_type': 'entry_type', 'date': 'date',
+        'description': 'description', 'status': 'status',
+        'total_debit': '_total_debit', 'total_credit': '_total_credit',
+    }
 
     def get_queryset(self):
-        return JournalEntry.objects.all()
+        # Orden explícito: Meta.ordering no se aplica a consultas con agregados
+        return JournalEntry.objects.order_by('-date', '-id')
 
 
 # ==========================================
@@ -106,6 +171,146 @@ class AccountingTemplateViewSet(viewsets.ModelViewSet):
         return AccountingTemplate.objects.all()
 
 
+class ExogenaReportViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Archivos de Información Exógena (Medios Magnéticos) generados.
+    POST generate/ {"year": 2025} encola la generación del tenant actual.
+    """
+    serializer_class = ExogenaReportSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = ['year', 'dian_format']
+
+    def get_queryset(self):
+        return ExogenaReport.objects.select_related('dian_format')
+
+    @action(detail=False, methods=['post'])
+    def generate(self, request):
+        from apps.tenants.utils import get_current_client_id
+        from apps.accounting.tasks import generate_exogena
+
+        try:
+            year = int(request.data.get('year'))
+        except (TypeError, ValueError):
+            return Response({'error': "Parámetro 'year' requerido."}, status=status.HTTP_400_BAD_REQUEST)
+
+        task = generate_exogena.delay(int(get_current_client_id()), year)
+        return Response({'status': 'queued', 'task_id': task.id, 'year': year}, status=status.HTTP_202_ACCEPTED)
+
+
+class FiscalPeriodViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Periodos contables y su cierre.
+    POST close/ {"year", "month"}, close-year/ {"year", "generate_closing_entry"}
+    y reopen/ {"year", "month"}.
+    """
+    serializer_class = FiscalPeriodSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = ['year', 'status']
+
+    def get_queryset(self):
+        return FiscalPeriod.objects.all()
+
+    def _service(self, request):
+        from apps.tenants.utils import get_current_client_id
+        from apps.accounting.services.closing_service import FiscalCloseService
+        return FiscalCloseService(int(get_current_client_id()), user=request.user)
+
+    def _year_month(self, request, require_month=True):
+        try:
+            year = int(request.data.get('year'))
+            month = int(request.data.get('month')) if require_month else None
+        except (TypeError, ValueError):
+            return None, None
+        if require_month and not 1 <= month <= 12:
+            return None, None
+        return year, month
+
+    @action(detail=False, methods=['post'])
+    def close(self, request):
+        year, month = self._year_month(request)
+        if year is None:
+            return Response({'error': "Parámetros 'year' y 'month' requeridos."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            period = self._service(request).close_period(year, month)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(FiscalPeriodSerializer(period).data)
+
+    @action(detail=False, methods=['post'], url_path='close-year')
+    def close_year(self, request):
+        year, _ = self._year_month(request, require_month=False)
+        if year is None:
+            return Response({'error': "Parámetro 'year' requerido."}, status=status.HTTP_400_BAD_REQUEST)
+        generate_entry = str(request.data.get('generate_closing_entry', True)).lower() not in ('false', '0')
+        try:
+            period = self._service(request).close_year(year, generate_closing_entry=generate_entry)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(FiscalPeriodSerializer(period).data)
+
+    @action(detail=False, methods=['post'])
+    def reopen(self, request):
+        year, month = self._year_month(request)
+        if year is None:
+            return Response({'error': "Parámetros 'year' y 'month' requeridos."}, status=status.HTTP_400_BAD_REQUEST)
+        reopened = self._service(request).reopen_period(year, month)
+        return Response({'reopened': reopened})
+
+
+class JournalImportViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Importaciones masivas de comprobantes (CSV/XLSX).
+    POST upload/ (multipart: file, post_entries) encola el procesamiento;
+    el resultado y los errores por fila quedan en el lote.
+    """
+    serializer_class = JournalImportBatchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = ['status']
+
+    def get_queryset(self):
+        return JournalImportBatch.objects.all()
+
+    @action(detail=False, methods=['post'])
+    def upload(self, request):
+        from apps.tenants.utils import get_current_client_id
+        from apps.accounting.tasks import import_journal_entries
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': "Archivo 'file' requerido."}, status=status.HTTP_400_BAD_REQUEST)
+        if not upload.name.lower().endswith(('.csv', '.txt', '.xlsx')):
+            return Response({'error': "Formato no soportado (CSV o XLSX)."}, status=status.HTTP_400_BAD_REQUEST)
+
+        client_id = int(get_current_client_id())
+        batch = JournalImportBatch.objects.create(
+            client_id=client_id,
+            file=upload,
+            original_name=upload.name,
+            post_entries=str(request.data.get('post_entries', 'true')).lower() not in ('false', '0'),
+            created_by=request.user,
+        )
+        task = import_journal_entries.delay(client_id, batch.id)
+        data = JournalImportBatchSerializer(batch).data
+        data['task_id'] = task.id
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def global_search(request):
+    """
+    Búsqueda transversal: terceros, facturas de venta y comprobantes en una
+    sola llamada. Parámetros: q (mín. 2 caracteres) y limit por entidad.
+    """
+    from apps.accounting.services.search_service import SearchService
+
+    try:
+        service = SearchService(request.query_params.get('q'), request.query_params.get('limit', 5))
+    except ValueError:
+        return Response({'error': "Parámetro 'limit' inválido."}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(service.search_all())
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def balance_sheet(request):
@@ -128,3 +333,57 @@ def income_statement(request):
     """Estado de Resultados"""
     # TODO: Implementar lógica de Estado de Resultados
     return Response({'message': 'Estado de Resultados'})
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def general_ledger(request):
+    """
+    Libro Auxiliar (streaming).
+    Parámetros: date_from, date_to (YYYY-MM-DD, obligatorios), account_from,
+    account_to, third_party (id) y output=csv|xlsx|jsonl (por defecto csv).
+    """
+    from django.http import StreamingHttpResponse, FileResponse
+    from django.utils.dateparse import parse_date
+    from apps.tenants.utils import get_current_client_id
+    from apps.accounting.services.ledger_service import (
+        GeneralLedgerService, stream_csv, stream_jsonl, build_xlsx,
+    )
+
+    params = request.query_params
+    date_from = parse_date(params.get('date_from', ''))
+    date_to = parse_date(params.get('date_to', ''))
+    if not date_from or not date_to or date_from > date_to:
+        return Response(
+            {'error': "Parámetros 'date_from' y 'date_to' requeridos (YYYY-MM-DD, date_from <= date_to)."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    output = params.get('output', 'csv').lower()
+    if output not in ('csv', 'xlsx', 'jsonl'):
+        return Response({'error': "Formato no soportado. Use csv, xlsx o jsonl."}, status=status.HTTP_400_BAD_REQUEST)
+
+    service = GeneralLedgerService(
+        date_from=date_from,
+        date_to=date_to,
+        account_from=params.get('account_from'),
+        account_to=params.get('account_to'),
+        third_party_id=params.get('third_party'),
+    )
+    client_id = get_current_client_id()
+    filename = f"libro_auxiliar_{date_from:%Y%m%d}_{date_to:%Y%m%d}"
+
+    if output == 'xlsx':
+        return FileResponse(
+            build_xlsx(client_id, service),
+            as_attachment=True,
+            filename=f"{filename}.xlsx",
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+
+    if output == 'jsonl':
+        response = StreamingHttpResponse(stream_jsonl(client_id, service), content_type='application/x-ndjson')
+    else:
+        response = StreamingHttpResponse(stream_csv(client_id, service), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{output}"'
+    return response
@@ -0,0 +1,48 @@
+import re
+
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+re_accepts_brotli = re.compile(r'\bbr\b')
+
+# Tamaño mínimo (bytes) a partir del cual vale la pena comprimir
+MIN_COMPRESS_SIZE = 200
+
+# Calidad 4-5: buena relación velocidad/tamaño para respuestas dinámicas
+BROTLI_QUALITY = 5
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compresión negociada por Accept-Encoding: brotli si el cliente lo acepta
+    y la librería está instalada, gzip en caso contrario (incluye respuestas
+    en streaming). No recomprime respuestas que ya traen Content-Encoding.
+    """
+
+    def process_response(self, request, response):
+        if (
+            brotli is None
+            or response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < MIN_COMPRESS_SIZE
+            or not re_accepts_brotli.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        # El contenido cambió: el ETag pasa a ser débil (igual que GZipMiddleware)
+        if response.has_header('ETag'):
+            response.headers['ETag'] = re.sub(r'^"', 'W/"', response.headers['ETag'])
+        response.headers['Content-Encoding'] = 'br'
+        return response
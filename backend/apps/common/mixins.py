@@ -0,0 +1,237 @@
+import hashlib
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.utils.http import parse_etags
+from rest_framework import serializers, status
+from rest_framework.response import Response
+
+from apps.tenants.utils import get_current_client_id
+
+
+def _split_param(value):
+    return {item.strip() for item in (value or '').split(',') if item.strip()}
+
+
+def requested_fields(request):
+    """
+    Campos solicitados por `?fields=a,b` más los de `?expand=rel`.
+    Retorna None si no se pidió selección (se devuelven todos los campos).
+    """
+    if request is None or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+        return None
+    fields = _split_param(request.query_params.get('fields'))
+    if not fields:
+        return None
+    return fields | _split_param(request.query_params.get('expand'))
+
+
+class DynamicFieldsMixin:
+    """
+    Serializer con sparse fieldsets: `?fields=id,number,total&expand=lines`.
+
+    Sin `?fields` se devuelven todos los campos (compatibilidad). Con `?fields`,
+    las relaciones anidadas solo se incluyen si se piden en `fields` o `expand`.
+    Solo aplica al serializer raíz de la petición, no a los anidados.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = requested_fields(self._context.get('request')) if hasattr(self, '_context') else None
+        if selected is None:
+            return
+        for name in set(self.fields) - selected:
+            self.fields.pop(name)
+
+
+class QueryPlanMixin:
+    """
+    Plan de consulta declarado por ViewSet para evitar N+1.
+
+    - `select_related_plan` / `prefetch_related_plan` / `annotation_plan`:
+      {campo_serializer: [lookups]} ({campo: {alias: expresión}} en anotaciones);
+      solo se aplican las entradas de los campos que se van a serializar.
+    - `values_fields`: {campo_salida: ruta_ORM}. Si en una acción `list` todos
+      los campos pedidos con `?fields=` están aquí, la respuesta se arma con
+      `.values()` y no se instancia el ModelSerializer (ruta rápida).
+    """
+    select_related_plan = {}
+    prefetch_related_plan = {}
+    annotation_plan = {}
+    values_fields = {}
+
+    def _selected(self, plan):
+        selected = requested_fields(getattr(self, 'request', None))
+        return [
+            item
+            for field, items in plan.items()
+            if selected is None or field in selected
+            for item in items
+        ]
+
+    def _annotations(self, only=None):
+        annotations = {}
+        for field, exprs in self.annotation_plan.items():
+            if only is None or field in only:
+                annotations.update(exprs)
+        return annotations
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        select = self._selected(self.select_related_plan)
+        prefetch = self._selected(self.prefetch_related_plan)
+        selected = requested_fields(getattr(self, 'request', None))
+        annotations = self._annotations(selected)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        selected = requested_fields(request)
+        if not selected or not self.values_fields or not selected <= self.values_fields.keys():
+            return super().list(request, *args, **kwargs)
+
+        # Ruta rápida: values() sin ModelSerializer
+        names = [name for name in self.values_fields if name in selected]
+        paths = [self.values_fields[name] for name in names]
+        # La paginación por cursor necesita los campos del orden en cada fila
+        ordering = [field.lstrip('-') for field in getattr(self, 'keyset_ordering', ())]
+        queryset = super(QueryPlanMixin, self).filter_queryset(self.get_queryset())
+        annotations = self._annotations(selected)
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        queryset = queryset.values(*dict.fromkeys(paths + ordering))
+
+        page = self.paginate_queryset(queryset)
+        rows = [self._values_row(names, paths, values) for values in (page if page is not None else queryset)]
+        if page is not None:
+            return self.get_paginated_response(rows)
+        return Response(rows)
+
+    _datetime_field = serializers.DateTimeField()
+
+    def _values_row(self, names, paths, values):
+        row = {}
+        for name, path in zip(names, paths):
+            value = values[path]
+            # Mismo formato que los campos del serializer
+            if isinstance(value, Decimal):
+                value = str(value)
+            elif isinstance(value, datetime):
+                value = self._datetime_field.to_representation(value)
+            row[name] = value
+        return row
+
+
+# ----------------------------------------------------------------------
+# ETag para catálogos
+# ----------------------------------------------------------------------
+CATALOG_VERSION_KEY = 'catalog-version:{}:{}'
+
+
+def _catalog_key(model, client_id=None):
+    """
+    Clave de versión de un catálogo. Los modelos con `client` llevan versión
+    por tenant (un cambio en un tenant no invalida a los demás); los
+    catálogos globales (DIAN, parámetros legales) comparten una sola.
+    """
+    model = apps.get_model(model) if isinstance(model, str) else model
+    if not any(field.name == 'client' for field in model._meta.fields):
+        return CATALOG_VERSION_KEY.format(model._meta.label, '*')
+    if client_id is None:
+        client_id = get_current_client_id()
+    return CATALOG_VERSION_KEY.format(model._meta.label, client_id)
+
+
+def catalog_versions(models, client_id=None):
+    """
+    Versión actual (en caché) de cada modelo de catálogo para el tenant
+    `client_id` (por defecto, el activo). Una versión ausente se inicializa
+    con un valor nuevo, de modo que perder la caché nunca produce un 304
+    con datos viejos.
+    """
+    keys = [_catalog_key(model, client_id) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def touch_catalog(model, client_id=None):
+    """
+    Invalida los ETag de un catálogo del tenant `client_id` (por defecto, el
+    activo). Se llama automáticamente en post_save/post_delete; las cargas
+    masivas (bulk_create, update) deben llamarla explícitamente.
+    """
+    key = _catalog_key(model, client_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def _on_catalog_change(sender, instance, **kwargs):
+    touch_catalog(sender, getattr(instance, 'client_id', None))
+
+
+def _etag_matches(header, etag):
+    # Comparación débil: la compresión convierte el ETag en W/"..."
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return etag.strip('"') in {tag.replace('W/', '', 1).strip('"') for tag in parse_etags(header)}
+
+
+class CatalogETagMixin:
+    """
+    ETag / If-None-Match para catálogos que cambian poco.
+
+    El ETag se deriva de la versión de los modelos en `catalog_models`
+    (etiquetas 'app.Modelo'), del tenant y de la URL, por lo que un 304 se
+    responde sin consultar la base de datos. `use_catalog_etag` permite
+    excluir respuestas que dependen de algo más que el catálogo.
+    """
+    catalog_models = []
+
+    def use_catalog_etag(self, request):
+        return True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for label in cls.catalog_models:
+            post_save.connect(_on_catalog_change, sender=label, dispatch_uid=f'catalog-etag:{label}')
+            post_delete.connect(_on_catalog_change, sender=label, dispatch_uid=f'catalog-etag:{label}')
+
+    def catalog_etag(self, request):
+        parts = [str(get_current_client_id()), request.get_full_path()]
+        parts.extend(str(version) for version in catalog_versions(self.catalog_models))
+        return '"{}"'.format(hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest())
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        if not self.use_catalog_etag(request):
+            return handler(request, *args, **kwargs)
+        etag = self.catalog_etag(request)
+        if _etag_matches(request.headers.get('If-None-Match'), etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,170 @@
+import json
+from base64 import b64decode, b64encode
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def estimated_count(queryset):
+    """
+    Conteo aproximado sin COUNT(*): en PostgreSQL toma las filas estimadas por
+    el planificador (EXPLAIN). En otros motores hace el conteo exacto.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor sobre una tupla ordenada (ej. fecha, id).
+
+    A diferencia de CursorPagination de DRF, el cursor guarda todos los campos
+    del orden, así que la siguiente página es un `WHERE (fecha, id) < (...)`
+    que usa el índice compuesto sin OFFSET, aunque muchas filas compartan la
+    misma fecha. El total se informa estimado en el encabezado
+    `X-Estimated-Count`.
+
+    La vista define el orden con `keyset_ordering` (el último campo debe ser
+    único, normalmente '-id').
+    """
+    page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 50)
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    ordering = ('-id',)
+    count_header = 'X-Estimated-Count'
+
+    def get_ordering(self, view):
+        return tuple(getattr(view, 'keyset_ordering', self.ordering))
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    # ------------------------------------------------------------------
+    # Cursor
+    # ------------------------------------------------------------------
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))
+            position, reverse = payload['p'], bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound('Cursor inválido.')
+        if not isinstance(position, list) or len(position) != len(self.fields):
+            raise NotFound('Cursor inválido.')
+        return position, reverse
+
+    def encode_cursor(self, position, reverse=False):
+        payload = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        return replace_query_param(self.base_url, self.cursor_query_param, b64encode(payload.encode('utf-8')).decode('ascii'))
+
+    @staticmethod
+    def _value(row, field):
+        if isinstance(row, dict):
+            value = row[field]
+        else:
+            # attname: para llaves foráneas se usa el *_id sin cargar el objeto
+            value = getattr(row, row._meta.get_field(field).attname)
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    def _position(self, row):
+        return [self._value(row, name) for name, _ in self.fields]
+
+    def _seek(self, position, reverse):
+        """WHERE (f1, f2, ...) > o < (v1, v2, ...) según el sentido de cada campo."""
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.fields, position):
+            forward = 'lt' if descending else 'gt'
+            backward = 'gt' if descending else 'lt'
+            condition |= equal & Q(**{f'{name}__{backward if reverse else forward}': value})
+            equal &= Q(**{name: value})
+        # Cota sobre el primer campo para que el índice acote el rango
+        name, descending = self.fields[0]
+        bound = 'lte' if descending != reverse else 'gte'
+        return Q(**{f'{name}__{bound}': position[0]}) & condition
+
+    # ------------------------------------------------------------------
+    # Paginación
+    # ------------------------------------------------------------------
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = self.get_ordering(view)
+        self.fields = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.estimated = estimated_count(queryset)
+
+        position, reverse = self.decode_cursor(request)
+        if reverse:
+            ordering = tuple(f[1:] if f.startswith('-') else f'-{f}' for f in ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._seek(position, reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_position = self.previous_position = None
+        if rows:
+            if has_more or reverse:
+                self.next_position = self._position(rows[-1])
+            if position is not None and (has_more or not reverse):
+                self.previous_position = self._position(rows[0])
+        return rows
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        response = Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+        response[self.count_header] = str(self.estimated)
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
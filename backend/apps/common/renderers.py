@@ -0,0 +1,36 @@
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+
+_fallback_encoder = encoders.JSONEncoder()
+
+
+def _default(obj):
+    # Decimal, Promise, timedelta, QuerySet, etc. con las mismas reglas de DRF
+    return _fallback_encoder.default(obj)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer basado en orjson (serialización en C; date y UUID nativos).
+    Decimal, fechas-hora y demás tipos se delegan al encoder de DRF para que
+    la salida sea idéntica a la del renderer estándar. Si orjson no está
+    instalado, o se pide indentación, se usa el renderer estándar.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(
+            data,
+            default=_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
@@ -0,0 +1,97 @@
+"""
+Utilidades de búsqueda en PostgreSQL (tsvector + pg_trgm).
+
+Los documentos de búsqueda los mantiene un trigger BEFORE INSERT/UPDATE, de
+modo que también se actualizan con bulk_create, COPY o UPDATE masivos. En
+otros motores (SQLite en desarrollo) las migraciones no crean nada y los
+servicios de búsqueda usan `icontains`.
+"""
+import re
+
+from django.db import connection
+
+# Sin stemming: nombres propios, NIT y números de documento
+SEARCH_CONFIG = 'simple'
+
+
+def is_postgres(conn=None):
+    return (conn or connection).vendor == 'postgresql'
+
+
+def prefix_tsquery(text):
+    """
+    Convierte el texto del usuario en un tsquery de prefijos ('juan:* & per:*').
+    Solo conserva caracteres de palabra, así que es seguro como consulta 'raw'.
+    """
+    tokens = re.findall(r'\w+', text or '')
+    return ' & '.join(f"{token.lower()}:*" for token in tokens)
+
+
+def _document(weighted_columns):
+    parts = []
+    for weight, columns in weighted_columns:
+        text = " || ' ' || ".join(f"coalesce(NEW.{column}::text, '')" for column in columns)
+        parts.append(f"setweight(to_tsvector('{SEARCH_CONFIG}', {text}), '{weight}')")
+    return ' || '.join(parts)
+
+
+def search_trigger_sql(table, weighted_columns):
+    """
+    SQL (forward, reverse) del trigger que mantiene `search_vector`, del
+    índice GIN sobre él y del backfill de las filas existentes.
+
+    weighted_columns: [('A', ['col1', 'col2']), ('B', ['col3'])]
+    """
+    columns = [column for _, cols in weighted_columns for column in cols]
+    function = f"{table}_search_vector_fn"
+    trigger = f"{table}_search_vector_trg"
+    forward = [
+        f"""
+        CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {_document(weighted_columns)};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+        """,
+        f"DROP TRIGGER IF EXISTS {trigger} ON {table};",
+        f"""
+        CREATE TRIGGER {trigger}
+        BEFORE INSERT OR UPDATE OF {', '.join(columns)} ON {table}
+        FOR EACH ROW EXECUTE PROCEDURE {function}();
+        """,
+        f"CREATE INDEX IF NOT EXISTS {table}_search_gin ON {table} USING gin (search_vector);",
+        f"UPDATE {table} SET {columns[0]} = {columns[0]};",
+    ]
+    reverse = [
+        f"DROP INDEX IF EXISTS {table}_search_gin;",
+        f"DROP TRIGGER IF EXISTS {trigger} ON {table};",
+        f"DROP FUNCTION IF EXISTS {function}();",
+    ]
+    return forward, reverse
+
+
+def trigram_index_sql(table, columns):
+    """
+    Índices GIN trigram sobre UPPER(columna): es la expresión que genera
+    `icontains` en PostgreSQL, así que SearchFilter de DRF los aprovecha.
+    """
+    forward = ["CREATE EXTENSION IF NOT EXISTS pg_trgm;"]
+    reverse = []
+    for column in columns:
+        name = f"{table}_{column}_trgm"
+        forward.append(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops);"
+        )
+        reverse.append(f"DROP INDEX IF EXISTS {name};")
+    return forward, reverse
+
+
+def run_on_postgres(statements):
+    """Operación RunPython que ejecuta SQL solo si la BD es PostgreSQL."""
+    def operation(apps, schema_editor):
+        if not is_postgres(schema_editor.connection):
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
@@ -19,34 +19,40 @@ class DianXadesSigner:
         """
         self.cert_data = cert_data
         self.cert_password = cert_password
+        self._credentials = None
 
-    def sign(self, xml_bytes: bytes) -> bytes:
+    def load(self):
         """
-        Injects the signature into the UBLExtensions/ExtensionContent of the provided XML.
+        Abre el .p12 una sola vez y conserva llave y certificado en PEM.
+        Firmar lotes (nómina del periodo) reutiliza la misma llave en todos los hilos.
         """
-        try:
-            # 1. Load Certificate and Private Key
+        if self._credentials is None:
             p12_data = self.cert_data
             if isinstance(self.cert_data, str):
                 # If it's a path, read it
                 with open(self.cert_data, "rb") as f:
                     p12_data = f.read()
 
-            p12 = pkcs12.load_key_and_certificates(p12_data, self.cert_password.encode())
-            
-            key = p12[0]
-            cert = p12[1]
-
+            key, cert, _ = pkcs12.load_key_and_certificates(p12_data, self.cert_password.encode())
             if not key or not cert:
                  raise ValueError("El archivo .p12 no contiene llave privada o certificado válidos.")
 
-            # 2. Prepare for signxml
             key_pem = key.private_bytes(
                 encoding=serialization.Encoding.PEM,
                 format=serialization.PrivateFormat.TraditionalOpenSSL,
                 encryption_algorithm=serialization.NoEncryption()
             )
             cert_pem = cert.public_bytes(serialization.Encoding.PEM)
+            self._credentials = (key_pem, cert_pem)
+        return self._credentials
+
+    def sign(self, xml_bytes: bytes) -> bytes:
+        """
+        Injects the signature into the UBLExtensions/ExtensionContent of the provided XML.
+        """
+        try:
+            # 1-2. Llave y certificado (cargados una vez por instancia)
+            key_pem, cert_pem = self.load()
 
             # 3. Configure Signer (RSA-SHA256)
             # method=methods.enveloped is standard for XAdES where signature is inside the doc
@@ -0,0 +1,140 @@
+"""
+Lectura de archivos planos (CSV/XLSX) en streaming y conversión de celdas.
+Lo usan las cargas masivas (comprobantes, extractos bancarios). También
+escribe registros de ancho fijo (archivos de pago, planilla PILA).
+"""
+import csv
+import io
+import itertools
+import re
+import unicodedata
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Formatos de fecha de archivos planos (ISO y los usuales en Colombia)
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d', '%Y%m%d')
+
+# Un solo separador seguido de exactamente tres dígitos ('1.500', '12,000')
+# es de miles en los exportes colombianos, no decimal
+THOUSANDS_ONLY = re.compile(r'-?[1-9]\d{0,2}[.,]\d{3}')
+
+
+def iter_csv(stream, encoding='utf-8-sig'):
+    """
+    Filas de un CSV binario. El separador (',' o ';') se toma de las primeras
+    líneas (algunos exportes traen títulos antes del encabezado). Los bytes
+    inválidos (exportes en Latin-1) se reemplazan.
+    """
+    text = io.TextIOWrapper(stream, encoding=encoding, errors='replace', newline='')
+    try:
+        head = list(itertools.islice(text, 10))
+        sample = ''.join(head)
+        delimiter = ';' if sample.count(';') > sample.count(',') else ','
+        yield from csv.reader(itertools.chain(head, text), delimiter=delimiter)
+    finally:
+        # No cerrar el archivo original (se guarda después de leerlo)
+        text.detach()
+
+
+def iter_xlsx(stream):
+    """Filas (valores) de la primera hoja, en modo solo lectura."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_table(stream, filename, encoding='utf-8-sig'):
+    """Filas de un CSV o XLSX según la extensión del archivo."""
+    if filename.lower().endswith('.xlsx'):
+        return iter_xlsx(stream)
+    return iter_csv(stream, encoding=encoding)
+
+
+def normalize_header(value):
+    """Encabezado en minúsculas y sin tildes ('Descripción ' -> 'descripcion')."""
+    text = str(value or '').strip().lower()
+    for accented, plain in zip('áéíóúñ', 'aeioun'):
+        text = text.replace(accented, plain)
+    return text
+
+
+def clean_text(value):
+    """Texto de una celda CSV/XLSX (los enteros leídos como float pierden el '.0')."""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def parse_date(value, formats=DATE_FORMATS):
+    """Fecha de una celda; None si no coincide con ningún formato."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = clean_text(value)
+    for fmt in formats:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_amount(value):
+    """
+    Valor monetario a Decimal con 2 decimales. Acepta 1234.5, '1.234,50',
+    '1,234.50', '1.234.567' y '$ -1.500' ('1.500' y '1,500' son 1500).
+    Vacío es 0; None si no es un número finito.
+    """
+    if value in (None, ''):
+        return Decimal('0')
+    if isinstance(value, (int, float, Decimal)):
+        text = str(value)
+    else:
+        text = clean_text(value).replace(' ', '').replace('$', '')
+        if ',' in text and '.' in text:
+            if text.rfind(',') > text.rfind('.'):
+                text = text.replace('.', '').replace(',', '.')
+            else:
+                text = text.replace(',', '')
+        elif THOUSANDS_ONLY.fullmatch(text) or text.count('.') > 1:
+            text = text.replace('.', '').replace(',', '')
+        elif text.count(',') > 1:
+            text = text.replace(',', '')
+        elif ',' in text:
+            text = text.replace(',', '.')
+    try:
+        amount = Decimal(text)
+        if not amount.is_finite():
+            return None
+        return amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        return None
+
+
+def _ascii(value):
+    text = unicodedata.normalize('NFKD', str(value or '')).encode('ascii', 'ignore').decode('ascii')
+    return text.upper()
+
+
+def format_record(fields, values):
+    """
+    Registro de ancho fijo. `fields` es una lista de (campo, longitud, tipo)
+    donde 'N' es numérico (ceros a la izquierda) y 'A' alfanumérico
+    (espacios a la derecha, mayúsculas y sin tildes).
+    """
+    parts = []
+    for name, length, kind in fields:
+        value = values.get(name, '')
+        if kind == 'N':
+            digits = ''.join(ch for ch in str(value if value is not None else '') if ch.isdigit())
+            parts.append(digits[-length:].rjust(length, '0'))
+        else:
+            parts.append(_ascii(value)[:length].ljust(length))
+    return ''.join(parts)
@@ -0,0 +1,45 @@
+from unittest.mock import patch
+
+import requests
+from django.test import TestCase
+
+from apps.accounting.models import Account, AccountClass, AccountGroup
+from apps.tenants.models import Client
+from apps.tenants.utils import set_current_client_id
+
+
+class TenantTestMixin:
+    """
+    Crea el tenant de prueba (sin consultar el RUES) y lo deja activo en el
+    hilo durante cada test. Las clases que necesitan otros datos del tenant
+    los declaran en `tenant_fields`. `create_account` arma una cuenta de
+    nivel 4 con su clase y grupo.
+    """
+    tenant_fields = {}
+
+    def create_tenant(self, **fields):
+        fields = {'name': "Empresa Test", 'nit': "900123456", **self.tenant_fields, **fields}
+        with patch('apps.tenants.signals.requests.get', side_effect=requests.exceptions.ConnectionError):
+            return Client.objects.create(**fields)
+
+    def create_account(self, class_code, nature, group_code, code, account_type='ACTIVO', **extra):
+        account_class, _ = AccountClass.objects.get_or_create(
+            client=self.tenant, code=class_code, defaults={'name': class_code, 'nature': nature},
+        )
+        group, _ = AccountGroup.objects.get_or_create(
+            client=self.tenant, account_class=account_class, code=group_code, defaults={'name': group_code},
+        )
+        return Account.objects.create(
+            client=self.tenant, account_group=group, code=code, name=code, level=4,
+            nature=nature, account_type=account_type, **extra,
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.tenant = self.create_tenant()
+        set_current_client_id(self.tenant.id)
+        self.addCleanup(set_current_client_id, None)
+
+
+class TenantTestCase(TenantTestMixin, TestCase):
+    pass
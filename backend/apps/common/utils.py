@@ -1,6 +1,54 @@
 from cryptography.fernet import Fernet
 from django.conf import settings
 import base64
+import hashlib
+import re
+
+# Pesos DIAN del Módulo 11, alineados a la derecha del NIT
+NIT_WEIGHTS = (3, 7, 13, 17, 19, 23, 29, 37, 41, 43, 47, 53, 59, 67, 71)
+
+
+def normalize_nit(value):
+    """
+    Forma canónica de un NIT / documento: sin puntos, espacios ni dígito de
+    verificación. '900.123.456-7' -> '900123456'.
+    """
+    if value is None:
+        return ''
+    value = str(value).strip().upper()
+    if '-' in value:
+        value = value.split('-', 1)[0]
+    return re.sub(r'[^0-9A-Z]', '', value)
+
+
+def nit_check_digit(nit):
+    """Dígito de verificación DIAN (Módulo 11). Vacío si el NIT no es numérico."""
+    nit = normalize_nit(nit)
+    if not nit.isdigit():
+        return ''
+    total = sum(int(digit) * weight for digit, weight in zip(reversed(nit), NIT_WEIGHTS))
+    remainder = total % 11
+    return str(remainder) if remainder in (0, 1) else str(11 - remainder)
+
+
+# Documentos extranjeros: pueden llevar letras y guiones propios del número
+FOREIGN_ID_TYPES = ('41', '42', '50')
+
+
+def canonical_identification(value, identification_type='31'):
+    """
+    Número de identificación canónico de un tercero. Es la única
+    normalización que se debe usar para buscar, crear o deduplicar terceros.
+    """
+    if identification_type in FOREIGN_ID_TYPES:
+        return re.sub(r'\s+', '', str(value or '')).upper()
+    return normalize_nit(value)
+
+
+def identification_hash(identification_number):
+    """SHA-256 del número canónico (llave única por tenant de ThirdParty)."""
+    return hashlib.sha256((identification_number or '').encode('utf-8')).hexdigest()
+
 
 class SecurityService:
     """
@@ -84,7 +84,8 @@ class MySocialAccountAdapter(DefaultSocialAccountAdapter):
                     logger.info(f"Tenant AB11 creado: {client}")
 
                 # 2. ThirdParty (El usuario como persona)
-                # Buscamos por email y cliente
+                # Buscamos por email y cliente: el username no es un documento
+                # y normalizarlo como NIT cruzaría usuarios distintos
                 third_party, tp_created = ThirdParty.objects.get_or_create(
                     client=client,
                     email=user.email,
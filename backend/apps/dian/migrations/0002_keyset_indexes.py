@@ -0,0 +1,17 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dian', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dianlog',
+            index=models.Index(fields=['-created_at', '-id'], name='dian_log_created_idx'),
+        ),
+    ]
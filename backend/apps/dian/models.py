@@ -302,6 +302,9 @@ class DIANLog(models.Model):
         verbose_name = "Log DIAN"
         verbose_name_plural = "Logs DIAN"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='dian_log_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_action_display()} - {self.created_at}"
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from apps.dian.models import ElectronicDocument, ElectronicDocumentLine, DIANResolution
+from apps.dian.models import ElectronicDocument, ElectronicDocumentLine, DIANResolution, DIANLog
 
 
 class ElectronicDocumentLineSerializer(serializers.ModelSerializer):
@@ -26,3 +26,12 @@ class DIANResolutionSerializer(serializers.ModelSerializer):
     
     def get_available_numbers(self, obj):
         return obj.get_available_numbers()
+
+
+class DIANLogSerializer(serializers.ModelSerializer):
+    document_number = serializers.CharField(source='document.full_number', read_only=True, default=None)
+
+    class Meta:
+        model = DIANLog
+        fields = ['id', 'document', 'document_number', 'action', 'status', 'message',
+                  'error_message', 'request_data', 'response_data', 'user', 'created_at']
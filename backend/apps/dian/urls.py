@@ -5,6 +5,7 @@ from . import views
 router = DefaultRouter()
 router.register(r'electronic-documents', views.ElectronicDocumentViewSet, basename='electronic-document')
 router.register(r'resolutions', views.DIANResolutionViewSet, basename='dian-resolution')
+router.register(r'logs', views.DIANLogViewSet, basename='dian-log')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,8 +1,9 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from apps.dian.models import ElectronicDocument, DIANResolution
-from apps.dian.serializers import ElectronicDocumentSerializer, DIANResolutionSerializer
+from apps.common.pagination import KeysetPagination
+from apps.dian.models import ElectronicDocument, DIANResolution, DIANLog
+from apps.dian.serializers import ElectronicDocumentSerializer, DIANResolutionSerializer, DIANLogSerializer
 
 
 class ElectronicDocumentViewSet(viewsets.ModelViewSet):
@@ -24,6 +25,18 @@ class DIANResolutionViewSet(viewsets.ModelViewSet):
         return DIANResolution.objects.all()
 
 
+class DIANLogViewSet(viewsets.ReadOnlyModelViewSet):
+    """Log de transacciones con la DIAN (paginado por cursor)."""
+    serializer_class = DIANLogSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = ['action', 'status', 'document']
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
+
+    def get_queryset(self):
+        return DIANLog.objects.select_related('document')
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def send_to_dian(request, pk):
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('electronic_events', '0002_receivedinvoice_subtotal_amount_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='receivedinvoice',
+            index=models.Index(fields=['client', '-issue_date', '-id'], name='recv_inv_client_date_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0012_journal_import_batch'),
+        ('electronic_events', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='receivedinvoice',
+            name='third_party',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='received_invoices', to='accounting.thirdparty', verbose_name='Tercero (Proveedor)'),
+        ),
+    ]
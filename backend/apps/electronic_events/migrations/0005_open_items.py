@@ -0,0 +1,34 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:25
+
+from django.db import migrations, models
+
+
+def backfill_outstanding(apps, schema_editor):
+    # Saldo inicial: total menos los egresos contabilizados
+    schema_editor.execute(
+        "UPDATE electronic_events_receivedinvoice SET outstanding_amount = total_amount - "
+        "COALESCE((SELECT SUM(d.amount_paid) FROM treasury_paymentoutdetail d "
+        "JOIN treasury_paymentout p ON p.id = d.payment_out_id "
+        "WHERE d.invoice_id = electronic_events_receivedinvoice.id AND p.status = 'POSTED'), 0)"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('electronic_events', '0004_receivedinvoice_third_party'),
+        ('treasury', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='receivedinvoice',
+            name='outstanding_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=18, null=True, verbose_name='Saldo Pendiente'),
+        ),
+        migrations.RunPython(backfill_outstanding, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='receivedinvoice',
+            index=models.Index(condition=models.Q(('outstanding_amount__gt', 0)), fields=['client', 'issuer_nit', 'issue_date'], name='recv_inv_open_items_idx'),
+        ),
+    ]
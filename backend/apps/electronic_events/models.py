@@ -11,6 +11,14 @@ class ReceivedInvoice(models.Model):
     # Datos del Emisor (Proveedor)
     issuer_nit = models.CharField(max_length=20, verbose_name="NIT Proveedor")
     issuer_name = models.CharField(max_length=200, verbose_name="Razón Social Proveedor")
+    third_party = models.ForeignKey(
+        'accounting.ThirdParty',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='received_invoices',
+        verbose_name="Tercero (Proveedor)"
+    )
     
     # Datos de la Factura
     invoice_number = models.CharField(max_length=50, verbose_name="Número de Factura")
@@ -20,6 +28,9 @@ class ReceivedInvoice(models.Model):
     subtotal_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0, verbose_name="Subtotal (Sin Impuestos)")
     tax_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0, verbose_name="Total Impuestos")
     total_amount = models.DecimalField(max_digits=18, decimal_places=2, verbose_name="Total Factura")
+    # Saldo del subledger de cuentas por pagar: lo mantienen los egresos al
+    # contabilizarse o anularse (ver apps.treasury.services.payables_service)
+    outstanding_amount = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True, verbose_name="Saldo Pendiente")
     
     # Archivo original
     xml_file = models.FileField(upload_to='inbox/xml/', verbose_name="XML Original")
@@ -30,6 +41,20 @@ class ReceivedInvoice(models.Model):
     class Meta:
         verbose_name = "Factura Recibida"
         verbose_name_plural = "Facturas Recibidas"
+        indexes = [
+            models.Index(fields=['client', '-issue_date', '-id'], name='recv_inv_client_date_idx'),
+            # Partidas abiertas: solo facturas con saldo (cartera por edades de proveedores)
+            models.Index(
+                fields=['client', 'issuer_nit', 'issue_date'],
+                condition=models.Q(outstanding_amount__gt=0),
+                name='recv_inv_open_items_idx',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.outstanding_amount is None:
+            self.outstanding_amount = self.total_amount
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.invoice_number} - {self.issuer_name}"
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from apps.common.mixins import DynamicFieldsMixin
 from .models import ReceivedInvoice, InvoiceEvent
 
 class InvoiceEventSerializer(serializers.ModelSerializer):
@@ -6,9 +7,10 @@ class InvoiceEventSerializer(serializers.ModelSerializer):
         model = InvoiceEvent
         fields = '__all__'
 
-class ReceivedInvoiceSerializer(serializers.ModelSerializer):
+class ReceivedInvoiceSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     events = InvoiceEventSerializer(many=True, read_only=True)
     
     class Meta:
         model = ReceivedInvoice
         fields = '__all__'
+        read_only_fields = ['outstanding_amount']
@@ -9,7 +9,8 @@ from django.core.files.base import ContentFile
 from email.header import decode_header
 from django.conf import settings
 from apps.tenants.models import Client
-from apps.support_docs.models import Supplier
+from apps.accounting.services.third_party_service import get_or_create_third_party
+from apps.common.utils import normalize_nit
 from .invoice_parser import InvoiceParser
 from ..models import ReceivedInvoice
 
@@ -34,9 +35,8 @@ class EmailReceptionService:
             logger.error(error_msg)
             raise ValueError(error_msg)
 
-        # Limpieza del NIT (Ej: 900123456-1 -> 900123456)
-        # Quitamos DV y espacios, puntos si los hubiera
-        clean_nit = receiver_nit.split('-')[0].strip().replace('.', '').replace(' ', '')
+        # Limpieza del NIT (Ej: 900.123.456-1 -> 900123456)
+        clean_nit = normalize_nit(receiver_nit)
         
         # Búsqueda de la Empresa (Tenant)
         try:
@@ -48,30 +48,24 @@ class EmailReceptionService:
             # Lanzamos error para que quede en el log de resultados y no se guarde basura
             raise ValueError(error_msg)
 
-        # 3. Autocrear o Actualizar Proveedor
-        # Intentamos buscarlo por NIT
+        # 3. Autocrear Proveedor (búsqueda por NIT canónico del tenant)
+        supplier = None
         if data.get('issuer_nit'):
-             # Limpieza básica de NIT (quitar DV si viene separado, pero aqui asumimos raw)
-             nit = data['issuer_nit']
-             
-             # Buscar o crear
-             supplier, created_supp = Supplier.objects.get_or_create(
-                 identification_number=nit,
-                 defaults={
-                     'identification_type': '31', # Asumimos NIT
-                     'business_name': data.get('issuer_name') or 'PROVEEDOR DESCONOCIDO',
-                     'party_type': 'PROVEEDOR',
-                     'person_type': 1, # Jurídica por defecto, 
-                     'email': data.get('issuer_email') or '',
-                     'phone': data.get('issuer_phone') or '',
-                     'address': data.get('issuer_address') or '',
-                     # Campos del modelo ThirdParty (Cuidado con nombres incorrectos)
-                     'city_code': data.get('issuer_city_code') or '00000',
-                     'department_code': data.get('issuer_department_code') or '00',
-                     'postal_code': data.get('issuer_postal_code') or '000000',
-                 }
-             )
-             # Si ya existía, podríamos actualizar datos si vienen vacios... por ahora dejamos asi.
+            supplier, created_supp = get_or_create_third_party(
+                client.id,
+                data['issuer_nit'],
+                defaults={
+                    'business_name': data.get('issuer_name') or 'PROVEEDOR DESCONOCIDO',
+                    'party_type': 'PROVEEDOR',
+                    'person_type': 1, # Jurídica por defecto
+                    'email': data.get('issuer_email') or '',
+                    'phone': data.get('issuer_phone') or '',
+                    'address': data.get('issuer_address') or '',
+                    'city_code': data.get('issuer_city_code') or '00000',
+                    'department_code': data.get('issuer_department_code') or '00',
+                    'postal_code': data.get('issuer_postal_code') or '000000',
+                }
+            )
 
         # Guardar en BD
         # Primero intentamos obtenerla por CUFE para no duplicar
@@ -81,6 +75,7 @@ class EmailReceptionService:
                 'client': client, # Asignado dinámicamente
                 'issuer_nit': data['issuer_nit'],
                 'issuer_name': data['issuer_name'],
+                'third_party': supplier,
                 'invoice_number': data['invoice_number'],
                 'issue_date': data['issue_date'],
                 'total_amount': data['total_amount'] if data['total_amount'] else 0,
@@ -6,6 +6,7 @@ from .models import ReceivedInvoice
 from apps.accounting.models import AccountingTemplate, JournalEntry
 from apps.accounting.services.accounting_engine import AccountingEngine
 from apps.support_docs.models import Supplier
+from apps.common.utils import canonical_identification, identification_hash
 
 logger = logging.getLogger(__name__)
 
@@ -21,8 +22,10 @@ def auto_generate_accounting_entry(sender, instance, created, **kwargs):
     logger.info(f"⚡ Iniciando causación automática para Factura {instance.invoice_number}")
 
     # 1. Buscar el Tercero (Proveedor)
-    # El email_service ya debió haberlo creado, pero validamos.
-    supplier = Supplier.objects.filter(identification_number=instance.issuer_nit).first()
+    # El email_service ya debió haberlo creado y asociado; si no, se busca por NIT canónico.
+    supplier = instance.third_party or Supplier.objects.filter(
+        identification_number_hash=identification_hash(canonical_identification(instance.issuer_nit))
+    ).first()
     
     if not supplier:
         logger.warning(f"⚠️ No se encontró proveedor con NIT {instance.issuer_nit} para la factura {instance.invoice_number}. Causación abortada.")
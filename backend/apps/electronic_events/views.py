@@ -6,6 +6,7 @@ from rest_framework.parsers import MultiPartParser
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 import pytz
 import base64
 import zipfile
@@ -14,22 +15,47 @@ import requests
 import logging
 
 from apps.accounting.services.accounting_engine import AccountingEngine
-from apps.accounting.models import AccountingTemplate, ThirdParty
+from apps.accounting.models import AccountingTemplate
+from apps.accounting.services.third_party_service import get_or_create_third_party
 from .services.invoice_parser import InvoiceParser
 from .services.email_service import EmailReceptionService
 from .services.event_builder import ApplicationResponseBuilder
 from .utils import generate_cude_sha384
 from .models import ReceivedInvoice, InvoiceEvent
 from .serializers import ReceivedInvoiceSerializer
+from apps.common.mixins import QueryPlanMixin
+from apps.common.pagination import KeysetPagination
+from apps.tenants.utils import get_current_client_id
+from apps.treasury.services.payables_service import payables_aging
 
 # Logger
 logger = logging.getLogger(__name__)
 
-class ReceivedInvoiceViewSet(viewsets.ModelViewSet):
+class ReceivedInvoiceViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     serializer_class = ReceivedInvoiceSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-issue_date', '-id')
+    prefetch_related_plan = {'events': ['events']}
+    values_fields = {
+        'id': 'id', 'cufe': 'cufe', 'invoice_number': 'invoice_number',
+        'issuer_nit': 'issuer_nit', 'issuer_name': 'issuer_name', 'issue_date': 'issue_date',
+        'subtotal_amount': 'subtotal_amount', 'tax_amount': 'tax_amount',
+        'total_amount': 'total_amount', 'outstanding_amount': 'outstanding_amount', 'created_at': 'created_at',
+    }
 
     def get_queryset(self):
-        return ReceivedInvoice.objects.all().order_by('-issue_date', '-created_at')
+        return ReceivedInvoice.objects.all().order_by('-issue_date', '-id')
+
+    @action(detail=False, methods=['get'])
+    def aging(self, request):
+        """
+        Cartera por edades de proveedores sobre las partidas abiertas.
+        Parámetros: as_of (YYYY-MM-DD), issuer_nit.
+        """
+        as_of = parse_date(request.query_params.get('as_of') or '')
+        return Response(payables_aging(
+            int(get_current_client_id()), as_of, issuer_nit=request.query_params.get('issuer_nit'),
+        ))
 
     @action(detail=True, methods=['post'])
     def post_to_accounting(self, request, pk=None):
@@ -47,22 +73,21 @@ class ReceivedInvoiceViewSet(viewsets.ModelViewSet):
         template = get_object_or_404(AccountingTemplate, pk=template_id)
 
         # 2. Obtener/Crear Tercero (Proveedor)
-        # El motor contable requiere un objeto ThirdParty.
-        # Buscamos por NIT. Si no existe, lo creamos básico.
-        nit_raw = invoice.issuer_nit.replace('-', '').replace('.', '')[:15]
-        
-        third_party, created = ThirdParty.objects.get_or_create(
-            identification_number=nit_raw,
-            defaults={
-                'identification_type': '31', # Asumimos NIT
-                'party_type': 'PROVEEDOR',
-                'person_type': 1, # Asumimos Jurídica por defecto al importar XML
-                'business_name': invoice.issuer_name,
-                'check_digit': invoice.issuer_nit.split('-')[1] if '-' in invoice.issuer_nit else '0',
-                'is_supplier': True,
-                'is_active': True
-            }
-        )
+        # El motor contable requiere un objeto ThirdParty; se busca por NIT canónico.
+        third_party = invoice.third_party
+        if third_party is None:
+            third_party, created = get_or_create_third_party(
+                invoice.client_id,
+                invoice.issuer_nit,
+                defaults={
+                    'party_type': 'PROVEEDOR',
+                    'person_type': 1, # Asumimos Jurídica por defecto al importar XML
+                    'business_name': invoice.issuer_name,
+                    'is_active': True
+                }
+            )
+            invoice.third_party = third_party
+            invoice.save(update_fields=['third_party'])
 
         try:
             # 3. Llamar al Motor Contable
@@ -140,11 +165,15 @@ class UploadInvoiceView(APIView):
             return Response({"error": f"Error interno: {str(e)}"}, status=500)
 
 class ListInvoicesView(APIView):
+    keyset_ordering = ('-issue_date', '-id')
+
     def get(self, request):
         # Ordenar por fecha de emisión descendente (más recientes primero)
-        invoices = ReceivedInvoice.objects.all().order_by('-issue_date', '-created_at')
-        serializer = ReceivedInvoiceSerializer(invoices, many=True)
-        return Response(serializer.data)
+        invoices = ReceivedInvoice.objects.prefetch_related('events')
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(invoices, request, view=self)
+        serializer = ReceivedInvoiceSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 class SendEventView(APIView):
     """
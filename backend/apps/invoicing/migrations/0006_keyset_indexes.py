@@ -0,0 +1,70 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0010_keyset_indexes'),
+        ('tenants', '0001_initial'),
+        ('invoicing', '0005_tenant_refactor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='cufe',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='CUFE'),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='dian_response',
+            field=models.JSONField(blank=True, null=True, verbose_name='Respuesta DIAN'),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='xml_file',
+            field=models.FileField(blank=True, null=True, upload_to='invoices/xml/', verbose_name='XML Firmado'),
+        ),
+        migrations.AddField(
+            model_name='invoiceline',
+            name='cost_center',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounting.costcenter', verbose_name='Centro de Costo'),
+        ),
+        migrations.AddField(
+            model_name='supportdocumentdetail',
+            name='cost_center',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounting.costcenter', verbose_name='Centro de Costo'),
+        ),
+        migrations.AlterField(
+            model_name='dianresolution',
+            name='client',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invoicing_dian_resolutions', to='tenants.client', verbose_name='Cliente'),
+        ),
+        migrations.AlterField(
+            model_name='documentsequence',
+            name='client',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_sequences', to='tenants.client', verbose_name='Cliente'),
+        ),
+        migrations.AlterField(
+            model_name='electronicbillingconfig',
+            name='client',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='electronic_billing_config', to='tenants.client', verbose_name='Cliente'),
+        ),
+        migrations.AlterField(
+            model_name='invoice',
+            name='status',
+            field=models.CharField(choices=[('DRAFT', 'Borrador'), ('POSTED', 'Guardada / Por Emitir'), ('SENT', 'Enviada a DIAN'), ('ACCEPTED', 'Aceptada por DIAN'), ('REJECTED', 'Rechazada por DIAN'), ('VOID', 'Anulada')], default='DRAFT', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='supportdocument',
+            name='client',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invoicing_support_documents', to='tenants.client'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['client', '-issue_date', '-id'], name='inv_invoice_client_date_idx'),
+        ),
+    ]
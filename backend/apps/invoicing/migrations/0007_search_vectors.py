@@ -0,0 +1,30 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:08
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+from apps.common.search import search_trigger_sql, trigram_index_sql, run_on_postgres
+
+ITEM_SEARCH = search_trigger_sql('invoicing_item', [
+    ('A', ['code']),
+    ('B', ['description']),
+])
+# Columnas de SearchFilter (icontains) en ItemViewSet
+ITEM_TRGM = trigram_index_sql('invoicing_item', ['code', 'description'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoicing', '0006_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(run_on_postgres(ITEM_SEARCH[0]), run_on_postgres(ITEM_SEARCH[1])),
+        migrations.RunPython(run_on_postgres(ITEM_TRGM[0]), run_on_postgres(ITEM_TRGM[1])),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:32
+
+from django.db import migrations, models
+
+
+def backfill_open_balance(apps, schema_editor):
+    # Aún no existen recibos de caja: el saldo de lo contabilizado es el total
+    Invoice = apps.get_model('invoicing', 'Invoice')
+    Invoice.objects.filter(status__in=['POSTED', 'SENT', 'ACCEPTED']).update(open_balance=models.F('total'))
+    Invoice.objects.filter(status='VOID').update(open_balance=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoicing', '0007_search_vectors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='open_balance',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True, verbose_name='Saldo por Cobrar'),
+        ),
+        migrations.RunPython(backfill_open_balance, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(condition=models.Q(('open_balance__gt', 0)), fields=['client', 'customer', 'payment_due_date'], name='inv_invoice_open_items_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models, transaction
+from django.contrib.postgres.search import SearchVectorField
 from decimal import Decimal
 from fernet_fields import EncryptedCharField
 from apps.tenants.models import Client
@@ -6,6 +7,7 @@ from apps.accounting.models import ThirdParty, CostCenter
 from django.utils.translation import gettext_lazy as _
 from datetime import date
 from apps.common.managers import TenantAwareManager
+from apps.taxes.services import line_iva_rate
 
 # ==============================================================================
 #  MODELOS DE CONFIGURACIÓN FISCAL Y SEGURIDAD (DIAN)
@@ -315,6 +317,8 @@ class Item(models.Model):
     tax_type = models.CharField(max_length=20, choices=TAX_TYPE_CHOICES, default='IVA_19', verbose_name="Tipo Impuesto")
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Documento de búsqueda (tsvector); lo mantiene un trigger en PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
 
     objects = TenantAwareManager()
 
@@ -357,7 +361,12 @@ class Invoice(models.Model):
         ('REJECTED', 'Rechazada por DIAN'),
         ('VOID', 'Anulada'),
     ]
+    # Estados que generan cuenta por cobrar
+    RECEIVABLE_STATUSES = ('POSTED', 'SENT', 'ACCEPTED')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='DRAFT')
+    # Saldo por cobrar: nace con el total al contabilizar la factura y lo
+    # mueven los recibos de caja (ver apps.treasury.services.receivables_service)
+    open_balance = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, verbose_name="Saldo por Cobrar")
     
     # Campos DIAN
     cufe = models.CharField(max_length=255, null=True, blank=True, verbose_name="CUFE")
@@ -372,6 +381,26 @@ class Invoice(models.Model):
         verbose_name = "Factura de Venta"
         verbose_name_plural = "Facturas de Venta"
         unique_together = ('client', 'prefix', 'number')
+        indexes = [
+            models.Index(fields=['client', '-issue_date', '-id'], name='inv_invoice_client_date_idx'),
+            # Partidas abiertas de cartera por cliente y vencimiento
+            models.Index(
+                fields=['client', 'customer', 'payment_due_date'],
+                condition=models.Q(open_balance__gt=0),
+                name='inv_invoice_open_items_idx',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        balance = self.open_balance
+        if self.status in self.RECEIVABLE_STATUSES and self.open_balance is None:
+            self.open_balance = self.total
+        elif self.status == 'VOID':
+            self.open_balance = Decimal('0')
+        if update_fields is not None and self.open_balance != balance:
+            kwargs['update_fields'] = set(update_fields) | {'open_balance'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.prefix}{self.number} - {self.customer.business_name if self.customer.business_name else self.customer.first_name}"
@@ -402,7 +431,10 @@ class InvoiceLine(models.Model):
     def save(self, *args, **kwargs):
         self.quantity = Decimal(str(self.quantity))
         self.unit_price = Decimal(str(self.unit_price))
-        self.tax_rate = Decimal(str(self.tax_rate))
+        # La tarifa sale de las reglas de impuestos del tenant; sin reglas se usa la de la línea
+        concepts = (self.item.tax_type, self.item.type) if self.item else ()
+        rate = line_iva_rate(self.invoice.client_id, 'SALE', self.invoice.customer, concepts)
+        self.tax_rate = Decimal(str(self.tax_rate)) if rate is None else rate
         self.subtotal = self.quantity * self.unit_price
         self.tax_amount = self.subtotal * (self.tax_rate / Decimal(100))
         self.total = self.subtotal + self.tax_amount
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from apps.common.mixins import DynamicFieldsMixin
 from .models import DianResolution, Item, Invoice, InvoiceLine
 
 class DianResolutionSerializer(serializers.ModelSerializer):
@@ -17,7 +18,7 @@ class InvoiceLineSerializer(serializers.ModelSerializer):
         fields = ['id', 'item', 'description', 'quantity', 'unit_price', 'tax_rate', 'subtotal', 'tax_amount', 'total']
         read_only_fields = ['subtotal', 'tax_amount', 'total']
 
-class InvoiceSerializer(serializers.ModelSerializer):
+class InvoiceSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     lines = InvoiceLineSerializer(many=True)
     customer_name = serializers.CharField(source='customer.get_full_name', read_only=True)
     
@@ -25,8 +26,8 @@ class InvoiceSerializer(serializers.ModelSerializer):
         model = Invoice
         fields = ['id', 'resolution', 'prefix', 'number', 'customer', 'customer_name', 
                   'issue_date', 'payment_due_date', 'payment_term', 
-                  'subtotal', 'tax_total', 'total', 'status', 'notes', 'lines']
-        read_only_fields = ['prefix', 'number', 'subtotal', 'tax_total', 'total', 'status']
+                  'subtotal', 'tax_total', 'total', 'open_balance', 'status', 'notes', 'lines']
+        read_only_fields = ['prefix', 'number', 'subtotal', 'tax_total', 'total', 'open_balance', 'status']
 
     def create(self, validated_data):
         lines_data = validated_data.pop('lines')
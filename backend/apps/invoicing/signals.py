@@ -4,6 +4,7 @@ from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
 from .models import Invoice, SupportDocument
 from apps.accounting.models import JournalEntry, JournalEntryLine, Account, AccountingDocumentType
+from apps.taxes.services import line_iva_rate
 from decimal import Decimal
 
 @receiver(post_save, sender=Invoice)
@@ -214,6 +215,8 @@ def create_support_document_journal_entry(sender, instance, **kwargs):
 
     line_counter = 2
     total_tax_from_lines = Decimal('0.00')
+    # IVA según las reglas de impuestos del tenant; sin reglas se usa la tarifa de cada línea
+    rule_rate = line_iva_rate(instance.client_id, 'PURCHASE', instance.supplier, ())
 
     # DÉBITOS a Gastos/Costos (por cada línea del documento)
     for line in instance.items.all():
@@ -235,7 +238,8 @@ def create_support_document_journal_entry(sender, instance, **kwargs):
         line_counter += 1
         
         # Calcular impuesto por línea
-        tax_on_line = line.total_line * (line.tax_rate / Decimal(100))
+        tax_rate = line.tax_rate if rule_rate is None else rule_rate
+        tax_on_line = line.total_line * (tax_rate / Decimal(100))
         total_tax_from_lines += tax_on_line
 
     # DÉBITO a Impuestos por Pagar (IVA Descontable)
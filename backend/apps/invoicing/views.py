@@ -1,5 +1,12 @@
-from rest_framework import viewsets, filters 
+from django.utils.dateparse import parse_date
+from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from apps.tenants.utils import get_current_client_id
+from apps.treasury.services.receivables_service import customer_statement, receivables_aging
+from apps.common.mixins import QueryPlanMixin
+from apps.common.pagination import KeysetPagination
 from .models import DianResolution, Item, Invoice
 from .serializers import DianResolutionSerializer, ItemSerializer, InvoiceSerializer
 
@@ -21,11 +28,41 @@ class ItemViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Item.objects.all()
 
-class InvoiceViewSet(viewsets.ModelViewSet):
+class InvoiceViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     serializer_class = InvoiceSerializer
     permission_classes = [IsAuthenticated]
     filterset_fields = ['status', 'customer']
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-issue_date', '-id')
+    select_related_plan = {'customer_name': ['customer']}
+    prefetch_related_plan = {'lines': ['lines']}
+    values_fields = {
+        'id': 'id', 'prefix': 'prefix', 'number': 'number', 'customer': 'customer_id',
+        'issue_date': 'issue_date', 'payment_due_date': 'payment_due_date',
+        'subtotal': 'subtotal', 'tax_total': 'tax_total', 'total': 'total', 'status': 'status',
+        'open_balance': 'open_balance',
+    }
 
     def get_queryset(self):
         return Invoice.objects.all().order_by('-id')
 
+    @action(detail=False, methods=['get'])
+    def aging(self, request):
+        """Cartera por edades de clientes. Parámetros: as_of (YYYY-MM-DD), customer."""
+        as_of = parse_date(request.query_params.get('as_of') or '')
+        return Response(receivables_aging(
+            int(get_current_client_id()), as_of, customer_id=request.query_params.get('customer') or None,
+        ))
+
+    @action(detail=False, methods=['get'])
+    def statement(self, request):
+        """Estado de cuenta de un cliente. Parámetros: customer (requerido), date_from, date_to."""
+        customer_id = request.query_params.get('customer')
+        if not customer_id:
+            return Response({'error': "Parámetro 'customer' requerido."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(customer_statement(
+            int(get_current_client_id()), int(customer_id),
+            date_from=parse_date(request.query_params.get('date_from') or ''),
+            date_to=parse_date(request.query_params.get('date_to') or ''),
+        ))
+
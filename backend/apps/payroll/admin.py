@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import LegalParameter, NoveltyType, EmployeeNovelty, Employee, PayrollPeriod, PayrollDocument, PayrollDetail
+from .models import (
+    LegalParameter, NoveltyType, EmployeeNovelty, Employee, PayrollPeriod, PayrollDocument, PayrollDetail, PayrollProvision,
+    PayrollAccountMapping, PayrollRetroChange, PayrollTransmission, PayrollTransmissionItem,
+    PayrollWithholding,
+)
 
 @admin.register(LegalParameter)
 class LegalParameterAdmin(admin.ModelAdmin):
@@ -9,13 +13,13 @@ class LegalParameterAdmin(admin.ModelAdmin):
 
 @admin.register(NoveltyType)
 class NoveltyTypeAdmin(admin.ModelAdmin):
-    list_display = ('code', 'name', 'dian_type', 'payroll_payment_percentage')
+    list_display = ('code', 'name', 'dian_type', 'unit', 'payroll_payment_percentage')
     list_filter = ('dian_type',)
     search_fields = ('code', 'name')
 
 @admin.register(EmployeeNovelty)
 class EmployeeNoveltyAdmin(admin.ModelAdmin):
-    list_display = ('employee', 'novelty_type', 'start_date', 'days', 'total_value')
+    list_display = ('employee', 'novelty_type', 'start_date', 'days', 'hours', 'total_value')
     list_filter = ('novelty_type', 'start_date')
     search_fields = ('employee__code', 'employee__third_party__name')
 
@@ -35,3 +39,45 @@ class PayrollConceptAdmin(admin.ModelAdmin):
     list_display = ('code', 'name', 'concept_type', 'percentage', 'dian_code')
     list_filter = ('concept_type',)
     search_fields = ('code', 'name')
+
+@admin.register(PayrollProvision)
+class PayrollProvisionAdmin(admin.ModelAdmin):
+    list_display = ('period', 'employee', 'days', 'severance', 'severance_interest', 'service_bonus', 'vacation')
+    list_filter = ('period',)
+    search_fields = ('employee__code',)
+
+
+@admin.register(PayrollAccountMapping)
+class PayrollAccountMappingAdmin(admin.ModelAdmin):
+    list_display = ('client', 'concept', 'debit_account', 'credit_account')
+    list_filter = ('client',)
+
+
+class PayrollTransmissionItemInline(admin.TabularInline):
+    model = PayrollTransmissionItem
+    fields = ('document', 'result', 'status_code', 'build_ms', 'sign_ms', 'send_ms', 'error')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
+@admin.register(PayrollTransmission)
+class PayrollTransmissionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'client', 'period', 'status', 'document_count', 'accepted_count', 'rejected_count',
+                    'failed_count', 'created_at')
+    list_filter = ('status', 'client')
+    readonly_fields = ('metrics', 'error', 'finished_at')
+    inlines = [PayrollTransmissionItemInline]
+
+
+@admin.register(PayrollRetroChange)
+class PayrollRetroChangeAdmin(admin.ModelAdmin):
+    list_display = ('period', 'employee', 'reason', 'created_at')
+    list_filter = ('period',)
+
+
+@admin.register(PayrollWithholding)
+class PayrollWithholdingAdmin(admin.ModelAdmin):
+    list_display = ('document', 'procedure', 'labor_income', 'allowed_total', 'taxable_base', 'withholding')
+    list_filter = ('procedure',)
+    raw_id_fields = ('document',)
@@ -5,3 +5,6 @@ class PayrollConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.payroll'
     verbose_name = 'Nómina y RRHH'
+
+    def ready(self):
+        import apps.payroll.signals
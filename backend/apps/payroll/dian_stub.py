@@ -0,0 +1,116 @@
+"""
+Stub local del servicio web de la DIAN para nómina electrónica.
+
+Atiende SendNominaSync y SendTestSetAsync: descomprime el ZIP, verifica que
+el XML traiga firma y recalcula el CUNE con el PIN del software. Si coincide
+responde IsValid=true (o un ZipKey en habilitación); si no, rechaza con el
+código 99 como lo haría la DIAN. Sirve para probar la transmisión completa
+sin salir de la máquina (`manage.py payroll_dian_stub`).
+"""
+import base64
+import io
+import time
+import uuid
+import zipfile
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from lxml import etree
+
+from .electronic_payroll import compute_cune
+
+DS_NS = 'http://www.w3.org/2000/09/xmldsig#'
+
+
+def _find(root, name):
+    nodes = root.xpath(f'//*[local-name()="{name}"]')
+    return nodes[0] if nodes else None
+
+
+def validate_payroll_xml(xml_bytes, software_pin):
+    """
+    Returns:
+        (es_válido, código, mensaje)
+    """
+    root = etree.fromstring(xml_bytes)
+    if root.find(f'.//{{{DS_NS}}}Signature') is None:
+        return False, '99', 'Documento sin firma digital.'
+
+    general = _find(root, 'InformacionGeneral')
+    sequence = _find(root, 'NumeroSecuenciaXML')
+    employer = _find(root, 'Empleador')
+    if general is None or sequence is None or employer is None:
+        return False, '99', 'Estructura del documento incompleta.'
+
+    worker = _find(root, 'Trabajador')
+    if worker is not None:
+        totals = [_find(root, name).text for name in ('DevengadosTotal', 'DeduccionesTotal', 'ComprobanteTotal')]
+        employee_document = worker.get('NumeroDocumento')
+    else:
+        # Nota de ajuste de eliminación
+        totals, employee_document = ['0', '0', '0'], '0'
+
+    issued = datetime.strptime(f"{general.get('FechaGen')} {general.get('HoraGen')[:8]}", '%Y-%m-%d %H:%M:%S')
+    expected = compute_cune(
+        sequence.get('Numero'), issued, *totals,
+        employer.get('NIT'), employee_document, general.get('TipoXML'), software_pin, general.get('Ambiente'),
+    )
+    if expected != general.get('CUNE'):
+        return False, '99', f"Regla: NIE024, Rechazo: CUNE no corresponde ({sequence.get('Numero')})."
+    return True, '00', 'Procesado Correctamente.'
+
+
+class DianStubHandler(BaseHTTPRequestHandler):
+    software_pin = ''
+    latency = 0.0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.latency:
+            time.sleep(self.latency)
+        try:
+            envelope = etree.fromstring(body)
+            action = _find(envelope, 'Body')[0]
+            archive = zipfile.ZipFile(io.BytesIO(base64.b64decode(_find(envelope, 'contentFile').text)))
+            xml_bytes = archive.read(archive.namelist()[0])
+            is_valid, code, message = validate_payroll_xml(xml_bytes, self.software_pin)
+        except Exception as e:
+            self._reply(500, f"<error>{e}</error>")
+            return
+
+        name = etree.QName(action).localname
+        if name == 'SendTestSetAsync' and is_valid:
+            result = f"<b:ZipKey>{uuid.uuid4()}</b:ZipKey>"
+        else:
+            errors = '' if is_valid else f"<c:string>{message}</c:string>"
+            result = (
+                f"<b:ErrorMessage>{errors}</b:ErrorMessage><b:IsValid>{str(is_valid).lower()}</b:IsValid>"
+                f"<b:StatusCode>{code}</b:StatusCode>"
+                f"<b:StatusDescription>{message if is_valid else 'Documento con errores en campos mandatorios.'}"
+                f"</b:StatusDescription>"
+            )
+        self._reply(200, (
+            '<s:Envelope xmlns:s="http://www.w3.org/2003/05/soap-envelope"><s:Body>'
+            f'<{name}Response xmlns="http://wcf.dian.colombia"><{name}Result '
+            'xmlns:b="http://schemas.datacontract.org/2004/07/DianResponse" '
+            'xmlns:c="http://schemas.microsoft.com/2003/10/Serialization/Arrays">'
+            f'{result}</{name}Result></{name}Response></s:Body></s:Envelope>'
+        ))
+
+    def _reply(self, status, payload):
+        data = payload.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/soap+xml; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host='127.0.0.1', port=0, software_pin='', latency=0.0):
+    """Servidor multihilo listo para `serve_forever()`; port=0 toma uno libre."""
+    handler = type('ConfiguredDianStubHandler', (DianStubHandler,),
+                   {'software_pin': software_pin, 'latency': latency})
+    return ThreadingHTTPServer((host, port), handler)
@@ -0,0 +1,312 @@
+"""
+XML de Nómina Electrónica (Resolución DIAN 000013 de 2021).
+
+ElectronicPayrollBuilder arma NominaIndividual (TipoXML 102) y
+NominaIndividualDeAjuste (103, reemplazar o eliminar) a partir de un
+PayrollDocument y sus detalles, y calcula el CUNE. El XML sale sin firmar:
+la firma (XAdES) la agrega DianXadesSigner en ext:UBLExtensions.
+"""
+import hashlib
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+from lxml import etree
+from lxml.builder import ElementMaker
+
+from .utils import calculate_commercial_days
+
+ROOT_NAMESPACES = {
+    '102': 'dian:gov:co:facturaelectronica:NominaIndividual',
+    '103': 'dian:gov:co:facturaelectronica:NominaIndividualDeAjuste',
+}
+EXT_NS = 'urn:oasis:names:specification:ubl:schema:xsd:CommonExtensionComponents-2'
+XML_VERSION = 'V1.0: Documento Soporte de Pago de Nómina Electrónica'
+QR_URLS = {
+    '1': 'https://catalogo-vpfe.dian.gov.co/document/searchqr?documentkey={}',
+    '2': 'https://catalogo-vpfe-hab.dian.gov.co/document/searchqr?documentkey={}',
+}
+
+CONTRACT_TYPES = {'FIJO': '1', 'INDEFINIDO': '2', 'OBRA': '3', 'APRENDIZAJE': '4'}
+# Porcentajes de ley de horas extras y recargos (tabla 5.5.7 del anexo técnico)
+HOUR_PERCENTAGES = {
+    'HED': '25.00', 'HEN': '75.00', 'HRN': '35.00', 'HEDDF': '100.00',
+    'HRDDF': '75.00', 'HENDF': '150.00', 'HRNDF': '110.00',
+}
+DEDUCTION_PERCENTAGES = {'SALUD': '4.00', 'PENSION': '4.00', 'FSP': '1.00', 'FSP_SUBSISTENCIA': '1.00'}
+
+# Código DIAN del detalle -> (contenedor, elemento), en el orden que exige el esquema
+EARNING_ELEMENTS = {
+    'BASICO': (None, 'Basico'),
+    'AUX_TRANSPORTE': (None, 'Transporte'),
+    **{code: (f'{code}s', code) for code in HOUR_PERCENTAGES},
+    'VAC': ('Vacaciones', 'VacacionesComunes'),
+    'VACACIONES_COMUNES': ('Vacaciones', 'VacacionesComunes'),
+    'VACACIONES_COMPENSADAS': ('Vacaciones', 'VacacionesCompensadas'),
+    'IGE': ('Incapacidades', 'Incapacidad'),
+    'INCAPACIDAD': ('Incapacidades', 'Incapacidad'),
+    'IRL': ('Incapacidades', 'Incapacidad'),
+    'LMA': ('Licencias', 'LicenciaMP'),
+    'LICENCIA_MP': ('Licencias', 'LicenciaMP'),
+    'LICENCIA_R': ('Licencias', 'LicenciaR'),
+    'LNR': ('Licencias', 'LicenciaNR'),
+    'BONIFICACION_S': ('Bonificaciones', 'Bonificacion'),
+    'BONIFICACION_NS': ('Bonificaciones', 'Bonificacion'),
+    'AUX_CONECTIVIDAD': ('Auxilios', 'Auxilio'),
+    'COMISION': ('Comisiones', 'Comision'),
+}
+DEDUCTION_ELEMENTS = {
+    'SALUD': (None, 'Salud'),
+    'PENSION': (None, 'FondoPension'),
+    'FSP': (None, 'FondoSP'),
+    'FSP_SUBSISTENCIA': (None, 'FondoSP'),
+    'SINDICATO': ('Sindicatos', 'Sindicato'),
+    'SANCION': ('Sanciones', 'Sancion'),
+    'LIBRANZA': ('Libranzas', 'Libranza'),
+    'RETENCION_FUENTE': (None, 'RetencionFuente'),
+}
+
+
+def money(value):
+    return f"{Decimal(value or 0):.2f}"
+
+
+def compute_cune(number, issued_at, accrued, deductions, net, employer_nit, employee_document, xml_type,
+                 software_pin, environment):
+    """
+    CUNE = SHA-384(NumNE + FecNE + HorNE + ValDev + ValDed + ValTolNE +
+                   NitNE + DocEmp + TipoXML + Software-Pin + TipAmb)
+    """
+    raw = (
+        f"{number}{issued_at:%Y-%m-%d}{issued_at:%H:%M:%S}-05:00"
+        f"{money(accrued)}{money(deductions)}{money(net)}"
+        f"{employer_nit}{employee_document}{xml_type}{software_pin}{environment}"
+    )
+    return hashlib.sha384(raw.encode('utf-8')).hexdigest()
+
+
+def split_nit(nit):
+    """'900123456-7' -> ('900123456', '7')."""
+    number, _, dv = (nit or '').partition('-')
+    return number.strip(), dv.strip()
+
+
+class ElectronicPayrollBuilder:
+    """
+    Construye el XML de nómina electrónica de los documentos de un emisor.
+    Una instancia sirve para todo el lote: la configuración se resuelve una vez.
+    """
+
+    def __init__(self, client, software_pin=None, environment=None):
+        dian = settings.DIAN_CONFIG
+        self.client = client
+        self.software_id = client.dian_software_id or dian['SOFTWARE_ID']
+        self.software_pin = dian['SOFTWARE_PIN'] if software_pin is None else software_pin
+        self.environment = environment or ('2' if dian['TEST_MODE'] else '1')
+        self.nit, self.dv = split_nit(client.nit)
+        self.department = settings.CALI_CONFIG['DEPARTMENT_CODE']
+        self.municipality = settings.CALI_CONFIG['MUNICIPALITY_CODE']
+
+    # ------------------------------------------------------------------
+    # Numeración y CUNE
+    # ------------------------------------------------------------------
+    @staticmethod
+    def number(document):
+        return f"{document.prefix}{document.conseccutive}"
+
+    def is_deletion(self, document):
+        return document.document_type == '103' and document.adjustment_type == '2'
+
+    def cune(self, document):
+        if self.is_deletion(document):
+            # Eliminar: valores en cero y documento del empleado en 0
+            totals, employee_document = (0, 0, 0), '0'
+        else:
+            totals = (document.accrued_total, document.deductions_total, document.net_total)
+            employee_document = document.employee.third_party.identification_number
+        return compute_cune(
+            self.number(document), timezone.localtime(document.issued_at), *totals, self.nit, employee_document,
+            document.document_type, self.software_pin, self.environment,
+        )
+
+    # ------------------------------------------------------------------
+    # XML
+    # ------------------------------------------------------------------
+    def build(self, document, details=None):
+        """
+        Genera el XML sin firmar. Asigna `issued_at` (si falta) y `cune` al
+        documento en memoria; guardarlos es responsabilidad de quien llama.
+        """
+        if document.issued_at is None:
+            document.issued_at = timezone.now().replace(microsecond=0)
+        document.cune = self.cune(document)
+        if details is None:
+            details = list(document.details.all())
+
+        E = ElementMaker(namespace=ROOT_NAMESPACES[document.document_type],
+                         nsmap={None: ROOT_NAMESPACES[document.document_type], 'ext': EXT_NS})
+        EXT = ElementMaker(namespace=EXT_NS)
+        extensions = EXT.UBLExtensions(EXT.UBLExtension(EXT.ExtensionContent()))
+
+        if document.document_type == '102':
+            root = E.NominaIndividual(extensions, *self._content(E, document, details))
+        else:
+            predecessor = document.adjusted_document
+            reference = dict(
+                NumeroPred=self.number(predecessor), CUNEPred=predecessor.cune or '',
+                FechaGenPred=f"{timezone.localtime(predecessor.issued_at):%Y-%m-%d}" if predecessor.issued_at else '',
+            )
+            if self.is_deletion(document):
+                body = E.Eliminar(E.EliminandoPredecesor(**reference), *self._header(E, document)[1:],
+                                  self._employer(E))
+            else:
+                body = E.Reemplazar(E.ReemplazandoPredecesor(**reference), *self._content(E, document, details))
+            root = E.NominaIndividualDeAjuste(extensions, E.TipoNota(document.adjustment_type), body)
+
+        return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+    def _header(self, E, document):
+        """Periodo, numeración, lugar, proveedor, QR e información general."""
+        period = document.period
+        employee = document.employee
+        issued = timezone.localtime(document.issued_at)
+        number = self.number(document)
+
+        period_dates = dict(
+            FechaIngreso=f"{employee.start_date:%Y-%m-%d}",
+            FechaLiquidacionInicio=f"{period.start_date:%Y-%m-%d}",
+            FechaLiquidacionFin=f"{period.end_date:%Y-%m-%d}",
+            TiempoLaborado=str(calculate_commercial_days(employee.start_date, period.end_date)),
+            FechaGen=f"{issued:%Y-%m-%d}",
+        )
+        if employee.end_date:
+            period_dates['FechaRetiro'] = f"{employee.end_date:%Y-%m-%d}"
+        software_sc = hashlib.sha384(f"{self.software_id}{self.software_pin}{number}".encode('utf-8')).hexdigest()
+        # Quincenal (4) si el periodo no pasa de 16 días, mensual (5) en otro caso
+        payroll_period = '4' if (period.end_date - period.start_date).days < 16 else '5'
+
+        return [
+            E.Periodo(**period_dates),
+            E.NumeroSecuenciaXML(CodigoTrabajador=employee.code, Prefijo=document.prefix,
+                                 Consecutivo=str(document.conseccutive), Numero=number),
+            E.LugarGeneracionXML(Pais='CO', DepartamentoEstado=self.department, MunicipioCiudad=self.municipality,
+                                 Idioma='es'),
+            E.ProveedorXML(RazonSocial=self.client.legal_name, NIT=self.nit, DV=self.dv,
+                           SoftwareID=self.software_id, SoftwareSC=software_sc),
+            E.CodigoQR(QR_URLS[self.environment].format(document.cune)),
+            E.InformacionGeneral(
+                Version=XML_VERSION, Ambiente=self.environment, TipoXML=document.document_type, CUNE=document.cune,
+                EncripCUNE='CUNE-SHA384', FechaGen=f"{issued:%Y-%m-%d}", HoraGen=f"{issued:%H:%M:%S}-05:00",
+                PeriodoNomina=payroll_period, TipoMoneda='COP',
+            ),
+        ]
+
+    def _employer(self, E):
+        return E.Empleador(RazonSocial=self.client.legal_name, NIT=self.nit, DV=self.dv, Pais='CO',
+                           DepartamentoEstado=self.department, MunicipioCiudad=self.municipality,
+                           Direccion=self.client.address)
+
+    def _content(self, E, document, details):
+        employee = document.employee
+        person = employee.third_party
+        worker = dict(
+            TipoTrabajador='01', SubTipoTrabajador='00', AltoRiesgoPension='false',
+            TipoDocumento=person.identification_type, NumeroDocumento=person.identification_number,
+            PrimerApellido=person.surname or '', SegundoApellido=person.second_surname or '',
+            PrimerNombre=person.first_name or '', LugarTrabajoPais='CO',
+            LugarTrabajoDepartamentoEstado=self.department, LugarTrabajoMunicipioCiudad=self.municipality,
+            LugarTrabajoDireccion=self.client.address, SalarioIntegral='false',
+            TipoContrato=CONTRACT_TYPES.get(employee.contract_type, '2'), Sueldo=money(employee.base_salary),
+            CodigoTrabajador=employee.code,
+        )
+        if person.middle_name:
+            worker['OtrosNombres'] = person.middle_name
+
+        return [
+            *self._header(E, document),
+            self._employer(E),
+            E.Trabajador(**worker),
+            # Contado, transferencia bancaria
+            E.Pago(Forma='1', Metodo='42'),
+            E.FechasPagos(E.FechaPago(f"{document.period.payment_date:%Y-%m-%d}")),
+            self._earnings(E, [d for d in details if d.concept_type == 'EARNING']),
+            self._deductions(E, [d for d in details if d.concept_type == 'DEDUCTION']),
+            E.DevengadosTotal(money(document.accrued_total)),
+            E.DeduccionesTotal(money(document.deductions_total)),
+            E.ComprobanteTotal(money(document.net_total)),
+        ]
+
+    @staticmethod
+    def _group(E, parent, layout, details, attributes, other):
+        """Agrupa los detalles en sus contenedores respetando el orden del esquema."""
+        order = {code: position for position, code in enumerate(layout)}
+        containers = {}
+        for detail in sorted(details, key=lambda d: order.get(d.dian_code, len(order))):
+            container, element = layout.get(detail.dian_code, (None, None))
+            if element is None:
+                other(detail)
+                continue
+            node = E(element, **attributes(element, detail))
+            if element in ('Comision', 'RetencionFuente'):
+                node.text = money(detail.value)
+            if container is None:
+                parent.append(node)
+            else:
+                if container not in containers:
+                    containers[container] = E(container)
+                    parent.append(containers[container])
+                containers[container].append(node)
+        return parent
+
+    def _earnings(self, E, details):
+        def attributes(element, detail):
+            quantity = f"{Decimal(detail.quantity or 0).normalize():f}"
+            if element == 'Basico':
+                return {'DiasTrabajados': str(int(detail.quantity or 0)), 'SueldoTrabajado': money(detail.value)}
+            if element == 'Transporte':
+                return {'AuxilioTransporte': money(detail.value)}
+            if element in HOUR_PERCENTAGES:
+                return {'Cantidad': quantity, 'Porcentaje': HOUR_PERCENTAGES[element], 'Pago': money(detail.value)}
+            if element == 'Incapacidad':
+                # 1 común, 2 profesional, 3 laboral
+                return {'Cantidad': quantity, 'Tipo': '3' if detail.dian_code == 'IRL' else '1', 'Pago': money(detail.value)}
+            if element == 'LicenciaNR':
+                return {'Cantidad': quantity}
+            if element == 'Bonificacion':
+                key = 'BonificacionNS' if detail.dian_code.endswith('_NS') else 'BonificacionS'
+                return {key: money(detail.value)}
+            if element == 'Auxilio':
+                return {'AuxilioNS': money(detail.value)}
+            if element == 'Comision':
+                return {}
+            return {'Cantidad': quantity, 'Pago': money(detail.value)}
+
+        others = []
+        devengados = self._group(E, E.Devengados(), EARNING_ELEMENTS, details, attributes, others.append)
+        if others:
+            devengados.append(E.OtrosConceptos(*[
+                E.OtroConcepto(DescripcionConcepto=detail.description, ConceptoS=money(detail.value))
+                for detail in others
+            ]))
+        return devengados
+
+    def _deductions(self, E, details):
+        def attributes(element, detail):
+            if element in ('Salud', 'FondoPension', 'Sindicato'):
+                return {'Porcentaje': DEDUCTION_PERCENTAGES.get(detail.dian_code, money(detail.percentage)),
+                        'Deduccion': money(detail.value)}
+            if element == 'FondoSP':
+                if detail.dian_code == 'FSP_SUBSISTENCIA':
+                    return {'PorcentajeSub': DEDUCTION_PERCENTAGES['FSP_SUBSISTENCIA'], 'DeduccionSub': money(detail.value)}
+                return {'Porcentaje': DEDUCTION_PERCENTAGES['FSP'], 'DeduccionSP': money(detail.value)}
+            if element == 'Sancion':
+                return {'SancionPublic': '0.00', 'SancionPriv': money(detail.value)}
+            if element == 'Libranza':
+                return {'Descripcion': detail.description, 'Deduccion': money(detail.value)}
+            return {}
+
+        others = []
+        deducciones = self._group(E, E.Deducciones(), DEDUCTION_ELEMENTS, details, attributes, others.append)
+        if others:
+            deducciones.append(E.OtrasDeducciones(*[E.OtraDeduccion(money(detail.value)) for detail in others]))
+        return deducciones
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.payroll.dian_stub import make_server
+
+
+class Command(BaseCommand):
+    help = ('Levanta un stub local del servicio web DIAN de nómina electrónica. '
+            'Apunte DIAN_PAYROLL_WEBSERVICE_URL a http://<host>:<puerto>/ para transmitir contra él.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8089)
+        parser.add_argument('--pin', default=settings.DIAN_CONFIG['SOFTWARE_PIN'],
+                            help='PIN del software con el que se recalcula el CUNE')
+        parser.add_argument('--latency', type=float, default=0.0, help='Segundos de espera por documento')
+
+    def handle(self, *args, **options):
+        server = make_server(options['host'], options['port'], options['pin'], options['latency'])
+        host, port = server.server_address[:2]
+        self.stdout.write(self.style.SUCCESS(f"Stub DIAN nómina escuchando en http://{host}:{port}/ (Ctrl+C para salir)"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0008_payrollconcept'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payrolldocument',
+            index=models.Index(fields=['-period', '-id'], name='payroll_doc_period_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0009_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employeenovelty',
+            name='hours',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Horas reportadas (solo novedades por horas)', max_digits=6, verbose_name='Horas'),
+        ),
+        migrations.AddField(
+            model_name='noveltytype',
+            name='unit',
+            field=models.CharField(choices=[('DAYS', 'Días'), ('HOURS', 'Horas')], default='DAYS', max_length=5, verbose_name='Unidad'),
+        ),
+        migrations.AddIndex(
+            model_name='employeenovelty',
+            index=models.Index(fields=['end_date', 'start_date'], name='payroll_novelty_range_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0012_journal_import_batch'),
+        ('payroll', '0010_novelty_units'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollProvision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base_salary', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Salario Base')),
+                ('transport_allowance', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Auxilio Transporte')),
+                ('days', models.IntegerField(verbose_name='Días Causados')),
+                ('severance', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Cesantías')),
+                ('severance_interest', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Intereses Cesantías')),
+                ('service_bonus', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Prima de Servicios')),
+                ('vacation', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Vacaciones')),
+                ('cost_center', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounting.costcenter', verbose_name='Centro de Costo')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='provisions', to='payroll.employee', verbose_name='Empleado')),
+                ('journal_entry', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounting.journalentry', verbose_name='Asiento')),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='provisions', to='payroll.payrollperiod', verbose_name='Periodo')),
+            ],
+            options={
+                'verbose_name': 'Provisión de Prestaciones',
+                'verbose_name_plural': 'Provisiones de Prestaciones',
+                'unique_together': {('period', 'employee')},
+            },
+        ),
+    ]
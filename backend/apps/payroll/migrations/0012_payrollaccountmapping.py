@@ -0,0 +1,32 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        ('accounting', '0012_journal_import_batch'),
+        ('payroll', '0011_payrollprovision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollAccountMapping',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.client')),
+                ('concept', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='account_mappings', to='payroll.payrollconcept', verbose_name='Concepto')),
+                ('credit_account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounting.account', verbose_name='Cuenta Crédito')),
+                ('debit_account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounting.account', verbose_name='Cuenta Débito')),
+            ],
+            options={
+                'verbose_name': 'Cuenta Contable de Concepto',
+                'verbose_name_plural': 'Cuentas Contables de Conceptos',
+                'unique_together': {('client', 'concept')},
+            },
+        ),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('payroll', '0012_payrollaccountmapping'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollTransmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('PROCESSING', 'Procesando'), ('DONE', 'Terminada'), ('FAILED', 'Fallida')], default='PENDING', max_length=20, verbose_name='Estado')),
+                ('document_count', models.IntegerField(default=0, verbose_name='Documentos')),
+                ('accepted_count', models.IntegerField(default=0, verbose_name='Aceptados')),
+                ('rejected_count', models.IntegerField(default=0, verbose_name='Rechazados')),
+                ('failed_count', models.IntegerField(default=0, verbose_name='Sin Respuesta')),
+                ('metrics', models.JSONField(blank=True, default=dict, verbose_name='Métricas')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+            ],
+            options={
+                'verbose_name': 'Transmisión Nómina Electrónica',
+                'verbose_name_plural': 'Transmisiones Nómina Electrónica',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PayrollTransmissionItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('result', models.CharField(choices=[('ACCEPTED', 'Aceptado'), ('SENT', 'Enviado'), ('REJECTED', 'Rechazado'), ('FAILED', 'Sin Respuesta')], max_length=20, verbose_name='Resultado')),
+                ('build_ms', models.IntegerField(default=0, verbose_name='Construcción (ms)')),
+                ('sign_ms', models.IntegerField(default=0, verbose_name='Firma (ms)')),
+                ('send_ms', models.IntegerField(default=0, verbose_name='Envío (ms)')),
+                ('status_code', models.CharField(blank=True, max_length=10, verbose_name='Código DIAN')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+            ],
+            options={
+                'verbose_name': 'Documento Transmitido',
+                'verbose_name_plural': 'Documentos Transmitidos',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='payrolldocument',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='payrolldocument',
+            name='adjusted_document',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='adjustments', to='payroll.payrolldocument', verbose_name='Documento Ajustado'),
+        ),
+        migrations.AddField(
+            model_name='payrolldocument',
+            name='adjustment_type',
+            field=models.CharField(blank=True, choices=[('1', 'Reemplazar'), ('2', 'Eliminar')], max_length=1, verbose_name='Tipo Nota'),
+        ),
+        migrations.AddField(
+            model_name='payrolldocument',
+            name='document_type',
+            field=models.CharField(choices=[('102', 'Nómina Individual'), ('103', 'Nómina Individual de Ajuste')], default='102', max_length=3, verbose_name='Tipo XML'),
+        ),
+        migrations.AddField(
+            model_name='payrolldocument',
+            name='issued_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Fecha Generación XML'),
+        ),
+        migrations.AddConstraint(
+            model_name='payrolldocument',
+            constraint=models.UniqueConstraint(condition=models.Q(('document_type', '102')), fields=('period', 'employee'), name='payroll_doc_individual_unique'),
+        ),
+        migrations.AddField(
+            model_name='payrolltransmissionitem',
+            name='document',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transmission_items', to='payroll.payrolldocument'),
+        ),
+        migrations.AddField(
+            model_name='payrolltransmissionitem',
+            name='transmission',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='payroll.payrolltransmission'),
+        ),
+        migrations.AddField(
+            model_name='payrolltransmission',
+            name='client',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.client', verbose_name='Cliente (Tenant)'),
+        ),
+        migrations.AddField(
+            model_name='payrolltransmission',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Creado por'),
+        ),
+        migrations.AddField(
+            model_name='payrolltransmission',
+            name='period',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='transmissions', to='payroll.payrollperiod', verbose_name='Periodo'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.9 on 2026-10-19 18:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0013_electronic_payroll'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollRetroChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(max_length=100, verbose_name='Motivo')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='retro_changes', to='payroll.employee', verbose_name='Empleado')),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='retro_changes', to='payroll.payrollperiod', verbose_name='Periodo')),
+            ],
+            options={
+                'verbose_name': 'Cambio Retroactivo Pendiente',
+                'verbose_name_plural': 'Cambios Retroactivos Pendientes',
+                'unique_together': {('period', 'employee')},
+            },
+        ),
+    ]
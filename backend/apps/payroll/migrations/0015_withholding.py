@@ -0,0 +1,69 @@
+# Generated by Django 4.2.9 on 2026-10-19 19:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0014_retro_changes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='has_dependents',
+            field=models.BooleanField(default=False, verbose_name='Tiene Dependientes'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='housing_interest',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Intereses mensuales de crédito de vivienda', max_digits=12, verbose_name='Intereses Vivienda'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='prepaid_health',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Pago mensual medicina prepagada', max_digits=12, verbose_name='Medicina Prepagada'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='voluntary_contributions',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Aportes mensuales a pensión voluntaria y cuentas AFC', max_digits=12, verbose_name='Aportes Voluntarios/AFC'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='withholding_procedure',
+            field=models.CharField(choices=[('1', 'Procedimiento 1'), ('2', 'Procedimiento 2')], default='1', max_length=1, verbose_name='Procedimiento Retención'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='withholding_rate',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Porcentaje fijo semestral (procedimiento 2)', max_digits=5, verbose_name='% Fijo Retención'),
+        ),
+        migrations.CreateModel(
+            name='PayrollWithholding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('procedure', models.CharField(choices=[('1', 'Procedimiento 1'), ('2', 'Procedimiento 2')], max_length=1, verbose_name='Procedimiento')),
+                ('uvt', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='UVT')),
+                ('labor_income', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Ingresos Laborales')),
+                ('non_taxable', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Ingresos No Constitutivos de Renta')),
+                ('dependents', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Deducción Dependientes')),
+                ('prepaid_health', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Deducción Medicina Prepagada')),
+                ('housing_interest', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Deducción Intereses Vivienda')),
+                ('voluntary', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Renta Exenta Aportes Voluntarios')),
+                ('labor_exempt', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Renta Exenta 25%')),
+                ('allowed_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Total Deducciones y Exentas')),
+                ('taxable_base', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Base Gravable')),
+                ('taxable_base_uvt', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Base Gravable (UVT)')),
+                ('rate', models.DecimalField(decimal_places=2, default=0, max_digits=5, verbose_name='% Fijo Aplicado')),
+                ('withholding', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Retención')),
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='withholding', to='payroll.payrolldocument', verbose_name='Documento')),
+            ],
+            options={
+                'verbose_name': 'Depuración Retención en la Fuente',
+                'verbose_name_plural': 'Depuraciones Retención en la Fuente',
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from apps.accounting.models import ThirdParty, CostCenter
+from apps.common.managers import TenantAwareManager
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db.models import Q
 from decimal import Decimal
@@ -111,6 +112,13 @@ class NoveltyType(models.Model):
     pays_pension = models.BooleanField(default=True, help_text="¿Se cotiza pensión?", verbose_name="Cotiza Pensión")
     pays_arl = models.BooleanField(default=False, help_text="¿Se cotiza ARL?", verbose_name="Cotiza ARL")
 
+    # Horas extras y recargos se reportan en horas; incapacidades y licencias en días
+    UNIT_CHOICES = (
+        ('DAYS', 'Días'),
+        ('HOURS', 'Horas'),
+    )
+    unit = models.CharField(max_length=5, choices=UNIT_CHOICES, default='DAYS', verbose_name="Unidad")
+
     class Meta:
         verbose_name = "Tipo de Novedad"
         verbose_name_plural = "Tipos de Novedades"
@@ -139,6 +147,18 @@ class Employee(models.Model):
     
     base_salary = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="Salario Base")
     transport_allowance_eligible = models.BooleanField(default=True, verbose_name="Aplica Aux. Transporte")
+
+    # Retención en la fuente (Art. 383 y 386 E.T.) y lo que el empleado certifica para depurarla
+    WITHHOLDING_PROCEDURES = [
+        ('1', 'Procedimiento 1'),
+        ('2', 'Procedimiento 2'),
+    ]
+    withholding_procedure = models.CharField(max_length=1, choices=WITHHOLDING_PROCEDURES, default='1', verbose_name="Procedimiento Retención")
+    withholding_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0, help_text="Porcentaje fijo semestral (procedimiento 2)", verbose_name="% Fijo Retención")
+    has_dependents = models.BooleanField(default=False, verbose_name="Tiene Dependientes")
+    prepaid_health = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Pago mensual medicina prepagada", verbose_name="Medicina Prepagada")
+    housing_interest = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Intereses mensuales de crédito de vivienda", verbose_name="Intereses Vivienda")
+    voluntary_contributions = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Aportes mensuales a pensión voluntaria y cuentas AFC", verbose_name="Aportes Voluntarios/AFC")
     
     # Entidades de Seguridad Social
     health_entity = models.CharField(max_length=100, verbose_name="EPS")
@@ -166,6 +186,7 @@ class EmployeeNovelty(models.Model):
     start_date = models.DateField(verbose_name="Fecha Inicio")
     end_date = models.DateField(verbose_name="Fecha Fin")
     days = models.PositiveIntegerField(help_text="Días a reportar en nómina", verbose_name="Días")
+    hours = models.DecimalField(max_digits=6, decimal_places=2, default=0, help_text="Horas reportadas (solo novedades por horas)", verbose_name="Horas")
     
     # Campo para guardar el valor calculado y no recalcular siempre
     total_value = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, verbose_name="Valor Total")
@@ -176,10 +197,17 @@ class EmployeeNovelty(models.Model):
     class Meta:
         verbose_name = "Novedad Empleado"
         verbose_name_plural = "Novedades Empleados"
+        indexes = [
+            # Cruce de rangos con el periodo: end_date >= inicio AND start_date <= fin
+            models.Index(fields=['end_date', 'start_date'], name='payroll_novelty_range_idx'),
+        ]
 
     def save(self, *args, **kwargs):
+        # Las novedades por horas no descuentan días trabajados
+        if self.novelty_type.unit == 'HOURS':
+            self.days = 0
         # Lógica para calcular días usando mes comercial (30 días)
-        if not self.days and self.end_date and self.start_date:
+        elif not self.days and self.end_date and self.start_date:
              if calculate_commercial_days:
                 self.days = calculate_commercial_days(self.start_date, self.end_date)
              else:
@@ -206,6 +234,35 @@ class PayrollConcept(models.Model):
     def __str__(self):
         return f"{self.code} - {self.name}"
 
+class PayrollAccountMapping(models.Model):
+    """
+    Cuentas PUC de un concepto de nómina para un tenant.
+
+    Devengados: débito al gasto y crédito a salarios por pagar.
+    Deducciones: débito a salarios por pagar y crédito al pasivo del tercero
+    (EPS, fondo de pensiones, etc.).
+    """
+    client = models.ForeignKey('tenants.Client', on_delete=models.CASCADE)
+    concept = models.ForeignKey(PayrollConcept, on_delete=models.CASCADE, related_name='account_mappings', verbose_name="Concepto")
+    debit_account = models.ForeignKey(
+        'accounting.Account', on_delete=models.PROTECT, related_name='+', verbose_name="Cuenta Débito"
+    )
+    credit_account = models.ForeignKey(
+        'accounting.Account', on_delete=models.PROTECT, related_name='+', verbose_name="Cuenta Crédito"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantAwareManager()
+
+    class Meta:
+        unique_together = ('client', 'concept')
+        verbose_name = "Cuenta Contable de Concepto"
+        verbose_name_plural = "Cuentas Contables de Conceptos"
+
+    def __str__(self):
+        return f"{self.concept.code}: {self.debit_account.code} / {self.credit_account.code}"
+
+
 class PayrollPeriod(models.Model):
     """Periodo de Liquidación (Mensual/Quincenal)"""
     name = models.CharField(max_length=100, verbose_name="Nombre Periodo") # Ej: Enero 2026 - Quincena 1
@@ -239,6 +296,23 @@ class PayrollDocument(models.Model):
     cune = models.CharField(max_length=255, null=True, blank=True, unique=True, verbose_name="CUNE")
     conseccutive = models.IntegerField(verbose_name="Consecutivo")
     prefix = models.CharField(max_length=10, blank=True, verbose_name="Prefijo")
+    issued_at = models.DateTimeField(null=True, blank=True, verbose_name="Fecha Generación XML")
+
+    # Nómina individual (102) o nota de ajuste (103) sobre un documento ya transmitido
+    DOCUMENT_TYPES = [
+        ('102', 'Nómina Individual'),
+        ('103', 'Nómina Individual de Ajuste'),
+    ]
+    ADJUSTMENT_TYPES = [
+        ('1', 'Reemplazar'),
+        ('2', 'Eliminar'),
+    ]
+    document_type = models.CharField(max_length=3, choices=DOCUMENT_TYPES, default='102', verbose_name="Tipo XML")
+    adjustment_type = models.CharField(max_length=1, choices=ADJUSTMENT_TYPES, blank=True, verbose_name="Tipo Nota")
+    adjusted_document = models.ForeignKey(
+        'self', on_delete=models.PROTECT, null=True, blank=True, related_name='adjustments',
+        verbose_name="Documento Ajustado"
+    )
     
     # Totales Calculados
     worked_days = models.IntegerField(default=30, verbose_name="Días Trabajados")
@@ -253,8 +327,99 @@ class PayrollDocument(models.Model):
     # PENDING, SENT, ACCEPTED, REJECTED
     dian_response = models.TextField(blank=True, null=True, verbose_name="Respuesta DIAN")
     
+    class Meta:
+        constraints = [
+            # Una nómina individual por empleado y periodo; los ajustes se acumulan
+            models.UniqueConstraint(
+                fields=['period', 'employee'], condition=models.Q(document_type='102'),
+                name='payroll_doc_individual_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['-period', '-id'], name='payroll_doc_period_idx'),
+        ]
+
+
+class PayrollTransmission(models.Model):
+    """
+    Transmisión a la DIAN de los documentos de nómina electrónica de un
+    periodo: construye, firma y envía en lote y guarda las métricas.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pendiente'),
+        ('PROCESSING', 'Procesando'),
+        ('DONE', 'Terminada'),
+        ('FAILED', 'Fallida'),
+    ]
+
+    client = models.ForeignKey('tenants.Client', on_delete=models.CASCADE, verbose_name="Cliente (Tenant)")
+    period = models.ForeignKey(PayrollPeriod, on_delete=models.PROTECT, related_name='transmissions', verbose_name="Periodo")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING', verbose_name="Estado")
+
+    document_count = models.IntegerField(default=0, verbose_name="Documentos")
+    accepted_count = models.IntegerField(default=0, verbose_name="Aceptados")
+    rejected_count = models.IntegerField(default=0, verbose_name="Rechazados")
+    failed_count = models.IntegerField(default=0, verbose_name="Sin Respuesta")
+    # Tiempos agregados en milisegundos (construcción, firma, envío)
+    metrics = models.JSONField(default=dict, blank=True, verbose_name="Métricas")
+    error = models.TextField(blank=True, verbose_name="Error")
+
+    created_by = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Creado por")
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Fin")
+
+    objects = TenantAwareManager()
+
+    class Meta:
+        verbose_name = "Transmisión Nómina Electrónica"
+        verbose_name_plural = "Transmisiones Nómina Electrónica"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Transmisión {self.pk} {self.period} ({self.get_status_display()})"
+
+
+class PayrollTransmissionItem(models.Model):
+    """Resultado y tiempos de un documento dentro de una transmisión."""
+    RESULT_CHOICES = [
+        ('ACCEPTED', 'Aceptado'),
+        ('SENT', 'Enviado'),
+        ('REJECTED', 'Rechazado'),
+        ('FAILED', 'Sin Respuesta'),
+    ]
+
+    transmission = models.ForeignKey(PayrollTransmission, on_delete=models.CASCADE, related_name='items')
+    document = models.ForeignKey('PayrollDocument', on_delete=models.CASCADE, related_name='transmission_items')
+    result = models.CharField(max_length=20, choices=RESULT_CHOICES, verbose_name="Resultado")
+    build_ms = models.IntegerField(default=0, verbose_name="Construcción (ms)")
+    sign_ms = models.IntegerField(default=0, verbose_name="Firma (ms)")
+    send_ms = models.IntegerField(default=0, verbose_name="Envío (ms)")
+    status_code = models.CharField(max_length=10, blank=True, verbose_name="Código DIAN")
+    error = models.TextField(blank=True, verbose_name="Error")
+
+    class Meta:
+        verbose_name = "Documento Transmitido"
+        verbose_name_plural = "Documentos Transmitidos"
+
+
+class PayrollRetroChange(models.Model):
+    """
+    Pareja (periodo, empleado) ya liquidada cuya nómina quedó desactualizada
+    por un cambio posterior en parámetros de ley o novedades. El motor
+    retroactivo solo recalcula estas parejas.
+    """
+    period = models.ForeignKey(PayrollPeriod, on_delete=models.CASCADE, related_name='retro_changes', verbose_name="Periodo")
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='retro_changes', verbose_name="Empleado")
+    reason = models.CharField(max_length=100, verbose_name="Motivo")
+    created_at = models.DateTimeField(auto_now_add=True)
+
     class Meta:
         unique_together = ('period', 'employee')
+        verbose_name = "Cambio Retroactivo Pendiente"
+        verbose_name_plural = "Cambios Retroactivos Pendientes"
+
+    def __str__(self):
+        return f"{self.period} - {self.employee.code}: {self.reason}"
 
 
 class PayrollDetail(models.Model):
@@ -284,3 +449,69 @@ class PayrollDetail(models.Model):
     
     def __str__(self):
         return f"{self.document.employee.code} - {self.description}: {self.value}"
+
+
+class PayrollWithholding(models.Model):
+    """
+    Depuración de la base de retención en la fuente de un documento de
+    nómina, paso a paso, para auditoría y para el promedio semestral del
+    procedimiento 2.
+    """
+    document = models.OneToOneField(PayrollDocument, on_delete=models.CASCADE, related_name='withholding', verbose_name="Documento")
+    procedure = models.CharField(max_length=1, choices=Employee.WITHHOLDING_PROCEDURES, verbose_name="Procedimiento")
+    uvt = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="UVT")
+
+    labor_income = models.DecimalField(max_digits=14, decimal_places=2, verbose_name="Ingresos Laborales")
+    non_taxable = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Ingresos No Constitutivos de Renta")
+    dependents = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Deducción Dependientes")
+    prepaid_health = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Deducción Medicina Prepagada")
+    housing_interest = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Deducción Intereses Vivienda")
+    voluntary = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Renta Exenta Aportes Voluntarios")
+    labor_exempt = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Renta Exenta 25%")
+    # Deducciones y rentas exentas después del límite del 40% / 1.340 UVT
+    allowed_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Total Deducciones y Exentas")
+    taxable_base = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Base Gravable")
+    taxable_base_uvt = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name="Base Gravable (UVT)")
+    rate = models.DecimalField(max_digits=5, decimal_places=2, default=0, verbose_name="% Fijo Aplicado")
+    withholding = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Retención")
+
+    class Meta:
+        verbose_name = "Depuración Retención en la Fuente"
+        verbose_name_plural = "Depuraciones Retención en la Fuente"
+
+    def __str__(self):
+        return f"{self.document_id}: {self.withholding}"
+
+
+class PayrollProvision(models.Model):
+    """
+    Provisión mensual de prestaciones sociales (costo empresa) por empleado:
+    cesantías, intereses sobre cesantías, prima de servicios y vacaciones.
+    """
+    period = models.ForeignKey(PayrollPeriod, on_delete=models.CASCADE, related_name='provisions', verbose_name="Periodo")
+    employee = models.ForeignKey(Employee, on_delete=models.PROTECT, related_name='provisions', verbose_name="Empleado")
+    cost_center = models.ForeignKey(CostCenter, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Centro de Costo")
+
+    # Bases del cálculo
+    base_salary = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="Salario Base")
+    transport_allowance = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Auxilio Transporte")
+    days = models.IntegerField(verbose_name="Días Causados")
+
+    severance = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Cesantías")
+    severance_interest = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Intereses Cesantías")
+    service_bonus = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Prima de Servicios")
+    vacation = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Vacaciones")
+
+    journal_entry = models.ForeignKey(
+        'accounting.JournalEntry', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+', verbose_name="Asiento"
+    )
+
+    class Meta:
+        unique_together = ('period', 'employee')
+        verbose_name = "Provisión de Prestaciones"
+        verbose_name_plural = "Provisiones de Prestaciones"
+
+    @property
+    def total(self):
+        return self.severance + self.severance_interest + self.service_bonus + self.vacation
@@ -0,0 +1,102 @@
+"""
+Motor de novedades por periodo.
+
+Carga en una sola consulta todas las novedades que se cruzan con el periodo
+(no solo las contenidas en él), recorta cada una a las fechas del periodo
+con días comerciales y las agrupa por empleado en memoria. Las novedades por
+horas (extras, recargos) se llevan aparte de las de días (incapacidades,
+licencias, vacaciones), que son las únicas que descuentan días trabajados.
+"""
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from .models import EmployeeNovelty
+from .utils import calculate_commercial_days
+
+
+class PeriodNovelty:
+    """Novedad recortada al periodo. `quantity` son días u horas según la unidad."""
+
+    def __init__(self, novelty, start_date, end_date, quantity):
+        self.novelty = novelty
+        self.novelty_type = novelty.novelty_type
+        self.start_date = start_date
+        self.end_date = end_date
+        self.quantity = quantity
+
+    @property
+    def is_hourly(self):
+        return self.novelty_type.unit == 'HOURS'
+
+
+class EmployeeNovelties:
+    """Novedades de un empleado en el periodo, separadas por unidad."""
+
+    def __init__(self):
+        self.day_items = []
+        self.hour_items = []
+
+    def add(self, item):
+        (self.hour_items if item.is_hourly else self.day_items).append(item)
+
+    def __iter__(self):
+        yield from self.day_items
+        yield from self.hour_items
+
+    @property
+    def days(self):
+        return sum(item.quantity for item in self.day_items)
+
+    @property
+    def transport_days(self):
+        """Días que no causan auxilio de transporte."""
+        return sum(item.quantity for item in self.day_items if item.novelty_type.affects_transport_aid)
+
+
+def clip_novelty(novelty, start_date, end_date):
+    """
+    Recorta una novedad al periodo. Si cabe completa se respetan los días u
+    horas registrados; si lo atraviesa se prorratea con días comerciales.
+    """
+    clip_start = max(novelty.start_date, start_date)
+    clip_end = min(novelty.end_date, end_date)
+    inside = clip_start == novelty.start_date and clip_end == novelty.end_date
+
+    if novelty.novelty_type.unit == 'HOURS':
+        quantity = novelty.hours
+        if not inside:
+            total_days = calculate_commercial_days(novelty.start_date, novelty.end_date)
+            period_days = calculate_commercial_days(clip_start, clip_end)
+            quantity = (novelty.hours * period_days / total_days).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) \
+                if total_days else Decimal('0')
+    else:
+        quantity = novelty.days if inside else min(calculate_commercial_days(clip_start, clip_end), novelty.days)
+
+    return PeriodNovelty(novelty, clip_start, clip_end, quantity)
+
+
+def load_period_novelties(start_date, end_date, employee_ids=None):
+    """
+    Novedades que se cruzan con [start_date, end_date], recortadas y agrupadas.
+
+    Una consulta sobre el índice (end_date, start_date) para todos los
+    empleados; pasar `employee_ids` solo restringe el resultado.
+
+    Returns:
+        defaultdict {employee_id: EmployeeNovelties}
+    """
+    queryset = (
+        EmployeeNovelty.objects
+        .filter(start_date__lte=end_date, end_date__gte=start_date)
+        .select_related('novelty_type')
+        .order_by('employee_id', 'start_date', 'id')
+    )
+    if employee_ids is not None:
+        queryset = queryset.filter(employee_id__in=employee_ids)
+
+    buckets = defaultdict(EmployeeNovelties)
+    for novelty in queryset.iterator():
+        item = clip_novelty(novelty, start_date, end_date)
+        if item.quantity > 0:
+            buckets[novelty.employee_id].add(item)
+    return buckets
@@ -0,0 +1,269 @@
+"""
+Planilla Integrada de Liquidación de Aportes (PILA), planilla tipo E.
+
+Genera el archivo plano de un periodo liquidado en una sola pasada: los
+devengados y deducciones se agregan en la base de datos por documento (sin
+instanciar PayrollDetail), las novedades se cargan una vez con el motor de
+novedades y cada cotizante se escribe como registro tipo 2 a medida que se
+recorre. Aplica las reglas de redondeo de la Resolución 2388 de 2016: IBC
+al peso superior y aportes al múltiplo de 100 superior.
+
+Los campos de administradora (EPS, AFP, ARL) del empleado deben contener el
+código PILA de la entidad.
+"""
+from decimal import Decimal, ROUND_CEILING
+
+from django.conf import settings
+from django.db.models import Q, Sum
+
+from apps.common.tabular import format_record
+
+from .models import LegalParameter, PayrollConcept, PayrollDetail, PayrollDocument
+from .novelty_engine import load_period_novelties
+from .services import NON_SALARY_CODES, SocialSecurityCalculator
+
+# Registros tipo 1 (aportante) y tipo 2 (cotizante): (campo, longitud, tipo)
+PILA_LAYOUT = {
+    'header': [
+        ('record_type', 2, 'N'), ('modality', 1, 'N'), ('sequence', 4, 'N'), ('payer_name', 200, 'A'),
+        ('payer_id_type', 2, 'A'), ('payer_id', 16, 'A'), ('payer_dv', 1, 'N'), ('form_type', 1, 'A'),
+        ('form_number', 10, 'A'), ('form_date', 10, 'A'), ('presentation', 1, 'A'), ('branch_code', 10, 'A'),
+        ('branch_name', 40, 'A'), ('arl_admin', 6, 'A'), ('pension_period', 7, 'A'), ('health_period', 7, 'A'),
+        ('filing_number', 10, 'N'), ('payment_date', 10, 'A'), ('employee_count', 5, 'N'),
+        ('payroll_total', 12, 'N'), ('payer_type', 2, 'N'), ('operator_code', 2, 'N'),
+    ],
+    'detail': [
+        ('record_type', 2, 'N'), ('sequence', 5, 'N'), ('id_type', 2, 'A'), ('id_number', 16, 'A'),
+        ('contributor_type', 2, 'N'), ('contributor_subtype', 2, 'N'), ('foreigner', 1, 'A'), ('abroad', 1, 'A'),
+        ('department', 2, 'A'), ('municipality', 3, 'A'), ('surname', 20, 'A'), ('second_surname', 30, 'A'),
+        ('first_name', 20, 'A'), ('middle_name', 30, 'A'), ('ing', 1, 'A'), ('ret', 1, 'A'), ('tde', 1, 'A'),
+        ('tae', 1, 'A'), ('tdp', 1, 'A'), ('tap', 1, 'A'), ('vsp', 1, 'A'), ('correction', 1, 'A'),
+        ('vst', 1, 'A'), ('sln', 1, 'A'), ('ige', 1, 'A'), ('lma', 1, 'A'), ('vac', 1, 'A'), ('avp', 1, 'A'),
+        ('vct', 1, 'A'), ('irl_days', 2, 'N'), ('pension_admin', 6, 'A'), ('pension_admin_to', 6, 'A'),
+        ('health_admin', 6, 'A'), ('health_admin_to', 6, 'A'), ('ccf_admin', 6, 'A'),
+        ('pension_days', 2, 'N'), ('health_days', 2, 'N'), ('arl_days', 2, 'N'), ('ccf_days', 2, 'N'),
+        ('base_salary', 9, 'N'), ('integral_salary', 1, 'A'), ('pension_ibc', 9, 'N'), ('health_ibc', 9, 'N'),
+        ('arl_ibc', 9, 'N'), ('ccf_ibc', 9, 'N'), ('pension_rate', 7, 'A'), ('pension_contribution', 9, 'N'),
+        ('health_rate', 7, 'A'), ('health_contribution', 9, 'N'), ('arl_rate', 9, 'A'),
+        ('arl_contribution', 9, 'N'), ('ccf_rate', 7, 'A'), ('ccf_contribution', 9, 'N'),
+        ('sena_rate', 7, 'A'), ('sena_contribution', 9, 'N'), ('icbf_rate', 7, 'A'),
+        ('icbf_contribution', 9, 'N'), ('exonerated', 1, 'A'), ('arl_admin', 6, 'A'), ('risk_class', 1, 'N'),
+    ],
+}
+
+SUBSYSTEMS = ('pension', 'health', 'arl', 'ccf', 'sena', 'icbf')
+
+# Tipo de cotizante PILA según contrato
+CONTRIBUTOR_TYPES = {'APRENDIZAJE': '12'}
+
+
+def round_ibc(value):
+    """IBC al peso superior."""
+    return value.to_integral_value(rounding=ROUND_CEILING)
+
+
+def round_contribution(value):
+    """Aportes al múltiplo de 100 superior."""
+    return (value / 100).to_integral_value(rounding=ROUND_CEILING) * 100
+
+
+def _rate(value):
+    return f"{value:.5f}"
+
+
+class PilaGenerator:
+    """Planilla PILA de un PayrollPeriod liquidado para el tenant `client_id`."""
+
+    def __init__(self, period, client):
+        self.period = period
+        self.client = client
+        rates = settings.PAYROLL_CONFIG['PILA_RATES']
+        self.rates = {key: Decimal(value) for key, value in rates.items()}
+        self.exoneration_limit = settings.PAYROLL_CONFIG['PILA_EXONERATION_SMMLV']
+        self.smmlv = LegalParameter.get_value('SMMLV', period.end_date)
+        self.summary = {'records': 0, 'documents': 0, 'ibc_total': Decimal('0'),
+                        'totals': dict.fromkeys(SUBSYSTEMS, Decimal('0')), 'warnings': []}
+        self._bad_lengths = []
+
+    # ------------------------------------------------------------------
+    # Datos del periodo (consultas agrupadas)
+    # ------------------------------------------------------------------
+    def _documents(self):
+        return (
+            PayrollDocument.objects
+            .filter(period=self.period, employee__third_party__client_id=self.client.pk)
+            .order_by('employee__code')
+            .values_list(
+                'id', 'employee_id', 'worked_days', 'novelty_days',
+                'employee__contract_type', 'employee__start_date', 'employee__end_date', 'employee__base_salary',
+                'employee__risk_level', 'employee__health_entity', 'employee__pension_entity',
+                'employee__arl_entity', 'employee__third_party__identification_type',
+                'employee__third_party__identification_number', 'employee__third_party__first_name',
+                'employee__third_party__middle_name', 'employee__third_party__surname',
+                'employee__third_party__second_surname',
+            )
+        )
+
+    def _amounts(self):
+        """{document_id: (devengado salarial, salud empleado, pensión empleado)} en una consulta."""
+        non_salary = set(NON_SALARY_CODES) | set(
+            PayrollConcept.objects.filter(concept_type='EARNING', is_salary=False).values_list('dian_code', flat=True)
+        )
+        codes = dict(PayrollConcept.objects.filter(code__in=['SALUD', 'PENSION']).values_list('code', 'dian_code'))
+        rows = (
+            PayrollDetail.objects
+            .filter(document__period=self.period, document__employee__third_party__client_id=self.client.pk)
+            .values('document_id')
+            .annotate(
+                salary=Sum('value', filter=Q(concept_type='EARNING') & ~Q(dian_code__in=non_salary)),
+                health=Sum('value', filter=Q(concept_type='DEDUCTION', dian_code=codes.get('SALUD', 'SALUD'))),
+                pension=Sum('value', filter=Q(concept_type='DEDUCTION', dian_code=codes.get('PENSION', 'PENSION'))),
+            )
+            .values_list('document_id', 'salary', 'health', 'pension')
+        )
+        return {doc_id: tuple(value or Decimal('0') for value in values) for doc_id, *values in rows}
+
+    # ------------------------------------------------------------------
+    # Reglas
+    # ------------------------------------------------------------------
+    def _ibc(self, salary, days, base_days):
+        """IBC proporcional a los días del subsistema, entre 1 SMMLV (por días) y 25 SMMLV."""
+        if days <= 0 or base_days <= 0:
+            return Decimal('0')
+        amount = salary * days / base_days
+        amount = max(amount, self.smmlv * days / 30)
+        return round_ibc(min(amount, self.smmlv * 25))
+
+    def _detail(self, sequence, row, amounts, novelties):
+        (doc_id, employee_id, worked_days, novelty_days, contract_type, start_date, end_date, base_salary,
+         risk_level, health_admin, pension_admin, arl_admin, id_type, id_number, first_name, middle_name,
+         surname, second_surname) = row
+        period = self.period
+        salary, health_deducted, pension_deducted = amounts.get(doc_id, (Decimal('0'),) * 3)
+        contributor_type = CONTRIBUTOR_TYPES.get(contract_type, '01')
+
+        # Días por subsistema según los indicadores de cada novedad
+        base_days = worked_days + novelty_days
+        days = dict.fromkeys(('pension', 'health', 'arl', 'ccf'), base_days)
+        flags = {'sln': '', 'ige': '', 'lma': '', 'vac': ''}
+        irl_days = 0
+        for item in (novelties.day_items if novelties else []):
+            novelty_type, quantity = item.novelty_type, item.quantity
+            if not novelty_type.pays_health:
+                days['health'] -= quantity
+            if not novelty_type.pays_pension:
+                days['pension'] -= quantity
+            if not novelty_type.pays_arl:
+                days['arl'] -= quantity
+            if novelty_type.dian_type == 'LNR':
+                days['ccf'] -= quantity
+                flags['sln'] = 'X'
+            elif novelty_type.dian_type == 'IRL':
+                irl_days += quantity
+            elif novelty_type.dian_type.lower() in flags:
+                flags[novelty_type.dian_type.lower()] = 'X'
+        if contributor_type == '12':
+            # Aprendiz: solo salud (a cargo del empleador) y ARL
+            days['pension'] = days['ccf'] = 0
+
+        ibc = {name: self._ibc(salary, max(value, 0), base_days) for name, value in days.items()}
+        exonerated = contributor_type != '12' and base_salary < self.smmlv * self.exoneration_limit
+        rates = {
+            'pension': self.rates['pension'] if days['pension'] > 0 else Decimal('0'),
+            'health': self.rates['health_exonerated'] if exonerated else self.rates['health'],
+            'arl': SocialSecurityCalculator.ARL_RATES.get(risk_level, SocialSecurityCalculator.ARL_RATES[1]),
+            'ccf': self.rates['ccf'] if days['ccf'] > 0 else Decimal('0'),
+            'sena': Decimal('0') if exonerated or contributor_type == '12' else self.rates['sena'],
+            'icbf': Decimal('0') if exonerated or contributor_type == '12' else self.rates['icbf'],
+        }
+        contributions = {
+            name: round_contribution(ibc['ccf' if name in ('sena', 'icbf') else name] * rate)
+            for name, rate in rates.items()
+        }
+
+        # Cuadre con lo descontado al empleado en la liquidación
+        employee_share = {
+            'health': round_contribution(ibc['health'] * Decimal('0.04')),
+            'pension': round_contribution(ibc['pension'] * Decimal('0.04')) if days['pension'] > 0 else Decimal('0'),
+        }
+        for name, deducted in (('health', health_deducted), ('pension', pension_deducted)):
+            if abs(employee_share[name] - deducted) > 100:
+                self.summary['warnings'].append({
+                    'identification_number': id_number, 'subsystem': name,
+                    'pila': employee_share[name], 'payroll': deducted,
+                })
+
+        summary = self.summary
+        summary['ibc_total'] += ibc['health']
+        for name, value in contributions.items():
+            summary['totals'][name] += value
+
+        return {
+            'record_type': 2, 'sequence': sequence, 'id_type': {'13': 'CC', '22': 'CE', '41': 'PA', '12': 'TI'}.get(id_type, 'CC'),
+            'id_number': id_number, 'contributor_type': contributor_type, 'contributor_subtype': '00',
+            'department': self.client.metadata.get('dane_department', ''),
+            'municipality': self.client.metadata.get('dane_municipality', ''),
+            'surname': surname, 'second_surname': second_surname, 'first_name': first_name, 'middle_name': middle_name,
+            'ing': 'X' if period.start_date <= start_date <= period.end_date else '',
+            'ret': 'X' if end_date and period.start_date <= end_date <= period.end_date else '',
+            **flags, 'irl_days': irl_days,
+            'pension_admin': pension_admin if days['pension'] > 0 else '', 'health_admin': health_admin,
+            'ccf_admin': self.client.metadata.get('pila_ccf', '') if days['ccf'] > 0 else '',
+            'pension_days': max(days['pension'], 0), 'health_days': max(days['health'], 0),
+            'arl_days': max(days['arl'], 0), 'ccf_days': max(days['ccf'], 0),
+            'base_salary': round_ibc(base_salary),
+            'pension_ibc': ibc['pension'], 'health_ibc': ibc['health'], 'arl_ibc': ibc['arl'], 'ccf_ibc': ibc['ccf'],
+            **{f'{name}_rate': _rate(rate) for name, rate in rates.items()},
+            **{f'{name}_contribution': value for name, value in contributions.items()},
+            'exonerated': 'S' if exonerated else 'N', 'arl_admin': arl_admin, 'risk_class': risk_level,
+        }
+
+    # ------------------------------------------------------------------
+    # Archivo
+    # ------------------------------------------------------------------
+    def _line(self, kind, values):
+        line = format_record(PILA_LAYOUT[kind], values)
+        if len(line) != sum(length for _, length, _ in PILA_LAYOUT[kind]):
+            self._bad_lengths.append(values.get('sequence'))
+        return line + '\r\n'
+
+    def stream(self):
+        """Líneas del archivo (CRLF). `summary` queda completo al agotar el generador."""
+        period, client = self.period, self.client
+        documents = list(self._documents())
+        amounts = self._amounts()
+        novelties = load_period_novelties(period.start_date, period.end_date, [row[1] for row in documents])
+        self.summary['documents'] = len(documents)
+
+        next_month = period.end_date.replace(day=1)
+        next_month = next_month.replace(year=next_month.year + 1, month=1) if next_month.month == 12 \
+            else next_month.replace(month=next_month.month + 1)
+        yield self._line('header', {
+            'record_type': 1, 'modality': 1, 'sequence': 1, 'payer_name': client.legal_name or client.name,
+            'payer_id_type': 'NI', 'payer_id': client.nit, 'payer_dv': client.metadata.get('dv', ''),
+            'form_type': 'E', 'presentation': 'U', 'arl_admin': client.metadata.get('pila_arl', ''),
+            'pension_period': period.end_date.strftime('%Y-%m'), 'health_period': next_month.strftime('%Y-%m'),
+            'employee_count': len(documents),
+            'payroll_total': round_ibc(sum((value[0] for value in amounts.values()), Decimal('0'))),
+            'payer_type': 1,
+        })
+        for sequence, row in enumerate(documents, start=1):
+            self.summary['records'] += 1
+            yield self._line('detail', self._detail(sequence, row, amounts, novelties.get(row[1])))
+
+    def validate(self):
+        summary = self.summary
+        if not summary['documents']:
+            raise ValueError("El periodo no tiene documentos liquidados.")
+        if summary['records'] != summary['documents']:
+            raise ValueError(f"Se escribieron {summary['records']} cotizantes de {summary['documents']} documentos.")
+        if self._bad_lengths:
+            raise ValueError(f"Registros con longitud inválida: {self._bad_lengths[:10]}")
+
+    def write(self, handle):
+        """Escribe la planilla en `handle` (binario) y valida los totales."""
+        for line in self.stream():
+            handle.write(line.encode('ascii'))
+        self.validate()
+        self.summary['total'] = sum(self.summary['totals'].values(), Decimal('0'))
+        return self.summary
@@ -0,0 +1,178 @@
+"""
+Contabilización de la nómina liquidada.
+
+Una sola consulta agrupada suma los detalles del periodo por código de
+concepto, tipo y centro de costo del empleado; cada grupo se traduce a sus
+cuentas con el mapeo PayrollAccountMapping (en caché por tenant, invalidado
+con la versión de catálogo) y las líneas se netean por cuenta y centro de
+costo antes de insertarlas en bloque. El resultado es un comprobante
+balanceado por periodo o uno por centro de costo.
+
+Una reliquidación retroactiva de un periodo ya contabilizado no toca esos
+comprobantes: `post_difference` registra solo la diferencia en un
+comprobante de ajuste (NOM-<periodo>-AJ<n>).
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.accounting.models import FiscalPeriod, JournalEntry, JournalEntryLine
+from apps.common.mixins import catalog_versions
+from apps.reports.signals import ledger_bulk_written
+
+from .models import PayrollAccountMapping, PayrollDetail, PayrollPeriod
+
+logger = logging.getLogger(__name__)
+
+ACCOUNTS_CACHE_KEY = 'payroll-accounts:{}:{}'
+MAPPING_CATALOGS = ['payroll.PayrollAccountMapping', 'payroll.PayrollConcept']
+
+
+def concept_accounts(client_id):
+    """
+    {(dian_code, concept_type): (cuenta débito, cuenta crédito)} del tenant.
+    Se guarda en caché con la versión de catálogo del mapeo y de los conceptos.
+    """
+    version = '-'.join(str(value) for value in catalog_versions(MAPPING_CATALOGS, client_id))
+    key = ACCOUNTS_CACHE_KEY.format(client_id, version)
+    accounts = cache.get(key)
+    if accounts is None:
+        accounts = {
+            (dian_code, concept_type): (debit_id, credit_id)
+            for dian_code, concept_type, debit_id, credit_id in PayrollAccountMapping.objects.filter(
+                client_id=client_id,
+            ).values_list('concept__dian_code', 'concept__concept_type', 'debit_account_id', 'credit_account_id')
+        }
+        cache.set(key, accounts, timeout=None)
+    return accounts
+
+
+def period_entries(period, client_id):
+    return JournalEntry.objects.filter(
+        client_id=client_id, content_type=ContentType.objects.get_for_model(period), object_id=period.pk,
+        number__startswith='NOM-',
+    ).exclude(status='CANCELLED')
+
+
+def _balances(groups, accounts, by_cost_center=False):
+    """
+    {centro de costo del comprobante: {(cuenta, centro de costo): neto débito - crédito}}
+    a partir de filas (dian_code, concept_type, cost_center_id, total).
+    """
+    balances = defaultdict(lambda: defaultdict(Decimal))
+    missing = set()
+    for dian_code, concept_type, cost_center_id, total in groups:
+        pair = accounts.get((dian_code, concept_type))
+        if pair is None:
+            missing.add(dian_code)
+            continue
+        debit_id, credit_id = pair
+        amount = total.quantize(Decimal('0.01'))
+        lines = balances[cost_center_id if by_cost_center else None]
+        lines[(debit_id, cost_center_id)] += amount
+        lines[(credit_id, cost_center_id)] -= amount
+    if missing:
+        raise ValueError(f"Conceptos sin cuentas contables: {', '.join(sorted(missing))}")
+    return balances
+
+
+def _create_entries(period, client_id, numbered_balances, description, user=None):
+    """Comprobantes contabilizados con sus líneas en bloque. Recibe [(número, {(cuenta, cc): neto})]."""
+    now = timezone.now()
+    user_id = user.pk if user else None
+    period_type = ContentType.objects.get_for_model(period)
+    entries = JournalEntry.objects.bulk_create([
+        JournalEntry(
+            client_id=client_id, entry_type='DIARIO', number=number, date=period.end_date,
+            description=description, content_type=period_type, object_id=period.pk, status='POSTED',
+            created_by_id=user_id, posted_by_id=user_id, posted_at=now,
+        )
+        for number, _ in numbered_balances
+    ])
+    lines = []
+    for entry, (_, balance) in zip(entries, numbered_balances):
+        line_number = 0
+        for (account_id, cost_center_id), net in sorted(balance.items(), key=lambda item: -item[1]):
+            if not net:
+                continue
+            line_number += 1
+            lines.append(JournalEntryLine(
+                client_id=client_id, entry_id=entry.pk, line_number=line_number, account_id=account_id,
+                cost_center_id=cost_center_id, description=description,
+                debit=net if net > 0 else Decimal('0'), credit=-net if net < 0 else Decimal('0'),
+            ))
+    JournalEntryLine.objects.bulk_create(lines, batch_size=1000)
+    ledger_bulk_written(client_id, period.end_date)
+    return entries, lines
+
+
+def post_difference(period, client_id, groups, user=None):
+    """
+    Contabiliza la diferencia de una reliquidación sobre un periodo ya
+    contabilizado. `groups` son filas (dian_code, concept_type,
+    cost_center_id, delta) con el valor nuevo menos el anterior.
+
+    Returns:
+        Número del comprobante de ajuste o None si la diferencia es cero.
+    """
+    if FiscalPeriod.is_date_closed(period.end_date):
+        raise ValueError(f"El periodo contable de la fecha {period.end_date} está cerrado.")
+    balances = _balances(groups, concept_accounts(client_id))
+    if not any(balances[None].values()):
+        return None
+    adjustments = period_entries(period, client_id).filter(number__startswith=f"NOM-{period.pk}-AJ").count()
+    number = f"NOM-{period.pk}-AJ{adjustments + 1}"
+    _create_entries(period, client_id, [(number, balances[None])], f"Reliquidación nómina {period.name}", user)
+    logger.info(f"Nómina periodo {period.pk}: diferencia de reliquidación contabilizada en {number}")
+    return number
+
+
+def post_period(period, client_id, by_cost_center=False, user=None):
+    """
+    Contabiliza la nómina liquidada del periodo.
+
+    Args:
+        by_cost_center: un comprobante por centro de costo en lugar de uno por periodo.
+
+    Returns:
+        dict con los comprobantes creados y sus totales.
+    """
+    if period.status == 'DRAFT':
+        raise ValueError("El periodo no ha sido liquidado.")
+    if FiscalPeriod.is_date_closed(period.end_date):
+        raise ValueError(f"El periodo contable de la fecha {period.end_date} está cerrado.")
+    groups = (
+        PayrollDetail.objects
+        .filter(document__period=period, document__employee__third_party__client_id=client_id)
+        .values('dian_code', 'concept_type', 'document__employee__cost_center_id')
+        .annotate(total=Sum('value'))
+        .order_by()
+        .values_list('dian_code', 'concept_type', 'document__employee__cost_center_id', 'total')
+    )
+    balances = _balances(groups, concept_accounts(client_id), by_cost_center)
+    if not balances:
+        raise ValueError("El periodo no tiene detalles de nómina.")
+    keys = sorted(balances, key=lambda pk: (pk is not None, pk or 0))
+
+    with transaction.atomic():
+        # El bloqueo del periodo serializa contabilizaciones simultáneas de la misma nómina
+        PayrollPeriod.objects.select_for_update().filter(pk=period.pk).first()
+        if period_entries(period, client_id).exists():
+            raise ValueError("La nómina del periodo ya fue contabilizada.")
+        entries, lines = _create_entries(period, client_id, [
+            (f"NOM-{period.pk}" + (f"-{key or 'GEN'}" if by_cost_center else ''), balances[key])
+            for key in keys
+        ], f"Nómina {period.name}", user)
+
+    logger.info(f"Nómina periodo {period.pk} contabilizada: {len(entries)} comprobantes, {len(lines)} líneas")
+    return {
+        'entries': [entry.number for entry in entries],
+        'lines': len(lines),
+        'total': sum((line.debit for line in lines), Decimal('0')),
+    }
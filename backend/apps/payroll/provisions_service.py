@@ -0,0 +1,232 @@
+"""
+Provisión mensual de prestaciones sociales (cesantías, intereses, prima y
+vacaciones).
+
+Trabaja por columnas: lee los datos de los empleados con values_list en
+lotes (sin instancias del ORM), calcula las cuatro provisiones con Decimal
+sobre cada lote, las inserta con bulk_create y acumula los totales por
+centro de costo. Al final contabiliza un asiento por centro de costo con
+sus líneas en bloque.
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.accounting.models import Account, FiscalPeriod, JournalEntry, JournalEntryLine
+from apps.reports.signals import ledger_bulk_written
+
+from .models import Employee, LegalParameter, PayrollPeriod, PayrollProvision
+from .novelty_engine import load_period_novelties
+from .utils import calculate_commercial_days
+
+logger = logging.getLogger(__name__)
+
+PROVISION_FIELDS = ('severance', 'severance_interest', 'service_bonus', 'vacation')
+PROVISION_LABELS = {
+    'severance': 'Cesantías',
+    'severance_interest': 'Intereses sobre cesantías',
+    'service_bonus': 'Prima de servicios',
+    'vacation': 'Vacaciones',
+}
+CENT = Decimal('0.01')
+
+
+def _round(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def compute_provisions(base_salaries, transport, days, interest_rate):
+    """
+    Provisiones de un lote. Recibe columnas alineadas (una posición por
+    empleado) y devuelve una columna por concepto.
+
+    - Cesantías y prima: (salario + auxilio de transporte) * días / 360
+    - Intereses: cesantías * tasa anual (las cesantías ya son proporcionales a los días)
+    - Vacaciones: salario * días / 720 (15 días hábiles por año)
+    """
+    severance = [_round((salary + aid) * d / 360) for salary, aid, d in zip(base_salaries, transport, days)]
+    return {
+        'severance': severance,
+        'severance_interest': [_round(value * interest_rate) for value in severance],
+        'service_bonus': list(severance),
+        'vacation': [_round(salary * d / 720) for salary, d in zip(base_salaries, days)],
+    }
+
+
+class ProvisionService:
+    """Calcula y contabiliza las provisiones de un periodo para el tenant actual."""
+
+    def __init__(self, period, client_id, user=None):
+        self.period = period
+        self.client_id = client_id
+        self.user = user
+        config = settings.PAYROLL_CONFIG
+        self.accounts_config = config['PROVISION_ACCOUNTS']
+        self.interest_rate = Decimal(config['SEVERANCE_INTEREST_RATE'])
+        self.batch_size = config['PROVISION_BATCH_SIZE']
+
+    # ------------------------------------------------------------------
+    # Orquestación
+    # ------------------------------------------------------------------
+    def run(self):
+        """
+        Returns:
+            dict con empleados provisionados, totales por concepto y asientos.
+        """
+        period = self.period
+        if FiscalPeriod.is_date_closed(period.end_date):
+            raise ValueError(f"El periodo contable de la fecha {period.end_date} está cerrado.")
+        accounts = self._accounts()
+
+        with transaction.atomic():
+            # El bloqueo del periodo serializa recálculos simultáneos
+            PayrollPeriod.objects.select_for_update().filter(pk=period.pk).first()
+            self._clear_previous()
+            totals_by_cc, count = self._provision()
+            entries = self._post(totals_by_cc, accounts) if count else []
+
+        totals = {field: sum((row[field] for row in totals_by_cc.values()), Decimal('0')) for field in PROVISION_FIELDS}
+        logger.info(f"Provisiones periodo {period.pk}: {count} empleados, {len(entries)} asientos")
+        return {
+            'employees': count,
+            'totals': totals,
+            'total': sum(totals.values(), Decimal('0')),
+            'entries': [entry.number for entry in entries],
+        }
+
+    def _accounts(self):
+        codes = {code for pair in self.accounts_config.values() for code in pair}
+        found = dict(Account.objects.filter(client_id=self.client_id, code__in=codes).values_list('code', 'id'))
+        missing = sorted(codes - set(found))
+        if missing:
+            raise ValueError(f"Faltan cuentas de provisión en el plan de cuentas: {', '.join(missing)}")
+        return {field: (found[debit], found[credit]) for field, (debit, credit) in self.accounts_config.items()}
+
+    def _clear_previous(self):
+        """Recalcular reemplaza provisiones y asientos anteriores del periodo."""
+        JournalEntry.objects.filter(
+            client_id=self.client_id, content_type=ContentType.objects.get_for_model(self.period),
+            object_id=self.period.pk, number__startswith='PROV-',
+        ).delete()
+        PayrollProvision.objects.filter(period=self.period, employee__third_party__client_id=self.client_id).delete()
+
+    # ------------------------------------------------------------------
+    # Cálculo por lotes
+    # ------------------------------------------------------------------
+    def _employees(self):
+        period = self.period
+        return (
+            Employee.objects
+            .filter(third_party__client_id=self.client_id, start_date__lte=period.end_date)
+            .filter(Q(end_date__isnull=True) | Q(end_date__gte=period.start_date))
+            .order_by('id')
+            .values_list('id', 'cost_center_id', 'base_salary', 'transport_allowance_eligible', 'start_date', 'end_date')
+        )
+
+    def _unpaid_days(self):
+        """Días de licencia no remunerada: no causan prestaciones."""
+        novelties = load_period_novelties(self.period.start_date, self.period.end_date)
+        return {
+            employee_id: sum(item.quantity for item in bucket.day_items if item.novelty_type.dian_type == 'LNR')
+            for employee_id, bucket in novelties.items()
+        }
+
+    def _provision(self):
+        period = self.period
+        smmlv = LegalParameter.get_value('SMMLV', period.end_date)
+        aux_trans = LegalParameter.get_value('AUX_TRANS', period.end_date)
+        unpaid = self._unpaid_days()
+
+        totals_by_cc = defaultdict(lambda: dict.fromkeys(PROVISION_FIELDS, Decimal('0')))
+        count, batch = 0, []
+        for row in self._employees().iterator(chunk_size=self.batch_size):
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                count += self._provision_batch(batch, smmlv, aux_trans, unpaid, totals_by_cc)
+                batch = []
+        if batch:
+            count += self._provision_batch(batch, smmlv, aux_trans, unpaid, totals_by_cc)
+        return totals_by_cc, count
+
+    def _provision_batch(self, rows, smmlv, aux_trans, unpaid, totals_by_cc):
+        period = self.period
+        ids, cost_centers, salaries, eligible, starts, ends = zip(*rows)
+
+        days = [
+            max(calculate_commercial_days(max(start, period.start_date), min(end or period.end_date, period.end_date))
+                - unpaid.get(employee_id, 0), 0)
+            for employee_id, start, end in zip(ids, starts, ends)
+        ]
+        # Auxilio de transporte mensual: hace parte de la base de cesantías y prima
+        transport = [
+            aux_trans if is_eligible and salary <= smmlv * 2 else Decimal('0')
+            for salary, is_eligible in zip(salaries, eligible)
+        ]
+        columns = compute_provisions(salaries, transport, days, self.interest_rate)
+
+        PayrollProvision.objects.bulk_create([
+            PayrollProvision(
+                period_id=period.pk, employee_id=ids[i], cost_center_id=cost_centers[i],
+                base_salary=salaries[i], transport_allowance=transport[i], days=days[i],
+                **{field: columns[field][i] for field in PROVISION_FIELDS},
+            )
+            for i in range(len(ids))
+        ], batch_size=self.batch_size)
+
+        for i, cost_center_id in enumerate(cost_centers):
+            totals = totals_by_cc[cost_center_id]
+            for field in PROVISION_FIELDS:
+                totals[field] += columns[field][i]
+        return len(ids)
+
+    # ------------------------------------------------------------------
+    # Contabilización
+    # ------------------------------------------------------------------
+    def _post(self, totals_by_cc, accounts):
+        period = self.period
+        now = timezone.now()
+        user_id = self.user.pk if self.user else None
+        period_type = ContentType.objects.get_for_model(period)
+        cost_center_ids = sorted(totals_by_cc, key=lambda pk: (pk is None, pk or 0))
+
+        entries = JournalEntry.objects.bulk_create([
+            JournalEntry(
+                client_id=self.client_id, entry_type='DIARIO',
+                number=f"PROV-{period.pk}-{cost_center_id or 'GEN'}", date=period.end_date,
+                description=f"Provisión prestaciones sociales {period.name}",
+                content_type=period_type, object_id=period.pk, status='POSTED',
+                created_by_id=user_id, posted_by_id=user_id, posted_at=now,
+            )
+            for cost_center_id in cost_center_ids
+        ])
+
+        lines = []
+        for entry, cost_center_id in zip(entries, cost_center_ids):
+            totals = totals_by_cc[cost_center_id]
+            line_number = 0
+            for field in PROVISION_FIELDS:
+                if not totals[field]:
+                    continue
+                debit_id, credit_id = accounts[field]
+                for account_id, debit, credit in ((debit_id, totals[field], Decimal('0')),
+                                                  (credit_id, Decimal('0'), totals[field])):
+                    line_number += 1
+                    lines.append(JournalEntryLine(
+                        client_id=self.client_id, entry_id=entry.pk, line_number=line_number,
+                        account_id=account_id, cost_center_id=cost_center_id,
+                        description=f"Provisión {PROVISION_LABELS[field]} {period.name}",
+                        debit=debit, credit=credit,
+                    ))
+            PayrollProvision.objects.filter(
+                period=period, cost_center_id=cost_center_id, employee__third_party__client_id=self.client_id,
+            ).update(journal_entry=entry)
+        JournalEntryLine.objects.bulk_create(lines, batch_size=1000)
+
+        ledger_bulk_written(self.client_id, period.end_date)
+        return entries
@@ -0,0 +1,265 @@
+"""
+Reliquidación retroactiva de nómina.
+
+Índice de dependencias: cuando cambia un parámetro de ley o una novedad,
+`parameter_dependencies` / `novelty_dependencies` resuelven con una consulta
+qué parejas (periodo, empleado) ya liquidadas dependen del cambio, y
+`mark_retro_pending` las deja en PayrollRetroChange. Solo se marcan los
+empleados a los que el parámetro realmente afecta:
+
+- AUX_TRANS: quienes recibieron auxilio de transporte.
+- SMMLV: quienes tienen auxilio y ganan hasta 2 SMMLV (antes o después del
+  cambio) o rozan el tope de IBC de 25 SMMLV.
+- MAX_WEEKLY_HOURS: quienes tienen novedades por horas en el periodo.
+- UVT: quienes tuvieron retención en la fuente o devengaron al menos la
+  base mínima gravada (95 UVT).
+
+RetroactiveEngine recalcula solo las parejas pendientes, compara contra los
+PayrollDetail guardados y escribe únicamente donde hay diferencias: en el
+mismo documento si aún no fue transmitido, o como nota de ajuste
+(NominaIndividualDeAjuste, reemplazar) si la DIAN ya lo recibió. El costo
+es proporcional al cambio, no al tamaño de la nómina.
+
+Si el periodo ya estaba contabilizado, los comprobantes NOM- no se
+reescriben: la diferencia por concepto se contabiliza en un comprobante de
+ajuste y las provisiones del periodo, si existían, se recalculan.
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from .models import (
+    Employee, EmployeeNovelty, PayrollConcept, PayrollDetail, PayrollDocument, PayrollPeriod, PayrollProvision,
+    PayrollRetroChange,
+)
+from .novelty_engine import EmployeeNovelties, load_period_novelties
+from .posting_service import period_entries, post_difference
+from .provisions_service import ProvisionService
+from .services import PAYROLL_PARAMETERS, PayrollCalculator, legal_parameters
+from .withholding_service import WITHHOLDING_CODE, apply_withholding, save_audits
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal('0.01')
+# Documentos ya recibidos por la DIAN: se corrigen con nota de ajuste
+TRANSMITTED_STATUSES = ('ACCEPTED', 'SENT')
+TRANSPORT_CODES = ('AUX_TRANSPORTE',)
+
+
+def _liquidated_periods():
+    return PayrollPeriod.objects.exclude(status='DRAFT')
+
+
+def novelty_dependencies(employee_id, start_date, end_date):
+    """Periodos liquidados del empleado que se cruzan con el rango de la novedad."""
+    periods = _liquidated_periods().filter(
+        start_date__lte=end_date, end_date__gte=start_date, documents__employee_id=employee_id,
+    ).values_list('id', flat=True).distinct()
+    return [(period_id, employee_id) for period_id in periods]
+
+
+def parameter_dependencies(key, valid_from, valid_to=None, values=()):
+    """
+    Parejas (periodo, empleado) cuya liquidación usa el parámetro en su
+    vigencia. `values` son los valores antes y después del cambio.
+    """
+    if key not in PAYROLL_PARAMETERS:
+        return []
+    # La liquidación toma los parámetros vigentes a la fecha fin del periodo
+    periods = _liquidated_periods().filter(end_date__gte=valid_from)
+    if valid_to:
+        periods = periods.filter(end_date__lte=valid_to)
+    documents = PayrollDocument.objects.filter(period__in=periods, document_type='102')
+
+    if key == 'AUX_TRANS':
+        documents = documents.filter(details__dian_code__in=TRANSPORT_CODES)
+    elif key == 'SMMLV':
+        values = [value for value in values if value]
+        if values:
+            documents = documents.filter(
+                Q(employee__transport_allowance_eligible=True, employee__base_salary__lte=max(values) * 2)
+                | Q(employee__base_salary__gte=min(values) * 25)
+            )
+    elif key == 'UVT':
+        values = [value for value in values if value]
+        withheld = Q(details__dian_code=WITHHOLDING_CODE)
+        documents = documents.filter(withheld | Q(accrued_total__gte=min(values) * 95) if values else withheld)
+    elif key == 'MAX_WEEKLY_HOURS':
+        documents = documents.filter(Exists(EmployeeNovelty.objects.filter(
+            employee=OuterRef('employee'), novelty_type__unit='HOURS',
+            start_date__lte=OuterRef('period__end_date'), end_date__gte=OuterRef('period__start_date'),
+        )))
+    return list(documents.values_list('period_id', 'employee_id').distinct())
+
+
+def mark_retro_pending(pairs, reason):
+    """Registra las parejas a reliquidar; las ya pendientes se conservan."""
+    if pairs:
+        PayrollRetroChange.objects.bulk_create(
+            [PayrollRetroChange(period_id=period_id, employee_id=employee_id, reason=reason[:100])
+             for period_id, employee_id in set(pairs)],
+            ignore_conflicts=True,
+        )
+
+
+def _summarize(rows):
+    """{(tipo, código): (cantidad, valor)} con cada línea redondeada como se guarda."""
+    summary = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+    for concept_type, code, quantity, value in rows:
+        totals = summary[(concept_type, code)]
+        totals[0] += Decimal(quantity or 0).quantize(CENT)
+        totals[1] += Decimal(value or 0).quantize(CENT)
+    return {key: tuple(totals) for key, totals in summary.items()}
+
+
+class RetroactiveEngine:
+    """Reliquida las parejas pendientes de un tenant y emite las diferencias."""
+
+    def __init__(self, client_id, user=None):
+        self.client_id = client_id
+        self.user = user
+
+    def run(self, period=None, dry_run=False):
+        """
+        Args:
+            period: limita la reliquidación a un periodo.
+            dry_run: calcula y devuelve las diferencias sin guardar nada.
+
+        Returns:
+            dict con contadores, documentos actualizados, notas de ajuste,
+            las diferencias por concepto y los comprobantes de ajuste.
+        """
+        pending = PayrollRetroChange.objects.filter(employee__third_party__client_id=self.client_id)
+        if period is not None:
+            pending = pending.filter(period=period)
+        pending = list(pending.values_list('id', 'period_id', 'employee_id'))
+
+        by_period = defaultdict(set)
+        for _, period_id, employee_id in pending:
+            by_period[period_id].add(employee_id)
+
+        summary = {'periods': len(by_period), 'checked': 0, 'unchanged': 0, 'updated': [], 'adjustments': [],
+                   'changes': [], 'entries': []}
+        if not pending:
+            return summary
+
+        self.concepts = {concept.code: concept for concept in PayrollConcept.objects.all()}
+        periods = PayrollPeriod.objects.in_bulk(list(by_period))
+        with transaction.atomic():
+            for period_id in sorted(by_period):
+                self._recalculate(periods[period_id], by_period[period_id], summary, dry_run)
+            if not dry_run:
+                PayrollRetroChange.objects.filter(pk__in=[pk for pk, _, _ in pending]).delete()
+
+        logger.info(
+            f"Retroactivo tenant {self.client_id}: {summary['checked']} empleados revisados, "
+            f"{len(summary['updated'])} actualizados, {len(summary['adjustments'])} notas de ajuste"
+        )
+        return summary
+
+    def _current_documents(self, period, employee_ids):
+        """Última versión vigente de la nómina de cada empleado (original o reemplazo)."""
+        current = {}
+        for document in (PayrollDocument.objects
+                         .filter(period=period, employee_id__in=employee_ids)
+                         .prefetch_related('details').order_by('id')):
+            current[document.employee_id] = document
+        # Si la última versión es una nota de eliminación, no hay nómina que corregir
+        return {employee_id: document for employee_id, document in current.items()
+                if not (document.document_type == '103' and document.adjustment_type == '2')}
+
+    def _recalculate(self, period, employee_ids, summary, dry_run):
+        parameters = legal_parameters(period.end_date)
+        novelties = load_period_novelties(period.start_date, period.end_date, list(employee_ids))
+        employees = Employee.objects.in_bulk(list(employee_ids))
+        documents = self._current_documents(period, employee_ids)
+
+        # Cálculo de todos los pendientes y una sola pasada de retención
+        liquidations, calculators = [], []
+        for employee_id in sorted(documents):
+            calculator = PayrollCalculator(
+                employees[employee_id], period.start_date, period.end_date,
+                novelties=novelties.get(employee_id, EmployeeNovelties()), concepts=self.concepts,
+                parameters=parameters,
+            )
+            liquidations.append((employees[employee_id], calculator.calculate_concepts()))
+            calculators.append(calculator)
+        withholdings = apply_withholding(liquidations, parameters['UVT'], period.end_date.year, self.concepts)
+
+        in_place, adjustments, new_details, audits = [], [], [], []
+        # Diferencias a contabilizar: (dian_code, tipo, centro de costo, nuevo - anterior)
+        deltas = []
+        for (employee, concepts), calculator, withholding in zip(liquidations, calculators, withholdings):
+            employee_id = employee.pk
+            document = documents[employee_id]
+            summary['checked'] += 1
+
+            before = _summarize((d.concept_type, d.dian_code, d.quantity, d.value) for d in document.details.all())
+            after = _summarize((c['type'], c['code'], c['quantity'], c['value']) for c in concepts)
+            if before == after:
+                summary['unchanged'] += 1
+                continue
+
+            zero = (Decimal('0'), Decimal('0'))
+            for key in sorted(set(before) | set(after)):
+                old, new = before.get(key, zero)[1], after.get(key, zero)[1]
+                if old != new:
+                    summary['changes'].append({
+                        'period': period.pk, 'employee': employee.code, 'type': key[0], 'code': key[1],
+                        'before': old, 'after': new, 'delta': new - old,
+                    })
+                    deltas.append((key[1], key[0], employee.cost_center_id, new - old))
+
+            accrued = sum((value for (kind, _), (_, value) in after.items() if kind == 'EARNING'), Decimal('0'))
+            deductions = sum((value for (kind, _), (_, value) in after.items() if kind == 'DEDUCTION'), Decimal('0'))
+            totals = dict(
+                worked_days=calculator.days_worked - calculator.novelty_days, novelty_days=calculator.novelty_days,
+                accrued_total=accrued, deductions_total=deductions, net_total=accrued - deductions,
+            )
+            if document.dian_status in TRANSMITTED_STATUSES:
+                target = PayrollDocument(
+                    period=period, employee_id=employee_id, conseccutive=0, document_type='103',
+                    adjustment_type='1', adjusted_document=document, **totals,
+                )
+                adjustments.append(target)
+            else:
+                target = document
+                for field, value in totals.items():
+                    setattr(target, field, value)
+                in_place.append(target)
+            new_details.append((target, concepts))
+            audits.append(withholding)
+
+        if not dry_run and new_details:
+            PayrollDocument.objects.bulk_create(adjustments)
+            PayrollDetail.objects.filter(document__in=in_place).delete()
+            PayrollDocument.objects.bulk_update(
+                in_place, ['worked_days', 'novelty_days', 'accrued_total', 'deductions_total', 'net_total'],
+                batch_size=500,
+            )
+            PayrollDetail.objects.bulk_create([
+                PayrollDetail(document=target, concept_type=c['type'], dian_code=c['code'],
+                              description=c['description'], quantity=c['quantity'], value=c['value'])
+                for target, concepts in new_details for c in concepts
+            ], batch_size=1000)
+            save_audits([target for target, _ in new_details], audits)
+            self._post_difference(period, deltas, summary)
+        # En simulación las notas de ajuste no tienen id todavía
+        summary['updated'] += [{'employee': employees[d.employee_id].code, 'document': d.pk} for d in in_place]
+        summary['adjustments'] += [
+            {'employee': employees[d.employee_id].code, 'document': d.pk, 'adjusts': d.adjusted_document_id}
+            for d in adjustments
+        ]
+
+    def _post_difference(self, period, deltas, summary):
+        """Periodo ya contabilizado: ajuste por la diferencia y provisiones al día."""
+        if not period_entries(period, self.client_id).exists():
+            return
+        number = post_difference(period, self.client_id, deltas, self.user)
+        if number:
+            summary['entries'].append(number)
+        if PayrollProvision.objects.filter(period=period, employee__third_party__client_id=self.client_id).exists():
+            summary['entries'] += ProvisionService(period, self.client_id, self.user).run()['entries']
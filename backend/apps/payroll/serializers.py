@@ -1,5 +1,9 @@
 from rest_framework import serializers
-from .models import LegalParameter, NoveltyType, EmployeeNovelty, Employee, PayrollPeriod, PayrollDocument, PayrollDetail
+from apps.common.mixins import DynamicFieldsMixin
+from .models import (
+    LegalParameter, NoveltyType, EmployeeNovelty, Employee, PayrollPeriod, PayrollDocument, PayrollDetail,
+    PayrollAccountMapping, PayrollTransmission, PayrollTransmissionItem,
+)
 import datetime
 from django.db.models import Q
 
@@ -28,10 +32,12 @@ class EmployeeNoveltySerializer(serializers.ModelSerializer):
         fields = [
             'id', 'employee', 'employee_name', 
             'novelty_type', 'novelty_code', 'novelty_name',
-            'start_date', 'end_date', 'days', 'total_value',
+            'start_date', 'end_date', 'days', 'hours', 'total_value',
             'attachment', 'document_url'
         ]
         read_only_fields = ['novelty_type', 'total_value', 'end_date']
+        # Las novedades por horas no reportan días
+        extra_kwargs = {'days': {'required': False}}
 
     def validate(self, data):
         """
@@ -49,6 +55,14 @@ class EmployeeNoveltySerializer(serializers.ModelSerializer):
         start_date = data.get('start_date')
         days = data.get('days')
 
+        if novelty.unit == 'HOURS':
+            # Horas extras y recargos: se reportan en horas y no ocupan días
+            if not data.get('hours') or data['hours'] <= 0:
+                raise serializers.ValidationError({"hours": "La cantidad de horas debe ser mayor a 0."})
+            data['days'] = 0
+            data['end_date'] = start_date
+            return data
+
         if not days or days <= 0:
              raise serializers.ValidationError({"days": "La cantidad de días debe ser mayor a 0."})
 
@@ -64,7 +78,7 @@ class EmployeeNoveltySerializer(serializers.ModelSerializer):
         # (StartA <= EndB) and (EndA >= StartB)
         overlapping = EmployeeNovelty.objects.filter(
             employee=employee
-        ).filter(
+        ).exclude(novelty_type__unit='HOURS').filter(
             Q(start_date__lte=calculated_end_date) & Q(end_date__gte=start_date)
         )
         
@@ -98,7 +112,7 @@ class PayrollDetailSerializer(serializers.ModelSerializer):
         model = PayrollDetail
         fields = '__all__'
 
-class PayrollDocumentSerializer(serializers.ModelSerializer):
+class PayrollDocumentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     employee_name = serializers.CharField(source='employee.third_party.get_full_name', read_only=True)
     details = PayrollDetailSerializer(many=True, read_only=True)
     
@@ -110,3 +124,34 @@ class PayrollPeriodSerializer(serializers.ModelSerializer):
     class Meta:
         model = PayrollPeriod
         fields = '__all__'
+
+class PayrollAccountMappingSerializer(serializers.ModelSerializer):
+    concept_code = serializers.CharField(source='concept.code', read_only=True)
+    debit_account_code = serializers.CharField(source='debit_account.code', read_only=True)
+    credit_account_code = serializers.CharField(source='credit_account.code', read_only=True)
+
+    class Meta:
+        model = PayrollAccountMapping
+        fields = [
+            'id', 'concept', 'concept_code', 'debit_account', 'debit_account_code',
+            'credit_account', 'credit_account_code', 'updated_at'
+        ]
+        read_only_fields = ['updated_at']
+
+
+class PayrollTransmissionItemSerializer(serializers.ModelSerializer):
+    employee_code = serializers.CharField(source='document.employee.code', read_only=True)
+
+    class Meta:
+        model = PayrollTransmissionItem
+        fields = ['id', 'document', 'employee_code', 'result', 'status_code', 'build_ms', 'sign_ms', 'send_ms', 'error']
+
+
+class PayrollTransmissionSerializer(serializers.ModelSerializer):
+    items = PayrollTransmissionItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = PayrollTransmission
+        fields = ['id', 'period', 'status', 'document_count', 'accepted_count', 'rejected_count', 'failed_count',
+                  'metrics', 'error', 'created_by', 'created_at', 'finished_at', 'items']
+        read_only_fields = fields
@@ -1,17 +1,49 @@
+from datetime import date
 from decimal import Decimal
+from django.db.models import Q
 from .models import LegalParameter, NoveltyType, EmployeeNovelty, PayrollDetail, PayrollConcept
 from .utils import calculate_commercial_days
+from .novelty_engine import load_period_novelties
 # from .models import PayrollDocument # Avoid circular import if possible, pass objects instead
 
+# Devengados que no son factor salarial (no entran al IBC)
+NON_SALARY_CODES = ('AUX_TRANSPORTE', 'AUX_CONECTIVIDAD', 'BONIFICACION_NS')
+
+# Parámetros de ley que usa la liquidación
+PAYROLL_PARAMETERS = ('SMMLV', 'AUX_TRANS', 'MAX_WEEKLY_HOURS', 'UVT')
+
+
+def legal_parameters(query_date=None):
+    """Valores vigentes de los parámetros de liquidación en la fecha, en una consulta."""
+    query_date = query_date or date.today()
+    values = {}
+    for key, value in LegalParameter.objects.filter(
+        key__in=PAYROLL_PARAMETERS, valid_from__lte=query_date,
+    ).filter(Q(valid_to__gte=query_date) | Q(valid_to__isnull=True)).values_list('key', 'value'):
+        values.setdefault(key, value)  # ordering = -valid_from: el primero es el vigente
+    # Los que falten toman el valor por defecto de LegalParameter.get_value
+    return {key: values[key] if key in values else LegalParameter.get_value(key, query_date)
+            for key in PAYROLL_PARAMETERS}
+
+
 class SocialSecurityCalculator:
     """
     Calcula IBC y aportes (Salud, Pensión, ARL, Parafiscales)
     Cumple con la norma de 'Piso de Protección Social' y la regla del 40% para independientes (aquí empleados).
     Ahora usa PayrollConcept para obtener porcentajes dinámicos.
     """
+
+    # Tarifa ARL por clase de riesgo (Decreto 1772 de 1994)
+    ARL_RATES = {
+        1: Decimal('0.00522'),
+        2: Decimal('0.01044'),
+        3: Decimal('0.02436'),
+        4: Decimal('0.04350'),
+        5: Decimal('0.06960'),
+    }
     
     @staticmethod
-    def calculate_ibc(total_earned, is_integral_salary=False):
+    def calculate_ibc(total_earned, is_integral_salary=False, smmlv=None):
         """
         Calcula el Ingreso Base de Cotización.
         - Regla general: 100% del Salario + Otros factores salariales.
@@ -19,7 +51,8 @@ class SocialSecurityCalculator:
         - Tope máximo: 25 SMMLV.
         - Tope mínimo: 1 SMMLV (ajustado por días trabajados).
         """
-        smmlv = LegalParameter.get_value('SMMLV')
+        if smmlv is None:
+            smmlv = LegalParameter.get_value('SMMLV')
         if not smmlv: smmlv = Decimal('1300000') # Seguridad en caso de que falle la carga
 
         if is_integral_salary:
@@ -35,12 +68,16 @@ class SocialSecurityCalculator:
         return ibc
 
     @staticmethod
-    def get_contributions(ibc, risk_level=1):
+    def get_contributions(ibc, risk_level=1, concepts=None):
         """
         Retorna diccionario con los aportes empresa/empleado usando conceptos maestros.
+        concepts: {code: PayrollConcept} ya cargado (evita consultar por empleado).
         """
         # Obtener porcentajes de la DB
         def get_pct(code, default):
+            if concepts is not None:
+                 obj = concepts.get(code)
+                 return obj.percentage / 100 if obj else Decimal(default)
             try:
                  obj = PayrollConcept.objects.get(code=code)
                  return obj.percentage / 100
@@ -54,15 +91,7 @@ class SocialSecurityCalculator:
         HEALTH_COMP = Decimal('0.085') # Exoneración si < 10 SMMLV
         PENSION_COMP = Decimal('0.12')
         
-        ARL_RATES = {
-            1: Decimal('0.00522'),
-            2: Decimal('0.01044'),
-            3: Decimal('0.02436'),
-            4: Decimal('0.04350'),
-            5: Decimal('0.06960'),
-        }
-        
-        arl_rate = ARL_RATES.get(risk_level, Decimal('0.00522'))
+        arl_rate = SocialSecurityCalculator.ARL_RATES.get(risk_level, Decimal('0.00522'))
         
         return {
             'health_employee': ibc * HEALTH_EMP_RATE,
@@ -78,19 +107,36 @@ class PayrollCalculator:
     Usa PayrollConcept para aplicar reglas y porcentajes de ley automáticamente.
     """
     
-    def __init__(self, employee, start_date, end_date):
+    def __init__(self, employee, start_date, end_date, novelties=None, concepts=None, parameters=None):
+        """
+        novelties: EmployeeNovelties del empleado ya recortadas al periodo
+            (ver novelty_engine.load_period_novelties). Si no se pasan se
+            cargan solo las de este empleado.
+        concepts: {code: PayrollConcept} compartido entre empleados.
+        parameters: {clave LegalParameter: valor} (ver legal_parameters); las
+            simulaciones pasan aquí los valores modificados.
+        """
         self.employee = employee
         self.start_date = start_date
         self.end_date = end_date
+        if novelties is None:
+            novelties = load_period_novelties(start_date, end_date, [employee.pk])[employee.pk]
+        self.novelties = novelties
+        if concepts is None:
+            concepts = {concept.code: concept for concept in PayrollConcept.objects.all()}
+        self.concepts = concepts
         # self.days_worked = (end_date - start_date).days + 1 # DEPRECATED: Usar lógica comercial colombiana 360
         self.days_worked = calculate_commercial_days(start_date, end_date)
         
         # Cargar parámetros globales
-        self.smmlv = LegalParameter.get_value('SMMLV')
-        self.aux_trans = LegalParameter.get_value('AUX_TRANS')
-        self.max_hours = LegalParameter.get_value('MAX_WEEKLY_HOURS') # 42 en 2026, 48 legado
+        if parameters is None:
+            parameters = legal_parameters(end_date)
+        self.parameters = parameters
+        self.smmlv = parameters['SMMLV']
+        self.aux_trans = parameters['AUX_TRANS']
+        self.max_hours = parameters['MAX_WEEKLY_HOURS'] # 42 en 2026, 48 legado
         if not self.max_hours: self.max_hours = 240 # Fallback mensual
-        else: self.max_hours = self.max_hours * 4 # Aprox mensual si viene semanal
+        else: self.max_hours = self.max_hours * 30 / 6 # Horas mensuales: semana de 6 días, mes de 30
         
     def calculate_concepts(self):
         """
@@ -98,20 +144,16 @@ class PayrollCalculator:
         """
         concepts = []
         
-        # 1. Salario Base (Proporcional a días trabajados - novedades)
-        # Buscar novedades en el periodo
-        novelties = EmployeeNovelty.objects.filter(
-            employee=self.employee,
-            start_date__gte=self.start_date,
-            end_date__lte=self.end_date
-        )
-        
-        novelty_days = sum(n.days for n in novelties)
+        # 1. Salario Base (Proporcional a días trabajados - novedades por días)
+        # Novedades del periodo, incluidas las que empiezan o terminan fuera de él
+        novelties = self.novelties
+
+        novelty_days = novelties.days
         paid_days = self.days_worked - novelty_days
         
         self.novelty_days = novelty_days # Expose for Dashboard
         
-        salary_concept = PayrollConcept.objects.filter(code='BASICO').first()
+        salary_concept = self.concepts.get('BASICO')
         salary_payment = (self.employee.base_salary / 30) * paid_days
         
         concepts.append({
@@ -125,13 +167,10 @@ class PayrollCalculator:
         # 2. Auxilio de Transporte (Si aplica y < 2 SMMLV)
         if self.employee.transport_allowance_eligible and self.employee.base_salary <= (self.smmlv * 2):
             # Descontar días de novedades que afectan auxilio
-            transport_days = self.days_worked
-            for nov in novelties:
-                if nov.novelty_type.affects_transport_aid:
-                    transport_days -= nov.days
+            transport_days = self.days_worked - novelties.transport_days
             
             if transport_days > 0:
-                aux_concept = PayrollConcept.objects.filter(code='TRANSPORTE').first()
+                aux_concept = self.concepts.get('TRANSPORTE')
                 aux_value = (self.aux_trans / 30) * transport_days
                 concepts.append({
                     'code': aux_concept.dian_code if aux_concept else 'AUX_TRANSPORTE',
@@ -143,12 +182,12 @@ class PayrollCalculator:
 
         # 3. Procesar Novedades (Incapacidades, Horas Extras Dinámicas, etc.)
         # Calculamos Valor Hora Ordinaria para extras
-        hour_value = self.employee.base_salary / 240 # Normativa 240H o division 30/8
+        hour_value = self.employee.base_salary / self.max_hours # 240H con jornada de 48, 210H con 42
         
         for nov in novelties:
             # Estrategia: Buscar si el NoveltyType tiene mapeo a un PayrollConcept
             # Asumimos que NoveltyType.dian_type coincide con PayrollConcept.code (Ej: HED)
-            concept_master = PayrollConcept.objects.filter(code=nov.novelty_type.dian_type).first()
+            concept_master = self.concepts.get(nov.novelty_type.dian_type)
             
             val = Decimal(0)
             desc = nov.novelty_type.name
@@ -173,29 +212,27 @@ class PayrollCalculator:
                      if "Recargo" in concept_master.name and "Extra" not in concept_master.name:
                           factor = (concept_master.percentage / 100)
                      
-                     val = hour_value * factor * nov.days # nov.days aqui serian HORAS reportadas
-                     # WARNING: El campo se llama 'days', toca interpretar si es dias u horas segun el tipo.
-                     # Asumiremos que para HED, HEN, etc, el usuario ingresa HORAS en el campo days.
+                     val = hour_value * factor * nov.quantity # Horas si el tipo es por horas
                 
                 else:
                      # Es una incapacidad o licencia (porcentaje viene de ley pero a veces de config)
                      # Usamos lógica de días (sueldo diario)
                      # Incapacidad 66.67%
                      if "INCAPACIDAD" in concept_master.code:
-                         val = (self.employee.base_salary / 30) * nov.days * (Decimal(66.67)/100)
+                         val = (self.employee.base_salary / 30) * nov.quantity * (Decimal(66.67)/100)
                      elif "LICENCIA" in concept_master.code:
-                         val = (self.employee.base_salary / 30) * nov.days
+                         val = (self.employee.base_salary / 30) * nov.quantity
             else:
                  # Fallback logica antigua o genérica
                  factor = nov.novelty_type.payroll_payment_percentage
                  if factor > 0:
-                    val = (self.employee.base_salary / 30) * nov.days * factor
+                    val = (self.employee.base_salary / 30) * nov.quantity * factor
 
             if val > 0:
                 concepts.append({
                     'code': concept_master.dian_code if concept_master else nov.novelty_type.dian_type,
                     'description': desc,
-                    'quantity': nov.days,
+                    'quantity': nov.quantity,
                     'value': val,
                     'type': 'EARNING' if not concept_master or concept_master.concept_type == 'EARNING' else 'DEDUCTION'
                 })
@@ -212,16 +249,17 @@ class PayrollCalculator:
         for c in concepts:
             # Buscar si es salarial en DB o hardcode
             # Por eficiencia, asumimos logica: Todo suma menos Aux Trans y Bonos No Salariales
-            if c['code'] not in ['AUX_TRANSPORTE', 'AUX_CONECTIVIDAD', 'BONIFICACION_NS']:
+            if c['code'] not in NON_SALARY_CODES:
                 base_ibc += c['value']
 
-        ibc = SocialSecurityCalculator.calculate_ibc(base_ibc)
-        contribs = SocialSecurityCalculator.get_contributions(ibc, self.employee.risk_level)
+        ibc = SocialSecurityCalculator.calculate_ibc(base_ibc, smmlv=self.smmlv)
+        contribs = SocialSecurityCalculator.get_contributions(ibc, self.employee.risk_level, self.concepts)
+        self.contributions = contribs # Aportes empresa para costo total (simulaciones)
         
         # Deducciones Empleado
         # Buscar Conceptos para obtener nombre y codigos actualizados
-        salud_concept = PayrollConcept.objects.filter(code='SALUD').first()
-        pension_concept = PayrollConcept.objects.filter(code='PENSION').first()
+        salud_concept = self.concepts.get('SALUD')
+        pension_concept = self.concepts.get('PENSION')
 
         concepts.append({
             'code': salud_concept.dian_code if salud_concept else 'SALUD',
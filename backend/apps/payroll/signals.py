@@ -0,0 +1,72 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.common.mixins import touch_catalog
+
+from .models import EmployeeNovelty, LegalParameter, PayrollAccountMapping, PayrollConcept
+from .retro_service import mark_retro_pending, novelty_dependencies, parameter_dependencies
+from .services import PAYROLL_PARAMETERS
+
+
+@receiver([post_save, post_delete], sender=PayrollAccountMapping)
+@receiver([post_save, post_delete], sender=PayrollConcept)
+def account_mapping_changed(sender, instance, **kwargs):
+    # Invalida las cuentas por concepto en caché (posting_service.concept_accounts)
+    touch_catalog(sender, getattr(instance, 'client_id', None))
+
+
+# --- Reliquidación retroactiva: el cambio marca solo lo que depende de él ---
+
+@receiver(pre_save, sender=LegalParameter)
+def legal_parameter_before(sender, instance, **kwargs):
+    previous = LegalParameter.objects.filter(pk=instance.pk).first() if instance.pk else None
+    if previous is not None:
+        instance._retro_previous = (previous.key, previous.valid_from, previous.valid_to, previous.value)
+    elif instance.key in PAYROLL_PARAMETERS:
+        # Parámetro nuevo: reemplaza al que regía desde su fecha de inicio
+        instance._retro_previous = (instance.key, instance.valid_from, instance.valid_to,
+                                    LegalParameter.get_value(instance.key, instance.valid_from))
+
+
+@receiver(post_save, sender=LegalParameter)
+def legal_parameter_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_retro_previous', None)
+    current = (instance.key, instance.valid_from, instance.valid_to, instance.value)
+    if previous is None or previous == current:
+        return
+    values = (previous[3], instance.value)
+    pairs = parameter_dependencies(instance.key, instance.valid_from, instance.valid_to, values)
+    if previous[:3] != current[:3]:
+        pairs += parameter_dependencies(previous[0], previous[1], previous[2], values)
+    mark_retro_pending(pairs, f"{instance.key} desde {instance.valid_from}")
+
+
+@receiver(post_delete, sender=LegalParameter)
+def legal_parameter_deleted(sender, instance, **kwargs):
+    values = (instance.value, LegalParameter.get_value(instance.key, instance.valid_from))
+    pairs = parameter_dependencies(instance.key, instance.valid_from, instance.valid_to, values)
+    mark_retro_pending(pairs, f"{instance.key} eliminado")
+
+
+@receiver(pre_save, sender=EmployeeNovelty)
+def novelty_before(sender, instance, **kwargs):
+    if instance.pk:
+        instance._retro_previous = (
+            EmployeeNovelty.objects.filter(pk=instance.pk)
+            .values_list('employee_id', 'start_date', 'end_date').first()
+        )
+
+
+@receiver(post_save, sender=EmployeeNovelty)
+def novelty_saved(sender, instance, **kwargs):
+    pairs = novelty_dependencies(instance.employee_id, instance.start_date, instance.end_date)
+    previous = getattr(instance, '_retro_previous', None)
+    if previous and previous != (instance.employee_id, instance.start_date, instance.end_date):
+        pairs += novelty_dependencies(*previous)
+    mark_retro_pending(pairs, f"Novedad {instance.pk}")
+
+
+@receiver(post_delete, sender=EmployeeNovelty)
+def novelty_deleted(sender, instance, **kwargs):
+    pairs = novelty_dependencies(instance.employee_id, instance.start_date, instance.end_date)
+    mark_retro_pending(pairs, f"Novedad {instance.pk} eliminada")
@@ -0,0 +1,153 @@
+"""
+Simulación de costo de nómina con parámetros de ley modificados.
+
+Toma una foto del periodo (empleados, novedades recortadas y conceptos) con
+tres consultas y ejecuta PayrollCalculator dos veces en memoria: con los
+parámetros vigentes y con los modificados. Las provisiones de prestaciones
+se calculan por columnas para todos los empleados a la vez. No escribe nada
+en la base de datos: la nómina persistida no se toca.
+"""
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+
+from apps.accounting.models import CostCenter
+
+from .models import Employee, PayrollConcept
+from .novelty_engine import EmployeeNovelties, load_period_novelties
+from .provisions_service import PROVISION_FIELDS, compute_provisions
+from .services import PAYROLL_PARAMETERS, PayrollCalculator, legal_parameters
+from .withholding_service import apply_withholding
+
+# Aportes a cargo del empleador que suman al costo
+EMPLOYER_CONTRIBUTIONS = ('health_company', 'pension_company', 'arl_company')
+CENT = Decimal('0.01')
+
+
+class PayrollSnapshot:
+    """Foto inmutable de los datos de un periodo para simular."""
+
+    def __init__(self, period, client_id):
+        self.period = period
+        self.employees = list(
+            Employee.objects
+            .filter(third_party__client_id=client_id, is_active=True)
+            .only('id', 'base_salary', 'transport_allowance_eligible', 'risk_level', 'cost_center_id',
+                  'withholding_procedure', 'withholding_rate', 'has_dependents', 'prepaid_health',
+                  'housing_interest', 'voluntary_contributions')
+            .order_by('id')
+        )
+        self.novelties = load_period_novelties(period.start_date, period.end_date,
+                                               [employee.pk for employee in self.employees])
+        self.concepts = {concept.code: concept for concept in PayrollConcept.objects.all()}
+        self.cost_centers = dict(
+            CostCenter.objects.filter(client_id=client_id).values_list('id', 'name')
+        )
+
+
+def parse_overrides(data):
+    """Valida {clave: valor} contra los parámetros de liquidación."""
+    overrides = {}
+    for key, value in (data or {}).items():
+        if key not in PAYROLL_PARAMETERS:
+            raise ValueError(f"Parámetro no simulable: {key}")
+        try:
+            value = Decimal(str(value))
+        except InvalidOperation:
+            raise ValueError(f"Valor inválido para {key}: {value}")
+        if value <= 0:
+            raise ValueError(f"El valor de {key} debe ser mayor a 0.")
+        overrides[key] = value
+    if not overrides:
+        raise ValueError("Indique al menos un parámetro a modificar.")
+    return overrides
+
+
+def _scenario_costs(snapshot, parameters):
+    """
+    Costo de un escenario: devengos, deducciones, aportes empresa y provisiones.
+
+    Returns:
+        ({(código, tipo): valor}, {cost_center_id: costo empresa})
+    """
+    period = snapshot.period
+    by_concept = defaultdict(Decimal)
+    by_cost_center = defaultdict(Decimal)
+    salaries, transport, days = [], [], []
+    empty = EmployeeNovelties()
+
+    liquidations, calculators = [], []
+    for employee in snapshot.employees:
+        novelties = snapshot.novelties.get(employee.pk, empty)
+        calculator = PayrollCalculator(
+            employee, period.start_date, period.end_date,
+            novelties=novelties, concepts=snapshot.concepts, parameters=parameters,
+        )
+        liquidations.append((employee, calculator.calculate_concepts()))
+        calculators.append(calculator)
+
+        # Mismas bases que ProvisionService: auxilio mensual y sin licencias no remuneradas
+        eligible = employee.transport_allowance_eligible and employee.base_salary <= parameters['SMMLV'] * 2
+        unpaid = sum(item.quantity for item in novelties.day_items if item.novelty_type.dian_type == 'LNR')
+        salaries.append(employee.base_salary)
+        transport.append(parameters['AUX_TRANS'] if eligible else Decimal('0'))
+        days.append(max(calculator.days_worked - unpaid, 0))
+    # Retención con la UVT del escenario, en una pasada para todos
+    apply_withholding(liquidations, parameters['UVT'], period.end_date.year, snapshot.concepts)
+
+    for (employee, concepts), calculator in zip(liquidations, calculators):
+        earned = Decimal('0')
+        for concept in concepts:
+            by_concept[(concept['code'], concept['type'])] += concept['value']
+            if concept['type'] == 'EARNING':
+                earned += concept['value']
+        employer = sum((calculator.contributions[key] for key in EMPLOYER_CONTRIBUTIONS), Decimal('0'))
+        by_concept[('APORTES_EMPRESA', 'EMPLOYER')] += employer
+        by_cost_center[employee.cost_center_id] += earned + employer
+
+    # Provisiones por columnas sobre todos los empleados
+    rate = Decimal(settings.PAYROLL_CONFIG['SEVERANCE_INTEREST_RATE'])
+    columns = compute_provisions(salaries, transport, days, rate)
+    for field in PROVISION_FIELDS:
+        by_concept[(field.upper(), 'PROVISION')] += sum(columns[field], Decimal('0'))
+        for employee, value in zip(snapshot.employees, columns[field]):
+            by_cost_center[employee.cost_center_id] += value
+    return by_concept, by_cost_center
+
+
+def _delta_rows(baseline, scenario, label):
+    rows = []
+    for key in sorted(set(baseline) | set(scenario), key=lambda item: str(item)):
+        before = baseline.get(key, Decimal('0')).quantize(CENT)
+        after = scenario.get(key, Decimal('0')).quantize(CENT)
+        rows.append({**label(key), 'baseline': before, 'scenario': after, 'delta': after - before})
+    return rows
+
+
+def simulate(period, client_id, overrides):
+    """
+    Compara el costo del periodo con los parámetros vigentes y con `overrides`.
+
+    Returns:
+        dict con parámetros, filas por concepto y por centro de costo y totales.
+    """
+    snapshot = PayrollSnapshot(period, client_id)
+    baseline_parameters = legal_parameters(period.end_date)
+    scenario_parameters = {**baseline_parameters, **overrides}
+
+    base_concepts, base_centers = _scenario_costs(snapshot, baseline_parameters)
+    new_concepts, new_centers = _scenario_costs(snapshot, scenario_parameters)
+
+    by_cost_center = _delta_rows(base_centers, new_centers, lambda pk: {
+        'cost_center': pk, 'name': snapshot.cost_centers.get(pk, 'Sin centro de costo'),
+    })
+    baseline_total = sum((row['baseline'] for row in by_cost_center), Decimal('0'))
+    scenario_total = sum((row['scenario'] for row in by_cost_center), Decimal('0'))
+    return {
+        'employees': len(snapshot.employees),
+        'parameters': {'baseline': baseline_parameters, 'scenario': scenario_parameters},
+        'by_concept': _delta_rows(base_concepts, new_concepts, lambda key: {'code': key[0], 'type': key[1]}),
+        'by_cost_center': by_cost_center,
+        'totals': {'baseline': baseline_total, 'scenario': scenario_total, 'delta': scenario_total - baseline_total},
+    }
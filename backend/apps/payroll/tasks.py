@@ -0,0 +1,20 @@
+from celery import shared_task
+from apps.tenants.utils import tenant_context
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def transmit_payroll_period(client_id, transmission_id):
+    """Construye, firma y envía a la DIAN la nómina electrónica de un periodo."""
+    from .models import PayrollTransmission
+    from .transmission_service import PayrollTransmissionService
+
+    with tenant_context(client_id):
+        transmission = PayrollTransmissionService(PayrollTransmission.objects.get(pk=transmission_id)).run()
+    logger.info(
+        f"Transmisión nómina {transmission_id}: tenant {client_id} -> {transmission.status}, "
+        f"{transmission.accepted_count}/{transmission.document_count} aceptados"
+    )
+    return transmission.status
@@ -0,0 +1,24 @@
+"""Datos de prueba compartidos por los tests de nómina."""
+from datetime import date
+
+from apps.accounting.models import ThirdParty
+from apps.payroll.models import Employee
+
+EMPLOYEE_DEFAULTS = {
+    'contract_type': 'INDEFINIDO', 'start_date': date(2025, 1, 1), 'health_entity': 'Sura',
+    'pension_entity': 'Porvenir', 'severance_entity': 'Porvenir', 'arl_entity': 'Sura', 'position': 'Analista',
+}
+
+
+def create_employee(client, code, salary, nit=None, first_name=None, surname='Test', **fields):
+    """
+    Empleado con su tercero. El NIT y el nombre toman el código si no se
+    indican; `fields` reemplaza los datos de contratación por defecto.
+    """
+    third_party = ThirdParty.objects.create(
+        client=client, party_type='EMPLEADO', person_type=2, first_name=first_name or code, surname=surname,
+        identification_number=nit or code, identification_type='13',
+    )
+    return Employee.objects.create(
+        third_party=third_party, code=code, base_salary=salary, **{**EMPLOYEE_DEFAULTS, **fields},
+    )
@@ -0,0 +1,170 @@
+import datetime
+import shutil
+import tempfile
+import threading
+from datetime import date
+from decimal import Decimal
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.serialization import pkcs12
+from cryptography.x509.oid import NameOID
+from django.conf import settings
+from django.test import override_settings
+from lxml import etree
+from apps.common.tests import TenantTestCase
+from apps.payroll.dian_stub import make_server
+from apps.payroll.models import (
+    LegalParameter, PayrollDetail, PayrollDocument, PayrollPeriod, PayrollTransmission,
+)
+from apps.payroll.services import PayrollCalculator
+from apps.payroll.transmission_service import PayrollTransmissionService
+from apps.payroll.tests.fixtures import create_employee
+
+
+def self_signed_p12(password):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'Empresa Test SAS')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(1).not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+            .sign(key, hashes.SHA256()))
+    return pkcs12.serialize_key_and_certificates(b'test', key, cert, None,
+                                                 serialization.BestAvailableEncryption(password.encode()))
+
+
+class ElectronicPayrollTransmissionTests(TenantTestCase):
+    """Nómina electrónica del periodo contra el stub local de la DIAN."""
+
+    tenant_fields = {'nit': "900123456-7", 'legal_name': "Empresa Test SAS", 'address': "Calle 5 # 10-20",
+                     'dian_software_id': "soft-001"}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = tempfile.mkdtemp()
+        cls.cert_path = f"{cls.media}/cert.p12"
+        with open(cls.cert_path, 'wb') as handle:
+            handle.write(self_signed_p12('secreto'))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.media, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+
+        LegalParameter.objects.create(key='SMMLV', value=Decimal('1300000'), valid_from=date(2026, 1, 1))
+        LegalParameter.objects.create(key='AUX_TRANS', value=Decimal('140606'), valid_from=date(2026, 1, 1))
+        self.period = PayrollPeriod.objects.create(name='Agosto 2026', start_date=date(2026, 8, 1),
+                                                   end_date=date(2026, 8, 30), payment_date=date(2026, 8, 30),
+                                                   status='LIQUIDATED')
+        self.documents = [
+            self._liquidate(create_employee(self.tenant, 'EMP_001', Decimal('1300000'), nit='1001')),
+            self._liquidate(create_employee(self.tenant, 'EMP_002', Decimal('3000000'), nit='1002')),
+        ]
+        self.configure()
+
+    def configure(self, pin='pin-123', url=None):
+        """Levanta un stub con `pin` y apunta la transmisión a él (o a `url`)."""
+        server = make_server(software_pin=pin)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        host, port = server.server_address[:2]
+
+        overrides = override_settings(
+            MEDIA_ROOT=self.media,
+            DIAN_CONFIG={**settings.DIAN_CONFIG, 'SOFTWARE_PIN': 'pin-123', 'TEST_MODE': True,
+                         'CERTIFICATE_PATH': self.cert_path, 'CERTIFICATE_PASSWORD': 'secreto'},
+            PAYROLL_CONFIG={**settings.PAYROLL_CONFIG, 'ELECTRONIC_PAYROLL': {
+                **settings.PAYROLL_CONFIG['ELECTRONIC_PAYROLL'], 'WEBSERVICE_URL': url or f"http://{host}:{port}/",
+                'SIGN_WORKERS': 2, 'SEND_CONCURRENCY': 2, 'SEND_TIMEOUT': 5,
+            }},
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def _liquidate(self, employee):
+        concepts = PayrollCalculator(employee, self.period.start_date, self.period.end_date).calculate_concepts()
+        accrued = sum(c['value'] for c in concepts if c['type'] == 'EARNING')
+        deductions = sum(c['value'] for c in concepts if c['type'] == 'DEDUCTION')
+        document = PayrollDocument.objects.create(period=self.period, employee=employee, conseccutive=0,
+                                                  accrued_total=accrued, deductions_total=deductions,
+                                                  net_total=accrued - deductions)
+        PayrollDetail.objects.bulk_create([
+            PayrollDetail(document=document, concept_type=c['type'], dian_code=c['code'],
+                          description=c['description'], quantity=c['quantity'], value=c['value'])
+            for c in concepts
+        ])
+        return document
+
+    def _transmit(self, documents=None):
+        transmission = PayrollTransmission.objects.create(client=self.tenant, period=self.period)
+        return PayrollTransmissionService(transmission, documents=documents).run()
+
+    def test_period_is_signed_sent_and_accepted(self):
+        transmission = self._transmit()
+
+        self.assertEqual((transmission.status, transmission.document_count, transmission.accepted_count), ('DONE', 2, 2))
+        self.assertEqual(set(transmission.metrics), {'build_ms', 'sign_ms', 'send_ms_p50', 'send_ms_p95',
+                                                     'send_ms_max', 'elapsed_ms'})
+        documents = list(PayrollDocument.objects.order_by('id'))
+        self.assertEqual([(d.prefix, d.conseccutive, d.dian_status) for d in documents],
+                         [('NE', 1, 'ACCEPTED'), ('NE', 2, 'ACCEPTED')])
+        self.assertEqual(len(documents[0].cune), 96)
+        self.period.refresh_from_db()
+        self.assertEqual(self.period.status, 'REPORTED')
+
+        with documents[0].xml_file.open('rb') as handle:
+            root = etree.parse(handle).getroot()
+        ns = {'n': 'dian:gov:co:facturaelectronica:NominaIndividual'}
+        self.assertEqual(root.find('n:Devengados/n:Basico', ns).get('DiasTrabajados'), '30')
+        self.assertEqual(root.find('n:Devengados/n:Transporte', ns).get('AuxilioTransporte'), '140606.00')
+        self.assertEqual(root.find('n:Deducciones/n:Salud', ns).get('Deduccion'), '52000.00')
+        self.assertEqual(root.find('n:InformacionGeneral', ns).get('CUNE'), documents[0].cune)
+
+        # Nota de ajuste que elimina el primer documento: CUNE con valores en cero
+        deletion = PayrollDocument.objects.create(
+            period=self.period, employee=documents[0].employee, conseccutive=0, document_type='103',
+            adjustment_type='2', adjusted_document=documents[0],
+        )
+        adjustment = self._transmit(documents=[deletion.pk])
+        deletion.refresh_from_db()
+        self.assertEqual((adjustment.accepted_count, deletion.prefix, deletion.conseccutive, deletion.dian_status),
+                         (1, 'NA', 1, 'ACCEPTED'))
+
+    def test_sent_documents_are_not_resent(self):
+        # En validación asíncrona (habilitación): ya tiene número y ZipKey
+        PayrollDocument.objects.filter(pk=self.documents[0].pk).update(dian_status='SENT', prefix='NE', conseccutive=1)
+        transmission = self._transmit()
+
+        self.assertEqual((transmission.document_count, transmission.accepted_count), (1, 1))
+        second = PayrollDocument.objects.get(pk=self.documents[1].pk)
+        self.assertEqual((second.conseccutive, second.dian_status), (2, 'ACCEPTED'))
+
+    def test_pending_documents_of_another_tenant_do_not_block_the_report(self):
+        other = self.create_tenant(name="Otra Empresa", nit="900999888")
+        self._liquidate(create_employee(other, 'EMP_900', Decimal('1300000'), nit='9001'))
+        self._transmit()
+
+        self.period.refresh_from_db()
+        self.assertEqual(self.period.status, 'REPORTED')
+
+    def test_rejections_and_unreachable_endpoint(self):
+        self.configure(pin='otro-pin')
+        transmission = self._transmit()
+        self.assertEqual(transmission.rejected_count, 2)
+        item = transmission.items.first()
+        self.assertEqual((item.result, item.status_code), ('REJECTED', '99'))
+        self.assertIn('NIE024', item.error)
+        self.assertEqual(PayrollDocument.objects.filter(dian_status='REJECTED').count(), 2)
+
+        # Sin respuesta: el documento sigue en su último estado para reintentar, con el mismo CUNE
+        cune = PayrollDocument.objects.get(pk=self.documents[0].pk).cune
+        self.configure(url='http://127.0.0.1:9/')
+        transmission = self._transmit(documents=[self.documents[0].pk])
+        self.assertEqual((transmission.status, transmission.failed_count), ('DONE', 1))
+        document = PayrollDocument.objects.get(pk=self.documents[0].pk)
+        self.assertEqual((document.dian_status, document.cune), ('REJECTED', cune))
@@ -0,0 +1,69 @@
+from datetime import date
+from decimal import Decimal
+from apps.common.tests import TenantTestCase
+from apps.payroll.models import NoveltyType, EmployeeNovelty, LegalParameter, PayrollConcept
+from apps.payroll.novelty_engine import load_period_novelties
+from apps.payroll.services import PayrollCalculator
+from apps.payroll.tests.fixtures import create_employee
+
+
+class NoveltyEngineTests(TenantTestCase):
+    """Novedades que se cruzan con el periodo, recortadas y separadas por unidad."""
+
+    def setUp(self):
+        super().setUp()
+
+        LegalParameter.objects.create(key='MAX_WEEKLY_HOURS', value=Decimal('48'), valid_from=date(2026, 1, 1))
+        self.ana = create_employee(self.tenant, 'EMP_001', Decimal('2400000'), nit='1001')
+        self.luis = create_employee(self.tenant, 'EMP_002', Decimal('2400000'), nit='1002')
+        self.ige = NoveltyType.objects.create(
+            code='IGE_66', name='Incapacidad General', dian_type='IGE',
+            payroll_payment_percentage=Decimal('0.6667'), affects_transport_aid=True,
+        )
+        self.vac = NoveltyType.objects.create(
+            code='VAC', name='Vacaciones', dian_type='VAC', payroll_payment_percentage=Decimal('1'),
+            affects_transport_aid=False,
+        )
+        self.hed = NoveltyType.objects.create(code='HED', name='Hora Extra Diurna', dian_type='OTR', unit='HOURS')
+        PayrollConcept.objects.create(code='OTR', name='Hora Extra Diurna', concept_type='EARNING',
+                                      dian_code='HED', percentage=Decimal('25.00'))
+
+        # Atraviesa el inicio del periodo: 28 jul - 3 ago
+        EmployeeNovelty.objects.create(employee=self.ana, novelty_type=self.ige, start_date=date(2026, 7, 28),
+                                       end_date=date(2026, 8, 3), days=7)
+        # Atraviesa el fin del periodo: 28 ago - 6 sep
+        EmployeeNovelty.objects.create(employee=self.ana, novelty_type=self.vac, start_date=date(2026, 8, 28),
+                                       end_date=date(2026, 9, 6), days=10)
+        EmployeeNovelty.objects.create(employee=self.luis, novelty_type=self.hed, start_date=date(2026, 8, 10),
+                                       end_date=date(2026, 8, 10), hours=Decimal('4'))
+        # Fuera del periodo
+        EmployeeNovelty.objects.create(employee=self.luis, novelty_type=self.ige, start_date=date(2026, 9, 10),
+                                       end_date=date(2026, 9, 12), days=3)
+
+    def test_overlapping_novelties_are_clipped_in_one_query(self):
+        with self.assertNumQueries(1):
+            buckets = load_period_novelties(date(2026, 8, 1), date(2026, 8, 30))
+
+        ana = buckets[self.ana.pk]
+        self.assertEqual([(item.start_date, item.quantity) for item in ana.day_items],
+                         [(date(2026, 8, 1), 3), (date(2026, 8, 28), 3)])
+        self.assertEqual((ana.days, ana.transport_days), (6, 3))
+
+        luis = buckets[self.luis.pk]
+        self.assertEqual(luis.days, 0)
+        self.assertEqual([item.quantity for item in luis.hour_items], [Decimal('4.00')])
+
+    def test_calculator_uses_clipped_days_and_hours(self):
+        buckets = load_period_novelties(date(2026, 8, 1), date(2026, 8, 30))
+
+        ana = PayrollCalculator(self.ana, date(2026, 8, 1), date(2026, 8, 30), novelties=buckets[self.ana.pk])
+        concepts = {c['code']: c for c in ana.calculate_concepts()}
+        self.assertEqual(ana.novelty_days, 6)
+        self.assertEqual(concepts['BASICO']['quantity'], 24)
+        self.assertEqual(concepts['IGE']['quantity'], 3)
+
+        luis = PayrollCalculator(self.luis, date(2026, 8, 1), date(2026, 8, 30), novelties=buckets[self.luis.pk])
+        concepts = {c['code']: c for c in luis.calculate_concepts()}
+        self.assertEqual(concepts['BASICO']['quantity'], 30)
+        # Jornada de 48 horas: 240 al mes, 2.400.000 / 240 = 10.000 la hora; 4 horas al 125%
+        self.assertEqual(concepts['HED']['value'], Decimal('50000'))
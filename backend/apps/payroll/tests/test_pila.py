@@ -0,0 +1,98 @@
+import io
+from datetime import date
+from decimal import Decimal
+from apps.common.tests import TenantTestCase
+from apps.payroll.models import (
+    EmployeeNovelty, LegalParameter, NoveltyType, PayrollDetail, PayrollDocument, PayrollPeriod,
+)
+from apps.payroll.pila_service import PILA_LAYOUT, PilaGenerator
+from apps.payroll.services import PayrollCalculator
+from apps.payroll.tests.fixtures import create_employee
+
+
+# Códigos de administradoras que exige la planilla
+PILA_ENTITIES = {'health_entity': 'EPS010', 'pension_entity': '230301', 'arl_entity': '14-23'}
+
+
+def parse(line, kind):
+    values, offset = {}, 0
+    for name, length, _ in PILA_LAYOUT[kind]:
+        values[name] = line[offset:offset + length].strip()
+        offset += length
+    return values
+
+
+class PilaGeneratorTests(TenantTestCase):
+    """Planilla PILA a partir de los documentos liquidados del periodo."""
+
+    tenant_fields = {'legal_name': "Empresa Test SAS"}
+
+    def setUp(self):
+        super().setUp()
+
+        LegalParameter.objects.create(key='SMMLV', value=Decimal('1300000'), valid_from=date(2026, 1, 1))
+        LegalParameter.objects.create(key='AUX_TRANS', value=Decimal('140606'), valid_from=date(2026, 1, 1))
+
+        self.ana = create_employee(self.tenant, 'EMP_001', Decimal('1300000'), nit='1001', first_name='Ana',
+                                   surname='Pérez', **PILA_ENTITIES)
+        self.luis = create_employee(self.tenant, 'EMP_002', Decimal('15000000'), nit='1002', first_name='Luis',
+                                    surname='Pérez', **PILA_ENTITIES)
+        ige = NoveltyType.objects.create(code='IGE_66', name='Incapacidad General', dian_type='IGE',
+                                         payroll_payment_percentage=Decimal('0.6667'), pays_arl=False)
+        EmployeeNovelty.objects.create(employee=self.ana, novelty_type=ige, start_date=date(2026, 8, 1),
+                                       end_date=date(2026, 8, 3), days=3)
+
+        self.period = PayrollPeriod.objects.create(name='Agosto 2026', start_date=date(2026, 8, 1),
+                                                   end_date=date(2026, 8, 30), payment_date=date(2026, 8, 30),
+                                                   status='LIQUIDATED')
+        for employee in (self.ana, self.luis):
+            self._liquidate(employee)
+
+    def _liquidate(self, employee):
+        calculator = PayrollCalculator(employee, self.period.start_date, self.period.end_date)
+        concepts = calculator.calculate_concepts()
+        document = PayrollDocument.objects.create(
+            period=self.period, employee=employee, conseccutive=0,
+            worked_days=calculator.days_worked - calculator.novelty_days, novelty_days=calculator.novelty_days,
+        )
+        PayrollDetail.objects.bulk_create([
+            PayrollDetail(document=document, concept_type=c['type'], dian_code=c['code'],
+                          description=c['description'], quantity=c['quantity'], value=c['value'])
+            for c in concepts
+        ])
+
+    def test_pila_records_rounding_and_flags(self):
+        handle = io.BytesIO()
+        summary = PilaGenerator(self.period, self.tenant).write(handle)
+        lines = handle.getvalue().decode('ascii').split('\r\n')[:-1]
+
+        self.assertEqual(len(lines), 3)
+        header = parse(lines[0], 'header')
+        self.assertEqual((header['pension_period'], header['health_period']), ('2026-08', '2026-09'))
+        self.assertEqual(int(header['employee_count']), 2)
+        detail_width = sum(length for _, length, _ in PILA_LAYOUT['detail'])
+        self.assertTrue(all(len(line) == detail_width for line in lines[1:]))
+
+        ana = parse(lines[1], 'detail')
+        self.assertEqual((ana['id_type'], ana['id_number'], ana['ige'], ana['exonerated']), ('CC', '1001', 'X', 'S'))
+        self.assertEqual((int(ana['health_days']), int(ana['arl_days'])), (30, 27))
+        # Devengado 1.256.671 < 1 SMMLV: el IBC sube al mínimo; ARL solo por los días laborados
+        self.assertEqual((int(ana['health_ibc']), int(ana['arl_ibc'])), (1300000, 1170000))
+        self.assertEqual(int(ana['health_contribution']), 52000)
+        self.assertEqual(int(ana['arl_contribution']), 6200)  # 6.107,40 al múltiplo de 100 superior
+        self.assertEqual(int(ana['sena_contribution']), 0)
+
+        luis = parse(lines[2], 'detail')
+        self.assertEqual(luis['exonerated'], 'N')
+        self.assertEqual((int(luis['health_contribution']), int(luis['sena_contribution']),
+                          int(luis['icbf_contribution'])), (1875000, 300000, 450000))
+
+        self.assertEqual(summary['totals']['health'], Decimal('1927000'))
+        self.assertEqual([(w['identification_number'], w['subsystem']) for w in summary['warnings']],
+                         [('1001', 'health'), ('1001', 'pension')])
+
+    def test_period_without_documents_is_rejected(self):
+        empty = PayrollPeriod.objects.create(name='Julio 2026', start_date=date(2026, 7, 1),
+                                             end_date=date(2026, 7, 30), payment_date=date(2026, 7, 30))
+        with self.assertRaises(ValueError):
+            PilaGenerator(empty, self.tenant).write(io.BytesIO())
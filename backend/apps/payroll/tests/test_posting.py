@@ -0,0 +1,98 @@
+from datetime import date
+from decimal import Decimal
+from apps.common.tests import TenantTestCase
+from apps.accounting.models import CostCenter, JournalEntry
+from apps.payroll.models import (
+    LegalParameter, PayrollAccountMapping, PayrollConcept, PayrollDetail, PayrollDocument, PayrollPeriod,
+)
+from apps.payroll.posting_service import post_period
+from apps.payroll.services import PayrollCalculator
+from apps.payroll.tests.fixtures import create_employee
+from apps.reports.models import ReportSnapshot
+
+
+class PayrollPostingTests(TenantTestCase):
+    """Contabilización agrupada de la nómina liquidada."""
+
+    def setUp(self):
+        super().setUp()
+
+        LegalParameter.objects.create(key='SMMLV', value=Decimal('1300000'), valid_from=date(2026, 1, 1))
+        LegalParameter.objects.create(key='AUX_TRANS', value=Decimal('140606'), valid_from=date(2026, 1, 1))
+
+        self.accounts = {}
+        for code in ('510506', '510527'):
+            self.accounts[code] = self.create_account('5', 'DEBITO', '51', code, 'GASTO')
+        for code in ('250505', '237005', '238030'):
+            self.accounts[code] = self.create_account('2', 'CREDITO', '25', code, 'PASIVO')
+
+        for code, name, concept_type, dian_code, percentage, debit, credit in (
+            ('BASICO', 'Sueldo Básico', 'EARNING', 'BASICO', 0, '510506', '250505'),
+            ('TRANSPORTE', 'Auxilio de Transporte', 'EARNING', 'AUX_TRANSPORTE', 0, '510527', '250505'),
+            ('SALUD', 'Aporte Salud', 'DEDUCTION', 'SALUD', 4, '250505', '237005'),
+            ('PENSION', 'Aporte Pensión', 'DEDUCTION', 'PENSION', 4, '250505', '238030'),
+        ):
+            concept = PayrollConcept.objects.create(code=code, name=name, concept_type=concept_type,
+                                                    dian_code=dian_code, percentage=percentage)
+            PayrollAccountMapping.objects.create(client=self.tenant, concept=concept,
+                                                 debit_account=self.accounts[debit], credit_account=self.accounts[credit])
+
+        self.admin = CostCenter.objects.create(client=self.tenant, code='ADM', name='Administración')
+        self.sales = CostCenter.objects.create(client=self.tenant, code='VEN', name='Ventas')
+        self.period = PayrollPeriod.objects.create(name='Agosto 2026', start_date=date(2026, 8, 1),
+                                                   end_date=date(2026, 8, 30), payment_date=date(2026, 8, 30),
+                                                   status='LIQUIDATED')
+        for code, nit, salary, cost_center in (('EMP_001', '1001', Decimal('1300000'), self.admin),
+                                               ('EMP_002', '1002', Decimal('3000000'), self.sales)):
+            self._liquidate(create_employee(self.tenant, code, salary, nit=nit, cost_center=cost_center))
+
+    def _liquidate(self, employee):
+        calculator = PayrollCalculator(employee, self.period.start_date, self.period.end_date)
+        document = PayrollDocument.objects.create(period=self.period, employee=employee, conseccutive=0)
+        PayrollDetail.objects.bulk_create([
+            PayrollDetail(document=document, concept_type=c['type'], dian_code=c['code'],
+                          description=c['description'], quantity=c['quantity'], value=c['value'])
+            for c in calculator.calculate_concepts()
+        ])
+
+    def _balance(self, entry, code, cost_center):
+        line = entry.lines.get(account=self.accounts[code], cost_center=cost_center)
+        return line.debit - line.credit
+
+    def test_single_balanced_entry_netted_by_account_and_cost_center(self):
+        summary = post_period(self.period, self.tenant.id)
+
+        entry = JournalEntry.objects.get(number=f'NOM-{self.period.pk}')
+        self.assertTrue(entry.is_balanced())
+        self.assertEqual((summary['lines'], summary['total']), (9, Decimal('4440606.00')))
+        self.assertEqual(self._balance(entry, '510527', self.admin), Decimal('140606.00'))
+        # Salarios por pagar: devengado menos deducciones de cada centro de costo
+        self.assertEqual(self._balance(entry, '250505', self.admin), Decimal('-1336606.00'))
+        self.assertEqual(self._balance(entry, '250505', self.sales), Decimal('-2760000.00'))
+        self.assertEqual(self._balance(entry, '238030', self.sales), Decimal('-120000.00'))
+
+        with self.assertRaises(ValueError):
+            post_period(self.period, self.tenant.id)
+
+    def test_entry_per_cost_center_and_unmapped_concepts(self):
+        PayrollAccountMapping.objects.filter(concept__code='PENSION').delete()
+        with self.assertRaisesMessage(ValueError, 'PENSION'):
+            post_period(self.period, self.tenant.id)
+
+        PayrollAccountMapping.objects.create(
+            client=self.tenant, concept=PayrollConcept.objects.get(code='PENSION'),
+            debit_account=self.accounts['250505'], credit_account=self.accounts['238030'],
+        )
+        summary = post_period(self.period, self.tenant.id, by_cost_center=True)
+        self.assertEqual(summary['entries'], [f'NOM-{self.period.pk}-{self.admin.pk}', f'NOM-{self.period.pk}-{self.sales.pk}'])
+        for entry in JournalEntry.objects.filter(number__startswith='NOM-'):
+            self.assertTrue(entry.is_balanced())
+        self.assertEqual(JournalEntry.objects.get(number=summary['entries'][1]).get_total_debit(), Decimal('3000000.00'))
+
+    def test_bulk_posting_marks_ledger_snapshots_stale(self):
+        snapshot = ReportSnapshot.objects.create(client=self.tenant, report_type='TRIAL_BALANCE',
+                                                 as_of=self.period.end_date, data_file='report_snapshots/tb.bin')
+        with self.captureOnCommitCallbacks(execute=True):
+            post_period(self.period, self.tenant.id)
+        snapshot.refresh_from_db()
+        self.assertEqual((snapshot.is_stale, snapshot.stale_reason), (True, 'LATE_ENTRY'))
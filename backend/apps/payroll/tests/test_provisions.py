@@ -0,0 +1,80 @@
+from datetime import date
+from decimal import Decimal
+from apps.common.tests import TenantTestCase
+from apps.accounting.models import CostCenter, JournalEntry
+from apps.payroll.models import EmployeeNovelty, LegalParameter, NoveltyType, PayrollPeriod, PayrollProvision
+from apps.payroll.provisions_service import ProvisionService
+from apps.payroll.tests.fixtures import create_employee
+
+
+class ProvisionServiceTests(TenantTestCase):
+    """Provisión de prestaciones por lotes y asiento por centro de costo."""
+
+    def setUp(self):
+        super().setUp()
+
+        LegalParameter.objects.create(key='SMMLV', value=Decimal('1300000'), valid_from=date(2026, 1, 1))
+        LegalParameter.objects.create(key='AUX_TRANS', value=Decimal('140606'), valid_from=date(2026, 1, 1))
+
+        for code in ('510530', '510533', '510536', '510539'):
+            self.create_account('5', 'DEBITO', '51', code, 'GASTO')
+        for code in ('261005', '261010', '261015', '261020'):
+            self.create_account('2', 'CREDITO', '26', code, 'PASIVO')
+
+        self.admin = CostCenter.objects.create(client=self.tenant, code='ADM', name='Administración')
+        self.sales = CostCenter.objects.create(client=self.tenant, code='VEN', name='Ventas')
+        self.ana = create_employee(self.tenant, 'EMP_001', Decimal('1300000'), nit='1001', cost_center=self.admin)
+        self.luis = create_employee(self.tenant, 'EMP_002', Decimal('3000000'), nit='1002',
+                                    start_date=date(2026, 8, 16), cost_center=self.sales)
+
+        lnr = NoveltyType.objects.create(code='LNR', name='Licencia No Remunerada', dian_type='LNR')
+        EmployeeNovelty.objects.create(employee=self.ana, novelty_type=lnr, start_date=date(2026, 8, 10),
+                                       end_date=date(2026, 8, 14), days=5)
+
+        self.period = PayrollPeriod.objects.create(name='Agosto 2026', start_date=date(2026, 8, 1),
+                                                   end_date=date(2026, 8, 30), payment_date=date(2026, 8, 30))
+
+    def test_provisions_per_employee_and_cost_center_entries(self):
+        summary = ProvisionService(self.period, self.tenant.id).run()
+        self.assertEqual(summary['employees'], 2)
+
+        ana = PayrollProvision.objects.get(employee=self.ana)
+        # 30 días menos 5 de licencia no remunerada; base con auxilio de transporte
+        self.assertEqual((ana.days, ana.transport_allowance), (25, Decimal('140606')))
+        self.assertEqual(
+            (ana.severance, ana.severance_interest, ana.service_bonus, ana.vacation),
+            (Decimal('100042.08'), Decimal('12005.05'), Decimal('100042.08'), Decimal('45138.89')),
+        )
+        luis = PayrollProvision.objects.get(employee=self.luis)
+        # Ingresó el 16: 15 días, sin auxilio (> 2 SMMLV)
+        self.assertEqual(
+            (luis.days, luis.severance, luis.severance_interest, luis.vacation),
+            (15, Decimal('125000.00'), Decimal('15000.00'), Decimal('62500.00')),
+        )
+
+        entry = JournalEntry.objects.get(number=f'PROV-{self.period.pk}-{self.sales.pk}')
+        self.assertTrue(entry.is_balanced())
+        self.assertEqual(entry.get_total_debit(), Decimal('327500.00'))
+        self.assertEqual(set(entry.lines.values_list('cost_center_id', flat=True)), {self.sales.pk})
+        self.assertEqual(luis.journal_entry_id, entry.pk)
+
+    def test_entries_only_link_provisions_of_the_tenant(self):
+        other = self.create_tenant(name="Otra Empresa", nit="900999888")
+        employee = create_employee(other, 'EMP_900', Decimal('2000000'), nit='2001')
+        foreign = PayrollProvision.objects.create(period=self.period, employee=employee, cost_center=self.sales,
+                                                  base_salary=Decimal('2000000'), days=30)
+
+        ProvisionService(self.period, self.tenant.id).run()
+        foreign.refresh_from_db()
+        self.assertIsNone(foreign.journal_entry_id)
+
+    def test_rerun_replaces_previous_provisions(self):
+        ProvisionService(self.period, self.tenant.id).run()
+        self.luis.base_salary = Decimal('3600000')
+        self.luis.save()
+
+        summary = ProvisionService(self.period, self.tenant.id).run()
+        self.assertEqual(PayrollProvision.objects.count(), 2)
+        self.assertEqual(JournalEntry.objects.filter(number__startswith='PROV-').count(), 2)
+        self.assertEqual(PayrollProvision.objects.get(employee=self.luis).severance, Decimal('150000.00'))
+        self.assertEqual(len(summary['entries']), 2)
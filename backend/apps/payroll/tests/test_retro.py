@@ -0,0 +1,147 @@
+from datetime import date
+from decimal import Decimal
+from apps.common.tests import TenantTestCase
+from apps.accounting.models import FiscalPeriod, JournalEntry
+from apps.payroll.models import (
+    EmployeeNovelty, LegalParameter, NoveltyType, PayrollAccountMapping, PayrollConcept, PayrollDetail,
+    PayrollDocument, PayrollPeriod, PayrollRetroChange,
+)
+from apps.payroll.posting_service import post_period
+from apps.payroll.retro_service import RetroactiveEngine
+from apps.payroll.services import PayrollCalculator
+from apps.payroll.tests.fixtures import create_employee
+
+
+class RetroactiveEngineTests(TenantTestCase):
+    """Reliquidación de solo lo afectado por cambios posteriores a la liquidación."""
+
+    def setUp(self):
+        super().setUp()
+
+        LegalParameter.objects.create(key='SMMLV', value=Decimal('1300000'), valid_from=date(2026, 1, 1))
+        self.aux = LegalParameter.objects.create(key='AUX_TRANS', value=Decimal('140606'), valid_from=date(2026, 1, 1))
+        self.period = PayrollPeriod.objects.create(name='Agosto 2026', start_date=date(2026, 8, 1),
+                                                   end_date=date(2026, 8, 30), payment_date=date(2026, 8, 30),
+                                                   status='LIQUIDATED')
+        self.ana = self._liquidate(create_employee(self.tenant, 'EMP_001', Decimal('1300000'), nit='1001'),
+                                   dian_status='ACCEPTED')
+        self.maria = self._liquidate(create_employee(self.tenant, 'EMP_002', Decimal('1500000'), nit='1002'))
+        self.luis = self._liquidate(create_employee(self.tenant, 'EMP_003', Decimal('3000000'), nit='1003'))
+        self.ige = NoveltyType.objects.create(code='IGE_66', name='Incapacidad General', dian_type='IGE',
+                                              payroll_payment_percentage=Decimal('0.6667'))
+
+    def _liquidate(self, employee, dian_status='PENDING'):
+        concepts = PayrollCalculator(employee, self.period.start_date, self.period.end_date).calculate_concepts()
+        document = PayrollDocument.objects.create(period=self.period, employee=employee, conseccutive=0,
+                                                  dian_status=dian_status)
+        PayrollDetail.objects.bulk_create([
+            PayrollDetail(document=document, concept_type=c['type'], dian_code=c['code'],
+                          description=c['description'], quantity=c['quantity'], value=c['value'])
+            for c in concepts
+        ])
+        return document
+
+    def _pending(self):
+        return sorted(PayrollRetroChange.objects.values_list('employee__code', flat=True))
+
+    def test_novelty_marks_one_employee_and_adjusts_transmitted_document(self):
+        EmployeeNovelty.objects.create(employee=self.ana.employee, novelty_type=self.ige,
+                                       start_date=date(2026, 8, 5), end_date=date(2026, 8, 7), days=3)
+        # Fuera de cualquier periodo liquidado: no marca nada
+        EmployeeNovelty.objects.create(employee=self.luis.employee, novelty_type=self.ige,
+                                       start_date=date(2026, 9, 5), end_date=date(2026, 9, 7), days=3)
+        self.assertEqual(self._pending(), ['EMP_001'])
+
+        preview = RetroactiveEngine(self.tenant.id).run(self.period, dry_run=True)
+        self.assertEqual([(c['code'], c['delta']) for c in preview['changes'] if c['type'] == 'EARNING'],
+                         [('AUX_TRANSPORTE', Decimal('-14060.60')), ('BASICO', Decimal('-130000.00')),
+                          ('IGE', Decimal('86671.00'))])
+        self.assertEqual((PayrollDocument.objects.count(), self._pending()), (3, ['EMP_001']))
+
+        summary = RetroactiveEngine(self.tenant.id).run(self.period)
+        self.assertEqual((summary['checked'], summary['updated']), (1, []))
+        adjustment = PayrollDocument.objects.get(pk=summary['adjustments'][0]['document'])
+        self.assertEqual((adjustment.document_type, adjustment.adjustment_type, adjustment.adjusted_document_id),
+                         ('103', '1', self.ana.pk))
+        self.assertEqual(adjustment.details.get(dian_code='BASICO').quantity, Decimal('27.00'))
+        self.assertEqual(self.ana.details.get(dian_code='BASICO').quantity, Decimal('30.00'))
+        self.assertEqual(adjustment.net_total, adjustment.accrued_total - adjustment.deductions_total)
+        self.assertEqual(self._pending(), [])
+
+    def test_parameter_change_reaches_only_dependents(self):
+        # Parámetros que no usa la liquidación o sin dependientes (sin horas extra) no marcan nada
+        LegalParameter.objects.create(key='UVT', value=Decimal('49799'), valid_from=date(2026, 1, 1))
+        LegalParameter.objects.create(key='MAX_WEEKLY_HOURS', value=Decimal('44'), valid_from=date(2026, 7, 15))
+        self.assertEqual(self._pending(), [])
+
+        # Quien gana 3.000.000 no tiene auxilio de transporte
+        self.aux.value = Decimal('150000')
+        self.aux.save()
+        self.assertEqual(self._pending(), ['EMP_001', 'EMP_002'])
+
+        summary = RetroactiveEngine(self.tenant.id).run()
+        self.assertEqual(summary['updated'], [{'employee': 'EMP_002', 'document': self.maria.pk}])
+        self.assertEqual([item['adjusts'] for item in summary['adjustments']], [self.ana.pk])
+        self.maria.refresh_from_db()
+        self.assertEqual(self.maria.details.get(dian_code='AUX_TRANSPORTE').value, Decimal('150000.00'))
+        self.assertEqual(self.maria.accrued_total, Decimal('1650000.00'))
+
+        # Un SMMLV nuevo marca a los que tienen auxilio, pero si nada cambia no se escribe nada
+        LegalParameter.objects.create(key='SMMLV', value=Decimal('1350000'), valid_from=date(2026, 8, 1))
+        self.assertEqual(self._pending(), ['EMP_001', 'EMP_002'])
+        summary = RetroactiveEngine(self.tenant.id).run()
+        self.assertEqual((summary['checked'], summary['unchanged'], summary['adjustments']), (2, 2, []))
+        self.assertEqual(PayrollDocument.objects.count(), 4)
+
+    def _map_accounts(self):
+        accounts = {
+            code: self.create_account(class_code, nature, code[:2], code, account_type)
+            for class_code, nature, code, account_type in (
+                ('5', 'DEBITO', '510506', 'GASTO'), ('5', 'DEBITO', '510527', 'GASTO'),
+                ('2', 'CREDITO', '250505', 'PASIVO'), ('2', 'CREDITO', '237005', 'PASIVO'),
+                ('2', 'CREDITO', '238030', 'PASIVO'),
+            )
+        }
+        for code, concept_type, dian_code, percentage, debit, credit in (
+            ('BASICO', 'EARNING', 'BASICO', 0, '510506', '250505'),
+            ('TRANSPORTE', 'EARNING', 'AUX_TRANSPORTE', 0, '510527', '250505'),
+            ('SALUD', 'DEDUCTION', 'SALUD', 4, '250505', '237005'),
+            ('PENSION', 'DEDUCTION', 'PENSION', 4, '250505', '238030'),
+        ):
+            concept = PayrollConcept.objects.create(code=code, name=code, concept_type=concept_type,
+                                                    dian_code=dian_code, percentage=percentage)
+            PayrollAccountMapping.objects.create(client=self.tenant, concept=concept,
+                                                 debit_account=accounts[debit], credit_account=accounts[credit])
+        return accounts
+
+    def test_posted_period_gets_a_difference_entry(self):
+        accounts = self._map_accounts()
+        post_period(self.period, self.tenant.id)
+        original = JournalEntry.objects.get(number=f'NOM-{self.period.pk}')
+        lines = list(original.lines.values_list('account_id', 'debit', 'credit'))
+
+        self.aux.value = Decimal('150000')
+        self.aux.save()
+        summary = RetroactiveEngine(self.tenant.id).run()
+
+        # El comprobante original no cambia; la diferencia (2 x 9.394) va en uno de ajuste
+        self.assertEqual(list(original.lines.values_list('account_id', 'debit', 'credit')), lines)
+        self.assertEqual(summary['entries'], [f'NOM-{self.period.pk}-AJ1'])
+        adjustment = JournalEntry.objects.get(number=f'NOM-{self.period.pk}-AJ1')
+        self.assertTrue(adjustment.is_balanced())
+        self.assertEqual(adjustment.lines.get(account=accounts['510527']).debit, Decimal('18788.00'))
+        self.assertEqual(adjustment.lines.get(account=accounts['250505']).credit, Decimal('18788.00'))
+
+    def test_posted_period_in_closed_fiscal_period_is_refused(self):
+        self._map_accounts()
+        post_period(self.period, self.tenant.id)
+        FiscalPeriod.objects.create(client=self.tenant, year=2026, month=8, status='CLOSED',
+                                    start_date=date(2026, 8, 1), end_date=date(2026, 8, 31))
+
+        self.aux.value = Decimal('150000')
+        self.aux.save()
+        with self.assertRaisesMessage(ValueError, 'está cerrado'):
+            RetroactiveEngine(self.tenant.id).run()
+        # Nada se reescribe: la nómina sigue como se contabilizó
+        self.assertEqual(self.maria.details.get(dian_code='AUX_TRANSPORTE').value, Decimal('140606.00'))
+        self.assertEqual(self._pending(), ['EMP_001', 'EMP_002'])
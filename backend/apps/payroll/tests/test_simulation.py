@@ -0,0 +1,58 @@
+from datetime import date
+from decimal import Decimal
+from apps.common.tests import TenantTestCase
+from apps.accounting.models import CostCenter
+from apps.payroll.models import LegalParameter, PayrollDocument, PayrollPeriod, PayrollProvision
+from apps.payroll.simulation_service import parse_overrides, simulate
+from apps.payroll.tests.fixtures import create_employee
+
+
+class PayrollSimulationTests(TenantTestCase):
+    """Costo del periodo con parámetros de ley modificados, sin persistir nada."""
+
+    def setUp(self):
+        super().setUp()
+
+        LegalParameter.objects.create(key='SMMLV', value=Decimal('1300000'), valid_from=date(2026, 1, 1))
+        LegalParameter.objects.create(key='AUX_TRANS', value=Decimal('140000'), valid_from=date(2026, 1, 1))
+
+        self.admin = CostCenter.objects.create(client=self.tenant, code='ADM', name='Administración')
+        self.sales = CostCenter.objects.create(client=self.tenant, code='VEN', name='Ventas')
+        create_employee(self.tenant, 'EMP_001', Decimal('1300000'), nit='1001', cost_center=self.admin)
+        create_employee(self.tenant, 'EMP_002', Decimal('3000000'), nit='1002', cost_center=self.sales)
+        self.period = PayrollPeriod.objects.create(name='Agosto 2026', start_date=date(2026, 8, 1),
+                                                   end_date=date(2026, 8, 30), payment_date=date(2026, 8, 30))
+
+    def test_transport_aid_change_only_moves_eligible_cost_center(self):
+        result = simulate(self.period, self.tenant.id, parse_overrides({'AUX_TRANS': '160000'}))
+
+        self.assertEqual(result['employees'], 2)
+        concepts = {row['code']: row for row in result['by_concept']}
+        self.assertEqual(concepts['AUX_TRANSPORTE']['delta'], Decimal('20000.00'))
+        # El auxilio no es salarial: no mueve aportes, sí cesantías y prima (20.000 * 30 / 360)
+        self.assertEqual(concepts['APORTES_EMPRESA']['delta'], Decimal('0.00'))
+        self.assertEqual(concepts['SEVERANCE']['delta'], Decimal('1666.67'))
+
+        centers = {row['cost_center']: row for row in result['by_cost_center']}
+        self.assertEqual(centers[self.sales.pk]['delta'], Decimal('0.00'))
+        self.assertEqual(centers[self.admin.pk]['name'], 'Administración')
+        self.assertEqual(result['totals']['delta'], centers[self.admin.pk]['delta'])
+        self.assertFalse(PayrollDocument.objects.exists())
+        self.assertFalse(PayrollProvision.objects.exists())
+
+    def test_minimum_wage_change_extends_transport_aid_eligibility(self):
+        # Con SMMLV de 1.600.000 el segundo empleado (3.000.000) ya gana menos de 2 SMMLV
+        result = simulate(self.period, self.tenant.id, parse_overrides({'SMMLV': 1600000}))
+        concepts = {row['code']: row for row in result['by_concept']}
+        self.assertEqual(concepts['AUX_TRANSPORTE']['delta'], Decimal('140000.00'))
+        self.assertEqual(concepts['SALUD']['delta'], Decimal('0.00'))
+        centers = {row['cost_center']: row for row in result['by_cost_center']}
+        # Auxilio más su efecto en cesantías, intereses y prima
+        self.assertGreater(centers[self.sales.pk]['delta'], Decimal('140000'))
+        self.assertEqual(centers[self.admin.pk]['delta'], Decimal('0.00'))
+        self.assertEqual(result['parameters']['scenario']['SMMLV'], Decimal('1600000'))
+
+    def test_invalid_overrides_are_rejected(self):
+        for overrides in ({}, {'IVA': 19}, {'SMMLV': 'abc'}, {'SMMLV': 0}):
+            with self.assertRaises(ValueError):
+                parse_overrides(overrides)
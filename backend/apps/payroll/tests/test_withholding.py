@@ -0,0 +1,82 @@
+from datetime import date
+from decimal import Decimal
+from apps.common.tests import TenantTestCase
+from apps.payroll.models import LegalParameter, PayrollDocument, PayrollPeriod, PayrollWithholding
+from apps.payroll.services import PayrollCalculator, legal_parameters
+from apps.payroll.withholding_service import apply_withholding, bracket_table, semiannual_rates
+from apps.payroll.tests.fixtures import create_employee
+
+
+class WithholdingTests(TenantTestCase):
+    """Retención en la fuente por procedimiento 1 y 2 (UVT de 50.000 para cifras redondas)."""
+
+    def setUp(self):
+        super().setUp()
+
+        LegalParameter.objects.create(key='SMMLV', value=Decimal('1300000'), valid_from=date(2026, 1, 1))
+        LegalParameter.objects.create(key='AUX_TRANS', value=Decimal('140606'), valid_from=date(2026, 1, 1))
+        LegalParameter.objects.create(key='UVT', value=Decimal('50000'), valid_from=date(2026, 1, 1))
+
+    def test_procedures_apply_limits_in_one_pass(self):
+        employees = [
+            create_employee(self.tenant, 'EMP_001', Decimal('15000000'), has_dependents=True,
+                            prepaid_health=Decimal('1000000'), voluntary_contributions=Decimal('2000000')),
+            create_employee(self.tenant, 'EMP_002', Decimal('3000000')),
+            create_employee(self.tenant, 'EMP_003', Decimal('15000000'), withholding_procedure='2',
+                            withholding_rate=Decimal('10.50')),
+        ]
+        parameters = legal_parameters(date(2026, 8, 30))
+        liquidations = [
+            (employee, PayrollCalculator(employee, date(2026, 8, 1), date(2026, 8, 30), novelties=None,
+                                         concepts={}, parameters=parameters).calculate_concepts())
+            for employee in employees
+        ]
+
+        with self.assertNumQueries(0):
+            audits = apply_withholding(liquidations, parameters['UVT'], 2026)
+
+        first = audits[0]
+        # Ingresos 15M - aportes 1,2M; dependientes 1,5M, prepagada topada a 16 UVT, AFC 2M, 25% exento 2,375M
+        self.assertEqual(
+            [first[field] for field in ('non_taxable', 'dependents', 'prepaid_health', 'voluntary', 'labor_exempt')],
+            [Decimal('1200000.00'), Decimal('1500000.00'), Decimal('800000.00'), Decimal('2000000.00'),
+             Decimal('2375000.00')],
+        )
+        # El total queda limitado al 40% del ingreso neto: base 165,6 UVT -> (165,6 - 150) * 28% + 10 UVT
+        self.assertEqual((first['allowed_total'], first['taxable_base_uvt']), (Decimal('5520000.00'), Decimal('165.60')))
+        self.assertEqual(first['withholding'], Decimal('718000.00'))
+        self.assertEqual(liquidations[0][1][-1]['code'], 'RETENCION_FUENTE')
+
+        # Por debajo de 95 UVT no hay retención ni deducción
+        self.assertEqual(audits[1]['withholding'], Decimal('0.00'))
+        self.assertNotIn('RETENCION_FUENTE', [c['code'] for c in liquidations[1][1]])
+
+        # Procedimiento 2: porcentaje fijo sobre la base (25% exento topado a 790/12 UVT)
+        self.assertEqual((audits[2]['taxable_base'], audits[2]['withholding']),
+                         (Decimal('10508500.00'), Decimal('1103000.00')))
+
+        self.assertIs(bracket_table(2026, parameters['UVT']), bracket_table(2026, Decimal('50000')))
+
+    def test_semiannual_rate_from_twelve_months_of_audits(self):
+        employee = create_employee(self.tenant, 'EMP_001', Decimal('15000000'), withholding_procedure='2')
+        for month in range(1, 13):
+            period = PayrollPeriod.objects.create(name=f'2026-{month}', start_date=date(2026, month, 1),
+                                                  end_date=date(2026, month, 28), payment_date=date(2026, month, 28),
+                                                  status='LIQUIDATED')
+            document = PayrollDocument.objects.create(period=period, employee=employee, conseccutive=0)
+            PayrollWithholding.objects.create(document=document, procedure='2', uvt=Decimal('50000'),
+                                              labor_income=Decimal('15000000'), non_taxable=Decimal('1200000'))
+
+        # Promedio (180M - 14,4M) / 13 = 12.738.461,54; menos 25% exento = 9.553.846,15 (191,08 UVT)
+        # Retención (191,08 - 150) * 28% + 10 UVT = 1.075.076,92 -> 11,25%
+        summary = semiannual_rates(self.tenant.id, date(2026, 12, 31), dry_run=True)
+        self.assertEqual(summary, [{'employee': 'EMP_001', 'average_base': Decimal('9553846.15'),
+                                    'rate': Decimal('11.25')}])
+        employee.refresh_from_db()
+        self.assertEqual(employee.withholding_rate, Decimal('0.00'))
+
+        # Junio solo toma julio del año anterior a junio: aquí seis meses
+        summary = semiannual_rates(self.tenant.id, date(2026, 6, 30))
+        employee.refresh_from_db()
+        self.assertEqual(employee.withholding_rate, summary[0]['rate'])
+        self.assertLess(summary[0]['rate'], Decimal('11.25'))
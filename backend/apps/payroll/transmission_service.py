@@ -0,0 +1,312 @@
+"""
+Transmisión de la nómina electrónica de un periodo a la DIAN.
+
+1. Carga los documentos pendientes con empleado, tercero y detalles en tres
+   consultas y numera en bloque los que aún no tienen consecutivo.
+2. Construye los XML (CUNE incluido) en el hilo principal.
+3. Firma en un pool de hilos con una sola llave cargada (DianXadesSigner.load).
+4. Envía con concurrencia acotada sobre una sesión HTTP compartida.
+5. Actualiza documentos con bulk_update y registra resultado y tiempos por
+   documento en PayrollTransmissionItem.
+
+El endpoint sale de PAYROLL_CONFIG['ELECTRONIC_PAYROLL']['WEBSERVICE_URL'];
+en desarrollo se apunta al stub local (`manage.py payroll_dian_stub`).
+"""
+import base64
+import io
+import logging
+import os
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Max, Prefetch
+from django.utils import timezone
+from lxml import etree
+
+from apps.common.services.dian_signer import DianXadesSigner
+from apps.common.utils import SecurityService
+from apps.tenants.models import Client
+
+from .electronic_payroll import ElectronicPayrollBuilder, split_nit
+from .models import PayrollDetail, PayrollDocument, PayrollTransmissionItem
+
+logger = logging.getLogger(__name__)
+
+SOAP_ACTIONS = {
+    'SendNominaSync': 'http://wcf.dian.colombia/IWcfDianCustomerServices/SendNominaSync',
+    'SendTestSetAsync': 'http://wcf.dian.colombia/IWcfDianCustomerServices/SendTestSetAsync',
+}
+DOCUMENT_FIELDS = ['prefix', 'conseccutive', 'issued_at', 'cune', 'xml_file', 'dian_status', 'dian_response']
+
+
+def load_certificate(client):
+    """
+    Certificado .p12 del emisor y su contraseña: el del tenant, el de
+    DIAN_CONFIG o el local de desarrollo, en ese orden.
+    """
+    if client.dian_certificate:
+        encrypted = client.certificate_password_encrypted
+        # Fallback temporal para legacy o desarrollo
+        if not encrypted and client.dian_certificate_password:
+            password = client.dian_certificate_password
+        else:
+            password = SecurityService.decrypt_password(encrypted)
+        if not password:
+            raise ValueError("No se pudo descifrar la contraseña del certificado.")
+        with client.dian_certificate.open('rb') as handle:
+            return handle.read(), password
+
+    configured = settings.DIAN_CONFIG['CERTIFICATE_PATH']
+    if configured and os.path.exists(configured):
+        return configured, settings.DIAN_CONFIG['CERTIFICATE_PASSWORD']
+
+    # Fallback a archivo local (Solo Dev)
+    cert_path = os.path.join(settings.BASE_DIR, 'apps', 'dian', 'certs', 'certificate.p12')
+    if os.path.exists(cert_path):
+        return cert_path, "Satori2026"
+    raise ValueError("Certificado digital no encontrado (ni en DB ni local).")
+
+
+def parse_dian_response(content):
+    """
+    Lee la respuesta SOAP de SendNominaSync o SendTestSetAsync.
+
+    Returns:
+        (dian_status, código, mensaje)
+    """
+    root = etree.fromstring(content)
+
+    def text(name):
+        node = root.xpath(f'//*[local-name()="{name}"]')
+        return (node[0].text or '').strip() if node else ''
+
+    zip_key = text('ZipKey')
+    if zip_key:
+        # Habilitación: la validación es asíncrona, queda el ZipKey para consultar
+        return 'SENT', '', zip_key
+    errors = [node.text for node in root.xpath('//*[local-name()="ErrorMessage"]/*') if node.text]
+    message = '; '.join([text('StatusDescription')] + errors).strip('; ')
+    status = 'ACCEPTED' if text('IsValid') == 'true' else 'REJECTED'
+    return status, text('StatusCode'), message
+
+
+class PayrollTransmissionService:
+    """Construye, firma y envía los documentos de una transmisión."""
+
+    def __init__(self, transmission, documents=None, session=None):
+        """
+        Args:
+            documents: ids a transmitir; por defecto los pendientes del periodo.
+            session: requests.Session (inyectable en pruebas).
+        """
+        self.transmission = transmission
+        self.client = transmission.client
+        self.document_ids = documents
+        self.config = settings.PAYROLL_CONFIG['ELECTRONIC_PAYROLL']
+        self.session = session
+
+    def run(self):
+        transmission = self.transmission
+        transmission.status = 'PROCESSING'
+        transmission.save(update_fields=['status'])
+        started = time.perf_counter()
+        try:
+            documents = self._documents()
+            if not documents:
+                raise ValueError("No hay documentos pendientes de transmitir en el periodo.")
+            signer = DianXadesSigner(*load_certificate(self.client))
+            signer.load()
+            self._number(documents)
+
+            builder = ElectronicPayrollBuilder(self.client)
+            metrics = {document.pk: {} for document in documents}
+            payloads = [self._build(builder, document, metrics[document.pk]) for document in documents]
+            signed = self._sign(signer, payloads, documents, metrics)
+            results = self._send(signed, documents, metrics)
+            self._save(documents, signed, results, metrics)
+            transmission.status = 'DONE'
+        except ValueError as e:
+            transmission.status = 'FAILED'
+            transmission.error = str(e)
+            logger.warning(f"Transmisión nómina {transmission.pk}: {transmission.error}")
+        transmission.metrics = {**transmission.metrics, 'elapsed_ms': _ms(started)}
+        transmission.finished_at = timezone.now()
+        transmission.save()
+        return transmission
+
+    # ------------------------------------------------------------------
+    # Preparación
+    # ------------------------------------------------------------------
+    def _documents(self):
+        documents = (
+            PayrollDocument.objects
+            .filter(period=self.transmission.period, employee__third_party__client_id=self.client.pk)
+            # SENT: en validación asíncrona (ZipKey); reenviarlo duplicaría el documento
+            .exclude(dian_status__in=('ACCEPTED', 'SENT'))
+            .select_related('period', 'employee__third_party', 'adjusted_document')
+            .prefetch_related(Prefetch('details', queryset=PayrollDetail.objects.order_by('id')))
+            .order_by('id')
+        )
+        if self.document_ids is not None:
+            documents = documents.filter(pk__in=self.document_ids)
+        return list(documents)
+
+    def _number(self, documents):
+        """Asigna prefijo y consecutivo a los documentos sin numerar, por tipo de XML."""
+        prefixes = {'102': self.config['PREFIX'], '103': self.config['ADJUSTMENT_PREFIX']}
+        pending = [document for document in documents if not document.conseccutive]
+        if not pending:
+            return
+        with transaction.atomic():
+            # Bloquea el tenant: dos transmisiones simultáneas no toman el mismo consecutivo
+            Client.objects.select_for_update().filter(pk=self.client.pk).first()
+            last = dict(
+                PayrollDocument.objects
+                .filter(employee__third_party__client_id=self.client.pk)
+                .values('document_type').annotate(last=Max('conseccutive')).order_by()
+                .values_list('document_type', 'last')
+            )
+            for document in pending:
+                last[document.document_type] = (last.get(document.document_type) or 0) + 1
+                document.prefix = prefixes[document.document_type]
+                document.conseccutive = last[document.document_type]
+            PayrollDocument.objects.bulk_update(pending, ['prefix', 'conseccutive'], batch_size=500)
+
+    def _build(self, builder, document, metric):
+        started = time.perf_counter()
+        xml = builder.build(document, list(document.details.all()))
+        metric['build_ms'] = _ms(started)
+        return xml
+
+    # ------------------------------------------------------------------
+    # Firma y envío
+    # ------------------------------------------------------------------
+    def _sign(self, signer, payloads, documents, metrics):
+        def sign(xml):
+            started = time.perf_counter()
+            try:
+                return signer.sign(xml), _ms(started), ''
+            except Exception as e:
+                return None, _ms(started), f"Error firmando XML: {e}"
+
+        with ThreadPoolExecutor(max_workers=max(1, self.config['SIGN_WORKERS'])) as pool:
+            results = list(pool.map(sign, payloads))
+        signed = []
+        for document, (xml, elapsed, error) in zip(documents, results):
+            metrics[document.pk]['sign_ms'] = elapsed
+            if error:
+                metrics[document.pk]['error'] = error
+            signed.append(xml)
+        return signed
+
+    def _send(self, signed, documents, metrics):
+        concurrency = max(1, self.config['SEND_CONCURRENCY'])
+        session = self.session or requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        nit = split_nit(self.client.nit)[0]
+        test_set_id = self.client.dian_test_set_id
+
+        def send(item):
+            document, xml = item
+            if xml is None:
+                return 'FAILED', '', metrics[document.pk]['error'], 0
+            file_name = f"nie{nit:0>10}000{document.issued_at:%y}{document.conseccutive:08x}"
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr(f"{file_name}.xml", xml)
+            content = base64.b64encode(buffer.getvalue()).decode('ascii')
+            action, body = self._envelope(f"z{file_name[3:]}.zip", content, test_set_id)
+
+            started = time.perf_counter()
+            try:
+                response = session.post(
+                    self.config['WEBSERVICE_URL'], data=body.encode('utf-8'), timeout=self.config['SEND_TIMEOUT'],
+                    headers={'Content-Type': f'application/soap+xml;charset=UTF-8;action="{SOAP_ACTIONS[action]}"'},
+                )
+                elapsed = _ms(started)
+                if response.status_code != 200:
+                    return 'FAILED', str(response.status_code), f"HTTP {response.status_code}", elapsed
+                status, code, message = parse_dian_response(response.content)
+                return status, code, message, elapsed
+            except (requests.RequestException, etree.XMLSyntaxError) as e:
+                return 'FAILED', '', str(e), _ms(started)
+
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                return list(pool.map(send, zip(documents, signed)))
+        finally:
+            if self.session is None:
+                session.close()
+
+    @staticmethod
+    def _envelope(file_name, content, test_set_id):
+        if test_set_id:
+            action = 'SendTestSetAsync'
+            payload = (f"<wcf:fileName>{file_name}</wcf:fileName><wcf:contentFile>{content}</wcf:contentFile>"
+                       f"<wcf:testSetId>{test_set_id}</wcf:testSetId>")
+        else:
+            action = 'SendNominaSync'
+            payload = f"<wcf:contentFile>{content}</wcf:contentFile>"
+        return action, (
+            '<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope" xmlns:wcf="http://wcf.dian.colombia">'
+            f'<soap:Header/><soap:Body><wcf:{action}>{payload}</wcf:{action}></soap:Body></soap:Envelope>'
+        )
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+    def _save(self, documents, signed, results, metrics):
+        transmission = self.transmission
+        items = []
+        counts = {'ACCEPTED': 0, 'SENT': 0, 'REJECTED': 0, 'FAILED': 0}
+        for document, xml, (result, code, message, send_ms) in zip(documents, signed, results):
+            counts[result] += 1
+            metric = metrics[document.pk]
+            if result != 'FAILED':
+                # Sin respuesta el documento sigue pendiente y conserva su último estado
+                document.dian_status = result
+                document.dian_response = message
+                document.xml_file.save(f"{document.prefix}{document.conseccutive}.xml", ContentFile(xml), save=False)
+            items.append(PayrollTransmissionItem(
+                transmission=transmission, document=document, result=result, build_ms=metric.get('build_ms', 0),
+                sign_ms=metric.get('sign_ms', 0), send_ms=send_ms, status_code=code,
+                error='' if result in ('ACCEPTED', 'SENT') else message,
+            ))
+
+        with transaction.atomic():
+            PayrollDocument.objects.bulk_update(documents, DOCUMENT_FIELDS, batch_size=500)
+            PayrollTransmissionItem.objects.bulk_create(items, batch_size=1000)
+            period = transmission.period
+            reported = not (period.documents.filter(document_type='102', employee__third_party__client_id=self.client.pk)
+                            .exclude(dian_status='ACCEPTED').exists())
+            if reported and period.status != 'REPORTED':
+                period.status = 'REPORTED'
+                period.save(update_fields=['status'])
+
+        send_times = sorted(item.send_ms for item in items)
+        transmission.document_count = len(items)
+        transmission.accepted_count = counts['ACCEPTED'] + counts['SENT']
+        transmission.rejected_count = counts['REJECTED']
+        transmission.failed_count = counts['FAILED']
+        transmission.metrics = {
+            'build_ms': sum(item.build_ms for item in items),
+            'sign_ms': sum(item.sign_ms for item in items),
+            'send_ms_p50': send_times[len(send_times) // 2],
+            'send_ms_p95': send_times[min(len(send_times) - 1, int(len(send_times) * 0.95))],
+            'send_ms_max': send_times[-1],
+        }
+        logger.info(
+            f"Transmisión nómina {transmission.pk}: {len(items)} documentos, {transmission.accepted_count} aceptados, "
+            f"{transmission.rejected_count} rechazados, {transmission.failed_count} sin respuesta"
+        )
+
+
+def _ms(started):
+    return int((time.perf_counter() - started) * 1000)
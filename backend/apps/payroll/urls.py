@@ -2,7 +2,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     LegalParameterViewSet, NoveltyTypeViewSet, EmployeeNoveltyViewSet,
-    EmployeeViewSet, PayrollPeriodViewSet, PayrollDocumentViewSet
+    EmployeeViewSet, PayrollPeriodViewSet, PayrollDocumentViewSet, PayrollAccountMappingViewSet,
+    PayrollTransmissionViewSet,
 )
 
 router = DefaultRouter()
@@ -12,6 +13,8 @@ router.register(r'employee-novelties', EmployeeNoveltyViewSet, basename='payroll
 router.register(r'employees', EmployeeViewSet, basename='payroll-employee')
 router.register(r'periods', PayrollPeriodViewSet, basename='payroll-period')
 router.register(r'documents', PayrollDocumentViewSet, basename='payroll-document')
+router.register(r'account-mappings', PayrollAccountMappingViewSet, basename='payroll-account-mapping')
+router.register(r'transmissions', PayrollTransmissionViewSet, basename='payroll-transmission')
 
 urlpatterns = [
     path('', include(router.urls)),
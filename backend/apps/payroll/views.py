@@ -4,32 +4,57 @@ from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.db import transaction
 
-from .models import LegalParameter, NoveltyType, EmployeeNovelty, Employee, PayrollPeriod, PayrollDocument, PayrollDetail
+from .models import (
+    LegalParameter, NoveltyType, EmployeeNovelty, Employee, PayrollPeriod, PayrollDocument, PayrollDetail, PayrollConcept,
+    PayrollAccountMapping, PayrollRetroChange, PayrollTransmission,
+)
 from .serializers import (
     LegalParameterSerializer, NoveltyTypeSerializer, EmployeeNoveltySerializer,
-    EmployeeSerializer, PayrollPeriodSerializer, PayrollDocumentSerializer
+    EmployeeSerializer, PayrollPeriodSerializer, PayrollDocumentSerializer, PayrollAccountMappingSerializer,
+    PayrollTransmissionSerializer,
 )
-from .services import PayrollCalculator
+from .services import PayrollCalculator, legal_parameters
+from .novelty_engine import load_period_novelties, EmployeeNovelties
+from .provisions_service import ProvisionService
+from .pila_service import PilaGenerator
+from .transmission_service import PayrollTransmissionService
+from .retro_service import RetroactiveEngine
+from .withholding_service import apply_withholding, save_audits, semiannual_rates
+from . import posting_service, simulation_service
 from .pdf_service import PayrollPDFService
-# from apps.dian.services import ElectronicPayrollBuilder  # TODO: Implementar esta clase
 from apps.tenants.models import Client
-from apps.common.utils import SecurityService
-from django.conf import settings
-import os
-from django.http import HttpResponse
+from apps.tenants.utils import get_current_client_id
+from apps.common.mixins import QueryPlanMixin, CatalogETagMixin
+from apps.common.pagination import KeysetPagination
+import tempfile
+from datetime import date
+from django.utils.dateparse import parse_date
+from django.http import HttpResponse, FileResponse
 
-class LegalParameterViewSet(viewsets.ModelViewSet):
+class LegalParameterViewSet(CatalogETagMixin, viewsets.ModelViewSet):
     serializer_class = LegalParameterSerializer
+    catalog_models = ['payroll.LegalParameter']
 
     def get_queryset(self):
         return LegalParameter.objects.all()
 
-class NoveltyTypeViewSet(viewsets.ModelViewSet):
+class NoveltyTypeViewSet(CatalogETagMixin, viewsets.ModelViewSet):
     serializer_class = NoveltyTypeSerializer
+    catalog_models = ['payroll.NoveltyType']
 
     def get_queryset(self):
         return NoveltyType.objects.all()
 
+class PayrollAccountMappingViewSet(CatalogETagMixin, viewsets.ModelViewSet):
+    serializer_class = PayrollAccountMappingSerializer
+    catalog_models = ['payroll.PayrollAccountMapping', 'accounting.Account']
+
+    def get_queryset(self):
+        return PayrollAccountMapping.objects.select_related('concept', 'debit_account', 'credit_account')
+
+    def perform_create(self, serializer):
+        serializer.save(client_id=int(get_current_client_id()))
+
 class EmployeeNoveltyViewSet(viewsets.ModelViewSet):
     serializer_class = EmployeeNoveltySerializer
     parser_classes = (MultiPartParser, FormParser, JSONParser) 
@@ -44,6 +69,20 @@ class EmployeeViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Employee.objects.all()
 
+    @action(detail=False, methods=['get', 'post'])
+    def withholding_rates(self, request):
+        """
+        Porcentaje fijo semestral de retención (procedimiento 2) a la fecha
+        `as_of` (por defecto hoy). GET lo calcula sin guardar; POST lo
+        actualiza en los empleados.
+        """
+        as_of = request.data.get('as_of') or request.query_params.get('as_of')
+        as_of = parse_date(as_of) if as_of else date.today()
+        if as_of is None:
+            return Response({"error": "Fecha inválida."}, status=400)
+        summary = semiannual_rates(int(get_current_client_id()), as_of, dry_run=request.method == 'GET')
+        return Response({"as_of": as_of, "employees": summary})
+
 class PayrollPeriodViewSet(viewsets.ModelViewSet):
     serializer_class = PayrollPeriodSerializer
 
@@ -61,8 +100,13 @@ class PayrollPeriodViewSet(viewsets.ModelViewSet):
         if period.status in ['PAID', 'REPORTED']:
             return Response({"error": "Periodo ya cerrado o pagado."}, status=400)
 
-        employees = Employee.objects.filter(is_active=True)
+        employees = Employee.objects.filter(is_active=True).select_related('third_party')
         # TODO: Filtrar por fecha ingreso/retiro vs fechas periodo
+
+        # Una consulta para las novedades de todos los empleados y otra para los conceptos
+        novelties = load_period_novelties(period.start_date, period.end_date)
+        concepts_master = {concept.code: concept for concept in PayrollConcept.objects.all()}
+        parameters = legal_parameters(period.end_date)
         
         results = []
         
@@ -71,10 +115,20 @@ class PayrollPeriodViewSet(viewsets.ModelViewSet):
                 # Limpiar liquidaciones previas de este periodo (Borrador)
                 PayrollDocument.objects.filter(period=period).delete()
                 
+                # Primero todos los cálculos: la retención se depura en una sola pasada
+                liquidations, calculators = [], []
                 for emp in employees:
-                    calculator = PayrollCalculator(emp, period.start_date, period.end_date)
-                    concepts = calculator.calculate_concepts()
-                    
+                    calculator = PayrollCalculator(
+                        emp, period.start_date, period.end_date,
+                        novelties=novelties.get(emp.pk, EmployeeNovelties()), concepts=concepts_master,
+                        parameters=parameters,
+                    )
+                    liquidations.append((emp, calculator.calculate_concepts()))
+                    calculators.append(calculator)
+                withholdings = apply_withholding(liquidations, parameters['UVT'], period.end_date.year, concepts_master)
+
+                documents = []
+                for (emp, concepts), calculator in zip(liquidations, calculators):
                     # Totales
                     accrued = sum(c['value'] for c in concepts if c['type'] == 'EARNING')
                     deductions = sum(c['value'] for c in concepts if c['type'] == 'DEDUCTION')
@@ -92,6 +146,7 @@ class PayrollPeriodViewSet(viewsets.ModelViewSet):
                         deductions_total=deductions,
                         net_total=net
                     )
+                    documents.append(doc)
                     
                     # Crear Detalles
                     for c in concepts:
@@ -116,17 +171,131 @@ class PayrollPeriodViewSet(viewsets.ModelViewSet):
                         "position": emp.position,
                         "dian_status": doc.dian_status
                     })
+                save_audits(documents, withholdings)
                 
                 period.status = 'LIQUIDATED'
                 period.save()
+                # Liquidación completa: nada queda pendiente de reliquidar
+                PayrollRetroChange.objects.filter(period=period).delete()
                 
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
         return Response({"message": "Liquidación completada", "results": results})
 
-class PayrollDocumentViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['post'])
+    def provisions(self, request, pk=None):
+        """
+        Provisiona cesantías, intereses, prima y vacaciones del periodo y
+        contabiliza un asiento por centro de costo. Recalcular reemplaza lo anterior.
+        """
+        period = self.get_object()
+        try:
+            summary = ProvisionService(period, int(get_current_client_id()), request.user).run()
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        return Response(summary)
+
+    @action(detail=True, methods=['post'])
+    def post_to_ledger(self, request, pk=None):
+        """
+        Contabiliza la nómina liquidada del periodo en un comprobante
+        (o uno por centro de costo con `by_cost_center=true`).
+        """
+        period = self.get_object()
+        by_cost_center = str(request.data.get('by_cost_center', '')).lower() in ('1', 'true')
+        try:
+            summary = posting_service.post_period(period, int(get_current_client_id()), by_cost_center, request.user)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        return Response(summary, status=201)
+
+    @action(detail=True, methods=['post'])
+    def transmit(self, request, pk=None):
+        """
+        Encola la transmisión a la DIAN de la nómina electrónica del periodo:
+        todos los documentos pendientes se construyen, firman y envían en lote.
+        """
+        from .tasks import transmit_payroll_period
+
+        period = self.get_object()
+        if period.status == 'DRAFT':
+            return Response({"error": "El periodo no ha sido liquidado."}, status=400)
+
+        client_id = int(get_current_client_id())
+        transmission = PayrollTransmission.objects.create(client_id=client_id, period=period, created_by=request.user)
+        task = transmit_payroll_period.delay(client_id, transmission.id)
+        data = PayrollTransmissionSerializer(transmission).data
+        data['task_id'] = task.id
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get', 'post'])
+    def retro(self, request, pk=None):
+        """
+        Reliquidación retroactiva de los empleados afectados por cambios
+        posteriores (parámetros o novedades). GET muestra las diferencias sin
+        guardar; POST las aplica en el documento o como nota de ajuste, y
+        contabiliza la diferencia si el periodo ya estaba contabilizado.
+        """
+        period = self.get_object()
+        engine = RetroactiveEngine(int(get_current_client_id()), user=request.user)
+        try:
+            summary = engine.run(period, dry_run=request.method == 'GET')
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        return Response(summary)
+
+    @action(detail=True, methods=['post'])
+    def simulate(self, request, pk=None):
+        """
+        Simula el costo del periodo con parámetros de ley modificados
+        (`{"overrides": {"SMMLV": 1450000}}`) sin guardar nada.
+        """
+        period = self.get_object()
+        try:
+            overrides = simulation_service.parse_overrides(request.data.get('overrides'))
+            summary = simulation_service.simulate(period, int(get_current_client_id()), overrides)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        return Response(summary)
+
+    @action(detail=True, methods=['get'])
+    def pila(self, request, pk=None):
+        """Descarga la planilla PILA (tipo E) del periodo liquidado."""
+        period = self.get_object()
+        if period.status == 'DRAFT':
+            return Response({"error": "El periodo no ha sido liquidado."}, status=400)
+
+        client = Client.objects.get(pk=get_current_client_id())
+        handle = tempfile.TemporaryFile()
+        try:
+            summary = PilaGenerator(period, client).write(handle)
+        except ValueError as e:
+            handle.close()
+            return Response({"error": str(e)}, status=400)
+        handle.seek(0)
+        response = FileResponse(handle, as_attachment=True, filename=f"pila_{period.end_date:%Y%m}_{client.nit}.txt",
+                                content_type='text/plain')
+        response['X-Pila-Records'] = summary['records']
+        response['X-Pila-Total'] = str(summary['total'])
+        response['X-Pila-Warnings'] = len(summary['warnings'])
+        return response
+
+class PayrollTransmissionViewSet(viewsets.ReadOnlyModelViewSet):
+    """Transmisiones de nómina electrónica con resultado y tiempos por documento."""
+    serializer_class = PayrollTransmissionSerializer
+    filterset_fields = ['period', 'status']
+
+    def get_queryset(self):
+        return PayrollTransmission.objects.prefetch_related('items__document__employee')
+
+class PayrollDocumentViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     serializer_class = PayrollDocumentSerializer
+    pagination_class = KeysetPagination
+    # Sin cliente ni fecha propios: el periodo agrupa y el id desempata
+    keyset_ordering = ('-period', '-id')
+    select_related_plan = {'employee_name': ['employee__third_party']}
+    prefetch_related_plan = {'details': ['details']}
 
     def get_queryset(self):
         return PayrollDocument.objects.all()
@@ -153,77 +322,26 @@ class PayrollDocumentViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def transmit(self, request, pk=None):
         """
-        Transmite el documento a la DIAN.
-        Firma XML -> Empaqueta -> Envía -> Actualiza Estado.
+        Transmite el documento a la DIAN con el emisor del tenant actual.
+        Construye XML -> Firma -> Empaqueta -> Envía -> Actualiza Estado.
         """
         document = self.get_object()
-        
+
         if document.dian_status == 'ACCEPTED':
              return Response({"message": "Documento ya aceptado por DIAN."}, status=400)
 
-        # 1. Obtener Configuración de Empresa (Multi-tenant MVP)
-        company = Client.objects.first()
-        if not company:
-             return Response({"error": "No hay empresa configurada."}, status=500)
-
-        # 2. Obtener Certificado
-        cert_data = None
-        cert_password = None
-
-        if company.dian_certificate:
-            # Usar certificado de la DB
-            try:
-                cert_data = company.dian_certificate.read()
-                # Descifrar contraseña
-                encrypted_pass = company.certificate_password_encrypted
-                # Fallback temporal para legacy o desarrollo
-                if not encrypted_pass and company.dian_certificate_password:
-                     cert_password = company.dian_certificate_password
-                else: 
-                     cert_password = SecurityService.decrypt_password(encrypted_pass)
-
-                if not cert_password:
-                     return Response({"error": "No se pudo descifrar la contraseña del certificado."}, status=500)
-
-            except Exception as e:
-                return Response({"error": f"Error leyendo certificado DB: {str(e)}"}, status=500)
-        else:
-            # Fallback a archivo local (Solo Dev)
-            cert_path = os.path.join(settings.BASE_DIR, 'apps', 'dian', 'certs', 'certificate.p12')
-            if os.path.exists(cert_path):
-                cert_data = cert_path
-                cert_password = "Satori2026"
-            else:
-                 return Response({"error": "Certificado digital no encontrado (ni en DB ni local)."}, status=500)
-            
-        try:
-            # TODO: Implementar ElectronicPayrollBuilder
-            return Response({"error": "Transmisión electrónica de nómina aún no implementada. Documento generado localmente."}, status=501)
-            # builder = ElectronicPayrollBuilder()
-            # result = builder.transmit_document(document, cert_data, cert_password, company)
-            
-            # Guardar XML Firmado (Simulado guardado en archivo o DB)
-            # En producción, guardar result['signed_xml'] en document.xml_file
-            
-            # Analizar Respuesta
-            soap_response = result['soap_response']
-            document.dian_response = soap_response.text
-            
-            # Validar éxito (Simplificado)
-            if soap_response.status_code == 200 and "TrackId" in soap_response.text:
-                document.dian_status = 'SENT'
-            else:
-                document.dian_status = 'REJECTED'
-            
-            document.save()
-            
-            return Response({
-                "message": "Transmisión realizada", 
-                "dian_status": document.dian_status,
-                "dian_response": document.dian_response[:500] # Primeros caracteres
-            })
-            
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return Response({"error": str(e)}, status=500)
+        client_id = int(get_current_client_id())
+        transmission = PayrollTransmission.objects.create(client_id=client_id, period=document.period,
+                                                          created_by=request.user)
+        transmission = PayrollTransmissionService(transmission, documents=[document.pk]).run()
+        if transmission.status == 'FAILED':
+            return Response({"error": transmission.error}, status=400)
+
+        document.refresh_from_db()
+        item = transmission.items.get()
+        return Response({
+            "message": "Transmisión realizada",
+            "dian_status": document.dian_status,
+            "cune": document.cune,
+            "dian_response": item.error or (document.dian_response or '')[:500],
+        }, status=200 if item.result != 'FAILED' else 502)
@@ -0,0 +1,237 @@
+"""
+Retención en la fuente sobre pagos laborales.
+
+- Procedimiento 1 (Art. 385 E.T.): la base depurada del mes se lleva a la
+  tabla del Art. 383.
+- Procedimiento 2 (Art. 386 E.T.): se aplica a la base del mes el
+  porcentaje fijo que se calcula en junio y diciembre con el promedio de
+  los últimos doce meses (`semiannual_rates`).
+
+La tabla marginal se convierte a pesos una sola vez por año gravable y
+valor de UVT (`bracket_table`). La depuración (ingresos no constitutivos,
+deducciones, rentas exentas y sus límites) se hace por columnas para todos
+los empleados de la liquidación a la vez con los datos que ya están en
+memoria: no agrega consultas por empleado. Cada paso queda en
+PayrollWithholding para auditoría.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import Sum
+
+from .models import Employee, LegalParameter, PayrollWithholding
+
+# Art. 383 E.T.: (desde UVT, tarifa marginal, impuesto acumulado en UVT)
+WITHHOLDING_BRACKETS = (
+    (Decimal('0'), Decimal('0'), Decimal('0')),
+    (Decimal('95'), Decimal('0.19'), Decimal('0')),
+    (Decimal('150'), Decimal('0.28'), Decimal('10')),
+    (Decimal('360'), Decimal('0.33'), Decimal('69')),
+    (Decimal('640'), Decimal('0.35'), Decimal('162')),
+    (Decimal('945'), Decimal('0.37'), Decimal('268')),
+    (Decimal('2300'), Decimal('0.39'), Decimal('770')),
+)
+# Concepto de nómina de la retención y código DIAN con el que se guarda el detalle
+WITHHOLDING_CONCEPT = 'RETENCION'
+WITHHOLDING_CODE = 'RETENCION_FUENTE'
+# Aportes obligatorios del empleado: ingresos no constitutivos de renta
+NON_TAXABLE_CODES = ('SALUD', 'PENSION', 'FSP', 'FSP_SUBSISTENCIA')
+# Campos de PayrollWithholding que produce la depuración
+AUDIT_FIELDS = (
+    'labor_income', 'non_taxable', 'dependents', 'prepaid_health', 'housing_interest', 'voluntary',
+    'labor_exempt', 'allowed_total', 'taxable_base', 'taxable_base_uvt', 'rate', 'withholding',
+)
+CENT = Decimal('0.01')
+THOUSAND = Decimal('1000')
+ZERO = Decimal('0')
+
+
+@lru_cache(maxsize=16)
+def bracket_table(year, uvt):
+    """
+    Tabla del Art. 383 en pesos para el año gravable.
+
+    Returns:
+        (límites inferiores, [(desde, tarifa, impuesto acumulado)]) en pesos.
+    """
+    rows = tuple((lower * uvt, rate, base_tax * uvt) for lower, rate, base_tax in WITHHOLDING_BRACKETS)
+    return tuple(row[0] for row in rows), rows
+
+
+def table_tax(base, table):
+    """Impuesto de la tabla marginal para una base en pesos."""
+    lowers, rows = table
+    lower, rate, base_tax = rows[bisect_right(lowers, base) - 1]
+    return (base - lower) * rate + base_tax if rate else ZERO
+
+
+def _round_thousand(value):
+    return (value / THOUSAND).quantize(Decimal('1'), rounding=ROUND_HALF_UP) * THOUSAND
+
+
+def _limits(uvt):
+    """Límites de depuración del mes en pesos."""
+    config = settings.PAYROLL_CONFIG['WITHHOLDING']
+    limits = {key: Decimal(value) for key, value in config.items()}
+    return {key: value * uvt if key.endswith('_UVT') else value for key, value in limits.items()}
+
+
+def clean_bases(columns, uvt):
+    """
+    Depura la base gravable de un lote. Recibe columnas alineadas (una
+    posición por empleado): labor_income, non_taxable, has_dependents (o
+    `dependents` ya calculada), prepaid_health, housing_interest y voluntary.
+    Devuelve las columnas de cada paso con los límites aplicados.
+    """
+    limits = _limits(uvt)
+    income, non_taxable = columns['labor_income'], columns['non_taxable']
+    net = [max(total - incr, ZERO) for total, incr in zip(income, non_taxable)]
+
+    if 'dependents' in columns:
+        dependents = [min(value, limits['DEPENDENTS_MAX_UVT']) for value in columns['dependents']]
+    else:
+        dependents = [min(total * limits['DEPENDENTS_RATE'], limits['DEPENDENTS_MAX_UVT']) if flag else ZERO
+                      for total, flag in zip(income, columns['has_dependents'])]
+    prepaid = [min(value, limits['PREPAID_HEALTH_MAX_UVT']) for value in columns['prepaid_health']]
+    housing = [min(value, limits['HOUSING_INTEREST_MAX_UVT']) for value in columns['housing_interest']]
+    voluntary = [min(value, total * limits['VOLUNTARY_RATE'], limits['VOLUNTARY_MAX_UVT'])
+                 for value, total in zip(columns['voluntary'], income)]
+    claimed = [sum(values) for values in zip(dependents, prepaid, housing, voluntary)]
+
+    # 25% exento sobre lo que queda después de deducciones y demás rentas exentas
+    labor_exempt = [min(max(base - other, ZERO) * limits['LABOR_EXEMPT_RATE'], limits['LABOR_EXEMPT_MAX_UVT'])
+                    for base, other in zip(net, claimed)]
+    allowed = [min(other + exempt, base * limits['TOTAL_RATE'], limits['TOTAL_MAX_UVT'])
+               for other, exempt, base in zip(claimed, labor_exempt, net)]
+    taxable = [max(base - total, ZERO) for base, total in zip(net, allowed)]
+    return {
+        'labor_income': list(income), 'non_taxable': list(non_taxable), 'dependents': dependents,
+        'prepaid_health': prepaid, 'housing_interest': housing, 'voluntary': voluntary,
+        'labor_exempt': labor_exempt, 'allowed_total': allowed, 'taxable_base': taxable,
+    }
+
+
+def compute_withholding(columns, procedures, rates, uvt, year):
+    """
+    Retención de un lote: procedimiento 1 con la tabla del año,
+    procedimiento 2 con el porcentaje fijo de cada empleado. Redondea al
+    múltiplo de mil más cercano.
+    """
+    table = bracket_table(year, uvt)
+    result = clean_bases(columns, uvt)
+    withholding, applied = [], []
+    for base, procedure, rate in zip(result['taxable_base'], procedures, rates):
+        if procedure == '2':
+            withholding.append(_round_thousand(base * rate / 100))
+            applied.append(rate)
+        else:
+            withholding.append(_round_thousand(table_tax(base, table)))
+            applied.append(ZERO)
+    result['taxable_base_uvt'] = [base / uvt for base in result['taxable_base']]
+    result['rate'] = applied
+    result['withholding'] = withholding
+    return {field: [value.quantize(CENT) for value in result[field]] for field in AUDIT_FIELDS}
+
+
+def apply_withholding(liquidations, uvt, year, concepts=None):
+    """
+    Pasada de retención sobre toda una liquidación.
+
+    Args:
+        liquidations: [(employee, conceptos de PayrollCalculator)]; a los que
+            tienen retención se les agrega la deducción.
+        concepts: {code: PayrollConcept} para el nombre y código DIAN.
+
+    Returns:
+        Lista alineada de dicts con la depuración (campos de PayrollWithholding).
+    """
+    if not liquidations:
+        return []
+    employees = [employee for employee, _ in liquidations]
+    columns = {
+        'labor_income': [sum((c['value'] for c in rows if c['type'] == 'EARNING'), ZERO) for _, rows in liquidations],
+        'non_taxable': [sum((c['value'] for c in rows if c['type'] == 'DEDUCTION' and c['code'] in NON_TAXABLE_CODES), ZERO)
+                        for _, rows in liquidations],
+        'has_dependents': [employee.has_dependents for employee in employees],
+        'prepaid_health': [Decimal(employee.prepaid_health) for employee in employees],
+        'housing_interest': [Decimal(employee.housing_interest) for employee in employees],
+        'voluntary': [Decimal(employee.voluntary_contributions) for employee in employees],
+    }
+    result = compute_withholding(columns, [e.withholding_procedure for e in employees],
+                                 [Decimal(e.withholding_rate) for e in employees], uvt, year)
+
+    concept = (concepts or {}).get(WITHHOLDING_CONCEPT)
+    audits = []
+    for i, (employee, rows) in enumerate(liquidations):
+        audit = {field: result[field][i] for field in AUDIT_FIELDS}
+        audit.update(procedure=employee.withholding_procedure, uvt=uvt)
+        audits.append(audit)
+        if audit['withholding'] > 0:
+            rows.append({
+                'code': WITHHOLDING_CODE,
+                'description': concept.name if concept else 'Retención en la Fuente',
+                'quantity': 0,
+                'value': audit['withholding'],
+                'type': 'DEDUCTION',
+            })
+    return audits
+
+
+def save_audits(documents, audits):
+    """Guarda la depuración de cada documento reemplazando la anterior."""
+    PayrollWithholding.objects.filter(document__in=[d for d in documents if d.pk]).delete()
+    PayrollWithholding.objects.bulk_create(
+        [PayrollWithholding(document=document, **audit) for document, audit in zip(documents, audits)],
+        batch_size=1000,
+    )
+
+
+def semiannual_rates(client_id, as_of, dry_run=False):
+    """
+    Porcentaje fijo del procedimiento 2 (junio y diciembre): promedia las
+    depuraciones de los últimos doce meses entre 13, lleva el promedio a la
+    tabla y divide la retención por la base. Una consulta agregada para todos
+    los empleados del tenant.
+
+    Returns:
+        [{employee, months, average_base, rate}] de los empleados con historia.
+    """
+    start = as_of - timedelta(days=365)
+    fields = ('labor_income', 'non_taxable', 'dependents', 'prepaid_health', 'housing_interest', 'voluntary')
+    history = (
+        PayrollWithholding.objects
+        .filter(document__employee__third_party__client_id=client_id,
+                document__employee__withholding_procedure='2', document__document_type='102',
+                document__period__end_date__gt=start, document__period__end_date__lte=as_of)
+        .values('document__employee_id')
+        .annotate(**{f'total_{field}': Sum(field) for field in fields})
+        .order_by('document__employee_id')
+    )
+    history = list(history)
+    if not history:
+        return []
+
+    thirteen = Decimal('13')
+    uvt = LegalParameter.get_value('UVT', as_of)
+    columns = defaultdict(list)
+    for row in history:
+        for field in fields:
+            columns[field].append(row[f'total_{field}'] / thirteen)
+    # Las deducciones ya vienen limitadas mes a mes: el promedio no supera los límites
+    averages = clean_bases(columns, uvt)
+
+    table = bracket_table(as_of.year, uvt)
+    employees = Employee.objects.in_bulk([row['document__employee_id'] for row in history])
+    summary = []
+    for row, base in zip(history, averages['taxable_base']):
+        employee = employees[row['document__employee_id']]
+        employee.withholding_rate = (table_tax(base, table) / base * 100).quantize(CENT) if base else ZERO
+        summary.append({'employee': employee.code, 'average_base': base.quantize(CENT),
+                        'rate': employee.withholding_rate})
+    if not dry_run:
+        Employee.objects.bulk_update(employees.values(), ['withholding_rate'], batch_size=500)
+    return summary
@@ -0,0 +1,40 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_type', models.CharField(choices=[('TRIAL_BALANCE', 'Balance de Comprobación'), ('AGING', 'Cartera por Edades'), ('CASH_POSITION', 'Posición de Caja')], max_length=20, verbose_name='Tipo de Reporte')),
+                ('as_of', models.DateField(verbose_name='Fecha de Corte')),
+                ('data_file', models.FileField(upload_to='report_snapshots/', verbose_name='Datos (Columnar Comprimido)')),
+                ('columns', models.JSONField(default=list, verbose_name='Columnas')),
+                ('row_count', models.IntegerField(default=0, verbose_name='Filas')),
+                ('watermark', models.BigIntegerField(default=0, verbose_name='Marca de Agua (Línea)')),
+                ('is_stale', models.BooleanField(default=False, verbose_name='Desactualizado')),
+                ('stale_reason', models.CharField(blank=True, choices=[('', 'Vigente'), ('LATE_ENTRY', 'Movimientos posteriores (recálculo incremental)'), ('REBUILD', 'Requiere recálculo completo')], default='', max_length=20, verbose_name='Motivo')),
+                ('generated_at', models.DateTimeField(auto_now=True, verbose_name='Generado')),
+                ('generation_ms', models.IntegerField(default=0, verbose_name='Duración (ms)')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.client', verbose_name='Cliente (Tenant)')),
+            ],
+            options={
+                'verbose_name': 'Snapshot de Reporte',
+                'verbose_name_plural': 'Snapshots de Reportes',
+                'unique_together': {('client', 'report_type', 'as_of')},
+                'indexes': [
+                    models.Index(fields=['client', 'report_type', '-as_of'], name='report_snap_type_asof_idx'),
+                    models.Index(fields=['client', 'is_stale'], name='report_snap_stale_idx'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-19 19:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportsnapshot',
+            name='watermark_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Marca de Agua (Instante)'),
+        ),
+    ]
@@ -1 +1,54 @@
-from django.db import models
\ No newline at end of file
+from django.db import models
+from apps.common.managers import TenantAwareManager
+
+
+class ReportSnapshot(models.Model):
+    """
+    Reporte precalculado (job nocturno) por tenant y fecha de corte.
+
+    Los datos se guardan comprimidos en formato columnar (gzip) en `data_file`;
+    esta fila solo contiene la metadata para servirlos sin recalcular.
+    """
+    REPORT_TYPE_CHOICES = [
+        ('TRIAL_BALANCE', 'Balance de Comprobación'),
+        ('AGING', 'Cartera por Edades'),
+        ('CASH_POSITION', 'Posición de Caja'),
+    ]
+
+    STALE_REASON_CHOICES = [
+        ('', 'Vigente'),
+        ('LATE_ENTRY', 'Movimientos posteriores (recálculo incremental)'),
+        ('REBUILD', 'Requiere recálculo completo'),
+    ]
+
+    client = models.ForeignKey('tenants.Client', on_delete=models.CASCADE, verbose_name="Cliente (Tenant)")
+    report_type = models.CharField(max_length=20, choices=REPORT_TYPE_CHOICES, verbose_name="Tipo de Reporte")
+    as_of = models.DateField(verbose_name="Fecha de Corte")
+
+    data_file = models.FileField(upload_to='report_snapshots/', verbose_name="Datos (Columnar Comprimido)")
+    columns = models.JSONField(default=list, verbose_name="Columnas")
+    row_count = models.IntegerField(default=0, verbose_name="Filas")
+
+    # Marca de agua: último JournalEntryLine.id incluido en el cálculo
+    watermark = models.BigIntegerField(default=0, verbose_name="Marca de Agua (Línea)")
+    # Instante de la marca de agua: asientos contabilizados después quedan para el recálculo
+    watermark_at = models.DateTimeField(null=True, blank=True, verbose_name="Marca de Agua (Instante)")
+    is_stale = models.BooleanField(default=False, verbose_name="Desactualizado")
+    stale_reason = models.CharField(max_length=20, choices=STALE_REASON_CHOICES, blank=True, default='', verbose_name="Motivo")
+
+    generated_at = models.DateTimeField(auto_now=True, verbose_name="Generado")
+    generation_ms = models.IntegerField(default=0, verbose_name="Duración (ms)")
+
+    objects = TenantAwareManager()
+
+    class Meta:
+        verbose_name = "Snapshot de Reporte"
+        verbose_name_plural = "Snapshots de Reportes"
+        unique_together = ('client', 'report_type', 'as_of')
+        indexes = [
+            models.Index(fields=['client', 'report_type', '-as_of'], name='report_snap_type_asof_idx'),
+            models.Index(fields=['client', 'is_stale'], name='report_snap_stale_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_report_type_display()} {self.as_of}"
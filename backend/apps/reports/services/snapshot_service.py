@@ -0,0 +1,325 @@
+import gzip
+import json
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Sum, Max, Q, F, Value, DecimalField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.accounting.models import JournalEntry, JournalEntryLine
+from apps.electronic_events.models import ReceivedInvoice
+from apps.invoicing.models import Invoice
+from apps.treasury.models import BankAccount
+from apps.reports.models import ReportSnapshot
+from apps.reports.signals import LEDGER_REPORTS
+
+ZERO = Value(Decimal('0'), output_field=DecimalField(max_digits=18, decimal_places=2))
+
+# Rangos de vencimiento (días) para la cartera por edades
+AGING_BUCKETS = [
+    ('current', None, 0),
+    ('d1_30', 1, 30),
+    ('d31_60', 31, 60),
+    ('d61_90', 61, 90),
+    ('over_90', 91, None),
+]
+
+
+def encode_columnar(columns, rows):
+    """
+    Serializa filas a formato columnar ({columna: [valores]}) comprimido con gzip.
+    Decimal y fechas se guardan como texto para no perder precisión.
+    """
+    data = {col: [] for col in columns}
+    for row in rows:
+        for col in columns:
+            value = row.get(col)
+            if isinstance(value, (Decimal, date)):
+                value = str(value)
+            data[col].append(value)
+    payload = json.dumps({'columns': columns, 'data': data}, separators=(',', ':'))
+    return gzip.compress(payload.encode('utf-8'))
+
+
+def decode_columnar(raw):
+    """Inverso de `encode_columnar`: devuelve (columns, data columnar)."""
+    payload = json.loads(gzip.decompress(raw).decode('utf-8'))
+    return payload['columns'], payload['data']
+
+
+def columnar_to_rows(columns, data):
+    return [dict(zip(columns, values)) for values in zip(*(data[col] for col in columns))]
+
+
+class ReportSnapshotService:
+    """
+    Precalcula y persiste reportes por tenant (Balance de Comprobación,
+    Cartera por Edades y Posición de Caja).
+
+    Debe ejecutarse dentro de un contexto de tenant (ver `tenant_context`).
+    """
+
+    TRIAL_BALANCE_COLUMNS = ['account_id', 'code', 'name', 'nature', 'debit', 'credit', 'balance']
+    AGING_COLUMNS = ['kind', 'third_party', 'name'] + [b[0] for b in AGING_BUCKETS] + ['total']
+    CASH_POSITION_COLUMNS = ['bank_account_id', 'bank_name', 'name', 'account_number', 'currency', 'gl_code', 'balance']
+
+    def __init__(self, client_id):
+        self.client_id = client_id
+
+    # ------------------------------------------------------------------
+    # Orquestación
+    # ------------------------------------------------------------------
+    def generate_all(self, as_of):
+        """Genera (o reemplaza) los tres snapshots del tenant para la fecha de corte."""
+        return {
+            report_type: self.generate(report_type, as_of).row_count
+            for report_type, _ in ReportSnapshot.REPORT_TYPE_CHOICES
+        }
+
+    def generate(self, report_type, as_of):
+        started = time.monotonic()
+        watermark = self._current_watermark()
+        columns, rows = self._build(report_type, as_of, line_filter=self._up_to(watermark))
+        return self._store(report_type, as_of, columns, rows, watermark, started)
+
+    def refresh(self, snapshot):
+        """
+        Recalcula un snapshot marcado como desactualizado.
+
+        Para Balance de Comprobación y Posición de Caja, si el motivo es
+        'LATE_ENTRY' solo se agregan las líneas nuevas (id > marca de agua) o
+        las de asientos contabilizados después de la generación, y se suman
+        al snapshot existente. La cartera y las anulaciones ('REBUILD')
+        se recalculan completas.
+        """
+        if snapshot.stale_reason == 'LATE_ENTRY' and snapshot.report_type in ('TRIAL_BALANCE', 'CASH_POSITION'):
+            return self._refresh_incremental(snapshot)
+        return self.generate(snapshot.report_type, snapshot.as_of)
+
+    def _build(self, report_type, as_of, line_filter=None):
+        if report_type == 'TRIAL_BALANCE':
+            return self.TRIAL_BALANCE_COLUMNS, self.trial_balance_rows(as_of, line_filter)
+        if report_type == 'AGING':
+            return self.AGING_COLUMNS, self.aging_rows(as_of)
+        if report_type == 'CASH_POSITION':
+            return self.CASH_POSITION_COLUMNS, self.cash_position_rows(as_of, line_filter)
+        raise ValueError(f"Tipo de reporte no soportado: {report_type}")
+
+    # ------------------------------------------------------------------
+    # Cálculos
+    # ------------------------------------------------------------------
+    def _posted_lines(self, as_of, line_filter=None):
+        qs = JournalEntryLine.objects.filter(entry__status='POSTED', entry__date__lte=as_of)
+        if line_filter is not None:
+            qs = qs.filter(line_filter)
+        return qs
+
+    def trial_balance_rows(self, as_of, line_filter=None):
+        """Sumas y saldos por cuenta en una sola consulta agrupada."""
+        grouped = (
+            self._posted_lines(as_of, line_filter)
+            .values('account_id', 'account__code', 'account__name', 'account__nature')
+            .annotate(debit=Coalesce(Sum('debit'), ZERO), credit=Coalesce(Sum('credit'), ZERO))
+            .order_by('account__code')
+        )
+        rows = []
+        for item in grouped:
+            nature = item['account__nature']
+            balance = item['debit'] - item['credit'] if nature == 'DEBITO' else item['credit'] - item['debit']
+            rows.append({
+                'account_id': item['account_id'],
+                'code': item['account__code'],
+                'name': item['account__name'],
+                'nature': nature,
+                'debit': item['debit'],
+                'credit': item['credit'],
+                'balance': balance,
+            })
+        return rows
+
+    def aging_rows(self, as_of):
+        """
+        Cartera por edades a la fecha de corte: CxC (facturas de venta menos
+        recibos aplicados, por fecha de vencimiento) y CxP (facturas recibidas
+        menos pagos contabilizados, por fecha de emisión).
+        """
+        rows = []
+
+        receivables = (
+            Invoice.objects
+            .filter(status__in=Invoice.RECEIVABLE_STATUSES, issue_date__lte=as_of)
+            .annotate(paid=Coalesce(
+                Sum('receipt_applications__amount', filter=Q(receipt_applications__receipt__status='POSTED',
+                                                             receipt_applications__receipt__receipt_date__lte=as_of)),
+                ZERO,
+            ))
+            .annotate(outstanding=F('total') - F('paid'))
+            .filter(outstanding__gt=0)
+            .values('customer_id', 'customer__identification_number', 'customer__business_name',
+                    'customer__first_name', 'customer__surname', 'payment_due_date', 'outstanding')
+        )
+        by_customer = {}
+        for item in receivables:
+            key = item['customer_id']
+            if key not in by_customer:
+                name = item['customer__business_name'] or f"{item['customer__first_name']} {item['customer__surname']}".strip()
+                by_customer[key] = self._empty_aging_row('CXC', item['customer__identification_number'], name)
+            self._add_to_bucket(by_customer[key], (as_of - item['payment_due_date']).days, item['outstanding'])
+        rows.extend(by_customer.values())
+
+        payables = (
+            ReceivedInvoice.objects
+            .filter(client_id=self.client_id, issue_date__lte=as_of)
+            .annotate(paid=Coalesce(
+                Sum('payments__amount_paid', filter=Q(payments__payment_out__status='POSTED',
+                                                      payments__payment_out__payment_date__lte=as_of)),
+                ZERO,
+            ))
+            .annotate(outstanding=F('total_amount') - F('paid'))
+            .filter(outstanding__gt=0)
+            .values_list('issuer_nit', 'issuer_name', 'issue_date', 'outstanding')
+        )
+        by_supplier = {}
+        for nit, name, issue_date, outstanding in payables:
+            if nit not in by_supplier:
+                by_supplier[nit] = self._empty_aging_row('CXP', nit, name)
+            self._add_to_bucket(by_supplier[nit], (as_of - issue_date).days, outstanding)
+        rows.extend(by_supplier.values())
+
+        return rows
+
+    def _empty_aging_row(self, kind, third_party, name):
+        row = {'kind': kind, 'third_party': third_party, 'name': name, 'total': Decimal('0')}
+        for bucket, _, _ in AGING_BUCKETS:
+            row[bucket] = Decimal('0')
+        return row
+
+    def _add_to_bucket(self, row, days_overdue, amount):
+        for bucket, low, high in AGING_BUCKETS:
+            if (low is None or days_overdue >= low) and (high is None or days_overdue <= high):
+                row[bucket] += amount
+                break
+        row['total'] += amount
+
+    def cash_position_rows(self, as_of, line_filter=None):
+        """Saldo de cada cuenta bancaria según su cuenta contable (PUC)."""
+        banks = list(
+            BankAccount.objects.filter(client_id=self.client_id)
+            .select_related('gl_account')
+            .order_by('bank_name', 'name')
+        )
+        balances = dict(
+            self._posted_lines(as_of, line_filter)
+            .filter(account_id__in=[b.gl_account_id for b in banks])
+            .values('account_id')
+            .annotate(balance=Coalesce(Sum('debit'), ZERO) - Coalesce(Sum('credit'), ZERO))
+            .values_list('account_id', 'balance')
+        )
+        return [{
+            'bank_account_id': bank.id,
+            'bank_name': bank.bank_name,
+            'name': bank.name,
+            'account_number': bank.account_number,
+            'currency': bank.currency,
+            'gl_code': bank.gl_account.code,
+            'balance': balances.get(bank.gl_account_id, Decimal('0')),
+        } for bank in banks]
+
+    # ------------------------------------------------------------------
+    # Recálculo incremental
+    # ------------------------------------------------------------------
+    def _refresh_incremental(self, snapshot):
+        started = time.monotonic()
+        watermark = self._current_watermark()
+        delta_filter = self._after((snapshot.watermark, snapshot.watermark_at or snapshot.generated_at))
+        columns, delta_rows = self._build(snapshot.report_type, snapshot.as_of,
+                                          line_filter=delta_filter & self._up_to(watermark))
+
+        _, data = load_snapshot_data(snapshot)
+        rows = columnar_to_rows(columns, data)
+
+        if snapshot.report_type == 'TRIAL_BALANCE':
+            key, amount_fields = 'account_id', ('debit', 'credit', 'balance')
+        else:
+            key, amount_fields = 'bank_account_id', ('balance',)
+
+        merged = {row[key]: row for row in rows}
+        for row in delta_rows:
+            current = merged.get(row[key])
+            if current is None:
+                merged[row[key]] = row
+                continue
+            for field in amount_fields:
+                current[field] = Decimal(str(current[field])) + row[field]
+
+        sort_key = 'code' if snapshot.report_type == 'TRIAL_BALANCE' else 'bank_account_id'
+        ordered = sorted(merged.values(), key=lambda r: r[sort_key])
+        return self._store(snapshot.report_type, snapshot.as_of, columns, ordered, watermark, started)
+
+    def _current_watermark(self):
+        """
+        Marca de agua del cálculo: (último id de línea, instante). El cálculo
+        lee solo lo contabilizado hasta esa marca (`_up_to`) y el recálculo
+        incremental toma exactamente lo posterior (`_after`), de modo que lo
+        que se contabiliza mientras se genera el snapshot no se pierde ni se
+        suma dos veces.
+        """
+        instant = timezone.now()
+        return JournalEntryLine.objects.aggregate(m=Max('id'))['m'] or 0, instant
+
+    @staticmethod
+    def _up_to(watermark):
+        last_id, instant = watermark
+        return Q(id__lte=last_id) & (Q(entry__posted_at__lte=instant) | Q(entry__posted_at__isnull=True))
+
+    @staticmethod
+    def _after(watermark):
+        last_id, instant = watermark
+        return Q(id__gt=last_id) | Q(entry__posted_at__gt=instant)
+
+    def _has_lines_after(self, watermark, as_of):
+        """Hay movimientos contabilizados después de la marca con fecha hasta el corte."""
+        last_id, instant = watermark
+        return (
+            JournalEntryLine.objects.filter(id__gt=last_id, entry__status='POSTED', entry__date__lte=as_of).exists()
+            or JournalEntry.objects.filter(status='POSTED', posted_at__gt=instant, date__lte=as_of).exists()
+        )
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+    @transaction.atomic
+    def _store(self, report_type, as_of, columns, rows, watermark, started):
+        snapshot, _ = ReportSnapshot.objects.select_for_update().get_or_create(
+            client_id=self.client_id, report_type=report_type, as_of=as_of,
+        )
+        old_name = snapshot.data_file.name if snapshot.data_file else None
+
+        filename = f"{self.client_id}/{report_type.lower()}_{as_of.isoformat()}.json.gz"
+        snapshot.data_file.save(filename, ContentFile(encode_columnar(columns, rows)), save=False)
+        snapshot.columns = columns
+        snapshot.row_count = len(rows)
+        snapshot.watermark, snapshot.watermark_at = watermark
+        # Lo contabilizado después de la marca (y que ya pudo marcar el snapshot) queda pendiente
+        late = report_type in LEDGER_REPORTS and self._has_lines_after(watermark, as_of)
+        snapshot.is_stale = late
+        snapshot.stale_reason = 'LATE_ENTRY' if late else ''
+        snapshot.generation_ms = int((time.monotonic() - started) * 1000)
+        snapshot.save()
+
+        if old_name and old_name != snapshot.data_file.name:
+            snapshot.data_file.storage.delete(old_name)
+        return snapshot
+
+
+def load_snapshot_data(snapshot):
+    """Lee y descomprime los datos columnares de un snapshot."""
+    snapshot.data_file.open('rb')
+    try:
+        return decode_columnar(snapshot.data_file.read())
+    finally:
+        snapshot.data_file.close()
@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.accounting.models import JournalEntry
+from apps.electronic_events.models import ReceivedInvoice
+from apps.invoicing.models import Invoice
+from apps.treasury.models import CashReceipt, PaymentOut
+from apps.tenants.utils import tenant_context
+from .models import ReportSnapshot
+
+LEDGER_REPORTS = ['TRIAL_BALANCE', 'CASH_POSITION']
+
+
+def mark_snapshots_stale(client_id, report_types, from_date, reason):
+    """
+    Marca como desactualizados los snapshots con fecha de corte >= from_date.
+    Un motivo 'REBUILD' nunca se degrada a 'LATE_ENTRY'.
+    """
+    if not client_id or from_date is None:
+        return
+    with tenant_context(client_id):
+        qs = ReportSnapshot.objects.filter(report_type__in=report_types, as_of__gte=from_date)
+        if reason == 'LATE_ENTRY':
+            qs = qs.exclude(stale_reason='REBUILD')
+        qs.update(is_stale=True, stale_reason=reason)
+
+
+def ledger_bulk_written(client_id, entry_date):
+    """
+    Asientos contabilizados con bulk_create (que no dispara señales) desde
+    `entry_date`: al confirmar la transacción marca los reportes del libro.
+    Lo llaman todos los escritores masivos del libro.
+    """
+    transaction.on_commit(lambda: mark_snapshots_stale(client_id, LEDGER_REPORTS, entry_date, 'LATE_ENTRY'))
+
+
+@receiver(post_save, sender=JournalEntry)
+def journal_entry_freshness(sender, instance, **kwargs):
+    if instance.status == 'POSTED':
+        mark_snapshots_stale(instance.client_id, LEDGER_REPORTS, instance.date, 'LATE_ENTRY')
+    elif instance.status == 'CANCELLED' and instance.posted_at:
+        # Anulación de un asiento ya contabilizado: el delta no es aditivo
+        mark_snapshots_stale(instance.client_id, LEDGER_REPORTS, instance.date, 'REBUILD')
+
+
+@receiver(post_delete, sender=JournalEntry)
+def journal_entry_deleted(sender, instance, **kwargs):
+    if instance.status == 'POSTED':
+        mark_snapshots_stale(instance.client_id, LEDGER_REPORTS, instance.date, 'REBUILD')
+
+
+@receiver(post_save, sender=Invoice)
+def invoice_freshness(sender, instance, **kwargs):
+    mark_snapshots_stale(instance.client_id, ['AGING'], instance.issue_date, 'REBUILD')
+
+
+@receiver(post_save, sender=ReceivedInvoice)
+def received_invoice_freshness(sender, instance, **kwargs):
+    mark_snapshots_stale(instance.client_id, ['AGING'], instance.issue_date, 'REBUILD')
+
+
+@receiver(post_save, sender=PaymentOut)
+def payment_out_freshness(sender, instance, **kwargs):
+    if instance.status in ('POSTED', 'CANCELLED'):
+        mark_snapshots_stale(instance.client_id, ['AGING'], instance.payment_date, 'REBUILD')
+
+
+@receiver(post_save, sender=CashReceipt)
+def cash_receipt_freshness(sender, instance, **kwargs):
+    if instance.status in ('POSTED', 'CANCELLED'):
+        mark_snapshots_stale(instance.client_id, ['AGING'], instance.receipt_date, 'REBUILD')
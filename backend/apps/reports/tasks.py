@@ -0,0 +1,63 @@
+from datetime import datetime
+
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+from apps.tenants.models import Client
+from apps.tenants.utils import run_for_tenants
+from .models import ReportSnapshot
+from .services.snapshot_service import ReportSnapshotService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _max_workers():
+    return settings.REPORTS_CONFIG.get('SNAPSHOT_MAX_WORKERS', 4)
+
+
+@shared_task
+def generate_daily_reports(as_of=None):
+    """
+    Job nocturno (Celery Beat 23:00): precalcula Balance de Comprobación,
+    Cartera por Edades y Posición de Caja para todos los tenants activos.
+    """
+    as_of = datetime.strptime(as_of, '%Y-%m-%d').date() if as_of else timezone.localdate()
+    client_ids = list(Client.objects.filter(is_active=True).values_list('id', flat=True))
+    logger.info(f"Snapshots: generando reportes al {as_of} para {len(client_ids)} tenants...")
+
+    results = run_for_tenants(
+        lambda client_id: ReportSnapshotService(client_id).generate_all(as_of),
+        client_ids,
+        max_workers=_max_workers(),
+    )
+
+    errors = [cid for cid, result in results.items() if isinstance(result, Exception)]
+    if errors:
+        logger.warning(f"Snapshots: {len(errors)} tenants con errores: {errors}")
+    return f"Tenants: {len(client_ids)}, Errors: {len(errors)}"
+
+
+@shared_task
+def refresh_stale_reports():
+    """
+    Recalcula los snapshots marcados como desactualizados (asientos tardíos,
+    anulaciones o cambios de cartera). El recálculo es incremental cuando es posible.
+    """
+    # Consulta transversal a todos los tenants (sin filtro de TenantAwareManager)
+    client_ids = list(
+        ReportSnapshot._base_manager.filter(is_stale=True)
+        .values_list('client_id', flat=True).distinct()
+    )
+    if not client_ids:
+        return "Stale: 0"
+
+    def _refresh(client_id):
+        service = ReportSnapshotService(client_id)
+        snapshots = ReportSnapshot.objects.filter(is_stale=True).order_by('as_of')
+        return sum(1 for snapshot in snapshots if service.refresh(snapshot))
+
+    results = run_for_tenants(_refresh, client_ids, max_workers=_max_workers())
+    refreshed = sum(r for r in results.values() if not isinstance(r, Exception))
+    logger.info(f"Snapshots: {refreshed} reportes recalculados en {len(client_ids)} tenants.")
+    return f"Stale: {refreshed}"
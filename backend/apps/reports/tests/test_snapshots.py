@@ -0,0 +1,132 @@
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework.test import APIClient
+from apps.common.tests import TenantTestCase
+from apps.tenants.utils import set_current_client_id, tenant_context
+from apps.accounting.models import JournalEntry, JournalEntryLine
+from apps.treasury.models import BankAccount
+from apps.reports.models import ReportSnapshot
+from apps.reports.services.snapshot_service import ReportSnapshotService, load_snapshot_data
+from apps.reports.tasks import generate_daily_reports, refresh_stale_reports
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def run_inline(func, client_ids, max_workers=4):
+    # Mismo contrato que run_for_tenants, en el hilo del test (la BD de prueba no se comparte entre hilos)
+    results = {}
+    for client_id in client_ids:
+        with tenant_context(client_id):
+            results[client_id] = func(client_id)
+    return results
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+@patch('apps.reports.tasks.run_for_tenants', run_inline)
+class ReportSnapshotTests(TenantTestCase):
+    """Snapshots nocturnos, marcas de desactualización y recálculo incremental."""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.bank = self.create_account('1', 'DEBITO', '11', '111005', 'ACTIVO')
+        self.income = self.create_account('4', 'CREDITO', '41', '413505', 'INGRESO')
+        BankAccount.objects.create(client=self.tenant, name='Corriente', account_number='123', bank_name='Bancolombia',
+                                   gl_account=self.bank)
+        self._entry('1', date(2026, 1, 10), Decimal('1000'))
+
+    def _entry(self, number, entry_date, amount, post=True):
+        entry = JournalEntry.objects.create(
+            client=self.tenant, number=number, entry_type='DIARIO', date=entry_date, description=number,
+        )
+        JournalEntryLine.objects.create(client=self.tenant, entry=entry, line_number=1, account=self.bank,
+                                        description=number, debit=amount, credit=0)
+        JournalEntryLine.objects.create(client=self.tenant, entry=entry, line_number=2, account=self.income,
+                                        description=number, debit=0, credit=amount)
+        if post:
+            self._post(entry)
+        return entry
+
+    def _post(self, entry):
+        entry.status = 'POSTED'
+        entry.save()
+
+    def _balances(self, snapshot):
+        _, data = load_snapshot_data(snapshot)
+        return [Decimal(value) for value in data['balance']]
+
+    def test_daily_job_and_incremental_refresh_of_late_entries(self):
+        self.assertEqual(generate_daily_reports('2026-01-31'), "Tenants: 1, Errors: 0")
+        trial = ReportSnapshot.objects.get(report_type='TRIAL_BALANCE')
+        self.assertEqual(ReportSnapshot.objects.count(), 3)
+        self.assertFalse(trial.is_stale)
+        self.assertEqual(self._balances(trial), [Decimal('1000'), Decimal('1000')])
+
+        self._entry('2', date(2026, 1, 20), Decimal('500'))
+        trial.refresh_from_db()
+        self.assertEqual((trial.is_stale, trial.stale_reason), (True, 'LATE_ENTRY'))
+
+        self.assertEqual(refresh_stale_reports(), "Stale: 2")
+        trial.refresh_from_db()
+        self.assertFalse(trial.is_stale)
+        self.assertEqual(self._balances(trial), [Decimal('1500'), Decimal('1500')])
+        cash = ReportSnapshot.objects.get(report_type='CASH_POSITION')
+        self.assertEqual(self._balances(cash), [Decimal('1500')])
+
+    def test_entry_posted_while_building_is_not_lost(self):
+        draft = self._entry('2', date(2026, 1, 20), Decimal('500'), post=False)
+        service = ReportSnapshotService(self.tenant.id)
+        build = service._build
+
+        def build_then_post(*args, **kwargs):
+            result = build(*args, **kwargs)
+            self._post(draft)  # contabilizado entre el cálculo y el guardado
+            return result
+
+        with patch.object(service, '_build', side_effect=build_then_post):
+            snapshot = service.generate('TRIAL_BALANCE', date(2026, 1, 31))
+        self.assertEqual((snapshot.is_stale, snapshot.stale_reason), (True, 'LATE_ENTRY'))
+        self.assertEqual(self._balances(snapshot), [Decimal('1000'), Decimal('1000')])
+
+        snapshot = service.refresh(snapshot)
+        self.assertFalse(snapshot.is_stale)
+        self.assertEqual(self._balances(snapshot), [Decimal('1500'), Decimal('1500')])
+
+    def test_entry_after_the_cut_off_does_not_mark_the_snapshot(self):
+        draft = self._entry('2', date(2026, 2, 10), Decimal('500'), post=False)
+        service = ReportSnapshotService(self.tenant.id)
+        build = service._build
+
+        def build_then_post(*args, **kwargs):
+            result = build(*args, **kwargs)
+            self._post(draft)  # contabilizado durante el cálculo, pero de febrero
+            return result
+
+        with patch.object(service, '_build', side_effect=build_then_post):
+            snapshot = service.generate('TRIAL_BALANCE', date(2026, 1, 31))
+        self.assertEqual((snapshot.is_stale, snapshot.stale_reason), (False, ''))
+
+    def test_snapshot_view_serves_latest_columnar_data(self):
+        ReportSnapshotService(self.tenant.id).generate('TRIAL_BALANCE', date(2026, 1, 31))
+        api = APIClient()
+        api.force_authenticate(user=User.objects.create_user(username='contador', password='password123'))
+        api.credentials(HTTP_X_CLIENT_ID=str(self.tenant.id))
+
+        response = api.get('/api/reports/snapshots/trial_balance/', {'as_of': '2026-02-15'})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['as_of'], '2026-01-31')
+        self.assertEqual(body['data']['code'], ['111005', '413505'])
+
+        self.assertEqual(api.get('/api/reports/snapshots/trial_balance/', {'as_of': '2025-12-31'}).status_code, 404)
+        self.assertEqual(api.get('/api/reports/snapshots/ledger/').status_code, 400)
+        set_current_client_id(self.tenant.id)
@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import DashboardMetricsView
+from .views import DashboardMetricsView, ReportSnapshotView
 
 urlpatterns = [
     path('dashboard/', DashboardMetricsView.as_view(), name='dashboard_metrics'),
+    path('snapshots/<str:report_type>/', ReportSnapshotView.as_view(), name='report_snapshot'),
 ]
@@ -1,13 +1,19 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework import status
+from django.utils.dateparse import parse_date
 from django.db.models import Sum, Q
 import datetime
 from decimal import Decimal
 
 from apps.invoicing.models import Invoice
-from apps.accounting.models import JournalEntryLine
+from apps.accounting.models import Account, JournalEntryLine
+from apps.accounting.services.closing_service import account_balances
+from apps.tenants.utils import get_current_client_id
 from apps.treasury.models import BankAccount
+from .models import ReportSnapshot
+from .services.snapshot_service import load_snapshot_data
 
 class DashboardMetricsView(APIView):
     permission_classes = [IsAuthenticated]
@@ -34,7 +40,7 @@ class DashboardMetricsView(APIView):
         # Consultamos el motor contable directamente
         # Gastos = Débitos - Créditos en cuentas 5xxx y 6xxx
         expense_lines = JournalEntryLine.objects.filter(
-            (Q(account__code__startswith='5') | Q(account__code__startswith='6')),
+            account__class_code__in=['5', '6'],
             entry__date__gte=first_day,
             entry__date__lte=today,
             entry__status='POSTED' # Solo asientos confirmados
@@ -47,24 +53,19 @@ class DashboardMetricsView(APIView):
         # 3. Disponible en Bancos (Real Time)
         # Saldo de las cuentas PUC asociadas a Tesorería
         # Activo (1xxx) aumenta por Débito, disminuye por Crédito
-        bank_accounts = BankAccount.objects.all()
+        # Se parte del último saldo de cierre (cierre de periodos) + movimiento posterior
+        bank_accounts = BankAccount.objects.filter(client_id=get_current_client_id())
         # Si no hay cuentas bancarias configuradas, buscamos genéricamente en la 1110 (Bancos) y 1105 (Caja)
         if bank_accounts.exists():
             bank_gl_ids = bank_accounts.values_list('gl_account_id', flat=True)
-            bank_lines = JournalEntryLine.objects.filter(
-                account_id__in=bank_gl_ids,
-                entry__status='POSTED'
-            )
         else:
             # Fallback: Cuentas 11 (Disponible)
-            bank_lines = JournalEntryLine.objects.filter(
-                account__code__startswith='11',
-                entry__status='POSTED'
-            )
-            
-        bank_debits = bank_lines.aggregate(t=Sum('debit'))['t'] or 0
-        bank_credits = bank_lines.aggregate(t=Sum('credit'))['t'] or 0
-        available_cash = bank_debits - bank_credits
+            bank_gl_ids = Account.objects.filter(group_code='11').values_list('id', flat=True)
+
+        available_cash = sum(
+            (debit - credit for debit, credit in account_balances(bank_gl_ids).values()),
+            Decimal('0')
+        )
 
         return Response({
             'period': f"{first_day.strftime('%B %Y')}",
@@ -76,3 +77,40 @@ class DashboardMetricsView(APIView):
                 {'name': 'Gastos', 'value': expenses_month, 'fill': '#f44336'},
             ]
         })
+
+
+class ReportSnapshotView(APIView):
+    """
+    Sirve el último snapshot precalculado de un reporte (job nocturno).
+    GET /api/reports/snapshots/<report_type>/?as_of=YYYY-MM-DD
+    Los datos se devuelven en formato columnar ({columna: [valores]}).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, report_type):
+        report_type = report_type.upper()
+        if report_type not in dict(ReportSnapshot.REPORT_TYPE_CHOICES):
+            return Response({'error': f"Tipo de reporte no soportado: {report_type}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        snapshots = ReportSnapshot.objects.filter(report_type=report_type)
+        as_of = request.query_params.get('as_of')
+        if as_of:
+            as_of = parse_date(as_of)
+            if not as_of:
+                return Response({'error': "Fecha 'as_of' inválida (YYYY-MM-DD)."}, status=status.HTTP_400_BAD_REQUEST)
+            snapshots = snapshots.filter(as_of__lte=as_of)
+
+        snapshot = snapshots.order_by('-as_of').first()
+        if not snapshot:
+            return Response({'error': 'No hay snapshot generado para este reporte.'}, status=status.HTTP_404_NOT_FOUND)
+
+        columns, data = load_snapshot_data(snapshot)
+        return Response({
+            'report_type': snapshot.report_type,
+            'as_of': snapshot.as_of,
+            'generated_at': snapshot.generated_at,
+            'is_stale': snapshot.is_stale,
+            'row_count': snapshot.row_count,
+            'columns': columns,
+            'data': data,
+        })
@@ -0,0 +1,17 @@
+from django.contrib import admin
+
+from .models import TaxDeclaration, TaxRule
+
+
+@admin.register(TaxRule)
+class TaxRuleAdmin(admin.ModelAdmin):
+    list_display = ('tax', 'name', 'operation', 'concept', 'third_party_regime', 'municipality', 'min_base_uvt', 'rate', 'is_active')
+    list_filter = ('tax', 'operation', 'is_active')
+    search_fields = ('name', 'concept')
+
+
+@admin.register(TaxDeclaration)
+class TaxDeclarationAdmin(admin.ModelAdmin):
+    list_display = ('form', 'year', 'period', 'period_start', 'period_end', 'is_final', 'computed_at')
+    list_filter = ('form', 'year', 'is_final')
+    readonly_fields = ('boxes', 'sources', 'rules_version', 'computed_at')
@@ -5,3 +5,6 @@ class TaxesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.taxes'
     verbose_name = 'Impuestos'
+
+    def ready(self):
+        import apps.taxes.signals
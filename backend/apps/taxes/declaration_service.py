@@ -0,0 +1,261 @@
+"""
+Declaraciones tributarias periódicas: IVA (formulario 300), retenciones en
+la fuente (350) e ICA.
+
+Las casillas de cada formulario se definen en
+settings.TAX_DECLARATION_CONFIG. Las cuentas de cada casilla salen de las
+TaxRule del tenant (y de los TaxType de facturación electrónica) o de
+prefijos del PUC; con ellas se hace una sola consulta agrupada por cuenta
+sobre JournalEntryLine en el periodo y, si el formulario lo pide, otra
+agrupada por tipo de documento y categoría sobre ElectronicDocumentTax.
+
+Si todos los meses del periodo están cerrados (FiscalPeriod) el resultado
+se guarda como definitivo en TaxDeclaration y se reutiliza mientras no
+cambien las reglas ni se reabra el periodo (signals). `sources` guarda las
+cuentas de cada casilla: el detalle de una casilla es una consulta directa
+por el índice (client, account) de JournalEntryLine.
+"""
+import calendar
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Q, Sum
+
+from apps.accounting.models import Account, FiscalPeriod, JournalEntryLine
+from apps.common.mixins import catalog_versions
+from apps.dian.models import ElectronicDocumentTax, TaxType
+
+from .models import TaxDeclaration, TaxRule
+
+# Cambios que alteran el mapeo casilla -> cuentas
+MAPPING_CATALOGS = ['taxes.TaxRule', 'dian.TaxType']
+ZERO = Decimal('0')
+
+LINE_FIELDS = (
+    'id', 'entry_id', 'entry__number', 'entry__date', 'account__code', 'account__name',
+    'third_party__identification_number', 'description', 'debit', 'credit', 'base_amount',
+)
+DOCUMENT_FIELDS = (
+    'id', 'document_id', 'document__document_type', 'document__full_number', 'document__issue_date',
+    'tax_type__code', 'taxable_amount', 'tax_rate', 'tax_amount',
+)
+
+
+def form_config(form):
+    try:
+        return settings.TAX_DECLARATION_CONFIG['FORMS'][form]
+    except KeyError:
+        raise ValueError(f"Formulario no configurado: {form}")
+
+
+def period_dates(form, year, period):
+    """Fechas del periodo `period` (1..n) del año según la periodicidad del formulario."""
+    months = form_config(form)['MONTHS']
+    if not 1 <= period <= 12 // months:
+        raise ValueError(f"El formulario {form} tiene {12 // months} periodos en el año.")
+    first = (period - 1) * months + 1
+    last = first + months - 1
+    return date(year, first, 1), date(year, last, calendar.monthrange(year, last)[1])
+
+
+def _measure(totals, measure):
+    debit, credit, base = totals
+    return {
+        'DEBIT': debit,
+        'CREDIT': credit,
+        'DEBIT_NET': debit - credit,
+        'CREDIT_NET': credit - debit,
+        'BASE': base,
+    }[measure]
+
+
+class DeclarationEngine:
+    """
+    Calcula las casillas de un formulario para un periodo del tenant.
+    Debe ejecutarse dentro de un contexto de tenant.
+    """
+
+    def __init__(self, client_id, form, year, period):
+        self.client_id = client_id
+        self.form = form
+        self.year = year
+        self.period = period
+        self.config = form_config(form)
+        self.start, self.end = period_dates(form, year, period)
+
+    # ------------------------------------------------------------------
+    # Mapeo casilla -> cuentas
+    # ------------------------------------------------------------------
+    def box_accounts(self):
+        """{casilla: [ids de cuenta]} para las casillas contables."""
+        boxes = [box for box in self.config['BOXES'] if 'tax' in box or 'prefixes' in box]
+        if not boxes:
+            return {}
+
+        by_tax = defaultdict(set)  # (impuesto, operación) -> cuentas
+        rules = TaxRule.objects.filter(client_id=self.client_id, is_active=True, account__isnull=False)
+        for tax, operation, account_id in rules.values_list('tax', 'operation', 'account_id'):
+            for op in ([operation] if operation else ['SALE', 'PURCHASE']):
+                by_tax[(tax, op)].add(account_id)
+        # Los TaxType son los impuestos de las facturas electrónicas que emite el tenant
+        tax_types = TaxType.objects.filter(account__client_id=self.client_id, is_active=True)
+        for category, account_id in tax_types.values_list('category', 'account_id'):
+            by_tax[(category, 'SALE')].add(account_id)
+
+        prefixes = sorted({prefix for box in boxes for prefix in box.get('prefixes', ())})
+        by_prefix = defaultdict(set)
+        if prefixes:
+            condition = Q()
+            for prefix in prefixes:
+                condition |= Q(code__startswith=prefix)
+            for account_id, code in Account.objects.filter(condition, client_id=self.client_id).values_list('id', 'code'):
+                for prefix in prefixes:
+                    if code.startswith(prefix):
+                        by_prefix[prefix].add(account_id)
+
+        mapping = {}
+        for box in boxes:
+            if 'tax' in box:
+                accounts = by_tax[(box['tax'], box['operation'])]
+            else:
+                accounts = set().union(*(by_prefix[prefix] for prefix in box['prefixes']))
+            mapping[box['box']] = sorted(accounts)
+        return mapping
+
+    # ------------------------------------------------------------------
+    # Agregación
+    # ------------------------------------------------------------------
+    def ledger_totals(self, account_ids):
+        """Una consulta agrupada por cuenta: {cuenta: (débitos, créditos, base)}."""
+        if not account_ids:
+            return {}
+        rows = (
+            JournalEntryLine.objects
+            .filter(client_id=self.client_id, account_id__in=account_ids, entry__status='POSTED',
+                    entry__date__gte=self.start, entry__date__lte=self.end)
+            .values('account_id')
+            .annotate(total_debit=Sum('debit'), total_credit=Sum('credit'), total_base=Sum('base_amount'))
+            .order_by()
+        )
+        return {
+            row['account_id']: (row['total_debit'] or ZERO, row['total_credit'] or ZERO, row['total_base'] or ZERO)
+            for row in rows
+        }
+
+    def _documents(self):
+        return (
+            ElectronicDocumentTax.objects
+            .filter(document__customer__client_id=self.client_id,
+                    document__issue_date__gte=self.start, document__issue_date__lte=self.end)
+            .exclude(document__status__in=settings.TAX_DECLARATION_CONFIG['EXCLUDED_DOCUMENT_STATUS'])
+        )
+
+    def document_totals(self):
+        """Una consulta agrupada: {(tipo de documento, categoría): (base, impuesto)}."""
+        rows = (
+            self._documents()
+            .values('document__document_type', 'tax_type__category')
+            .annotate(taxable=Sum('taxable_amount'), tax=Sum('tax_amount'))
+            .order_by()
+        )
+        return {
+            (row['document__document_type'], row['tax_type__category']): (row['taxable'] or ZERO, row['tax'] or ZERO)
+            for row in rows
+        }
+
+    def compute(self):
+        """
+        Returns:
+            (casillas {casilla: {'label', 'value'}}, origen {casilla: {...}})
+            con los valores como texto para guardarlos en JSON.
+        """
+        mapping = self.box_accounts()
+        ledger = self.ledger_totals(sorted({account for accounts in mapping.values() for account in accounts}))
+        boxes = self.config['BOXES']
+        documents = self.document_totals() if any('category' in box for box in boxes) else {}
+
+        values, sources = {}, {}
+        for box in boxes:
+            code = box['box']
+            if 'formula' in box:
+                values[code] = sum((values[other] * sign for other, sign in box['formula'].items()), ZERO)
+                sources[code] = {'formula': box['formula']}
+            elif 'category' in box:
+                position = 0 if box['measure'] == 'TAXABLE' else 1
+                values[code] = sum(
+                    (documents.get((document_type, box['category']), (ZERO, ZERO))[position] * sign
+                     for document_type, sign in box['document_types'].items()),
+                    ZERO,
+                )
+                sources[code] = {'category': box['category'], 'document_types': sorted(box['document_types'])}
+            else:
+                values[code] = sum(
+                    (_measure(ledger[account], box['measure']) for account in mapping[code] if account in ledger),
+                    ZERO,
+                )
+                sources[code] = {'accounts': mapping[code]}
+
+        result = {box['box']: {'label': box['label'], 'value': str(values[box['box']])} for box in boxes}
+        return result, sources
+
+    # ------------------------------------------------------------------
+    # Cierre y caché
+    # ------------------------------------------------------------------
+    def is_closed(self):
+        """Todos los meses del periodo tienen su FiscalPeriod cerrado."""
+        closed = FiscalPeriod.objects.filter(
+            client_id=self.client_id, status='CLOSED', end_date__gte=self.start, start_date__lte=self.end,
+        ).count()
+        return closed >= self.config['MONTHS']
+
+    def declaration(self, refresh=False):
+        """
+        Declaración del periodo: la guardada si es definitiva y las reglas no
+        cambiaron; si no, se recalcula y se guarda (definitiva solo si el
+        periodo está cerrado).
+        """
+        version = '-'.join(str(value) for value in catalog_versions(MAPPING_CATALOGS, self.client_id))
+        cached = TaxDeclaration.objects.filter(
+            client_id=self.client_id, form=self.form, year=self.year, period=self.period,
+        ).first()
+        if cached is not None and cached.is_final and cached.rules_version == version and not refresh:
+            return cached
+
+        boxes, sources = self.compute()
+        declaration, _ = TaxDeclaration.objects.update_or_create(
+            client_id=self.client_id, form=self.form, year=self.year, period=self.period,
+            defaults={
+                'period_start': self.start, 'period_end': self.end, 'boxes': boxes, 'sources': sources,
+                'is_final': self.is_closed(), 'rules_version': version,
+            },
+        )
+        return declaration
+
+
+def source_lines(declaration, box):
+    """
+    Detalle de una casilla: movimientos contables (o impuestos de documentos
+    electrónicos) que la componen, como queryset de valores.
+    """
+    source = declaration.sources.get(box)
+    if source is None:
+        raise ValueError(f"La casilla {box} no existe en la declaración.")
+    if 'formula' in source:
+        raise ValueError(f"La casilla {box} es calculada a partir de: {', '.join(source['formula'])}.")
+
+    if 'accounts' in source:
+        return (
+            JournalEntryLine.objects
+            .filter(client_id=declaration.client_id, account_id__in=source['accounts'], entry__status='POSTED',
+                    entry__date__gte=declaration.period_start, entry__date__lte=declaration.period_end)
+            .values(*LINE_FIELDS)
+        )
+
+    engine = DeclarationEngine(declaration.client_id, declaration.form, declaration.year, declaration.period)
+    return (
+        engine._documents()
+        .filter(tax_type__category=source['category'], document__document_type__in=source['document_types'])
+        .values(*DOCUMENT_FIELDS)
+    )
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.9 on 2026-10-19 19:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        ('accounting', '0012_journal_import_batch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaxRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tax', models.CharField(choices=[('IVA', 'IVA'), ('RETEFUENTE', 'Retención en la Fuente'), ('RETEIVA', 'Retención de IVA'), ('RETEICA', 'Retención de ICA')], max_length=20, verbose_name='Impuesto')),
+                ('name', models.CharField(max_length=150, verbose_name='Nombre')),
+                ('operation', models.CharField(blank=True, choices=[('SALE', 'Venta'), ('PURCHASE', 'Compra')], max_length=10, verbose_name='Operación')),
+                ('concept', models.CharField(blank=True, help_text='Tipo de impuesto del ítem (IVA_19, EXENTO...) o tipo de ítem (PRODUCTO, SERVICIO)', max_length=50, verbose_name='Concepto')),
+                ('third_party_regime', models.CharField(blank=True, choices=[('48', 'Responsable de IVA (Antes Régimen Común)'), ('49', 'No Responsable de IVA (Antes Régimen Simplificado)'), ('42', 'Régimen Simple de Tributación')], max_length=2, verbose_name='Régimen del Tercero')),
+                ('responsibility', models.CharField(blank=True, help_text='Ej: O-13', max_length=20, verbose_name='Responsabilidad Requerida')),
+                ('excluded_responsibility', models.CharField(blank=True, help_text='Ej: O-15 (autorretenedor)', max_length=20, verbose_name='Responsabilidad Excluida')),
+                ('municipality', models.CharField(blank=True, max_length=5, verbose_name='Municipio (DANE)')),
+                ('min_base_uvt', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Base Mínima (UVT)')),
+                ('base', models.CharField(choices=[('SUBTOTAL', 'Subtotal de la línea'), ('IVA', 'IVA de la línea')], default='SUBTOTAL', max_length=10, verbose_name='Base')),
+                ('rate', models.DecimalField(decimal_places=4, max_digits=7, verbose_name='Tarifa (%)')),
+                ('priority', models.IntegerField(default=0, verbose_name='Prioridad')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Activa')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounting.account', verbose_name='Cuenta Contable')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tax_rules', to='tenants.client', verbose_name='Cliente (Tenant)')),
+            ],
+            options={
+                'verbose_name': 'Regla de Impuesto',
+                'verbose_name_plural': 'Reglas de Impuestos',
+                'ordering': ['tax', '-priority', 'id'],
+                'indexes': [models.Index(fields=['client', 'tax'], name='taxes_rule_client_tax_idx')],
+            },
+        ),
+    ]
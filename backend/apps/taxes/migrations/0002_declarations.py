@@ -0,0 +1,38 @@
+# Generated by Django 4.2.9 on 2026-10-19 19:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        ('taxes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaxDeclaration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('form', models.CharField(choices=[('300', 'Formulario 300 - IVA'), ('350', 'Formulario 350 - Retenciones en la Fuente'), ('ICA', 'Industria y Comercio')], max_length=5, verbose_name='Formulario')),
+                ('year', models.IntegerField(verbose_name='Año Gravable')),
+                ('period', models.PositiveSmallIntegerField(verbose_name='Periodo')),
+                ('period_start', models.DateField(verbose_name='Desde')),
+                ('period_end', models.DateField(verbose_name='Hasta')),
+                ('boxes', models.JSONField(default=dict, verbose_name='Casillas')),
+                ('sources', models.JSONField(default=dict, verbose_name='Origen por Casilla')),
+                ('is_final', models.BooleanField(default=False, verbose_name='Periodo Cerrado')),
+                ('rules_version', models.CharField(blank=True, max_length=100, verbose_name='Versión de Reglas')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='Calculada')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tax_declarations', to='tenants.client', verbose_name='Cliente (Tenant)')),
+            ],
+            options={
+                'verbose_name': 'Declaración Tributaria',
+                'verbose_name_plural': 'Declaraciones Tributarias',
+                'ordering': ['-year', '-period', 'form'],
+                'unique_together': {('client', 'form', 'year', 'period')},
+            },
+        ),
+    ]
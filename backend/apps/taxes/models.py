@@ -1 +1,116 @@
-from django.db import models
\ No newline at end of file
+from decimal import Decimal
+
+from django.db import models
+
+from apps.accounting.models import ThirdParty
+from apps.common.managers import TenantAwareManager
+
+
+class TaxRule(models.Model):
+    """
+    Regla de impuesto del tenant: qué tarifa de IVA, ReteFuente, ReteIVA o
+    ReteICA aplica a un concepto según el régimen y las responsabilidades
+    del tercero, el municipio y la base mínima en UVT. Los campos vacíos
+    aplican a todos; entre varias reglas que coinciden gana la más
+    específica (y luego la de mayor prioridad). Ver services.TaxEngine.
+    """
+    TAX_CHOICES = [
+        ('IVA', 'IVA'),
+        ('RETEFUENTE', 'Retención en la Fuente'),
+        ('RETEIVA', 'Retención de IVA'),
+        ('RETEICA', 'Retención de ICA'),
+    ]
+    OPERATION_CHOICES = [
+        ('SALE', 'Venta'),
+        ('PURCHASE', 'Compra'),
+    ]
+    BASE_CHOICES = [
+        ('SUBTOTAL', 'Subtotal de la línea'),
+        ('IVA', 'IVA de la línea'),
+    ]
+
+    client = models.ForeignKey('tenants.Client', on_delete=models.CASCADE, related_name='tax_rules', verbose_name="Cliente (Tenant)")
+    tax = models.CharField(max_length=20, choices=TAX_CHOICES, verbose_name="Impuesto")
+    name = models.CharField(max_length=150, verbose_name="Nombre")
+
+    # Condiciones (vacío = cualquiera)
+    operation = models.CharField(max_length=10, choices=OPERATION_CHOICES, blank=True, verbose_name="Operación")
+    concept = models.CharField(
+        max_length=50, blank=True, verbose_name="Concepto",
+        help_text="Tipo de impuesto del ítem (IVA_19, EXENTO...) o tipo de ítem (PRODUCTO, SERVICIO)"
+    )
+    third_party_regime = models.CharField(max_length=2, choices=ThirdParty.TAX_REGIME_CHOICES, blank=True, verbose_name="Régimen del Tercero")
+    responsibility = models.CharField(max_length=20, blank=True, verbose_name="Responsabilidad Requerida", help_text="Ej: O-13")
+    excluded_responsibility = models.CharField(max_length=20, blank=True, verbose_name="Responsabilidad Excluida", help_text="Ej: O-15 (autorretenedor)")
+    municipality = models.CharField(max_length=5, blank=True, verbose_name="Municipio (DANE)")
+    min_base_uvt = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name="Base Mínima (UVT)")
+
+    # Resultado
+    base = models.CharField(max_length=10, choices=BASE_CHOICES, default='SUBTOTAL', verbose_name="Base")
+    rate = models.DecimalField(max_digits=7, decimal_places=4, verbose_name="Tarifa (%)")
+    account = models.ForeignKey(
+        'accounting.Account', on_delete=models.PROTECT, null=True, blank=True, related_name='+',
+        verbose_name="Cuenta Contable"
+    )
+    priority = models.IntegerField(default=0, verbose_name="Prioridad")
+    is_active = models.BooleanField(default=True, verbose_name="Activa")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantAwareManager()
+
+    class Meta:
+        verbose_name = "Regla de Impuesto"
+        verbose_name_plural = "Reglas de Impuestos"
+        ordering = ['tax', '-priority', 'id']
+        indexes = [
+            models.Index(fields=['client', 'tax'], name='taxes_rule_client_tax_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tax_display()} {self.rate}% - {self.name}"
+
+    @property
+    def specificity(self):
+        """Número de condiciones que la regla exige."""
+        return sum(bool(value) for value in (
+            self.operation, self.concept, self.third_party_regime, self.responsibility,
+            self.excluded_responsibility, self.municipality,
+        )) + (self.min_base_uvt > Decimal('0'))
+
+
+class TaxDeclaration(models.Model):
+    """
+    Casillas de una declaración periódica (IVA 300, retenciones 350, ICA)
+    de un periodo. Cuando todos los meses del periodo están cerrados el
+    resultado queda como definitivo y se reutiliza sin volver a agregar;
+    `sources` guarda por casilla las cuentas o documentos de origen para el
+    detalle. Ver declaration_service.
+    """
+    FORM_CHOICES = [
+        ('300', 'Formulario 300 - IVA'),
+        ('350', 'Formulario 350 - Retenciones en la Fuente'),
+        ('ICA', 'Industria y Comercio'),
+    ]
+
+    client = models.ForeignKey('tenants.Client', on_delete=models.CASCADE, related_name='tax_declarations', verbose_name="Cliente (Tenant)")
+    form = models.CharField(max_length=5, choices=FORM_CHOICES, verbose_name="Formulario")
+    year = models.IntegerField(verbose_name="Año Gravable")
+    period = models.PositiveSmallIntegerField(verbose_name="Periodo")
+    period_start = models.DateField(verbose_name="Desde")
+    period_end = models.DateField(verbose_name="Hasta")
+    boxes = models.JSONField(default=dict, verbose_name="Casillas")
+    sources = models.JSONField(default=dict, verbose_name="Origen por Casilla")
+    is_final = models.BooleanField(default=False, verbose_name="Periodo Cerrado")
+    rules_version = models.CharField(max_length=100, blank=True, verbose_name="Versión de Reglas")
+    computed_at = models.DateTimeField(auto_now=True, verbose_name="Calculada")
+
+    objects = TenantAwareManager()
+
+    class Meta:
+        verbose_name = "Declaración Tributaria"
+        verbose_name_plural = "Declaraciones Tributarias"
+        ordering = ['-year', '-period', 'form']
+        unique_together = ('client', 'form', 'year', 'period')
+
+    def __str__(self):
+        return f"{self.get_form_display()} {self.year}-{self.period}"
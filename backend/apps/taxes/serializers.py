@@ -0,0 +1,57 @@
+from rest_framework import serializers
+
+from .models import TaxDeclaration, TaxRule
+
+
+class TaxRuleSerializer(serializers.ModelSerializer):
+    account_code = serializers.CharField(source='account.code', read_only=True, default=None)
+
+    class Meta:
+        model = TaxRule
+        fields = [
+            'id', 'tax', 'name', 'operation', 'concept', 'third_party_regime', 'responsibility',
+            'excluded_responsibility', 'municipality', 'min_base_uvt', 'base', 'rate', 'account', 'account_code',
+            'priority', 'is_active', 'updated_at',
+        ]
+        read_only_fields = ['updated_at']
+
+
+class TaxLineSerializer(serializers.Serializer):
+    concepts = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    subtotal = serializers.DecimalField(max_digits=16, decimal_places=2)
+
+
+class TaxDocumentSerializer(serializers.Serializer):
+    """Documento libre para el motor: tercero descrito por régimen, responsabilidades y municipio."""
+    operation = serializers.ChoiceField(choices=TaxRule.OPERATION_CHOICES, default='SALE')
+    tax_regime = serializers.CharField(required=False, allow_blank=True, default='')
+    fiscal_responsibilities = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    city_code = serializers.CharField(required=False, allow_blank=True, default='')
+    municipality = serializers.CharField(required=False, allow_blank=True, default='')
+    lines = TaxLineSerializer(many=True)
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        return {
+            'operation': value['operation'],
+            'third_party': {key: value[key] for key in ('tax_regime', 'fiscal_responsibilities', 'city_code')},
+            'municipality': value['municipality'],
+            'lines': [{'concepts': tuple(line['concepts']), 'subtotal': line['subtotal']} for line in value['lines']],
+        }
+
+
+class TaxDeclarationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TaxDeclaration
+        fields = [
+            'id', 'form', 'year', 'period', 'period_start', 'period_end', 'boxes', 'sources', 'is_final',
+            'computed_at',
+        ]
+        read_only_fields = fields
+
+
+class DeclarationRequestSerializer(serializers.Serializer):
+    form = serializers.ChoiceField(choices=TaxDeclaration.FORM_CHOICES)
+    year = serializers.IntegerField(min_value=2000, max_value=2100)
+    period = serializers.IntegerField(min_value=1, max_value=12)
+    refresh = serializers.BooleanField(default=False)
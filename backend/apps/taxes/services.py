@@ -0,0 +1,206 @@
+"""
+Motor de impuestos por reglas.
+
+Las reglas (TaxRule) de un tenant se compilan una vez en un índice en
+memoria {(operación, concepto): [reglas]} que se guarda por proceso junto
+con la versión de catálogo de TaxRule: cualquier cambio en las reglas sube
+la versión (signals) y la siguiente consulta recompila. El mismo cálculo de
+IVA, ReteFuente, ReteIVA y ReteICA sirve para una factura o para un lote:
+la decisión de reglas se memoriza por combinación de conceptos, tercero y
+municipio dentro de la llamada, y la base mínima en UVT de las retenciones
+se evalúa sobre el total del documento por regla.
+"""
+from collections import defaultdict, namedtuple
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+
+from apps.common.mixins import catalog_versions
+from apps.payroll.models import LegalParameter
+
+from .models import TaxRule
+
+TAX_CATALOGS = ['taxes.TaxRule']
+TAXES = [code for code, _ in TaxRule.TAX_CHOICES]
+WITHHOLDING_TAXES = ('RETEFUENTE', 'RETEIVA', 'RETEICA')
+CENT = Decimal('0.01')
+ZERO = Decimal('0')
+
+CompiledRule = namedtuple('CompiledRule', [
+    'id', 'tax', 'name', 'regime', 'responsibility', 'excluded', 'municipality', 'min_base_uvt', 'base', 'rate',
+    'account_id', 'order',
+])
+# Datos del tercero que usan las reglas
+Party = namedtuple('Party', ['regime', 'responsibilities', 'municipality'])
+
+# {client_id: (versión de catálogo, CompiledRules)} por proceso
+_compiled = {}
+
+
+def _round(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def as_party(third_party):
+    """Party desde un ThirdParty o un dict con las mismas claves."""
+    if isinstance(third_party, Party):
+        return third_party
+    if isinstance(third_party, dict):
+        get = third_party.get
+    else:
+        def get(key):
+            return getattr(third_party, key, None)
+    return Party(get('tax_regime') or '', frozenset(get('fiscal_responsibilities') or ()), get('city_code') or '')
+
+
+class CompiledRules:
+    """Índice de reglas de un tenant listo para decidir sin consultar la base de datos."""
+
+    def __init__(self, rules):
+        index = defaultdict(list)
+        for rule in rules:
+            compiled = CompiledRule(
+                rule.id, rule.tax, rule.name, rule.third_party_regime, rule.responsibility,
+                rule.excluded_responsibility, rule.municipality, rule.min_base_uvt, rule.base, rule.rate,
+                rule.account_id, (-rule.specificity, -rule.priority, rule.id),
+            )
+            for operation in ([rule.operation] if rule.operation else ['SALE', 'PURCHASE']):
+                index[(operation, rule.concept)].append(compiled)
+        self.index = {key: sorted(items, key=lambda rule: rule.order) for key, items in index.items()}
+        self.rule_count = len(rules)
+
+    @staticmethod
+    def _matches(rule, party, municipality):
+        return (
+            (not rule.regime or rule.regime == party.regime)
+            and (not rule.responsibility or rule.responsibility in party.responsibilities)
+            and (not rule.excluded or rule.excluded not in party.responsibilities)
+            and (not rule.municipality or rule.municipality == municipality)
+        )
+
+    def decide(self, operation, concepts, party, municipality):
+        """
+        Regla ganadora por impuesto para una línea: la más específica que
+        coincide, luego la de mayor prioridad.
+
+        Returns:
+            {impuesto: CompiledRule}
+        """
+        candidates = sorted(
+            (rule for concept in (*concepts, '') for rule in self.index.get((operation, concept), ())),
+            key=lambda rule: rule.order,
+        )
+        chosen = {}
+        for rule in candidates:
+            if rule.tax not in chosen and self._matches(rule, party, municipality):
+                chosen[rule.tax] = rule
+        return chosen
+
+
+def compiled_rules(client_id):
+    """Reglas compiladas del tenant; se recompilan cuando cambia la versión del catálogo."""
+    version = '-'.join(str(value) for value in catalog_versions(TAX_CATALOGS, client_id))
+    entry = _compiled.get(client_id)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    compiled = CompiledRules(list(TaxRule.objects.filter(client_id=client_id, is_active=True)))
+    _compiled[client_id] = (version, compiled)
+    return compiled
+
+
+class TaxEngine:
+    """
+    Calcula los impuestos de documentos con las reglas del tenant.
+
+    Un documento es un dict:
+        {'operation': 'SALE' | 'PURCHASE',
+         'third_party': ThirdParty o dict (tax_regime, fiscal_responsibilities, city_code),
+         'municipality': código DANE donde se causa el ICA (por defecto el del tercero),
+         'lines': [{'concepts': ('IVA_19', 'SERVICIO'), 'subtotal': Decimal}]}
+    """
+
+    def __init__(self, client_id, on_date=None):
+        self.rules = compiled_rules(client_id)
+        self.uvt = LegalParameter.get_value('UVT', on_date or date.today())
+
+    def compute(self, document):
+        return self.compute_many([document])[0]
+
+    def compute_many(self, documents):
+        """
+        Returns:
+            Lista alineada con `documents`: líneas con su IVA, impuestos por
+            regla, totales por impuesto y el neto a pagar/cobrar.
+        """
+        decisions = {}
+        return [self._compute(document, decisions) for document in documents]
+
+    def _compute(self, document, decisions):
+        party = as_party(document['third_party'])
+        municipality = document.get('municipality') or party.municipality
+        operation = document.get('operation') or 'SALE'
+
+        lines, bases = [], {}
+        for line in document['lines']:
+            concepts = tuple(concept for concept in line.get('concepts', ()) if concept)
+            key = (operation, concepts, party, municipality)
+            if key not in decisions:
+                decisions[key] = self.rules.decide(operation, concepts, party, municipality)
+            decision = decisions[key]
+
+            subtotal = Decimal(line['subtotal'])
+            iva_rule = decision.get('IVA')
+            iva = _round(subtotal * iva_rule.rate / 100) if iva_rule else ZERO
+            lines.append({'subtotal': _round(subtotal), 'iva_rate': iva_rule.rate if iva_rule else ZERO, 'iva': iva})
+            for rule in decision.values():
+                bases[rule] = bases.get(rule, ZERO) + (iva if rule.base == 'IVA' else subtotal)
+
+        taxes = []
+        totals = dict.fromkeys(TAXES, ZERO)
+        for rule, base in sorted(bases.items(), key=lambda item: (TAXES.index(item[0].tax), item[0].order)):
+            # La base mínima aplica al total del documento, no a cada línea
+            if rule.tax in WITHHOLDING_TAXES and base < rule.min_base_uvt * self.uvt:
+                continue
+            amount = _round(base * rule.rate / 100)
+            totals[rule.tax] += amount
+            taxes.append({'tax': rule.tax, 'rule': rule.id, 'name': rule.name, 'base': _round(base),
+                          'rate': rule.rate, 'amount': amount, 'account': rule.account_id})
+
+        subtotal = sum((line['subtotal'] for line in lines), ZERO)
+        withholdings = sum((totals[tax] for tax in WITHHOLDING_TAXES), ZERO)
+        return {
+            'lines': lines,
+            'taxes': taxes,
+            'totals': totals,
+            'subtotal': subtotal,
+            'total': subtotal + totals['IVA'],
+            'withholdings': withholdings,
+            'net': subtotal + totals['IVA'] - withholdings,
+        }
+
+
+def line_iva_rate(client_id, operation, third_party, concepts):
+    """
+    Tarifa de IVA de una línea con las reglas del tenant (0 si ninguna regla
+    de IVA coincide). None si el tenant no tiene reglas: el documento
+    conserva la tarifa que trae.
+    """
+    rules = compiled_rules(client_id)
+    if not rules.rule_count:
+        return None
+    party = as_party(third_party)
+    rule = rules.decide(operation, tuple(concept for concept in concepts if concept), party,
+                        party.municipality).get('IVA')
+    return rule.rate if rule else ZERO
+
+
+def invoice_document(invoice):
+    """Documento del motor para una factura de venta (líneas e ítems ya cargados)."""
+    return {
+        'operation': 'SALE',
+        'third_party': invoice.customer,
+        'lines': [
+            {'concepts': (line.item.tax_type, line.item.type) if line.item else (),
+             'subtotal': Decimal(line.quantity) * Decimal(line.unit_price)}
+            for line in invoice.lines.all()
+        ],
+    }
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.accounting.models import FiscalPeriod
+from apps.common.mixins import touch_catalog
+from apps.dian.models import ElectronicDocument, TaxType
+from apps.tenants.utils import tenant_context
+
+from .models import TaxDeclaration, TaxRule
+
+
+@receiver([post_save, post_delete], sender=TaxRule)
+def tax_rule_changed(sender, instance, **kwargs):
+    # Sube la versión: services.compiled_rules recompila en la siguiente consulta
+    # y las declaraciones guardadas con otra versión se recalculan
+    touch_catalog(sender, instance.client_id)
+
+
+@receiver([post_save, post_delete], sender=TaxType)
+def tax_type_changed(sender, **kwargs):
+    touch_catalog(sender)
+
+
+def reopen_declarations(client_id, start_date, end_date):
+    """Las declaraciones definitivas que cruzan el rango se vuelven a calcular en la siguiente consulta."""
+    with tenant_context(client_id):
+        TaxDeclaration.objects.filter(
+            is_final=True, period_start__lte=end_date, period_end__gte=start_date,
+        ).update(is_final=False)
+
+
+@receiver(post_save, sender=FiscalPeriod)
+def fiscal_period_reopened(sender, instance, **kwargs):
+    if instance.status == 'OPEN':
+        reopen_declarations(instance.client_id, instance.start_date, instance.end_date)
+
+
+@receiver(post_save, sender=ElectronicDocument)
+def electronic_document_changed(sender, instance, **kwargs):
+    # Los documentos electrónicos no se bloquean con el cierre contable
+    reopen_declarations(instance.customer.client_id, instance.issue_date, instance.issue_date)
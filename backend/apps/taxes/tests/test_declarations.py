@@ -0,0 +1,112 @@
+from datetime import date
+from decimal import Decimal
+from apps.common.tests import TenantTestCase
+from apps.accounting.models import JournalEntry, JournalEntryLine, FiscalPeriod
+from apps.accounting.services.closing_service import FiscalCloseService
+from apps.taxes.models import TaxDeclaration, TaxRule
+from apps.taxes.declaration_service import DeclarationEngine, source_lines
+
+
+class TaxDeclarationTests(TenantTestCase):
+    """Casillas de IVA y retenciones desde el libro, con caché ligada al cierre del periodo."""
+
+    def setUp(self):
+        super().setUp()
+
+        bank = self.create_account('1', 'DEBITO', '11', '111005')
+        reteiva = self.create_account('1', 'DEBITO', '13', '135517')
+        iva = self.create_account('2', 'CREDITO', '24', '240805')
+        retefuente = self.create_account('2', 'CREDITO', '23', '236540')
+        income = self.create_account('4', 'CREDITO', '41', '413505')
+        expense = self.create_account('5', 'DEBITO', '51', '513505')
+
+        # Una sola cuenta de IVA: créditos generados, débitos descontables
+        TaxRule.objects.create(client=self.tenant, tax='IVA', name='IVA 19%', rate=Decimal('19'), account=iva)
+        TaxRule.objects.create(client=self.tenant, tax='RETEFUENTE', name='Compras', operation='PURCHASE',
+                               rate=Decimal('2.5'), account=retefuente)
+        TaxRule.objects.create(client=self.tenant, tax='RETEIVA', name='ReteIVA sufrida', operation='SALE',
+                               base='IVA', rate=Decimal('15'), account=reteiva)
+
+        self._entry('1', date(2026, 1, 15), [
+            (bank, '1190000', '0', '0'), (income, '0', '1000000', '0'), (iva, '0', '190000', '1000000'),
+        ])
+        self._entry('2', date(2026, 2, 10), [
+            (expense, '500000', '0', '0'), (iva, '95000', '0', '500000'),
+            (retefuente, '0', '12500', '500000'), (bank, '0', '582500', '0'),
+        ])
+        self._entry('3', date(2026, 2, 20), [
+            (bank, '1161500', '0', '0'), (reteiva, '28500', '0', '190000'),
+            (income, '0', '1000000', '0'), (iva, '0', '190000', '1000000'),
+        ])
+        self._entry('4', date(2026, 3, 5), [(bank, '119000', '0', '0'), (iva, '0', '119000', '0')])
+
+    def _entry(self, number, entry_date, lines):
+        entry = JournalEntry.objects.create(
+            client=self.tenant, number=number, entry_type='DIARIO', date=entry_date, description=number,
+        )
+        for i, (account, debit, credit, base) in enumerate(lines, start=1):
+            JournalEntryLine.objects.create(client=self.tenant, entry=entry, line_number=i, account=account,
+                                            description=number, debit=Decimal(debit), credit=Decimal(credit),
+                                            base_amount=Decimal(base))
+        entry.status = 'POSTED'
+        entry.save()
+        return entry
+
+    def _close(self, *months):
+        return [
+            FiscalPeriod.objects.create(client=self.tenant, year=2026, month=month, status='CLOSED',
+                                        start_date=date(2026, month, 1), end_date=date(2026, month, 28 if month == 2 else 31))
+            for month in months
+        ]
+
+    def test_iva_boxes_are_cached_once_the_period_is_closed(self):
+        engine = DeclarationEngine(self.tenant.id, '300', 2026, 1)
+        declaration = engine.declaration()
+
+        values = {box: Decimal(data['value']) for box, data in declaration.boxes.items()}
+        self.assertEqual(values['IVA_GENERADO'], Decimal('380000'))
+        self.assertEqual(values['IVA_DESCONTABLE'], Decimal('95000'))
+        self.assertEqual(values['RETEIVA_SUFRIDA'], Decimal('28500'))
+        self.assertEqual(values['SALDO'], Decimal('256500'))
+        self.assertFalse(declaration.is_final)
+
+        january, _ = self._close(1, 2)
+        self.assertTrue(engine.declaration().is_final)
+        with self.assertNumQueries(1):
+            engine.declaration()
+
+        # Detalle: los tres movimientos de la cuenta de IVA del bimestre, no el de marzo
+        rows = list(source_lines(declaration, 'IVA_GENERADO'))
+        self.assertEqual(sorted(row['entry__number'] for row in rows), ['1', '2', '3'])
+        with self.assertRaises(ValueError):
+            source_lines(declaration, 'SALDO')
+
+        january.status = 'OPEN'
+        january.save()
+        self.assertFalse(TaxDeclaration.objects.get(pk=declaration.pk).is_final)
+
+    def test_reopen_period_service_reopens_declarations(self):
+        self._close(1, 2)
+        declaration = DeclarationEngine(self.tenant.id, '300', 2026, 1).declaration()
+        self.assertTrue(declaration.is_final)
+
+        # reopen_period usa update(): no pasa por el post_save de FiscalPeriod
+        self.assertEqual(FiscalCloseService(self.tenant.id).reopen_period(2026, 2), 1)
+        self.assertFalse(TaxDeclaration.objects.get(pk=declaration.pk).is_final)
+
+    def test_withholding_form_follows_rule_accounts(self):
+        self._close(2)
+        declaration = DeclarationEngine(self.tenant.id, '350', 2026, 2).declaration()
+        values = {box: Decimal(data['value']) for box, data in declaration.boxes.items()}
+        self.assertEqual(values['BASE_RETEFUENTE'], Decimal('500000'))
+        self.assertEqual(values['RETEFUENTE'], Decimal('12500'))
+        self.assertEqual(values['TOTAL'], Decimal('12500'))
+        self.assertTrue(declaration.is_final)
+
+        # Un cambio de reglas invalida la declaración guardada
+        TaxRule.objects.filter(tax='RETEFUENTE').get().delete()
+        declaration = DeclarationEngine(self.tenant.id, '350', 2026, 2).declaration()
+        self.assertEqual(Decimal(declaration.boxes['RETEFUENTE']['value']), Decimal('0'))
+
+        with self.assertRaises(ValueError):
+            DeclarationEngine(self.tenant.id, '300', 2026, 7)
@@ -0,0 +1,96 @@
+from datetime import date
+from decimal import Decimal
+from apps.common.tests import TenantTestCase
+from apps.accounting.models import ThirdParty
+from apps.invoicing.models import DianResolution, Invoice, InvoiceLine, Item
+from apps.payroll.models import LegalParameter
+from apps.taxes.models import TaxRule
+from apps.taxes.services import TaxEngine, compiled_rules
+
+
+class TaxEngineTests(TenantTestCase):
+    """IVA y retenciones calculados con las reglas compiladas del tenant (UVT de 50.000)."""
+
+    def setUp(self):
+        super().setUp()
+        LegalParameter.objects.create(key='UVT', value=Decimal('50000'), valid_from=date(2026, 1, 1))
+
+        rule = lambda **kwargs: TaxRule.objects.create(client=self.tenant, **kwargs)
+        rule(tax='IVA', name='IVA 19%', concept='IVA_19', rate=Decimal('19'))
+        rule(tax='IVA', name='IVA 5%', concept='IVA_5', rate=Decimal('5'))
+        rule(tax='RETEFUENTE', name='Compras', operation='PURCHASE', min_base_uvt=Decimal('27'), rate=Decimal('2.5'))
+        self.services = rule(tax='RETEFUENTE', name='Servicios', operation='PURCHASE', concept='SERVICIO',
+                             excluded_responsibility='O-15', min_base_uvt=Decimal('4'), rate=Decimal('4'))
+        rule(tax='RETEIVA', name='ReteIVA', operation='PURCHASE', third_party_regime='48', base='IVA',
+             rate=Decimal('15'))
+        rule(tax='RETEICA', name='ICA Cali', operation='PURCHASE', municipality='76001', rate=Decimal('0.966'))
+
+    def _purchase(self, responsibilities=()):
+        return {
+            'operation': 'PURCHASE',
+            'third_party': {'tax_regime': '48', 'fiscal_responsibilities': list(responsibilities), 'city_code': '76001'},
+            'lines': [
+                {'concepts': ('IVA_19', 'SERVICIO'), 'subtotal': Decimal('1000000')},
+                {'concepts': ('IVA_5', 'PRODUCTO'), 'subtotal': Decimal('400000')},
+            ],
+        }
+
+    def test_invoice_batch_is_decided_in_memory(self):
+        engine = TaxEngine(self.tenant.id, date(2026, 8, 1))
+        with self.assertNumQueries(0):
+            regular, self_withholder = engine.compute_many([self._purchase(), self._purchase(['O-15'])])
+
+        self.assertEqual([line['iva'] for line in regular['lines']], [Decimal('190000.00'), Decimal('20000.00')])
+        # Servicios 4% sobre 1M; las compras (400.000) no llegan a 27 UVT
+        self.assertEqual(regular['totals'], {
+            'IVA': Decimal('210000.00'), 'RETEFUENTE': Decimal('40000.00'),
+            'RETEIVA': Decimal('31500.00'), 'RETEICA': Decimal('13524.00'),
+        })
+        self.assertEqual(regular['net'], Decimal('1524976.00'))
+        self.assertEqual([(t['tax'], t['base']) for t in regular['taxes'] if t['tax'] == 'RETEIVA'],
+                         [('RETEIVA', Decimal('210000.00'))])
+
+        # Autorretenedor: la regla de servicios no aplica; la genérica suma las dos líneas (1,4M >= 27 UVT)
+        self.assertEqual(self_withholder['totals']['RETEFUENTE'], Decimal('35000.00'))
+        self.assertEqual(self_withholder['totals']['RETEIVA'], Decimal('31500.00'))
+
+        # En venta no aplica ninguna retención de compras
+        sale = engine.compute({**self._purchase(), 'operation': 'SALE'})
+        self.assertEqual(sale['withholdings'], Decimal('0'))
+
+    def test_rules_recompile_only_when_they_change(self):
+        compiled = compiled_rules(self.tenant.id)
+        with self.assertNumQueries(0):
+            self.assertIs(compiled_rules(self.tenant.id), compiled)
+
+        self.services.rate = Decimal('6')
+        self.services.save()
+        recompiled = compiled_rules(self.tenant.id)
+        self.assertIsNot(recompiled, compiled)
+        result = TaxEngine(self.tenant.id, date(2026, 8, 1)).compute(self._purchase())
+        self.assertEqual(result['totals']['RETEFUENTE'], Decimal('60000.00'))
+
+    def test_invoice_lines_take_iva_from_the_rules(self):
+        customer = ThirdParty.objects.create(client=self.tenant, identification_type='31',
+                                             identification_number='900555111', person_type=1, business_name='Acme')
+        resolution = DianResolution.objects.create(
+            client=self.tenant, document_type='INVOICE', resolution_number='18760000001', prefix='FE',
+            number_from=1, number_to=1000, current_number=1, date_from=date(2026, 1, 1), date_to=date(2027, 1, 1),
+        )
+        invoice = Invoice.objects.create(client=self.tenant, resolution=resolution, prefix='FE', number=1,
+                                         customer=customer, payment_due_date=date(2026, 8, 31))
+        reduced = Item.objects.create(client=self.tenant, code='P1', description='Producto', unit_price=Decimal('100'),
+                                      type='PRODUCTO', tax_type='IVA_5')
+
+        line = InvoiceLine.objects.create(invoice=invoice, item=reduced, description='Producto', quantity=2,
+                                          unit_price=Decimal('100'), tax_rate=Decimal('19'), subtotal=0,
+                                          tax_amount=0, total=0)
+        self.assertEqual((line.tax_rate, line.tax_amount, line.total), (Decimal('5'), Decimal('10'), Decimal('210')))
+
+        # Sin reglas en el tenant la línea conserva su tarifa
+        TaxRule.objects.filter(client=self.tenant).delete()
+        line.save()
+        self.assertEqual(line.tax_rate, Decimal('5'))
+        line.tax_rate = Decimal('19')
+        line.save()
+        self.assertEqual(line.tax_amount, Decimal('38'))
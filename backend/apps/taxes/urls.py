@@ -1,3 +1,12 @@
-from django.urls import path
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
 
-urlpatterns = []
+from .views import TaxDeclarationViewSet, TaxRuleViewSet
+
+router = DefaultRouter()
+router.register(r'rules', TaxRuleViewSet, basename='tax-rule')
+router.register(r'declarations', TaxDeclarationViewSet, basename='tax-declaration')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
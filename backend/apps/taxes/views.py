@@ -0,0 +1,82 @@
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from apps.common.mixins import CatalogETagMixin
+from apps.common.pagination import KeysetPagination
+from apps.invoicing.models import Invoice
+from apps.tenants.utils import get_current_client_id
+
+from .declaration_service import DeclarationEngine, source_lines
+from .models import TaxDeclaration, TaxRule
+from .serializers import (
+    DeclarationRequestSerializer, TaxDeclarationSerializer, TaxDocumentSerializer, TaxRuleSerializer,
+)
+from .services import TaxEngine, invoice_document
+
+
+class TaxRuleViewSet(CatalogETagMixin, viewsets.ModelViewSet):
+    serializer_class = TaxRuleSerializer
+    catalog_models = ['taxes.TaxRule', 'accounting.Account']
+    filterset_fields = ['tax', 'operation', 'is_active']
+
+    def get_queryset(self):
+        return TaxRule.objects.select_related('account')
+
+    def perform_create(self, serializer):
+        serializer.save(client_id=int(get_current_client_id()))
+
+    @action(detail=False, methods=['post'])
+    def compute(self, request):
+        """
+        Calcula IVA y retenciones en lote con las reglas del tenant:
+        `{"invoices": [ids]}` para facturas guardadas o
+        `{"documents": [...]}` con documentos libres (ver TaxDocumentSerializer).
+        """
+        engine = TaxEngine(int(get_current_client_id()))
+        invoice_ids = request.data.get('invoices')
+        if invoice_ids:
+            invoices = (Invoice.objects.filter(pk__in=invoice_ids).select_related('customer')
+                        .prefetch_related('lines__item').order_by('id'))
+            results = engine.compute_many([invoice_document(invoice) for invoice in invoices])
+            return Response([{'invoice': invoice.pk, **result} for invoice, result in zip(invoices, results)])
+
+        serializer = TaxDocumentSerializer(data=request.data.get('documents') or [], many=True)
+        serializer.is_valid(raise_exception=True)
+        return Response(engine.compute_many(serializer.validated_data))
+
+
+class TaxDeclarationViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = TaxDeclarationSerializer
+    filterset_fields = ['form', 'year', 'is_final']
+    keyset_ordering = ('-id',)
+
+    def get_queryset(self):
+        return TaxDeclaration.objects.all()
+
+    @action(detail=False, methods=['post'])
+    def compute(self, request):
+        """
+        Casillas del formulario para un periodo (`{"form": "300", "year":
+        2026, "period": 1}`). Un periodo cerrado se responde desde la
+        declaración guardada salvo `refresh`.
+        """
+        serializer = DeclarationRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            engine = DeclarationEngine(int(get_current_client_id()), data['form'], data['year'], data['period'])
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(TaxDeclarationSerializer(engine.declaration(refresh=data['refresh'])).data)
+
+    @action(detail=True, methods=['get'])
+    def lines(self, request, pk=None):
+        """Detalle de una casilla (`?box=IVA_GENERADO`) paginado por cursor."""
+        try:
+            rows = source_lines(self.get_object(), request.query_params.get('box', ''))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(rows, request, view=self)
+        return paginator.get_paginated_response(page)
@@ -1,5 +1,10 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from threading import local
 
+logger = logging.getLogger(__name__)
+
 _thread_locals = local()
 
 
@@ -16,3 +21,51 @@ def get_current_client_id():
     Returns None if the client ID has not been set.
     """
     return getattr(_thread_locals, 'client_id', None)
+
+
+@contextmanager
+def tenant_context(client_id):
+    """
+    Activa temporalmente un tenant en el hilo actual (tareas Celery, comandos).
+    Restaura el tenant previo al salir, aun si ocurre una excepción.
+    """
+    previous = get_current_client_id()
+    set_current_client_id(client_id)
+    try:
+        yield
+    finally:
+        set_current_client_id(previous)
+
+
+def run_for_tenants(func, client_ids, max_workers=4):
+    """
+    Ejecuta `func(client_id)` para cada tenant con concurrencia acotada.
+
+    Cada ejecución corre dentro de `tenant_context` en un hilo del pool y
+    cierra su conexión a la BD al terminar (Django abre una por hilo).
+    Un fallo en un tenant no detiene a los demás: se registra y se devuelve
+    la excepción como resultado de ese tenant.
+
+    Returns:
+        dict {client_id: resultado | Exception}
+    """
+    from django.db import connection
+
+    def _worker(client_id):
+        try:
+            with tenant_context(client_id):
+                return func(client_id)
+        finally:
+            connection.close()
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {pool.submit(_worker, client_id): client_id for client_id in client_ids}
+        for future in as_completed(futures):
+            client_id = futures[future]
+            try:
+                results[client_id] = future.result()
+            except Exception as e:
+                logger.error(f"Tenant {client_id}: {str(e)}")
+                results[client_id] = e
+    return results
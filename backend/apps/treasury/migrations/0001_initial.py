@@ -0,0 +1,70 @@
+# Generated by Django 4.2.9 on 2026-10-19 19:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounting', '0005_accountingtemplate_accountingtemplateline'),
+        ('electronic_events', '0002_receivedinvoice_subtotal_amount_and_more'),
+        ('tenants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankAccount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Nombre')),
+                ('account_number', models.CharField(max_length=50, verbose_name='Número de Cuenta')),
+                ('bank_name', models.CharField(max_length=100, verbose_name='Banco')),
+                ('currency', models.CharField(default='COP', max_length=3, verbose_name='Moneda')),
+                ('client', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='tenants.client', verbose_name='Cliente (Tenant)')),
+                ('gl_account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='accounting.account', verbose_name='Cuenta Contable (PUC)')),
+            ],
+            options={
+                'verbose_name': 'Cuenta Bancaria',
+                'verbose_name_plural': 'Cuentas Bancarias',
+                'unique_together': {('client', 'account_number')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PaymentOut',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('consecutive', models.IntegerField(editable=False, verbose_name='Consecutivo')),
+                ('payment_date', models.DateField(verbose_name='Fecha de Pago')),
+                ('payment_method', models.CharField(choices=[('TRANSFERENCIA', 'Transferencia Bancaria'), ('CHEQUE', 'Cheque'), ('EFECTIVO', 'Efectivo')], default='TRANSFERENCIA', max_length=20, verbose_name='Método de Pago')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='Monto Total')),
+                ('notes', models.TextField(blank=True, verbose_name='Observaciones')),
+                ('status', models.CharField(choices=[('DRAFT', 'Borrador'), ('POSTED', 'Contabilizado'), ('CANCELLED', 'Anulado')], default='DRAFT', max_length=20, verbose_name='Estado')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('bank_account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='treasury.bankaccount', verbose_name='Cuenta Bancaria')),
+                ('client', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='tenants.client', verbose_name='Cliente (Tenant)')),
+                ('third_party', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='accounting.thirdparty', verbose_name='Tercero (Proveedor)')),
+            ],
+            options={
+                'verbose_name': 'Comprobante de Egreso',
+                'verbose_name_plural': 'Comprobantes de Egreso',
+                'unique_together': {('client', 'consecutive')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PaymentOutDetail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount_paid', models.DecimalField(decimal_places=2, max_digits=18, verbose_name='Monto Pagado')),
+                ('invoice', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='payments', to='electronic_events.receivedinvoice', verbose_name='Factura de Proveedor')),
+                ('payment_out', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='details', to='treasury.paymentout', verbose_name='Comprobante de Egreso')),
+            ],
+            options={
+                'verbose_name': 'Detalle de Pago',
+                'verbose_name_plural': 'Detalles de Pago',
+            },
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 4.2.9 on 2026-10-19 19:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounting', '0012_journal_import_batch'),
+        ('tenants', '0001_initial'),
+        ('treasury', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankStatement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_format', models.CharField(choices=[('CSV', 'CSV genérico'), ('OFX', 'OFX'), ('BANCOLOMBIA', 'Bancolombia'), ('DAVIVIENDA', 'Davivienda'), ('BOGOTA', 'Banco de Bogotá')], max_length=20, verbose_name='Formato')),
+                ('file', models.FileField(blank=True, null=True, upload_to='bank_statements/', verbose_name='Archivo')),
+                ('original_name', models.CharField(blank=True, max_length=255, verbose_name='Nombre del Archivo')),
+                ('period_start', models.DateField(blank=True, null=True, verbose_name='Desde')),
+                ('period_end', models.DateField(blank=True, null=True, verbose_name='Hasta')),
+                ('line_count', models.IntegerField(default=0, verbose_name='Movimientos')),
+                ('duplicate_count', models.IntegerField(default=0, verbose_name='Movimientos Repetidos')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('bank_account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='statements', to='treasury.bankaccount', verbose_name='Cuenta Bancaria')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.client', verbose_name='Cliente (Tenant)')),
+                ('imported_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Importado por')),
+            ],
+            options={
+                'verbose_name': 'Extracto Bancario',
+                'verbose_name_plural': 'Extractos Bancarios',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReconciliationMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('match_type', models.CharField(choices=[('ONE_TO_ONE', '1 a 1'), ('MANY_TO_ONE', 'Varios del extracto a 1 contable'), ('ONE_TO_MANY', '1 del extracto a varios contables'), ('MANY_TO_MANY', 'Varios a varios')], max_length=20, verbose_name='Tipo')),
+                ('rule', models.CharField(choices=[('REFERENCE', 'Referencia y valor'), ('AMOUNT_DATE', 'Valor y fecha'), ('GROUP', 'Agrupación por suma'), ('MANUAL', 'Manual')], max_length=20, verbose_name='Regla')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=18, verbose_name='Valor')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('bank_account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reconciliation_matches', to='treasury.bankaccount', verbose_name='Cuenta Bancaria')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.client', verbose_name='Cliente (Tenant)')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Conciliado por')),
+            ],
+            options={
+                'verbose_name': 'Conciliación Bancaria',
+                'verbose_name_plural': 'Conciliaciones Bancarias',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReconciledEntryLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_line', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='bank_reconciliation', to='accounting.journalentryline', verbose_name='Movimiento Contable')),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entry_lines', to='treasury.reconciliationmatch', verbose_name='Conciliación')),
+            ],
+            options={
+                'verbose_name': 'Movimiento Contable Conciliado',
+                'verbose_name_plural': 'Movimientos Contables Conciliados',
+            },
+        ),
+        migrations.CreateModel(
+            name='BankStatementLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Fecha')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=18, verbose_name='Valor')),
+                ('description', models.CharField(blank=True, max_length=255, verbose_name='Descripción')),
+                ('reference', models.CharField(blank=True, max_length=100, verbose_name='Referencia')),
+                ('line_hash', models.CharField(max_length=64, verbose_name='Huella')),
+                ('bank_account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='statement_lines', to='treasury.bankaccount', verbose_name='Cuenta Bancaria')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.client', verbose_name='Cliente (Tenant)')),
+                ('match', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='statement_lines', to='treasury.reconciliationmatch', verbose_name='Conciliación')),
+                ('statement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='treasury.bankstatement', verbose_name='Extracto')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Extracto',
+                'verbose_name_plural': 'Movimientos de Extracto',
+                'ordering': ['date', 'id'],
+                'indexes': [models.Index(fields=['bank_account', 'match', 'date'], name='treas_stmt_line_pending_idx')],
+                'unique_together': {('bank_account', 'line_hash')},
+            },
+        ),
+    ]
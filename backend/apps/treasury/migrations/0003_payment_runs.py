@@ -0,0 +1,51 @@
+# Generated by Django 4.2.9 on 2026-10-19 19:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('treasury', '0002_bank_reconciliation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payment_date', models.DateField(verbose_name='Fecha de Pago')),
+                ('due_before', models.DateField(verbose_name='Facturas emitidas hasta')),
+                ('supplier_ids', models.JSONField(blank=True, default=list, verbose_name='Proveedores (vacío = todos)')),
+                ('max_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=18, null=True, verbose_name='Tope de la Corrida')),
+                ('grouping', models.CharField(choices=[('RUN', 'Un comprobante por corrida'), ('SUPPLIER', 'Un comprobante por proveedor')], default='SUPPLIER', max_length=10, verbose_name='Contabilización')),
+                ('file_format', models.CharField(choices=[('PAB', 'Bancolombia PAB'), ('ACH', 'ACH genérico')], default='PAB', max_length=10, verbose_name='Formato Archivo Banco')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('PROCESSING', 'Procesando'), ('POSTED', 'Contabilizada'), ('FAILED', 'Fallida')], default='PENDING', max_length=20, verbose_name='Estado')),
+                ('payment_count', models.IntegerField(default=0, verbose_name='Pagos')),
+                ('invoice_count', models.IntegerField(default=0, verbose_name='Facturas')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='Total')),
+                ('skipped', models.JSONField(blank=True, default=list, verbose_name='Proveedores Omitidos')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('bank_file', models.FileField(blank=True, null=True, upload_to='payment_runs/', verbose_name='Archivo Banco')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+                ('bank_account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='payment_runs', to='treasury.bankaccount', verbose_name='Cuenta Bancaria')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.client', verbose_name='Cliente (Tenant)')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Creado por')),
+            ],
+            options={
+                'verbose_name': 'Corrida de Pagos',
+                'verbose_name_plural': 'Corridas de Pagos',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='paymentout',
+            name='payment_run',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payments', to='treasury.paymentrun', verbose_name='Corrida de Pagos'),
+        ),
+    ]
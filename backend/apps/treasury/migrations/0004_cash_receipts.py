@@ -0,0 +1,61 @@
+# Generated by Django 4.2.9 on 2026-10-19 19:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoicing', '0008_invoice_open_balance'),
+        ('tenants', '0001_initial'),
+        ('accounting', '0012_journal_import_batch'),
+        ('treasury', '0003_payment_runs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CashReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('consecutive', models.IntegerField(editable=False, verbose_name='Consecutivo')),
+                ('receipt_date', models.DateField(verbose_name='Fecha de Recaudo')),
+                ('payment_method', models.CharField(choices=[('TRANSFERENCIA', 'Transferencia Bancaria'), ('CHEQUE', 'Cheque'), ('EFECTIVO', 'Efectivo')], default='TRANSFERENCIA', max_length=20, verbose_name='Método de Pago')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=18, verbose_name='Valor Recibido')),
+                ('reference', models.CharField(blank=True, help_text="Facturas que indica el cliente, p. ej. 'FE-1023 FE-1030'", max_length=100, verbose_name='Referencia')),
+                ('unapplied_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='Saldo a Favor')),
+                ('notes', models.TextField(blank=True, verbose_name='Observaciones')),
+                ('status', models.CharField(choices=[('DRAFT', 'Borrador'), ('POSTED', 'Contabilizado'), ('CANCELLED', 'Anulado')], default='DRAFT', max_length=20, verbose_name='Estado')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('bank_account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='treasury.bankaccount', verbose_name='Cuenta Bancaria')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.client', verbose_name='Cliente (Tenant)')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='cash_receipts', to='accounting.thirdparty', verbose_name='Cliente')),
+            ],
+            options={
+                'verbose_name': 'Recibo de Caja',
+                'verbose_name_plural': 'Recibos de Caja',
+            },
+        ),
+        migrations.CreateModel(
+            name='CashReceiptApplication',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=18, verbose_name='Valor Aplicado')),
+                ('invoice', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='receipt_applications', to='invoicing.invoice', verbose_name='Factura de Venta')),
+                ('receipt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='applications', to='treasury.cashreceipt', verbose_name='Recibo de Caja')),
+            ],
+            options={
+                'verbose_name': 'Aplicación de Recibo',
+                'verbose_name_plural': 'Aplicaciones de Recibos',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='cashreceipt',
+            index=models.Index(fields=['client', 'customer', 'receipt_date'], name='treas_receipt_customer_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='cashreceipt',
+            unique_together={('client', 'consecutive')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-19 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('treasury', '0004_cash_receipts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paymentrun',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pendiente'), ('PROCESSING', 'Procesando'), ('POSTED', 'Contabilizada'), ('FILE_ERROR', 'Contabilizada, error en archivo'), ('FAILED', 'Fallida')], default='PENDING', max_length=20, verbose_name='Estado'),
+        ),
+    ]
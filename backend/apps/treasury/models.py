@@ -1,8 +1,8 @@
 from django.db import models
 from django.core.exceptions import ValidationError
-from django.db.models import Sum
 from django.utils.translation import gettext_lazy as _
 from apps.accounting.models import Account
+from apps.common.managers import TenantAwareManager
 from apps.electronic_events.models import ReceivedInvoice
 
 class BankAccount(models.Model):
@@ -43,6 +43,14 @@ class PaymentOut(models.Model):
     total_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0, verbose_name="Monto Total")
     notes = models.TextField(blank=True, verbose_name="Observaciones")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='DRAFT', verbose_name="Estado")
+    payment_run = models.ForeignKey(
+        'PaymentRun',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='payments',
+        verbose_name="Corrida de Pagos"
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -72,23 +80,11 @@ class PaymentOutDetail(models.Model):
     amount_paid = models.DecimalField(max_digits=18, decimal_places=2, verbose_name="Monto Pagado")
 
     def clean(self):
-        # Evitar pagar más del saldo
-        # Saldo = Total Factura - Pagos PREVIOS (excluyendo este si se está editando)
-        # Consideramos pagos en estado POSTED o DRAFT? 
-        # Para ser conservadores, todos los pagos activos (no CANCELLED) restan cupo.
-        
-        existing_payments = PaymentOutDetail.objects.filter(
-            invoice=self.invoice
-        ).exclude(payment_out__status='CANCELLED')
-        
-        if self.pk:
-            existing_payments = existing_payments.exclude(pk=self.pk)
-            
-        total_paid_already = existing_payments.aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
-        
-        balance = self.invoice.total_amount - total_paid_already
-        
-        if self.amount_paid > balance:
+        # Evitar pagar más del saldo pendiente (subledger de la factura).
+        # Es una validación temprana: el saldo se bloquea y descuenta al
+        # contabilizar el egreso (ver payables_service.apply_payment).
+        balance = self.invoice.outstanding_amount
+        if balance is not None and self.amount_paid > balance:
             raise ValidationError(
                 f"El monto a pagar ({'{:,.2f}'.format(self.amount_paid)}) excede el saldo pendiente de la factura ({'{:,.2f}'.format(balance)})."
             )
@@ -100,3 +96,251 @@ class PaymentOutDetail(models.Model):
     class Meta:
         verbose_name = "Detalle de Pago"
         verbose_name_plural = "Detalles de Pago"
+
+
+class CashReceipt(models.Model):
+    """
+    Recibo de Caja: pago recibido de un cliente. Al contabilizarse se aplica
+    a sus facturas de venta abiertas (por referencia y luego las más
+    antiguas) y lo no aplicado queda como saldo a favor del cliente.
+    """
+    STATUS_CHOICES = [
+        ('DRAFT', 'Borrador'),
+        ('POSTED', 'Contabilizado'),
+        ('CANCELLED', 'Anulado'),
+    ]
+
+    client = models.ForeignKey('tenants.Client', on_delete=models.CASCADE, verbose_name="Cliente (Tenant)")
+    consecutive = models.IntegerField(verbose_name="Consecutivo", editable=False)
+    receipt_date = models.DateField(verbose_name="Fecha de Recaudo")
+    customer = models.ForeignKey('accounting.ThirdParty', on_delete=models.PROTECT, related_name='cash_receipts', verbose_name="Cliente")
+    bank_account = models.ForeignKey(BankAccount, on_delete=models.PROTECT, verbose_name="Cuenta Bancaria")
+    payment_method = models.CharField(max_length=20, choices=PaymentOut.PAYMENT_METHOD_CHOICES, default='TRANSFERENCIA', verbose_name="Método de Pago")
+    amount = models.DecimalField(max_digits=18, decimal_places=2, verbose_name="Valor Recibido")
+    reference = models.CharField(max_length=100, blank=True, verbose_name="Referencia", help_text="Facturas que indica el cliente, p. ej. 'FE-1023 FE-1030'")
+    unapplied_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0, verbose_name="Saldo a Favor")
+    notes = models.TextField(blank=True, verbose_name="Observaciones")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='DRAFT', verbose_name="Estado")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantAwareManager()
+
+    def save(self, *args, **kwargs):
+        if not self.consecutive:
+            # Consecutivo por Cliente
+            last = CashReceipt._base_manager.filter(client_id=self.client_id).order_by('-consecutive').first()
+            self.consecutive = last.consecutive + 1 if last else 1
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"RC-{self.consecutive} {self.customer}"
+
+    class Meta:
+        verbose_name = "Recibo de Caja"
+        verbose_name_plural = "Recibos de Caja"
+        unique_together = ('client', 'consecutive')
+        indexes = [
+            models.Index(fields=['client', 'customer', 'receipt_date'], name='treas_receipt_customer_idx'),
+        ]
+
+
+class CashReceiptApplication(models.Model):
+    """Valor de un recibo de caja aplicado a una factura de venta."""
+    receipt = models.ForeignKey(CashReceipt, on_delete=models.CASCADE, related_name='applications', verbose_name="Recibo de Caja")
+    invoice = models.ForeignKey('invoicing.Invoice', on_delete=models.PROTECT, related_name='receipt_applications', verbose_name="Factura de Venta")
+    amount = models.DecimalField(max_digits=18, decimal_places=2, verbose_name="Valor Aplicado")
+
+    class Meta:
+        verbose_name = "Aplicación de Recibo"
+        verbose_name_plural = "Aplicaciones de Recibos"
+
+
+class PaymentRun(models.Model):
+    """
+    Corrida de pagos a proveedores: selecciona las facturas recibidas con
+    saldo según los criterios, crea los egresos en bloque, los contabiliza
+    (un comprobante por corrida o por proveedor) y genera el archivo plano
+    para el banco.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pendiente'),
+        ('PROCESSING', 'Procesando'),
+        ('POSTED', 'Contabilizada'),
+        # Egresos contabilizados pero sin archivo del banco: se puede regenerar
+        ('FILE_ERROR', 'Contabilizada, error en archivo'),
+        ('FAILED', 'Fallida'),
+    ]
+    GROUPING_CHOICES = [
+        ('RUN', 'Un comprobante por corrida'),
+        ('SUPPLIER', 'Un comprobante por proveedor'),
+    ]
+    FILE_FORMAT_CHOICES = [
+        ('PAB', 'Bancolombia PAB'),
+        ('ACH', 'ACH genérico'),
+    ]
+
+    client = models.ForeignKey('tenants.Client', on_delete=models.CASCADE, verbose_name="Cliente (Tenant)")
+    bank_account = models.ForeignKey(BankAccount, on_delete=models.PROTECT, related_name='payment_runs', verbose_name="Cuenta Bancaria")
+    payment_date = models.DateField(verbose_name="Fecha de Pago")
+    # Criterios de selección
+    due_before = models.DateField(verbose_name="Facturas emitidas hasta")
+    supplier_ids = models.JSONField(default=list, blank=True, verbose_name="Proveedores (vacío = todos)")
+    max_amount = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True, verbose_name="Tope de la Corrida")
+
+    grouping = models.CharField(max_length=10, choices=GROUPING_CHOICES, default='SUPPLIER', verbose_name="Contabilización")
+    file_format = models.CharField(max_length=10, choices=FILE_FORMAT_CHOICES, default='PAB', verbose_name="Formato Archivo Banco")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING', verbose_name="Estado")
+
+    payment_count = models.IntegerField(default=0, verbose_name="Pagos")
+    invoice_count = models.IntegerField(default=0, verbose_name="Facturas")
+    total_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0, verbose_name="Total")
+    skipped = models.JSONField(default=list, blank=True, verbose_name="Proveedores Omitidos")
+    error = models.TextField(blank=True, verbose_name="Error")
+    bank_file = models.FileField(upload_to='payment_runs/', null=True, blank=True, verbose_name="Archivo Banco")
+
+    created_by = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Creado por")
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Fin")
+
+    objects = TenantAwareManager()
+
+    def __str__(self):
+        return f"Corrida {self.pk} {self.payment_date} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = "Corrida de Pagos"
+        verbose_name_plural = "Corridas de Pagos"
+        ordering = ['-created_at']
+
+
+class BankStatement(models.Model):
+    """
+    Extracto bancario importado (CSV, OFX o formato propio del banco).
+    Sus movimientos se concilian contra los movimientos contables de la
+    cuenta PUC asociada a la cuenta bancaria.
+    """
+    FORMAT_CHOICES = [
+        ('CSV', 'CSV genérico'),
+        ('OFX', 'OFX'),
+        ('BANCOLOMBIA', 'Bancolombia'),
+        ('DAVIVIENDA', 'Davivienda'),
+        ('BOGOTA', 'Banco de Bogotá'),
+    ]
+
+    client = models.ForeignKey('tenants.Client', on_delete=models.CASCADE, verbose_name="Cliente (Tenant)")
+    bank_account = models.ForeignKey(BankAccount, on_delete=models.PROTECT, related_name='statements', verbose_name="Cuenta Bancaria")
+    source_format = models.CharField(max_length=20, choices=FORMAT_CHOICES, verbose_name="Formato")
+    file = models.FileField(upload_to='bank_statements/', null=True, blank=True, verbose_name="Archivo")
+    original_name = models.CharField(max_length=255, blank=True, verbose_name="Nombre del Archivo")
+    period_start = models.DateField(null=True, blank=True, verbose_name="Desde")
+    period_end = models.DateField(null=True, blank=True, verbose_name="Hasta")
+    line_count = models.IntegerField(default=0, verbose_name="Movimientos")
+    duplicate_count = models.IntegerField(default=0, verbose_name="Movimientos Repetidos")
+    imported_by = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Importado por")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TenantAwareManager()
+
+    def __str__(self):
+        return f"{self.bank_account} {self.period_start} - {self.period_end}"
+
+    class Meta:
+        verbose_name = "Extracto Bancario"
+        verbose_name_plural = "Extractos Bancarios"
+        ordering = ['-created_at']
+
+
+class ReconciliationMatch(models.Model):
+    """
+    Conciliación de uno o varios movimientos del extracto con uno o varios
+    movimientos contables de la cuenta bancaria.
+    """
+    MATCH_TYPE_CHOICES = [
+        ('ONE_TO_ONE', '1 a 1'),
+        ('MANY_TO_ONE', 'Varios del extracto a 1 contable'),
+        ('ONE_TO_MANY', '1 del extracto a varios contables'),
+        ('MANY_TO_MANY', 'Varios a varios'),
+    ]
+    RULE_CHOICES = [
+        ('REFERENCE', 'Referencia y valor'),
+        ('AMOUNT_DATE', 'Valor y fecha'),
+        ('GROUP', 'Agrupación por suma'),
+        ('MANUAL', 'Manual'),
+    ]
+
+    client = models.ForeignKey('tenants.Client', on_delete=models.CASCADE, verbose_name="Cliente (Tenant)")
+    bank_account = models.ForeignKey(BankAccount, on_delete=models.CASCADE, related_name='reconciliation_matches', verbose_name="Cuenta Bancaria")
+    match_type = models.CharField(max_length=20, choices=MATCH_TYPE_CHOICES, verbose_name="Tipo")
+    rule = models.CharField(max_length=20, choices=RULE_CHOICES, verbose_name="Regla")
+    amount = models.DecimalField(max_digits=18, decimal_places=2, verbose_name="Valor")
+    created_by = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Conciliado por")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TenantAwareManager()
+
+    def __str__(self):
+        return f"{self.get_match_type_display()} {self.amount} ({self.get_rule_display()})"
+
+    class Meta:
+        verbose_name = "Conciliación Bancaria"
+        verbose_name_plural = "Conciliaciones Bancarias"
+        ordering = ['-created_at']
+
+
+class BankStatementLine(models.Model):
+    """
+    Movimiento del extracto. El valor es con signo desde la óptica de la
+    empresa: positivo = consignación/abono, negativo = retiro/cargo.
+    """
+    client = models.ForeignKey('tenants.Client', on_delete=models.CASCADE, verbose_name="Cliente (Tenant)")
+    statement = models.ForeignKey(BankStatement, on_delete=models.CASCADE, related_name='lines', verbose_name="Extracto")
+    bank_account = models.ForeignKey(BankAccount, on_delete=models.PROTECT, related_name='statement_lines', verbose_name="Cuenta Bancaria")
+    date = models.DateField(verbose_name="Fecha")
+    amount = models.DecimalField(max_digits=18, decimal_places=2, verbose_name="Valor")
+    description = models.CharField(max_length=255, blank=True, verbose_name="Descripción")
+    reference = models.CharField(max_length=100, blank=True, verbose_name="Referencia")
+    # Huella del movimiento para no duplicar al reimportar extractos solapados
+    line_hash = models.CharField(max_length=64, verbose_name="Huella")
+    match = models.ForeignKey(
+        ReconciliationMatch,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='statement_lines',
+        verbose_name="Conciliación"
+    )
+
+    objects = TenantAwareManager()
+
+    def __str__(self):
+        return f"{self.date} {self.amount} {self.description}"
+
+    class Meta:
+        verbose_name = "Movimiento de Extracto"
+        verbose_name_plural = "Movimientos de Extracto"
+        ordering = ['date', 'id']
+        unique_together = ('bank_account', 'line_hash')
+        indexes = [
+            # Pendientes por conciliar de una cuenta en un rango de fechas
+            models.Index(fields=['bank_account', 'match', 'date'], name='treas_stmt_line_pending_idx'),
+        ]
+
+
+class ReconciledEntryLine(models.Model):
+    """
+    Movimiento contable (de la cuenta PUC del banco) incluido en una
+    conciliación. Uno a uno: un movimiento contable se concilia una sola vez.
+    """
+    match = models.ForeignKey(ReconciliationMatch, on_delete=models.CASCADE, related_name='entry_lines', verbose_name="Conciliación")
+    entry_line = models.OneToOneField(
+        'accounting.JournalEntryLine',
+        on_delete=models.CASCADE,
+        related_name='bank_reconciliation',
+        verbose_name="Movimiento Contable"
+    )
+
+    class Meta:
+        verbose_name = "Movimiento Contable Conciliado"
+        verbose_name_plural = "Movimientos Contables Conciliados"
@@ -1,5 +1,8 @@
 from rest_framework import serializers
-from .models import BankAccount, PaymentOut, PaymentOutDetail
+from apps.common.mixins import DynamicFieldsMixin
+from .models import (
+    BankAccount, PaymentOut, PaymentOutDetail, PaymentRun, CashReceipt, CashReceiptApplication, BankStatement, BankStatementLine, ReconciliationMatch,
+)
 from apps.electronic_events.models import ReceivedInvoice
 
 class BankAccountSerializer(serializers.ModelSerializer):
@@ -14,7 +17,7 @@ class PaymentOutDetailSerializer(serializers.ModelSerializer):
         model = PaymentOutDetail
         fields = ['id', 'invoice', 'invoice_number', 'amount_paid']
 
-class PaymentOutSerializer(serializers.ModelSerializer):
+class PaymentOutSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     details = PaymentOutDetailSerializer(many=True, read_only=False)
     bank_account_name = serializers.CharField(source='bank_account.name', read_only=True)
     
@@ -23,9 +26,9 @@ class PaymentOutSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'consecutive', 'payment_date', 'third_party', 
             'bank_account', 'bank_account_name', 'payment_method', 
-            'total_amount', 'notes', 'status', 'details', 'created_at'
+            'total_amount', 'notes', 'status', 'details', 'payment_run', 'created_at'
         ]
-        read_only_fields = ['consecutive', 'status', 'created_at']
+        read_only_fields = ['consecutive', 'status', 'payment_run', 'created_at']
 
     def create(self, validated_data):
         details_data = validated_data.pop('details')
@@ -51,3 +54,89 @@ class PaymentOutSerializer(serializers.ModelSerializer):
                 PaymentOutDetail.objects.create(payment_out=instance, **detail_data)
                 
         return instance
+
+
+class CashReceiptApplicationSerializer(serializers.ModelSerializer):
+    invoice_number = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CashReceiptApplication
+        fields = ['id', 'invoice', 'invoice_number', 'amount']
+
+    def get_invoice_number(self, obj):
+        return f"{obj.invoice.prefix}{obj.invoice.number}"
+
+
+class CashReceiptSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    `applications` es opcional: si el borrador no trae aplicaciones, al
+    contabilizarlo el valor se aplica automáticamente.
+    """
+    applications = CashReceiptApplicationSerializer(many=True, required=False)
+
+    class Meta:
+        model = CashReceipt
+        fields = [
+            'id', 'consecutive', 'receipt_date', 'customer', 'bank_account', 'payment_method',
+            'amount', 'reference', 'unapplied_amount', 'notes', 'status', 'applications', 'created_at'
+        ]
+        read_only_fields = ['consecutive', 'unapplied_amount', 'status', 'created_at']
+
+    def create(self, validated_data):
+        applications = validated_data.pop('applications', [])
+        receipt = CashReceipt.objects.create(**validated_data)
+        for application in applications:
+            CashReceiptApplication.objects.create(receipt=receipt, **application)
+        return receipt
+
+    def update(self, instance, validated_data):
+        if instance.status != 'DRAFT':
+            raise serializers.ValidationError("Solo se pueden modificar recibos en estado Borrador.")
+        applications = validated_data.pop('applications', None)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save()
+        if applications is not None:
+            instance.applications.all().delete()
+            for application in applications:
+                CashReceiptApplication.objects.create(receipt=instance, **application)
+        return instance
+
+
+class PaymentRunSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PaymentRun
+        fields = ['id', 'bank_account', 'payment_date', 'due_before', 'supplier_ids', 'max_amount', 'grouping',
+                  'file_format', 'status', 'payment_count', 'invoice_count', 'total_amount', 'skipped', 'error',
+                  'bank_file', 'created_by', 'created_at', 'finished_at']
+        read_only_fields = ['status', 'payment_count', 'invoice_count', 'total_amount', 'skipped', 'error',
+                            'bank_file', 'created_by', 'created_at', 'finished_at']
+
+
+class BankStatementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BankStatement
+        fields = ['id', 'bank_account', 'source_format', 'original_name', 'period_start', 'period_end',
+                  'line_count', 'duplicate_count', 'imported_by', 'created_at']
+        read_only_fields = fields
+
+
+class BankStatementLineSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BankStatementLine
+        fields = ['id', 'statement', 'date', 'amount', 'description', 'reference', 'match']
+        read_only_fields = fields
+
+
+class ReconciliationMatchSerializer(serializers.ModelSerializer):
+    statement_lines = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    entry_lines = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReconciliationMatch
+        fields = ['id', 'bank_account', 'match_type', 'rule', 'amount', 'statement_lines', 'entry_lines',
+                  'created_by', 'created_at']
+        read_only_fields = fields
+
+    def get_entry_lines(self, obj):
+        return [item.entry_line_id for item in obj.entry_lines.all()]
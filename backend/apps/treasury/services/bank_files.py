@@ -0,0 +1,118 @@
+"""
+Archivos planos de pago para los bancos (dispersión a proveedores).
+
+Cada formato es una lista de registros de ancho fijo: (campo, longitud,
+tipo) donde 'N' es numérico (ceros a la izquierda) y 'A' alfanumérico
+(espacios a la derecha, mayúsculas y sin tildes). Los detalles se escriben
+a medida que llegan, así el archivo se genera en una sola pasada.
+"""
+from decimal import Decimal
+
+from apps.common.tabular import format_record, normalize_header
+
+# Códigos de compensación ACH Colombia de las entidades más comunes
+ACH_BANK_CODES = {
+    'bogota': '1001',
+    'popular': '1002',
+    'itau': '1006',
+    'bancolombia': '1007',
+    'citibank': '1009',
+    'sudameris': '1012',
+    'bbva': '1013',
+    'colpatria': '1019',
+    'scotiabank': '1019',
+    'occidente': '1023',
+    'caja social': '1032',
+    'agrario': '1040',
+    'davivienda': '1051',
+    'av villas': '1052',
+    'falabella': '1062',
+    'pichincha': '1060',
+    'nequi': '1507',
+    'daviplata': '1551',
+}
+
+# Tipo de documento DIAN -> código del banco
+PAB_ID_TYPES = {'13': '1', '22': '2', '31': '3', '12': '4', '41': '5'}
+
+BANK_FILE_LAYOUTS = {
+    'PAB': {
+        'header': [
+            ('record_type', 1, 'N'), ('payer_nit', 15, 'N'), ('application', 1, 'A'), ('filler', 15, 'A'),
+            ('transaction_class', 3, 'N'), ('purpose', 10, 'A'), ('transmission_date', 8, 'N'),
+            ('sequence', 2, 'A'), ('application_date', 8, 'N'), ('record_count', 6, 'N'),
+            ('total_debits', 17, 'N'), ('total_credits', 17, 'N'), ('debit_account', 11, 'N'),
+            ('debit_account_type', 1, 'A'), ('filler_end', 149, 'A'),
+        ],
+        'detail': [
+            ('record_type', 1, 'N'), ('beneficiary_id', 15, 'A'), ('beneficiary_name', 30, 'A'),
+            ('bank_code', 9, 'N'), ('account_number', 17, 'A'), ('payment_place', 1, 'A'),
+            ('transaction_type', 2, 'N'), ('amount', 17, 'N'), ('application_date', 8, 'N'),
+            ('reference', 21, 'A'), ('id_type', 1, 'A'), ('office', 5, 'N'), ('fax', 15, 'A'),
+            ('email', 80, 'A'), ('authorized_id', 15, 'A'), ('filler_end', 27, 'A'),
+        ],
+        'control': None,
+        # Abono a cuenta: 37 ahorros, 27 corriente
+        'transaction_types': {'AHORROS': '37', 'CORRIENTE': '27'},
+    },
+    'ACH': {
+        'header': [
+            ('record_type', 1, 'N'), ('payer_nit', 10, 'N'), ('payer_name', 16, 'A'),
+            ('transaction_class', 3, 'N'), ('purpose', 10, 'A'), ('application_date', 8, 'N'),
+            ('debit_account', 17, 'A'), ('debit_account_type', 1, 'A'),
+        ],
+        'detail': [
+            ('record_type', 1, 'N'), ('transaction_type', 2, 'N'), ('bank_code', 4, 'N'),
+            ('account_number', 17, 'A'), ('amount', 17, 'N'), ('beneficiary_id', 15, 'A'),
+            ('beneficiary_name', 22, 'A'), ('reference', 15, 'A'),
+        ],
+        'control': [
+            ('record_type', 1, 'N'), ('record_count', 6, 'N'), ('total_credits', 17, 'N'),
+            ('payer_nit', 10, 'N'),
+        ],
+        # Crédito a cuenta: 32 ahorros, 22 corriente
+        'transaction_types': {'AHORROS': '32', 'CORRIENTE': '22'},
+    },
+}
+
+
+def bank_code(bank_name):
+    """Código ACH a partir del nombre del banco (texto libre en el tercero)."""
+    name = normalize_header(bank_name)
+    for keyword, code in ACH_BANK_CODES.items():
+        if keyword in name:
+            return code
+    return None
+
+
+def format_amount(value):
+    """Valor en centavos, sin separadores."""
+    return int((Decimal(value) * 100).quantize(Decimal('1')))
+
+
+def stream_bank_file(file_format, header, details):
+    """
+    Genera las líneas del archivo (terminadas en CRLF).
+
+    header: valores del encabezado (totales incluidos cuando el formato los pide).
+    details: iterable de dicts con los valores de cada pago.
+    """
+    layout = BANK_FILE_LAYOUTS[file_format]
+    yield format_record(layout['header'], {'record_type': 1, **header}) + '\r\n'
+
+    count, total = 0, 0
+    for detail in details:
+        values = {
+            'record_type': 6,
+            'transaction_type': layout['transaction_types'].get(detail.get('account_type'), ''),
+            **detail,
+            'amount': format_amount(detail['amount']),
+        }
+        count += 1
+        total += values['amount']
+        yield format_record(layout['detail'], values) + '\r\n'
+
+    if layout['control']:
+        yield format_record(layout['control'], {
+            'record_type': 8, 'record_count': count, 'total_credits': total, 'payer_nit': header.get('payer_nit'),
+        }) + '\r\n'
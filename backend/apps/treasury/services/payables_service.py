@@ -0,0 +1,137 @@
+"""
+Subledger de cuentas por pagar (partidas abiertas de facturas recibidas).
+
+El saldo de cada factura vive en `ReceivedInvoice.outstanding_amount` y se
+mueve solo aquí, dentro de la transacción que contabiliza o anula el
+comprobante de egreso. Los reportes leen ese saldo directamente sobre el
+índice parcial de partidas abiertas, sin sumar pagos por factura.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.electronic_events.models import ReceivedInvoice
+
+ZERO = Value(Decimal('0'), output_field=DecimalField(max_digits=18, decimal_places=2))
+
+# Rangos de antigüedad (días desde la emisión) para la cartera de proveedores
+AGING_BUCKETS = [
+    ('d0_30', 0, 30),
+    ('d31_60', 31, 60),
+    ('d61_90', 61, 90),
+    ('d91_120', 91, 120),
+    ('over_120', 121, None),
+]
+
+
+def _payment_amounts(payment_ids):
+    """Valor pagado por factura en los egresos (una factura puede repetirse en el detalle)."""
+    from apps.treasury.models import PaymentOutDetail
+
+    amounts = defaultdict(Decimal)
+    details = PaymentOutDetail.objects.filter(payment_out_id__in=payment_ids).values_list('invoice_id', 'amount_paid')
+    for invoice_id, amount in details.iterator():
+        amounts[invoice_id] += amount
+    return amounts
+
+
+def _locked_invoices(invoice_ids):
+    # Orden por id para que dos egresos concurrentes bloqueen en el mismo orden
+    return list(ReceivedInvoice.objects.select_for_update().filter(pk__in=invoice_ids).order_by('pk'))
+
+
+def apply_payments(payment_ids):
+    """
+    Descuenta los egresos del saldo de sus facturas. Debe llamarse dentro
+    de la transacción que los contabiliza.
+
+    Raises:
+        ValueError si algún pago excede el saldo pendiente de la factura.
+    """
+    amounts = _payment_amounts(payment_ids)
+    invoices = _locked_invoices(amounts)
+    for invoice in invoices:
+        amount = amounts[invoice.pk]
+        if amount > invoice.outstanding_amount:
+            raise ValueError(
+                f"El pago a la factura {invoice.invoice_number} ({amount:,.2f}) excede su saldo pendiente "
+                f"({invoice.outstanding_amount:,.2f})."
+            )
+        invoice.outstanding_amount -= amount
+    ReceivedInvoice.objects.bulk_update(invoices, ['outstanding_amount'], batch_size=1000)
+
+
+def apply_payment(payment):
+    apply_payments([payment.pk])
+
+
+def reverse_payment(payment):
+    """Devuelve a las facturas el valor de un egreso contabilizado que se anula."""
+    amounts = _payment_amounts([payment.pk])
+    invoices = _locked_invoices(amounts)
+    for invoice in invoices:
+        invoice.outstanding_amount += amounts[invoice.pk]
+    ReceivedInvoice.objects.bulk_update(invoices, ['outstanding_amount'])
+
+
+def aging_sums(date_field, amount_field, as_of, buckets):
+    """
+    Una suma condicional por rango de antigüedad (días entre `date_field` y
+    `as_of`). Las condiciones son rangos de fecha, no cálculos por fila, así
+    que la consulta agrupada usa el índice de partidas abiertas.
+    """
+    sums = {}
+    for bucket, low, high in buckets:
+        condition = Q()
+        if low is not None:
+            condition &= Q(**{f'{date_field}__lte': as_of - timedelta(days=low)})
+        if high is not None:
+            condition &= Q(**{f'{date_field}__gte': as_of - timedelta(days=high)})
+        sums[bucket] = Coalesce(Sum(amount_field, filter=condition), ZERO)
+    return sums
+
+
+def payables_aging(client_id, as_of=None, issuer_nit=None):
+    """
+    Cartera por edades de proveedores (0-30, 31-60, 61-90, 91-120, +120 días).
+
+    Una sola consulta agrupada sobre las partidas abiertas; cada rango es una
+    suma condicional por fecha de emisión, así el motor recorre el índice
+    parcial una vez. El saldo es el vigente: `as_of` fija la fecha de
+    referencia para la antigüedad.
+
+    Returns:
+        dict {'as_of', 'buckets', 'rows': [...], 'totals': {...}}
+    """
+    as_of = as_of or timezone.localdate()
+    open_items = ReceivedInvoice.objects.filter(client_id=client_id, outstanding_amount__gt=0, issue_date__lte=as_of)
+    if issuer_nit:
+        open_items = open_items.filter(issuer_nit=issuer_nit)
+
+    sums = aging_sums('issue_date', 'outstanding_amount', as_of, AGING_BUCKETS)
+
+    rows = list(
+        open_items.values('issuer_nit')
+        .annotate(
+            name=Max('issuer_name'),
+            third_party=Max('third_party_id'),
+            invoices=Count('id'),
+            oldest=Min('issue_date'),
+            total=Sum('outstanding_amount'),
+            **sums,
+        )
+        .order_by('issuer_nit')
+    )
+
+    totals = {bucket: sum((row[bucket] for row in rows), Decimal('0')) for bucket, _, _ in AGING_BUCKETS}
+    totals['total'] = sum((row['total'] for row in rows), Decimal('0'))
+    return {
+        'as_of': as_of,
+        'buckets': [bucket for bucket, _, _ in AGING_BUCKETS],
+        'rows': rows,
+        'totals': totals,
+    }
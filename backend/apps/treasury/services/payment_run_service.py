@@ -0,0 +1,313 @@
+"""
+Corridas de pago a proveedores.
+
+Una corrida selecciona las partidas abiertas que cumplen los criterios,
+crea los comprobantes de egreso y sus detalles con bulk_create, los
+contabiliza (un asiento por corrida o por proveedor, líneas en bloque),
+descuenta el subledger de cuentas por pagar y escribe el archivo del banco
+en una sola pasada. Todo en un único trabajo, sin consultas por factura.
+"""
+import logging
+import tempfile
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from apps.accounting.models import FiscalPeriod, JournalEntry, JournalEntryLine, ThirdParty
+from apps.electronic_events.models import ReceivedInvoice
+from apps.reports.signals import ledger_bulk_written, mark_snapshots_stale
+from apps.treasury.models import PaymentOut, PaymentOutDetail
+from apps.treasury.services import payables_service
+from apps.treasury.services.bank_files import PAB_ID_TYPES, bank_code, stream_bank_file
+from apps.treasury.services.treasury_service import payable_accounts
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentRunService:
+    """Ejecuta una PaymentRun. Debe correr dentro del contexto del tenant."""
+
+    def __init__(self, run, user=None):
+        self.run = run
+        self.client_id = run.client_id
+        self.user = user or run.created_by
+
+    # ------------------------------------------------------------------
+    # Orquestación
+    # ------------------------------------------------------------------
+    def execute(self):
+        run = self.run
+        run.status = 'PROCESSING'
+        run.save(update_fields=['status'])
+        try:
+            with transaction.atomic():
+                payments = self._create_payments(self._select_invoices())
+                if payments:
+                    self._post(payments)
+        except Exception as e:
+            # La transacción se revirtió: no quedó ningún egreso
+            run.status = 'FAILED'
+            run.payment_count, run.invoice_count, run.total_amount = 0, 0, Decimal('0')
+            run.error = ' '.join(getattr(e, 'messages', [str(e)]))
+            run.finished_at = timezone.now()
+            run.save()
+            if not isinstance(e, (ValueError, ValidationError)):
+                raise
+            logger.warning(f"Corrida de pagos {run.pk}: {run.error}")
+            return run
+
+        run.status = 'POSTED'
+        if run.payment_count:
+            self._generate_file()
+        run.finished_at = timezone.now()
+        run.save()
+        return run
+
+    def regenerate_file(self):
+        """Vuelve a escribir el archivo del banco de una corrida ya contabilizada."""
+        run = self.run
+        if run.status not in ('POSTED', 'FILE_ERROR') or not run.payment_count:
+            raise ValueError("Solo se regenera el archivo de una corrida contabilizada con pagos.")
+        run.status, run.error = 'POSTED', ''
+        self._generate_file()
+        run.save(update_fields=['status', 'error', 'bank_file'])
+        return run
+
+    def _generate_file(self):
+        """
+        Los egresos ya están contabilizados: un error en el archivo deja la
+        corrida en FILE_ERROR con sus totales, para regenerarlo después.
+        """
+        run = self.run
+        try:
+            self._write_bank_file()
+        except Exception as e:
+            run.status = 'FILE_ERROR'
+            run.error = f"Archivo del banco: {e}"
+            logger.exception(f"Corrida de pagos {run.pk}: error al generar el archivo del banco")
+
+    # ------------------------------------------------------------------
+    # Selección
+    # ------------------------------------------------------------------
+    def _select_invoices(self):
+        """
+        Partidas abiertas emitidas hasta `due_before`, de proveedores con
+        cuenta bancaria y cuenta por pagar; las más antiguas primero hasta el
+        tope de la corrida. Se excluyen facturas con egresos en borrador.
+
+        Returns:
+            OrderedDict {third_party_id: [(invoice_id, invoice_number, amount)]}
+        """
+        run = self.run
+        open_items = (
+            ReceivedInvoice.objects
+            .filter(client_id=self.client_id, outstanding_amount__gt=0, issue_date__lte=run.due_before,
+                    third_party__isnull=False)
+            .exclude(payments__payment_out__status='DRAFT')
+        )
+        if run.supplier_ids:
+            open_items = open_items.filter(third_party_id__in=run.supplier_ids)
+        rows = list(
+            open_items.order_by('issue_date', 'id')
+            .values_list('id', 'third_party_id', 'invoice_number', 'outstanding_amount')
+        )
+
+        supplier_ids = sorted({row[1] for row in rows})
+        suppliers = {
+            row['id']: row for row in ThirdParty.objects.filter(pk__in=supplier_ids).values(
+                'id', 'identification_number', 'business_name', 'first_name', 'surname',
+                'bank_name', 'bank_account_number', 'is_active',
+            )
+        }
+        accounts = payable_accounts(self.client_id, supplier_ids)
+
+        eligible, skipped = set(), []
+        for pk in supplier_ids:
+            supplier = suppliers[pk]
+            reason = None
+            if not supplier['is_active']:
+                reason = "Proveedor inactivo"
+            elif not supplier['bank_account_number'] or not bank_code(supplier['bank_name']):
+                reason = "Sin cuenta bancaria o banco sin código ACH"
+            elif not accounts[pk]:
+                reason = "Sin cuenta por pagar"
+            if reason:
+                skipped.append({'third_party': pk, 'identification_number': supplier['identification_number'], 'reason': reason})
+            else:
+                eligible.add(pk)
+        run.skipped = skipped
+        self.payable_accounts = accounts
+
+        selected, total = OrderedDict(), Decimal('0')
+        for invoice_id, third_party_id, number, amount in rows:
+            if third_party_id not in eligible:
+                continue
+            if run.max_amount is not None and total + amount > run.max_amount:
+                continue
+            total += amount
+            selected.setdefault(third_party_id, []).append((invoice_id, number, amount))
+        return selected
+
+    # ------------------------------------------------------------------
+    # Egresos
+    # ------------------------------------------------------------------
+    def _create_payments(self, selected):
+        """Un egreso por proveedor con sus detalles, todo con bulk_create."""
+        run = self.run
+        if not selected:
+            return []
+        # Bloquea el último consecutivo para numerar el bloque sin colisiones
+        last = (
+            PaymentOut.objects.select_for_update().filter(client_id=self.client_id)
+            .order_by('-consecutive').values_list('consecutive', flat=True).first()
+        ) or 0
+
+        payments = PaymentOut.objects.bulk_create([
+            PaymentOut(
+                client_id=self.client_id, consecutive=last + index, payment_date=run.payment_date,
+                third_party_id=third_party_id, bank_account_id=run.bank_account_id,
+                payment_method='TRANSFERENCIA', total_amount=sum(amount for _, _, amount in invoices),
+                notes=f"Corrida de pagos {run.pk}", payment_run=run,
+            )
+            for index, (third_party_id, invoices) in enumerate(selected.items(), start=1)
+        ], batch_size=1000)
+
+        PaymentOutDetail.objects.bulk_create([
+            PaymentOutDetail(payment_out_id=payment.pk, invoice_id=invoice_id, amount_paid=amount)
+            for payment in payments
+            for invoice_id, _, amount in selected[payment.third_party_id]
+        ], batch_size=1000)
+
+        self.invoice_numbers = {
+            invoice_id: number for invoices in selected.values() for invoice_id, number, _ in invoices
+        }
+        run.payment_count = len(payments)
+        run.invoice_count = len(self.invoice_numbers)
+        run.total_amount = sum((payment.total_amount for payment in payments), Decimal('0'))
+        return payments
+
+    # ------------------------------------------------------------------
+    # Contabilización
+    # ------------------------------------------------------------------
+    def _post(self, payments):
+        run = self.run
+        if FiscalPeriod.is_date_closed(run.payment_date):
+            raise ValueError(f"El periodo contable de la fecha {run.payment_date} está cerrado.")
+
+        now = timezone.now()
+        user_id = self.user.pk if self.user else None
+        bank_gl_id = run.bank_account.gl_account_id
+
+        def entry(number, description, content_type, object_id):
+            return JournalEntry(
+                client_id=self.client_id, entry_type='EGRESO', number=number, date=run.payment_date,
+                description=description, content_type=content_type, object_id=object_id, status='POSTED',
+                created_by_id=user_id, posted_by_id=user_id, posted_at=now,
+            )
+
+        if run.grouping == 'RUN':
+            entries = JournalEntry.objects.bulk_create([entry(
+                f"CE-CP{run.pk}", f"Corrida de pagos {run.pk} - {run.payment_count} proveedores",
+                ContentType.objects.get_for_model(run), run.pk,
+            )])
+            entry_of = {payment.pk: entries[0].pk for payment in payments}
+        else:
+            payment_type = ContentType.objects.get_for_model(PaymentOut)
+            entries = JournalEntry.objects.bulk_create([
+                entry(f"CE-{payment.consecutive}", f"Pago corrida {run.pk}", payment_type, payment.pk)
+                for payment in payments
+            ], batch_size=1000)
+            entry_of = {payment.pk: journal.pk for payment, journal in zip(payments, entries)}
+
+        details = PaymentOutDetail.objects.filter(payment_out__payment_run=run).values_list(
+            'payment_out_id', 'invoice_id', 'amount_paid',
+        ).order_by('payment_out_id', 'id')
+        supplier_of = {payment.pk: payment.third_party_id for payment in payments}
+
+        lines, line_numbers, bank_credit = [], {}, {}
+        for payment_id, invoice_id, amount in details.iterator():
+            entry_id = entry_of[payment_id]
+            line_numbers[entry_id] = line_numbers.get(entry_id, 1) + 1
+            bank_credit[entry_id] = bank_credit.get(entry_id, Decimal('0')) + amount
+            third_party_id = supplier_of[payment_id]
+            lines.append(JournalEntryLine(
+                client_id=self.client_id, entry_id=entry_id, line_number=line_numbers[entry_id],
+                account_id=self.payable_accounts[third_party_id], third_party_id=third_party_id,
+                description=f"Pago Factura {self.invoice_numbers[invoice_id]}",
+                debit=amount, credit=Decimal('0'),
+            ))
+        for entry_id, amount in bank_credit.items():
+            lines.append(JournalEntryLine(
+                client_id=self.client_id, entry_id=entry_id, line_number=1, account_id=bank_gl_id,
+                description=f"Corrida de pagos {run.pk}", debit=Decimal('0'), credit=amount,
+            ))
+        JournalEntryLine.objects.bulk_create(lines, batch_size=1000)
+
+        payment_ids = list(entry_of)
+        payables_service.apply_payments(payment_ids)
+        PaymentOut.objects.filter(pk__in=payment_ids).update(status='POSTED', updated_at=now)
+
+        ledger_bulk_written(self.client_id, run.payment_date)
+        transaction.on_commit(lambda: mark_snapshots_stale(self.client_id, ['AGING'], run.payment_date, 'REBUILD'))
+
+    # ------------------------------------------------------------------
+    # Archivo del banco
+    # ------------------------------------------------------------------
+    def _file_header(self):
+        run = self.run
+        bank_account = run.bank_account
+        return {
+            'payer_nit': run.client.nit,
+            'payer_name': run.client.name,
+            'application': 'I',
+            'transaction_class': '220',
+            'purpose': 'PAGOPROV',
+            'transmission_date': timezone.localdate().strftime('%Y%m%d'),
+            'sequence': 'A',
+            'application_date': run.payment_date.strftime('%Y%m%d'),
+            'record_count': run.payment_count,
+            'total_debits': 0,
+            'total_credits': int(run.total_amount * 100),
+            'debit_account': bank_account.account_number,
+            'debit_account_type': 'S' if 'ahorro' in bank_account.name.lower() else 'D',
+        }
+
+    def _file_details(self):
+        payments = (
+            PaymentOut.objects.filter(payment_run=self.run).order_by('consecutive')
+            .values_list(
+                'consecutive', 'total_amount', 'third_party__identification_type',
+                'third_party__identification_number', 'third_party__business_name', 'third_party__first_name',
+                'third_party__surname', 'third_party__bank_name', 'third_party__bank_account_type',
+                'third_party__bank_account_number', 'third_party__email',
+            )
+        )
+        application_date = self.run.payment_date.strftime('%Y%m%d')
+        for (consecutive, amount, id_type, number, business_name, first_name, surname,
+             bank_name, account_type, account_number, email) in payments.iterator():
+            yield {
+                'beneficiary_id': number,
+                'beneficiary_name': business_name or ' '.join(filter(None, [first_name, surname])),
+                'bank_code': bank_code(bank_name),
+                'account_number': account_number,
+                'account_type': account_type or 'AHORROS',
+                'payment_place': 'S',
+                'amount': amount,
+                'application_date': application_date,
+                'reference': f"CE{consecutive}",
+                'id_type': PAB_ID_TYPES.get(id_type, '3'),
+                'email': email,
+            }
+
+    def _write_bank_file(self):
+        run = self.run
+        with tempfile.TemporaryFile() as tmp:
+            for line in stream_bank_file(run.file_format, self._file_header(), self._file_details()):
+                tmp.write(line.encode('ascii'))
+            tmp.seek(0)
+            run.bank_file.save(f"pagos_{run.pk}_{run.file_format.lower()}.txt", File(tmp), save=False)
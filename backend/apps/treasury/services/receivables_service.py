@@ -0,0 +1,307 @@
+"""
+Cartera de clientes: recibos de caja aplicados a facturas de venta.
+
+El saldo de cada factura vive en `Invoice.open_balance` y solo lo mueven
+los recibos al contabilizarse o anularse. La aplicación automática busca
+primero las facturas citadas en la referencia del recibo y luego recorre
+las partidas abiertas del cliente por vencimiento, página a página sobre
+el índice parcial, hasta agotar el valor recibido.
+"""
+import re
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.utils import timezone
+
+from apps.accounting.models import Account, JournalEntry, JournalEntryLine
+from apps.invoicing.models import Invoice
+from apps.treasury.models import CashReceipt, CashReceiptApplication
+from apps.treasury.services.payables_service import aging_sums
+
+# Número de factura citado por el cliente: 'FE-1023', 'FE1023' o '1023'
+DOCUMENT_REFERENCE = re.compile(r'\b([A-Za-z]{0,4})\s*-?\s*(\d+)\b')
+
+# Días de mora (desde el vencimiento) para la cartera de clientes
+AGING_BUCKETS = [
+    ('current', None, 0),
+    ('d1_30', 1, 30),
+    ('d31_60', 31, 60),
+    ('d61_90', 61, 90),
+    ('d91_120', 91, 120),
+    ('over_120', 121, None),
+]
+
+OPEN_ITEMS_PAGE = 100
+
+
+def reference_documents(reference):
+    """[(prefijo, número)] de las facturas mencionadas en la referencia."""
+    return [(prefix.upper(), int(number)) for prefix, number in DOCUMENT_REFERENCE.findall(reference or '')]
+
+
+def receivable_account_id(client_id):
+    """Cuenta 130505 (Clientes Nacionales) o, en su defecto, la primera 1305."""
+    accounts = Account.objects.filter(client_id=client_id)
+    return (
+        accounts.filter(code='130505').values_list('id', flat=True).first()
+        or accounts.filter(account_code='1305').order_by('code').values_list('id', flat=True).first()
+    )
+
+
+def _open_items(receipt):
+    return Invoice.objects.filter(
+        client_id=receipt.client_id, customer_id=receipt.customer_id, open_balance__gt=0,
+    ).select_for_update()
+
+
+def _oldest_first(queryset):
+    """Partidas abiertas por vencimiento, en páginas (keyset) para no cargar toda la cartera."""
+    last = None
+    while True:
+        page = queryset.order_by('payment_due_date', 'id')
+        if last is not None:
+            page = page.filter(Q(payment_due_date__gt=last[0]) | Q(payment_due_date=last[0], id__gt=last[1]))
+        invoices = list(page[:OPEN_ITEMS_PAGE])
+        if not invoices:
+            return
+        yield from invoices
+        last = (invoices[-1].payment_due_date, invoices[-1].pk)
+
+
+def auto_allocate(receipt):
+    """
+    Reparte el valor del recibo: primero las facturas citadas en la
+    referencia, luego las más antiguas. Bloquea las facturas que toca.
+
+    Returns:
+        OrderedDict {invoice: valor aplicado}
+    """
+    remaining = receipt.amount
+    allocations = OrderedDict()
+    open_items = _open_items(receipt)
+
+    tokens = reference_documents(receipt.reference)
+    if tokens:
+        candidates = list(open_items.filter(number__in={number for _, number in tokens}).order_by('pk'))
+        for prefix, number in tokens:
+            same_number = [inv for inv in candidates if inv.number == number and inv not in allocations]
+            invoice = next((inv for inv in same_number if inv.prefix.upper() == prefix), None) \
+                or (same_number[0] if same_number else None)
+            if invoice is None or remaining <= 0:
+                continue
+            allocations[invoice] = min(invoice.open_balance, remaining)
+            remaining -= allocations[invoice]
+
+    if remaining > 0:
+        for invoice in _oldest_first(open_items.exclude(pk__in=[inv.pk for inv in allocations])):
+            allocations[invoice] = min(invoice.open_balance, remaining)
+            remaining -= allocations[invoice]
+            if remaining <= 0:
+                break
+    return allocations
+
+
+def _manual_allocations(receipt):
+    """Aplicaciones registradas en el borrador, validadas contra el saldo de cada factura."""
+    amounts = OrderedDict()
+    for invoice_id, amount in receipt.applications.values_list('invoice_id', 'amount'):
+        amounts[invoice_id] = amounts.get(invoice_id, Decimal('0')) + amount
+    invoices = {inv.pk: inv for inv in _open_items(receipt).filter(pk__in=amounts).order_by('pk')}
+
+    allocations = OrderedDict()
+    for invoice_id, amount in amounts.items():
+        invoice = invoices.get(invoice_id)
+        if invoice is None or amount > invoice.open_balance:
+            raise ValueError(f"La aplicación a la factura {invoice_id} excede su saldo o no pertenece al cliente.")
+        allocations[invoice] = amount
+    if sum(allocations.values(), Decimal('0')) > receipt.amount:
+        raise ValueError("Las aplicaciones superan el valor del recibo.")
+    return allocations
+
+
+@transaction.atomic
+def post_receipt(receipt_id, user=None):
+    """
+    Contabiliza un recibo de caja: aplica el valor a las facturas (las que
+    traiga el borrador o, si no trae, automáticamente), descuenta su saldo
+    y genera el asiento DB Banco / CR Clientes.
+    """
+    receipt = CashReceipt.objects.select_for_update().select_related('bank_account').get(pk=receipt_id)
+    if receipt.status != 'DRAFT':
+        raise ValueError("Solo se pueden contabilizar recibos en estado Borrador.")
+
+    account_id = receivable_account_id(receipt.client_id)
+    if not account_id:
+        raise ValueError("No se encontró la cuenta de Clientes (1305) en el plan de cuentas.")
+
+    manual = receipt.applications.exists()
+    allocations = _manual_allocations(receipt) if manual else auto_allocate(receipt)
+
+    for invoice, amount in allocations.items():
+        invoice.open_balance -= amount
+    Invoice.objects.bulk_update(list(allocations), ['open_balance'])
+    if not manual:
+        CashReceiptApplication.objects.bulk_create([
+            CashReceiptApplication(receipt=receipt, invoice=invoice, amount=amount)
+            for invoice, amount in allocations.items()
+        ])
+
+    applied = sum(allocations.values(), Decimal('0'))
+    documents = ', '.join(f"{inv.prefix}{inv.number}" for inv in allocations)
+    entry = JournalEntry.objects.create(
+        client_id=receipt.client_id,
+        entry_type='INGRESO',
+        number=f"RC-{receipt.consecutive}",
+        date=receipt.receipt_date,
+        description=f"Recaudo de {receipt.customer} {documents}".strip(),
+        content_type=ContentType.objects.get_for_model(receipt),
+        object_id=receipt.pk,
+        status='POSTED',
+        created_by=user,
+        posted_by=user,
+    )
+    JournalEntryLine.objects.bulk_create([
+        JournalEntryLine(
+            client_id=receipt.client_id, entry=entry, line_number=1, account_id=receipt.bank_account.gl_account_id,
+            description=f"Recibo RC-{receipt.consecutive}", debit=receipt.amount, credit=Decimal('0'),
+        ),
+        # Lo no aplicado queda en la misma cuenta como saldo a favor del cliente
+        JournalEntryLine(
+            client_id=receipt.client_id, entry=entry, line_number=2, account_id=account_id,
+            third_party_id=receipt.customer_id, description=f"Abono {documents}".strip(),
+            debit=Decimal('0'), credit=receipt.amount,
+        ),
+    ])
+
+    receipt.unapplied_amount = receipt.amount - applied
+    receipt.status = 'POSTED'
+    receipt.save()
+    return receipt
+
+
+@transaction.atomic
+def cancel_receipt(receipt_id):
+    """Anula un recibo; si estaba contabilizado anula su asiento y devuelve el saldo a las facturas."""
+    receipt = CashReceipt.objects.select_for_update().get(pk=receipt_id)
+    if receipt.status == 'CANCELLED':
+        raise ValueError("El recibo ya está anulado.")
+
+    if receipt.status == 'POSTED':
+        entries = JournalEntry.objects.filter(
+            content_type=ContentType.objects.get_for_model(receipt), object_id=receipt.pk,
+        ).exclude(status='CANCELLED')
+        for entry in entries:
+            entry.status = 'CANCELLED'
+            entry.save()
+
+        amounts = {}
+        for invoice_id, amount in receipt.applications.values_list('invoice_id', 'amount'):
+            amounts[invoice_id] = amounts.get(invoice_id, Decimal('0')) + amount
+        invoices = list(Invoice.objects.select_for_update().filter(pk__in=amounts).order_by('pk'))
+        for invoice in invoices:
+            invoice.open_balance += amounts[invoice.pk]
+        Invoice.objects.bulk_update(invoices, ['open_balance'])
+
+    receipt.status = 'CANCELLED'
+    receipt.save()
+    return receipt
+
+
+# ----------------------------------------------------------------------
+# Reportes
+# ----------------------------------------------------------------------
+def receivables_aging(client_id, as_of=None, customer_id=None):
+    """
+    Cartera por edades de clientes según días de mora (vencimiento).
+    Una sola consulta agrupada sobre el índice de partidas abiertas.
+    """
+    as_of = as_of or timezone.localdate()
+    open_items = Invoice.objects.filter(client_id=client_id, open_balance__gt=0, issue_date__lte=as_of)
+    if customer_id:
+        open_items = open_items.filter(customer_id=customer_id)
+
+    rows = list(
+        open_items.values('customer_id')
+        .annotate(
+            identification_number=Max('customer__identification_number'),
+            business_name=Max('customer__business_name'),
+            first_name=Max('customer__first_name'),
+            surname=Max('customer__surname'),
+            invoices=Count('id'),
+            oldest_due=Min('payment_due_date'),
+            total=Sum('open_balance'),
+            **aging_sums('payment_due_date', 'open_balance', as_of, AGING_BUCKETS),
+        )
+        .order_by('customer_id')
+    )
+    for row in rows:
+        business_name, first_name, surname = row.pop('business_name'), row.pop('first_name'), row.pop('surname')
+        row['name'] = business_name or ' '.join(filter(None, [first_name, surname]))
+
+    totals = {bucket: sum((row[bucket] for row in rows), Decimal('0')) for bucket, _, _ in AGING_BUCKETS}
+    totals['total'] = sum((row['total'] for row in rows), Decimal('0'))
+    return {
+        'as_of': as_of,
+        'buckets': [bucket for bucket, _, _ in AGING_BUCKETS],
+        'rows': rows,
+        'totals': totals,
+    }
+
+
+def customer_statement(client_id, customer_id, date_from=None, date_to=None):
+    """
+    Estado de cuenta del cliente: saldo inicial, facturas (débitos) y
+    recibos (créditos) del rango con saldo acumulado, y las partidas
+    abiertas vigentes con sus días de mora.
+    """
+    date_to = date_to or timezone.localdate()
+    date_from = date_from or date_to.replace(day=1)
+    invoices = Invoice.objects.filter(
+        client_id=client_id, customer_id=customer_id, status__in=Invoice.RECEIVABLE_STATUSES,
+    )
+    receipts = CashReceipt.objects.filter(client_id=client_id, customer_id=customer_id, status='POSTED')
+
+    opening = (
+        (invoices.filter(issue_date__lt=date_from).aggregate(total=Sum('total'))['total'] or Decimal('0'))
+        - (receipts.filter(receipt_date__lt=date_from).aggregate(total=Sum('amount'))['total'] or Decimal('0'))
+    )
+
+    movements = [
+        {'date': issue_date, 'document': f"{prefix}{number}", 'type': 'FACTURA', 'due_date': due_date,
+         'debit': total, 'credit': Decimal('0')}
+        for issue_date, prefix, number, due_date, total in invoices.filter(
+            issue_date__gte=date_from, issue_date__lte=date_to,
+        ).values_list('issue_date', 'prefix', 'number', 'payment_due_date', 'total')
+    ] + [
+        {'date': receipt_date, 'document': f"RC-{consecutive}", 'type': 'RECIBO', 'due_date': None,
+         'debit': Decimal('0'), 'credit': amount}
+        for receipt_date, consecutive, amount in receipts.filter(
+            receipt_date__gte=date_from, receipt_date__lte=date_to,
+        ).values_list('receipt_date', 'consecutive', 'amount')
+    ]
+    movements.sort(key=lambda item: (item['date'], item['type'] == 'RECIBO'))
+    balance = opening
+    for item in movements:
+        balance += item['debit'] - item['credit']
+        item['balance'] = balance
+
+    open_items = [
+        {'id': pk, 'document': f"{prefix}{number}", 'issue_date': issue_date, 'due_date': due_date,
+         'total': total, 'open_balance': open_balance, 'days_overdue': max((date_to - due_date).days, 0)}
+        for pk, prefix, number, issue_date, due_date, total, open_balance in invoices.filter(open_balance__gt=0)
+        .order_by('payment_due_date', 'id')
+        .values_list('id', 'prefix', 'number', 'issue_date', 'payment_due_date', 'total', 'open_balance')
+    ]
+    return {
+        'customer': customer_id,
+        'date_from': date_from,
+        'date_to': date_to,
+        'opening_balance': opening,
+        'movements': movements,
+        'closing_balance': balance,
+        'open_items': open_items,
+        'unapplied': receipts.aggregate(total=Sum('unapplied_amount'))['total'] or Decimal('0'),
+    }
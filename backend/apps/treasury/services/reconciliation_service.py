@@ -0,0 +1,368 @@
+import hashlib
+import re
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum, Value, DecimalField
+from django.db.models.functions import Coalesce
+
+from apps.accounting.models import JournalEntryLine
+from apps.treasury.models import BankStatement, BankStatementLine, ReconciliationMatch, ReconciledEntryLine
+from .statement_parser import parse_statement
+
+ZERO = Decimal('0')
+ZERO_VALUE = Value(ZERO, output_field=DecimalField(max_digits=18, decimal_places=2))
+
+# Referencias: números de 4 o más dígitos (cheque, transferencia, factura)
+REFERENCE_TOKEN = re.compile(r'\d{4,}')
+
+
+def reference_tokens(*texts):
+    """Números de referencia presentes en los textos, sin ceros a la izquierda."""
+    tokens = set()
+    for text in texts:
+        for token in REFERENCE_TOKEN.findall(text or ''):
+            tokens.add(token.lstrip('0') or '0')
+    return tokens
+
+
+def _line_hash(bank_account_id, row, occurrence):
+    key = f"{bank_account_id}|{row['date']}|{row['amount']}|{row['reference']}|{row['description']}|{occurrence}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def import_statement(bank_account, upload, source_format=None, user=None):
+    """
+    Importa un extracto. Los movimientos ya importados (extractos solapados)
+    se detectan por su huella y no se duplican. Debe ejecutarse dentro de un
+    contexto de tenant.
+    """
+    source_format, rows = parse_statement(upload, upload.name, source_format)
+    rows = list(rows)
+    upload.seek(0)
+
+    occurrences = Counter()
+    lines = []
+    for row in rows:
+        key = (row['date'], row['amount'], row['reference'], row['description'])
+        occurrences[key] += 1
+        lines.append((row, _line_hash(bank_account.pk, row, occurrences[key])))
+
+    with transaction.atomic():
+        statement = BankStatement.objects.create(
+            client_id=bank_account.client_id,
+            bank_account=bank_account,
+            source_format=source_format,
+            file=upload,
+            original_name=upload.name,
+            period_start=min((row['date'] for row in rows), default=None),
+            period_end=max((row['date'] for row in rows), default=None),
+            imported_by=user,
+        )
+        BankStatementLine.objects.bulk_create([
+            BankStatementLine(
+                client_id=bank_account.client_id, statement=statement, bank_account=bank_account,
+                line_hash=line_hash, **row,
+            )
+            for row, line_hash in lines
+        ], batch_size=1000, ignore_conflicts=True)
+        statement.line_count = BankStatementLine.objects.filter(statement=statement).count()
+        statement.duplicate_count = len(lines) - statement.line_count
+        statement.save(update_fields=['line_count', 'duplicate_count'])
+    return statement
+
+
+class ReconciliationEngine:
+    """
+    Conciliación automática de una cuenta bancaria.
+
+    Empareja movimientos del extracto pendientes con los movimientos
+    contables pendientes de la cuenta PUC del banco usando índices hash, no
+    comparaciones entre todos los pares:
+
+    1. Referencia: (número de referencia, valor) -> movimientos contables.
+    2. Valor y fecha: valor -> lista ordenada por fecha, búsqueda binaria
+       dentro de la ventana de días.
+    3. Agrupaciones: la suma de varios movimientos del extracto del mismo día
+       o referencia contra un movimiento contable (varios a uno), y la suma
+       de las líneas de un comprobante o de un día contra un movimiento del
+       extracto (uno a varios).
+
+    Solo se cargan los pendientes y cada ejecución persiste sus
+    conciliaciones, así que volver a conciliar el mes procesa únicamente lo
+    nuevo. Debe ejecutarse dentro de un contexto de tenant.
+    """
+
+    def __init__(self, bank_account, date_from=None, date_to=None, user=None):
+        self.bank_account = bank_account
+        self.date_from = date_from
+        self.date_to = date_to
+        self.user = user
+        config = settings.TREASURY_CONFIG
+        self.window = timedelta(days=config.get('MATCH_WINDOW_DAYS', 3))
+        self.reference_window = timedelta(days=config.get('REFERENCE_WINDOW_DAYS', 30))
+
+    # ------------------------------------------------------------------
+    # Carga de pendientes
+    # ------------------------------------------------------------------
+    def _statement_lines(self):
+        lines = BankStatementLine.objects.filter(bank_account=self.bank_account, match__isnull=True)
+        if self.date_from:
+            lines = lines.filter(date__gte=self.date_from)
+        if self.date_to:
+            lines = lines.filter(date__lte=self.date_to)
+        rows = {}
+        for row in lines.values('id', 'date', 'amount', 'reference', 'description').iterator():
+            row['tokens'] = reference_tokens(row['reference'], row['description'])
+            rows[row['id']] = row
+        return rows
+
+    def _entry_lines(self):
+        lines = JournalEntryLine.objects.filter(
+            account_id=self.bank_account.gl_account_id,
+            entry__status='POSTED',
+            bank_reconciliation__isnull=True,
+        )
+        # La ventana amplía el rango: un cheque contabilizado el 30 puede cobrarse el 2
+        if self.date_from:
+            lines = lines.filter(entry__date__gte=self.date_from - self.reference_window)
+        if self.date_to:
+            lines = lines.filter(entry__date__lte=self.date_to + self.reference_window)
+        rows = {}
+        values = lines.values(
+            'id', 'entry_id', 'debit', 'credit', 'description',
+            'entry__date', 'entry__number', 'entry__reference', 'entry__external_reference',
+        )
+        for row in values.iterator():
+            rows[row['id']] = {
+                'id': row['id'],
+                'entry_id': row['entry_id'],
+                'date': row['entry__date'],
+                # Débito a la cuenta de bancos = entrada de dinero (positivo en el extracto)
+                'amount': row['debit'] - row['credit'],
+                'tokens': reference_tokens(
+                    row['description'], row['entry__number'], row['entry__reference'], row['entry__external_reference'],
+                ),
+            }
+        return rows
+
+    # ------------------------------------------------------------------
+    # Índices
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _amount_index(rows):
+        """valor -> ([fechas ordenadas], [ids]) para búsqueda binaria por fecha."""
+        buckets = defaultdict(list)
+        for row in rows.values():
+            buckets[row['amount']].append((row['date'], row['id']))
+        index = {}
+        for amount, items in buckets.items():
+            items.sort()
+            index[amount] = ([value_date for value_date, _ in items], [pk for _, pk in items])
+        return index
+
+    @staticmethod
+    def _nearest(index, amount, value_date, window, used):
+        """Id no usado con el valor dado más cercano en fecha dentro de la ventana."""
+        bucket = index.get(amount)
+        if not bucket:
+            return None
+        dates, ids = bucket
+        best, best_distance = None, None
+        for position in range(bisect_left(dates, value_date - window), bisect_right(dates, value_date + window)):
+            if ids[position] in used:
+                continue
+            distance = abs((dates[position] - value_date).days)
+            if best is None or distance < best_distance:
+                best, best_distance = ids[position], distance
+        return best
+
+    # ------------------------------------------------------------------
+    # Reglas
+    # ------------------------------------------------------------------
+    def _match_by_reference(self, statement, ledger, matches):
+        index = defaultdict(list)
+        for row in ledger.values():
+            for token in row['tokens']:
+                index[(token, row['amount'])].append(row)
+        for line in sorted(statement.values(), key=lambda row: (row['date'], row['id'])):
+            best = None
+            for token in line['tokens']:
+                for candidate in index.get((token, line['amount']), ()):
+                    if candidate['id'] in self._used_ledger:
+                        continue
+                    distance = abs((candidate['date'] - line['date']).days)
+                    if distance <= self.reference_window.days and (best is None or distance < best[0]):
+                        best = (distance, candidate['id'])
+            if best:
+                self._add(matches, 'REFERENCE', [line['id']], [best[1]], line['amount'])
+
+    def _match_by_amount_date(self, statement, ledger, matches):
+        index = self._amount_index({pk: row for pk, row in ledger.items() if pk not in self._used_ledger})
+        for line in sorted(statement.values(), key=lambda row: (row['date'], row['id'])):
+            if line['id'] in self._used_statement:
+                continue
+            candidate = self._nearest(index, line['amount'], line['date'], self.window, self._used_ledger)
+            if candidate:
+                self._add(matches, 'AMOUNT_DATE', [line['id']], [candidate], line['amount'])
+
+    def _match_groups(self, statement, ledger, matches):
+        # Varios del extracto -> 1 contable (mismo día o misma referencia)
+        pending = [row for row in statement.values() if row['id'] not in self._used_statement]
+        ledger_index = self._amount_index({pk: row for pk, row in ledger.items() if pk not in self._used_ledger})
+        for group in self._groups(pending):
+            candidate = self._nearest(ledger_index, group['amount'], group['date'], self.window, self._used_ledger)
+            if candidate and not self._used_statement.intersection(group['ids']):
+                self._add(matches, 'GROUP', group['ids'], [candidate], group['amount'])
+
+        # 1 del extracto -> varios contables (mismo comprobante o mismo día)
+        pending = [row for row in ledger.values() if row['id'] not in self._used_ledger]
+        statement_index = self._amount_index(
+            {pk: row for pk, row in statement.items() if pk not in self._used_statement}
+        )
+        for group in self._groups(pending, by_entry=True):
+            candidate = self._nearest(statement_index, group['amount'], group['date'], self.window, self._used_statement)
+            if candidate and not self._used_ledger.intersection(group['ids']):
+                self._add(matches, 'GROUP', [candidate], group['ids'], group['amount'])
+
+    @staticmethod
+    def _groups(rows, by_entry=False):
+        """Agrupaciones candidatas de 2 o más movimientos del mismo signo."""
+        buckets = defaultdict(list)
+        for row in rows:
+            sign = row['amount'] > 0
+            buckets[('date', row['date'], sign)].append(row)
+            for token in row['tokens']:
+                buckets[('token', token, sign)].append(row)
+            if by_entry:
+                buckets[('entry', row['entry_id'], sign)].append(row)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            yield {
+                'ids': [row['id'] for row in members],
+                'amount': sum((row['amount'] for row in members), ZERO),
+                'date': max(row['date'] for row in members),
+            }
+
+    def _add(self, matches, rule, statement_ids, ledger_ids, amount):
+        self._used_statement.update(statement_ids)
+        self._used_ledger.update(ledger_ids)
+        matches.append((rule, statement_ids, ledger_ids, amount))
+
+    # ------------------------------------------------------------------
+    def run(self):
+        """Concilia lo pendiente y devuelve el resumen de la ejecución."""
+        statement = self._statement_lines()
+        ledger = self._entry_lines()
+        self._used_statement, self._used_ledger = set(), set()
+
+        matches = []
+        self._match_by_reference(statement, ledger, matches)
+        self._match_by_amount_date(statement, ledger, matches)
+        self._match_groups(statement, ledger, matches)
+        self._persist(matches)
+
+        rules = Counter(rule for rule, _, _, _ in matches)
+        return {
+            'matches': len(matches),
+            'by_rule': dict(rules),
+            'matched_statement_lines': len(self._used_statement),
+            'matched_entry_lines': len(self._used_ledger),
+            'pending_statement_lines': len(statement) - len(self._used_statement),
+            'pending_entry_lines': len(ledger) - len(self._used_ledger),
+        }
+
+    def _persist(self, matches):
+        if not matches:
+            return
+        with transaction.atomic():
+            created = ReconciliationMatch.objects.bulk_create([
+                ReconciliationMatch(
+                    client_id=self.bank_account.client_id, bank_account=self.bank_account,
+                    match_type=match_type(len(statement_ids), len(ledger_ids)), rule=rule,
+                    amount=amount, created_by=self.user,
+                )
+                for rule, statement_ids, ledger_ids, amount in matches
+            ], batch_size=1000)
+            statement_lines, entry_lines = [], []
+            for match, (_, statement_ids, ledger_ids, _) in zip(created, matches):
+                statement_lines += [BankStatementLine(pk=pk, match_id=match.pk) for pk in statement_ids]
+                entry_lines += [ReconciledEntryLine(match_id=match.pk, entry_line_id=pk) for pk in ledger_ids]
+            BankStatementLine.objects.bulk_update(statement_lines, ['match'], batch_size=1000)
+            ReconciledEntryLine.objects.bulk_create(entry_lines, batch_size=1000)
+
+
+def match_type(statement_count, ledger_count):
+    if statement_count == 1 and ledger_count == 1:
+        return 'ONE_TO_ONE'
+    if ledger_count == 1:
+        return 'MANY_TO_ONE'
+    if statement_count == 1:
+        return 'ONE_TO_MANY'
+    return 'MANY_TO_MANY'
+
+
+def manual_match(bank_account, statement_line_ids, entry_line_ids, user=None):
+    """Conciliación manual: los movimientos deben estar pendientes y sumar lo mismo."""
+    if not statement_line_ids or not entry_line_ids:
+        raise ValueError("Seleccione al menos un movimiento del extracto y uno contable.")
+    statement_lines = BankStatementLine.objects.filter(
+        bank_account=bank_account, match__isnull=True, pk__in=statement_line_ids,
+    )
+    entry_lines = JournalEntryLine.objects.filter(
+        account_id=bank_account.gl_account_id, entry__status='POSTED',
+        bank_reconciliation__isnull=True, pk__in=entry_line_ids,
+    )
+    if statement_lines.count() != len(set(statement_line_ids)) or entry_lines.count() != len(set(entry_line_ids)):
+        raise ValueError("Hay movimientos inexistentes, de otra cuenta o ya conciliados.")
+
+    statement_total = statement_lines.aggregate(total=Coalesce(Sum('amount'), ZERO_VALUE))['total']
+    entry_total = entry_lines.aggregate(total=Coalesce(Sum(F('debit') - F('credit')), ZERO_VALUE))['total']
+    if statement_total != entry_total:
+        raise ValueError(f"Los valores no coinciden. Extracto: {statement_total}, Contabilidad: {entry_total}")
+
+    with transaction.atomic():
+        match = ReconciliationMatch.objects.create(
+            client_id=bank_account.client_id, bank_account=bank_account,
+            match_type=match_type(len(set(statement_line_ids)), len(set(entry_line_ids))),
+            rule='MANUAL', amount=statement_total, created_by=user,
+        )
+        statement_lines.update(match=match)
+        ReconciledEntryLine.objects.bulk_create(
+            [ReconciledEntryLine(match=match, entry_line_id=pk) for pk in set(entry_line_ids)]
+        )
+    return match
+
+
+def reconciliation_summary(bank_account, as_of=None):
+    """Saldo en libros, saldo según extracto y partidas pendientes a la fecha."""
+    entry_lines = JournalEntryLine.objects.filter(account_id=bank_account.gl_account_id, entry__status='POSTED')
+    statement_lines = BankStatementLine.objects.filter(bank_account=bank_account)
+    if as_of:
+        entry_lines = entry_lines.filter(entry__date__lte=as_of)
+        statement_lines = statement_lines.filter(date__lte=as_of)
+
+    book = entry_lines.aggregate(
+        balance=Coalesce(Sum(F('debit') - F('credit')), ZERO_VALUE),
+        pending=Coalesce(Sum(F('debit') - F('credit'), filter=Q(bank_reconciliation__isnull=True)), ZERO_VALUE),
+        pending_count=Count('id', filter=Q(bank_reconciliation__isnull=True)),
+    )
+    bank = statement_lines.aggregate(
+        balance=Coalesce(Sum('amount'), ZERO_VALUE),
+        pending=Coalesce(Sum('amount', filter=Q(match__isnull=True)), ZERO_VALUE),
+        pending_count=Count('id', filter=Q(match__isnull=True)),
+    )
+    return {
+        'as_of': as_of,
+        'book_balance': book['balance'],
+        'statement_movement': bank['balance'],
+        'pending_entry_lines': book['pending_count'],
+        'pending_entry_amount': book['pending'],
+        'pending_statement_lines': bank['pending_count'],
+        'pending_statement_amount': bank['pending'],
+    }
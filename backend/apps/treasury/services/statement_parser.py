@@ -0,0 +1,158 @@
+"""
+Lectura de extractos bancarios: CSV genérico, OFX y los formatos de
+descarga de los principales bancos colombianos.
+
+Todos los lectores producen dicts {date, amount, description, reference}
+con el valor firmado desde la óptica de la empresa (positivo = abono).
+"""
+import re
+from datetime import datetime
+
+from apps.common.tabular import DATE_FORMATS, clean_text, iter_table, normalize_header, parse_amount, parse_date
+
+# Perfiles por banco: encabezados aceptados por columna y formatos de fecha.
+# Si el extracto trae valor único, el signo lo da el banco; si trae débito y
+# crédito separados, débito (retiro) resta y crédito (consignación) suma.
+BANK_PROFILES = {
+    'BANCOLOMBIA': {
+        'date': ('fecha',),
+        'description': ('descripcion',),
+        'reference': ('dcto.', 'documento', 'referencia'),
+        'amount': ('valor',),
+        'date_formats': ('%d/%m/%Y', '%Y/%m/%d', '%Y%m%d', '%Y-%m-%d'),
+    },
+    'DAVIVIENDA': {
+        'date': ('fecha', 'fecha de sistema'),
+        'description': ('transaccion', 'descripcion', 'descripcion motivo'),
+        'reference': ('referencia', 'documento', 'referencia 1'),
+        'debit': ('valor debito', 'debitos'),
+        'credit': ('valor credito', 'creditos'),
+        'date_formats': ('%d/%m/%Y', '%Y-%m-%d'),
+    },
+    'BOGOTA': {
+        'date': ('fecha', 'fecha transaccion'),
+        'description': ('descripcion', 'concepto'),
+        'reference': ('referencia', 'documento', 'oficina'),
+        'debit': ('debitos', 'retiros'),
+        'credit': ('creditos', 'consignaciones'),
+        'date_formats': ('%d/%m/%Y', '%Y/%m/%d'),
+    },
+    'CSV': {
+        'date': ('fecha', 'date'),
+        'description': ('descripcion', 'detalle', 'concepto', 'description'),
+        'reference': ('referencia', 'documento', 'reference'),
+        'amount': ('valor', 'monto', 'amount'),
+        'debit': ('debito', 'debitos', 'retiro', 'cargo'),
+        'credit': ('credito', 'creditos', 'deposito', 'abono'),
+    },
+}
+PROFILE_COLUMNS = ('date', 'description', 'reference', 'amount', 'debit', 'credit')
+
+
+class StatementFormatError(ValueError):
+    """El extracto no coincide con el formato indicado."""
+
+
+def _column_map(header, profile):
+    normalized = [normalize_header(name) for name in header]
+    mapping = {}
+    for column in PROFILE_COLUMNS:
+        for alias in profile.get(column, ()):
+            if alias in normalized:
+                mapping[column] = normalized.index(alias)
+                break
+    if 'date' not in mapping or not ('amount' in mapping or ('debit' in mapping and 'credit' in mapping)):
+        return None
+    return mapping
+
+
+def detect_profile(header):
+    """Perfil de banco cuyo encabezado coincide (los propios antes que el genérico)."""
+    for name, profile in BANK_PROFILES.items():
+        if _column_map(header, profile) is not None:
+            return name
+    return None
+
+
+def parse_tabular(stream, filename, source_format=None):
+    """
+    CSV/XLSX con el perfil indicado o detectado por el encabezado.
+    Returns: (formato, iterador de movimientos)
+    """
+    reader = iter_table(stream, filename)
+    header = None
+    for row in reader:
+        # Algunos bancos ponen títulos antes del encabezado real
+        if row and (_column_map(row, BANK_PROFILES[source_format]) if source_format else detect_profile(row)):
+            header = row
+            break
+    if header is None:
+        raise StatementFormatError("No se encontró el encabezado del extracto (fecha y valor).")
+
+    source_format = source_format or detect_profile(header)
+    profile = BANK_PROFILES[source_format]
+    mapping = _column_map(header, profile)
+    formats = profile.get('date_formats', DATE_FORMATS)
+
+    def cell(values, column):
+        index = mapping.get(column)
+        return values[index] if index is not None and index < len(values) else None
+
+    def rows():
+        for values in reader:
+            if not values or all(value in (None, '') for value in values):
+                continue
+            value_date = parse_date(cell(values, 'date'), formats)
+            if 'amount' in mapping:
+                amount = parse_amount(cell(values, 'amount'))
+            else:
+                debit, credit = parse_amount(cell(values, 'debit')), parse_amount(cell(values, 'credit'))
+                amount = None if debit is None or credit is None else credit - abs(debit)
+            if value_date is None or amount is None:
+                # Filas de totales o saldos al final del archivo
+                continue
+            yield {
+                'date': value_date,
+                'amount': amount,
+                'description': clean_text(cell(values, 'description'))[:255],
+                'reference': clean_text(cell(values, 'reference'))[:100],
+            }
+
+    return source_format, rows()
+
+
+OFX_TRANSACTION = re.compile(r'<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|(?=</BANKTRANLIST>))', re.S | re.I)
+OFX_FIELD = re.compile(r'<(\w+)>([^<\r\n]*)')
+
+
+def parse_ofx(stream):
+    """OFX 1.x (SGML) y 2.x (XML): un movimiento por bloque STMTTRN."""
+    content = stream.read()
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', errors='replace')
+    for block in OFX_TRANSACTION.findall(content):
+        fields = {name.upper(): value.strip() for name, value in OFX_FIELD.findall(block)}
+        try:
+            value_date = datetime.strptime(fields.get('DTPOSTED', '')[:8], '%Y%m%d').date()
+        except ValueError:
+            continue
+        amount = parse_amount(fields.get('TRNAMT'))
+        if amount is None:
+            continue
+        description = ' '.join(filter(None, [fields.get('NAME'), fields.get('MEMO')]))
+        yield {
+            'date': value_date,
+            'amount': amount,
+            'description': description[:255],
+            'reference': (fields.get('CHECKNUM') or fields.get('REFNUM') or fields.get('FITID') or '')[:100],
+        }
+
+
+def parse_statement(stream, filename, source_format=None):
+    """
+    Lector según el formato (o la extensión del archivo si no se indica).
+    Returns: (formato, iterador de movimientos)
+    """
+    if source_format == 'OFX' or (source_format is None and filename.lower().endswith(('.ofx', '.qfx'))):
+        return 'OFX', parse_ofx(stream)
+    return parse_tabular(stream, filename, source_format)
@@ -5,6 +5,26 @@ from django.contrib.contenttypes.models import ContentType
 from apps.treasury.models import PaymentOut
 from apps.accounting.models import JournalEntry, JournalEntryLine, Account
 from apps.accounting.models import ThirdParty # Assuming we can find the third party by name or ID
+from apps.treasury.services import payables_service
+
+
+def payable_accounts(client_id, third_party_ids):
+    """
+    Cuenta por pagar de cada proveedor: la suya por defecto o, si no tiene,
+    la cuenta 2205 (Proveedores Nacionales) del plan de cuentas del cliente.
+    Dos consultas sin importar el número de proveedores.
+    """
+    defaults = dict(
+        ThirdParty.objects.filter(pk__in=third_party_ids).values_list('id', 'default_account_id')
+    )
+    fallback = None
+    if not all(defaults.get(pk) for pk in third_party_ids):
+        fallback = (
+            Account.objects.filter(client_id=client_id, account_code='2205')
+            .order_by('code').values_list('id', flat=True).first()
+        )
+    return {pk: defaults.get(pk) or fallback for pk in third_party_ids}
+
 
 class TreasuryService:
     @staticmethod
@@ -16,7 +36,7 @@ class TreasuryService:
           DB: Cuentas por Pagar (Proveedores) 
           CR: Banco (Activo)
         """
-        payment = PaymentOut.objects.get(pk=payment_id)
+        payment = PaymentOut.objects.select_for_update().get(pk=payment_id)
         
         if payment.status != 'DRAFT':
             raise ValueError("Solo se pueden contabilizar pagos en estado Borrador.")
@@ -47,36 +67,58 @@ class TreasuryService:
         )
         
         # B. Débito a Cuentas por Pagar (Disminución de pasivo)
-        line_num = 2
-        for detail in payment.details.all():
-            # Buscar cuenta por pagar
-            # 1. Intentar usar la cuenta por defecto del proveedor
-            payable_account = payment.third_party.default_account
-            
-            # 2. Si no, buscar una cuenta 2205 (Nacionales) en el plan de cuentas del cliente
-            if not payable_account:
-                payable_account = Account.objects.filter(
-                    client=payment.client, 
-                    code__startswith='2205'
-                ).first()
-            
-            if not payable_account:
-                 raise ValueError(f"No se encontró una cuenta contable para imputar el pago al proveedor {payment.third_party}.")
+        # La cuenta se resuelve una vez por egreso, no por cada factura
+        payable_account_id = payable_accounts(payment.client_id, [payment.third_party_id])[payment.third_party_id]
+        if not payable_account_id:
+            raise ValueError(f"No se encontró una cuenta contable para imputar el pago al proveedor {payment.third_party}.")
 
-            JournalEntryLine.objects.create(
-                client=payment.client,
+        JournalEntryLine.objects.bulk_create([
+            JournalEntryLine(
+                client_id=payment.client_id,
                 entry=entry,
                 line_number=line_num,
-                account=payable_account,
-                third_party=payment.third_party, # Vinculación real
+                account_id=payable_account_id,
+                third_party_id=payment.third_party_id, # Vinculación real
                 description=f"Pago Factura {detail.invoice.invoice_number}",
                 debit=detail.amount_paid,
                 credit=Decimal('0')
             )
-            line_num += 1
+            for line_num, detail in enumerate(payment.details.select_related('invoice'), start=2)
+        ])
 
-        # 3. Actualizar estado del Pago
+        # 3. Descontar el saldo de las facturas pagadas (subledger CxP)
+        payables_service.apply_payment(payment)
+
+        # 4. Actualizar estado del Pago
         payment.status = 'POSTED'
         payment.save()
         
         return entry
+
+    @staticmethod
+    @transaction.atomic
+    def cancel_payment(payment_id):
+        """
+        Anula un Comprobante de Egreso. Si estaba contabilizado, anula su
+        asiento y devuelve el valor pagado al saldo de las facturas.
+        """
+        payment = PaymentOut.objects.select_for_update().get(pk=payment_id)
+
+        if payment.status == 'CANCELLED':
+            raise ValueError("El pago ya está anulado.")
+
+        if payment.status == 'POSTED':
+            if payment.payment_run_id and payment.payment_run.grouping == 'RUN':
+                raise ValueError("El pago se contabilizó en el comprobante único de su corrida; no se puede anular por separado.")
+            entries = JournalEntry.objects.filter(
+                content_type=ContentType.objects.get_for_model(payment),
+                object_id=payment.pk,
+            ).exclude(status='CANCELLED')
+            for entry in entries:
+                entry.status = 'CANCELLED'
+                entry.save()
+            payables_service.reverse_payment(payment)
+
+        payment.status = 'CANCELLED'
+        payment.save()
+        return payment
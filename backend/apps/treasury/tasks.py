@@ -0,0 +1,20 @@
+from celery import shared_task
+from apps.tenants.utils import tenant_context
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def execute_payment_run(client_id, run_id):
+    """Ejecuta una corrida de pagos: egresos, contabilización y archivo del banco."""
+    from .models import PaymentRun
+    from .services.payment_run_service import PaymentRunService
+
+    with tenant_context(client_id):
+        run = PaymentRunService(PaymentRun.objects.get(pk=run_id)).execute()
+    logger.info(
+        f"Corrida de pagos {run_id}: tenant {client_id} -> {run.status}, "
+        f"{run.payment_count} pagos por {run.total_amount}"
+    )
+    return run.status
@@ -0,0 +1,85 @@
+from datetime import date
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from apps.common.tests import TenantTestCase
+from apps.accounting.models import JournalEntry, ThirdParty
+from apps.electronic_events.models import ReceivedInvoice
+from apps.treasury.models import BankAccount, PaymentOut, PaymentOutDetail
+from apps.treasury.services.payables_service import payables_aging
+from apps.treasury.services.treasury_service import TreasuryService
+
+
+class PayablesSubledgerTests(TenantTestCase):
+    """Saldo de facturas recibidas mantenido por los egresos y cartera por edades."""
+
+    def setUp(self):
+        super().setUp()
+
+        bank = self.create_account('1', 'DEBITO', '11', '111005', 'ACTIVO')
+        payable = self.create_account('2', 'CREDITO', '22', '220505', 'PASIVO')
+        self.bank_account = BankAccount.objects.create(
+            client=self.tenant, name='Corriente', account_number='123', bank_name='Bancolombia', gl_account=bank,
+        )
+        self.supplier = ThirdParty.objects.create(
+            client=self.tenant, party_type='PROVEEDOR', person_type=1, identification_type='31',
+            identification_number='900555111', business_name='Proveedor SAS', default_account=payable,
+        )
+        self.old = self._invoice('F-1', date(2025, 1, 10), Decimal('1000'))
+        self.recent = self._invoice('F-2', date(2025, 4, 20), Decimal('500'))
+
+    def _invoice(self, number, issue_date, total):
+        return ReceivedInvoice.objects.create(
+            client=self.tenant, issuer_nit='900555111', issuer_name='Proveedor SAS', third_party=self.supplier,
+            invoice_number=number, cufe=f'cufe-{number}', issue_date=issue_date,
+            subtotal_amount=total, total_amount=total, xml_file='inbox/xml/test.xml',
+        )
+
+    def _payment(self, *details):
+        payment = PaymentOut.objects.create(
+            client=self.tenant, payment_date=date(2025, 5, 2), third_party=self.supplier,
+            bank_account=self.bank_account, total_amount=sum(amount for _, amount in details),
+        )
+        for invoice, amount in details:
+            PaymentOutDetail.objects.create(payment_out=payment, invoice=invoice, amount_paid=amount)
+        return payment
+
+    def test_post_and_cancel_move_outstanding(self):
+        self.assertEqual(self.old.outstanding_amount, Decimal('1000'))
+        payment = self._payment((self.old, Decimal('600')), (self.recent, Decimal('500')))
+        TreasuryService.post_payment(payment.pk)
+
+        self.old.refresh_from_db()
+        self.recent.refresh_from_db()
+        self.assertEqual((self.old.outstanding_amount, self.recent.outstanding_amount), (Decimal('400'), Decimal('0')))
+
+        # Un borrador que supera el saldo no pasa la validación temprana
+        with self.assertRaises(ValidationError):
+            self._payment((self.old, Decimal('500')))
+
+        TreasuryService.cancel_payment(payment.pk)
+        self.old.refresh_from_db()
+        self.assertEqual(self.old.outstanding_amount, Decimal('1000'))
+        self.assertEqual(JournalEntry.objects.get(number=f'CE-{payment.consecutive}').status, 'CANCELLED')
+
+    def test_post_rejects_payment_over_current_balance(self):
+        # Dos borradores sobre la misma factura: el segundo no puede contabilizarse
+        first = self._payment((self.old, Decimal('700')))
+        second = self._payment((self.old, Decimal('700')))
+        TreasuryService.post_payment(first.pk)
+        with self.assertRaises(ValueError):
+            TreasuryService.post_payment(second.pk)
+        self.old.refresh_from_db()
+        self.assertEqual(self.old.outstanding_amount, Decimal('300'))
+        self.assertEqual(PaymentOut.objects.get(pk=second.pk).status, 'DRAFT')
+
+    def test_aging_buckets_by_supplier(self):
+        TreasuryService.post_payment(self._payment((self.recent, Decimal('500'))).pk)
+        self._invoice('F-3', date(2025, 5, 1), Decimal('250'))
+
+        aging = payables_aging(self.tenant.id, as_of=date(2025, 5, 15))
+        self.assertEqual(len(aging['rows']), 1)
+        row = aging['rows'][0]
+        self.assertEqual((row['issuer_nit'], row['third_party'], row['invoices']), ('900555111', self.supplier.id, 2))
+        self.assertEqual(row['d0_30'], Decimal('250'))
+        self.assertEqual(row['over_120'], Decimal('1000'))
+        self.assertEqual(aging['totals']['total'], Decimal('1250'))
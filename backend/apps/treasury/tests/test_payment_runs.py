@@ -0,0 +1,123 @@
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+from django.test import override_settings
+from apps.common.tests import TenantTestCase
+from apps.accounting.models import JournalEntry, JournalEntryLine, ThirdParty
+from apps.electronic_events.models import ReceivedInvoice
+from apps.treasury.models import BankAccount, PaymentOut, PaymentRun
+from apps.treasury.services.payment_run_service import PaymentRunService
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PaymentRunTests(TenantTestCase):
+    """Corridas de pago: egresos en bloque, contabilización y archivo del banco."""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+
+        bank = self.create_account('1', 'DEBITO', '11', '111005', 'ACTIVO')
+        self.payable = self.create_account('2', 'CREDITO', '22', '220505', 'PASIVO')
+        self.bank_account = BankAccount.objects.create(
+            client=self.tenant, name='Corriente', account_number='12345678901', bank_name='Bancolombia', gl_account=bank,
+        )
+        self.acme = self._supplier('900555111', 'Acme Suministros SAS', bank_name='Bancolombia', account='111222333')
+        self.beta = self._supplier('800111222', 'Beta Ltda', bank_name='Banco Davivienda', account='444555666')
+        self.no_bank = self._supplier('700111222', 'Sin Banco SAS')
+
+        self._invoice(self.acme, 'A-1', date(2025, 3, 1), Decimal('1000'))
+        self._invoice(self.acme, 'A-2', date(2025, 3, 5), Decimal('500'))
+        self._invoice(self.beta, 'B-1', date(2025, 3, 2), Decimal('300'))
+        self._invoice(self.no_bank, 'N-1', date(2025, 3, 2), Decimal('100'))
+        # Emitida después del corte de la corrida
+        self._invoice(self.beta, 'B-2', date(2025, 4, 20), Decimal('900'))
+
+    def _supplier(self, nit, name, bank_name='', account=''):
+        return ThirdParty.objects.create(
+            client=self.tenant, party_type='PROVEEDOR', person_type=1, identification_type='31',
+            identification_number=nit, business_name=name, bank_name=bank_name, bank_account_type='AHORROS',
+            bank_account_number=account,
+        )
+
+    def _invoice(self, supplier, number, issue_date, total):
+        return ReceivedInvoice.objects.create(
+            client=self.tenant, issuer_nit=supplier.identification_number, issuer_name=supplier.business_name,
+            third_party=supplier, invoice_number=number, cufe=f'cufe-{number}', issue_date=issue_date,
+            subtotal_amount=total, total_amount=total, xml_file='inbox/xml/test.xml',
+        )
+
+    def _run(self, **options):
+        run = PaymentRun.objects.create(
+            client=self.tenant, bank_account=self.bank_account, payment_date=date(2025, 4, 30),
+            due_before=date(2025, 3, 31), **options,
+        )
+        return PaymentRunService(run).execute()
+
+    def test_run_per_supplier_posts_and_writes_pab_file(self):
+        run = self._run()
+        self.assertEqual(run.status, 'POSTED', run.error)
+        self.assertEqual((run.payment_count, run.invoice_count, run.total_amount), (2, 3, Decimal('1800')))
+        self.assertEqual([item['identification_number'] for item in run.skipped], ['700111222'])
+
+        payments = PaymentOut.objects.filter(payment_run=run).order_by('consecutive')
+        self.assertEqual(list(payments.values_list('consecutive', 'status', 'total_amount')),
+                         [(1, 'POSTED', Decimal('1500')), (2, 'POSTED', Decimal('300'))])
+        entry = JournalEntry.objects.get(number='CE-1')
+        self.assertTrue(entry.is_balanced())
+        self.assertEqual(JournalEntryLine.objects.filter(entry=entry, account=self.payable).count(), 2)
+        self.assertEqual(
+            sorted(ReceivedInvoice.objects.filter(outstanding_amount=0).values_list('invoice_number', flat=True)),
+            ['A-1', 'A-2', 'B-1'],
+        )
+
+        with run.bank_file.open('rb') as handle:
+            lines = handle.read().decode('ascii').split('\r\n')[:-1]
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(all(len(line) == 264 for line in lines))
+        self.assertEqual(lines[0][86:103], '180000'.rjust(17, '0'))
+        self.assertEqual(lines[1][1:16].strip(), '900555111')
+        self.assertEqual(lines[1][55:72].strip(), '111222333')
+        self.assertEqual(lines[1][72:75], 'S37')
+
+    def test_single_entry_run_with_cap_and_ach_file(self):
+        run = self._run(grouping='RUN', file_format='ACH', max_amount=Decimal('1400'))
+        self.assertEqual(run.status, 'POSTED', run.error)
+        # Las más antiguas primero: A-1 y B-1 caben en el tope, A-2 no
+        self.assertEqual((run.invoice_count, run.total_amount), (2, Decimal('1300')))
+
+        entry = JournalEntry.objects.get(number=f'CE-CP{run.pk}')
+        self.assertTrue(entry.is_balanced())
+        self.assertEqual(entry.lines.count(), 3)
+
+        with run.bank_file.open('rb') as handle:
+            lines = handle.read().decode('ascii').split('\r\n')[:-1]
+        self.assertEqual([line[0] for line in lines], ['1', '6', '6', '8'])
+        self.assertEqual(lines[-1][1:7], '000002')
+
+        # Una nueva corrida no vuelve a pagar lo ya pagado
+        again = self._run()
+        self.assertEqual((again.invoice_count, again.total_amount), (1, Decimal('500')))
+
+    def test_bank_file_error_keeps_the_posted_run(self):
+        with patch('apps.treasury.services.payment_run_service.stream_bank_file', side_effect=OSError('disco lleno')):
+            run = self._run()
+        self.assertEqual(run.status, 'FILE_ERROR')
+        self.assertIn('disco lleno', run.error)
+        # Los egresos quedaron contabilizados y la corrida conserva sus totales
+        self.assertEqual((run.payment_count, run.total_amount), (2, Decimal('1800')))
+        self.assertEqual(PaymentOut.objects.filter(payment_run=run, status='POSTED').count(), 2)
+        self.assertFalse(run.bank_file)
+
+        run = PaymentRunService(run).regenerate_file()
+        run.refresh_from_db()
+        self.assertEqual((run.status, run.error), ('POSTED', ''))
+        self.assertTrue(run.bank_file.name.endswith('_pab.txt'))
@@ -0,0 +1,102 @@
+from datetime import date
+from decimal import Decimal
+from apps.common.tests import TenantTestCase
+from apps.accounting.models import JournalEntry, ThirdParty
+from apps.invoicing.models import DianResolution, Invoice
+from apps.treasury.models import BankAccount, CashReceipt, CashReceiptApplication
+from apps.treasury.services.receivables_service import (
+    cancel_receipt, customer_statement, post_receipt, receivables_aging,
+)
+
+
+class ReceivablesTests(TenantTestCase):
+    """Recibos de caja aplicados a facturas de venta y cartera por edades."""
+
+    def setUp(self):
+        super().setUp()
+
+        bank = self.create_account('1', 'DEBITO', '11', '111005', 'ACTIVO')
+        self.create_account('1', 'DEBITO', '13', '130505', 'ACTIVO')
+        self.bank_account = BankAccount.objects.create(
+            client=self.tenant, name='Corriente', account_number='123', bank_name='Bancolombia', gl_account=bank,
+        )
+        self.customer = ThirdParty.objects.create(
+            client=self.tenant, party_type='CLIENTE', person_type=1, identification_type='31',
+            identification_number='900555111', business_name='Cliente SAS',
+        )
+        self.resolution = DianResolution.objects.create(
+            client=self.tenant, document_type='INVOICE', resolution_number='18760000001', prefix='FE',
+            number_from=1, number_to=1000, current_number=1, date_from=date(2025, 1, 1), date_to=date(2026, 1, 1),
+        )
+        self.old = self._invoice(1001, date(2025, 1, 5), date(2025, 2, 4), Decimal('1000'))
+        self.middle = self._invoice(1002, date(2025, 2, 5), date(2025, 3, 7), Decimal('800'))
+        self.recent = self._invoice(1003, date(2025, 4, 1), date(2025, 5, 1), Decimal('500'))
+        self.draft = self._invoice(1004, date(2025, 4, 2), date(2025, 5, 2), Decimal('999'), status='DRAFT')
+
+    def _invoice(self, number, issue_date, due_date, total, status='POSTED'):
+        return Invoice.objects.create(
+            client=self.tenant, resolution=self.resolution, prefix='FE', number=number, customer=self.customer,
+            issue_date=issue_date, payment_due_date=due_date, total=total, status=status,
+        )
+
+    def _receipt(self, amount, reference=''):
+        return CashReceipt.objects.create(
+            client=self.tenant, receipt_date=date(2025, 4, 10), customer=self.customer,
+            bank_account=self.bank_account, amount=amount, reference=reference,
+        )
+
+    def _balances(self):
+        return {inv.number: inv.open_balance for inv in Invoice.objects.filter(status='POSTED')}
+
+    def test_open_balance_follows_posting(self):
+        self.assertEqual(self.old.open_balance, Decimal('1000'))
+        self.assertIsNone(self.draft.open_balance)
+        self.old.status = 'VOID'
+        self.old.save(update_fields=['status'])
+        self.old.refresh_from_db()
+        self.assertEqual(self.old.open_balance, Decimal('0'))
+
+    def test_reference_then_oldest_first_and_cancel(self):
+        receipt = post_receipt(self._receipt(Decimal('1700'), reference='Pago FE-1003').pk)
+
+        self.assertEqual(self._balances(), {1001: Decimal('0'), 1002: Decimal('600'), 1003: Decimal('0')})
+        self.assertEqual(
+            list(CashReceiptApplication.objects.order_by('id').values_list('invoice__number', 'amount')),
+            [(1003, Decimal('500')), (1001, Decimal('1000')), (1002, Decimal('200'))],
+        )
+        self.assertEqual(receipt.unapplied_amount, Decimal('0'))
+        self.assertTrue(JournalEntry.objects.get(number=f'RC-{receipt.consecutive}').is_balanced())
+
+        # Sobrepago: lo no aplicado queda como saldo a favor
+        overpaid = post_receipt(self._receipt(Decimal('700')).pk)
+        self.assertEqual(overpaid.unapplied_amount, Decimal('100'))
+
+        cancel_receipt(receipt.pk)
+        self.assertEqual(self._balances(), {1001: Decimal('1000'), 1002: Decimal('200'), 1003: Decimal('500')})
+
+    def test_manual_application_is_validated(self):
+        receipt = self._receipt(Decimal('300'))
+        CashReceiptApplication.objects.create(receipt=receipt, invoice=self.middle, amount=Decimal('900'))
+        with self.assertRaises(ValueError):
+            post_receipt(receipt.pk)
+
+        receipt.applications.update(amount=Decimal('300'))
+        post_receipt(receipt.pk)
+        self.assertEqual(self._balances()[1002], Decimal('500'))
+
+    def test_aging_and_statement(self):
+        post_receipt(self._receipt(Decimal('400'), reference='FE1002').pk)
+
+        aging = receivables_aging(self.tenant.id, as_of=date(2025, 4, 15))
+        row = aging['rows'][0]
+        self.assertEqual((row['name'], row['invoices']), ('Cliente SAS', 3))
+        self.assertEqual(row['current'], Decimal('500'))
+        self.assertEqual(row['d31_60'], Decimal('400'))
+        self.assertEqual(row['d61_90'], Decimal('1000'))
+        self.assertEqual(aging['totals']['total'], Decimal('1900'))
+
+        statement = customer_statement(self.tenant.id, self.customer.id, date(2025, 3, 1), date(2025, 4, 30))
+        self.assertEqual(statement['opening_balance'], Decimal('1800'))
+        self.assertEqual([item['document'] for item in statement['movements']], ['FE1003', 'RC-1'])
+        self.assertEqual(statement['closing_balance'], Decimal('1900'))
+        self.assertEqual([item['document'] for item in statement['open_items']], ['FE1001', 'FE1002', 'FE1003'])
@@ -0,0 +1,147 @@
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework.test import APIClient
+from apps.common.tests import TenantTestCase
+from apps.tenants.utils import set_current_client_id
+from apps.accounting.models import JournalEntry, JournalEntryLine
+from apps.treasury.models import BankAccount, BankStatementLine, ReconciliationMatch
+from apps.treasury.services.reconciliation_service import (
+    ReconciliationEngine, import_statement, manual_match, reconciliation_summary,
+)
+
+STATEMENT = (
+    "Extracto cuenta corriente\n"
+    "FECHA;DESCRIPCIÓN;SUCURSAL;DCTO.;VALOR\n"
+    "04/03/2025;TRANSFERENCIA 123456;;;1.000,00\n"
+    "06/03/2025;PAGO CHEQUE;;7788;-250\n"
+    "10/03/2025;CONSIGNACION;;;200\n"
+    "10/03/2025;CONSIGNACION;;;300\n"
+    "13/03/2025;PAGO PSE;;;-250\n"
+    "20/03/2025;COMISION;;;-15\n"
+)
+
+OFX = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20250304<TRNAMT>1000.00<FITID>A1<NAME>TRANSFERENCIA 123456
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250320<TRNAMT>-15.00<FITID>A2<NAME>COMISION
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BankReconciliationTests(TenantTestCase):
+    """Importación de extractos y conciliación automática por reglas."""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+
+        self.bank = self.create_account('1', 'DEBITO', '11', '111005', 'ACTIVO')
+        self.income = self.create_account('4', 'CREDITO', '41', '413505', 'INGRESO')
+        self.bank_account = BankAccount.objects.create(
+            client=self.tenant, name='Corriente', account_number='123-456', bank_name='Bancolombia',
+            gl_account=self.bank,
+        )
+        self._entry('E1', date(2025, 3, 3), [Decimal('1000')], reference='TRF 123456')
+        self._entry('E2', date(2025, 3, 5), [Decimal('-250')], description='Cheque 7788')
+        self._entry('E3', date(2025, 3, 10), [Decimal('500')])
+        # Un comprobante con dos salidas que el banco reporta como un solo cargo
+        self._entry('E4', date(2025, 3, 12), [Decimal('-100'), Decimal('-150')])
+
+    def _entry(self, number, entry_date, amounts, reference='', description='Movimiento'):
+        entry = JournalEntry.objects.create(client=self.tenant, number=number, entry_type='DIARIO', date=entry_date,
+                                            description=description, reference=reference)
+        for line_number, amount in enumerate(amounts, start=1):
+            JournalEntryLine.objects.create(
+                client=self.tenant, entry=entry, line_number=line_number, account=self.bank, description=description,
+                debit=max(amount, 0), credit=max(-amount, 0),
+            )
+        total = sum(amounts)
+        JournalEntryLine.objects.create(
+            client=self.tenant, entry=entry, line_number=len(amounts) + 1, account=self.income, description=description,
+            debit=max(-total, 0), credit=max(total, 0),
+        )
+        entry.status = 'POSTED'
+        entry.save()
+
+    def _import(self, content=STATEMENT, name='extracto.csv', source_format=None):
+        upload = SimpleUploadedFile(name, content.encode('utf-8'))
+        return import_statement(self.bank_account, upload, source_format)
+
+    def test_import_detects_bank_format_and_skips_duplicates(self):
+        statement = self._import()
+        self.assertEqual(statement.source_format, 'BANCOLOMBIA')
+        self.assertEqual(statement.line_count, 6)
+        self.assertEqual((statement.period_start, statement.period_end), (date(2025, 3, 4), date(2025, 3, 20)))
+        self.assertEqual(BankStatementLine.objects.get(reference='7788').amount, Decimal('-250'))
+
+        again = self._import()
+        self.assertEqual((again.line_count, again.duplicate_count), (0, 6))
+
+        ofx = self._import(OFX, name='extracto.ofx')
+        self.assertEqual((ofx.source_format, ofx.line_count), ('OFX', 2))
+
+    def test_engine_matches_one_to_one_and_groups(self):
+        self._import()
+        result = ReconciliationEngine(self.bank_account, date(2025, 3, 1), date(2025, 3, 31)).run()
+
+        self.assertEqual(result['by_rule'], {'REFERENCE': 2, 'GROUP': 2})
+        self.assertEqual(result['pending_statement_lines'], 1)
+        self.assertEqual(result['pending_entry_lines'], 0)
+        self.assertEqual(
+            sorted(ReconciliationMatch.objects.values_list('match_type', flat=True)),
+            ['MANY_TO_ONE', 'ONE_TO_MANY', 'ONE_TO_ONE', 'ONE_TO_ONE'],
+        )
+
+        # Incremental: una segunda ejecución no reprocesa lo conciliado
+        self.assertEqual(ReconciliationEngine(self.bank_account).run()['matches'], 0)
+
+        summary = reconciliation_summary(self.bank_account)
+        self.assertEqual(summary['book_balance'], Decimal('1000'))
+        self.assertEqual(summary['pending_statement_amount'], Decimal('-15'))
+
+    def test_manual_match_and_undo(self):
+        self._import()
+        ReconciliationEngine(self.bank_account).run()
+        match = ReconciliationMatch.objects.get(match_type='MANY_TO_ONE')
+        statement_ids = list(match.statement_lines.values_list('id', flat=True))
+        entry_ids = [item.entry_line_id for item in match.entry_lines.all()]
+        match.delete()
+        self.assertEqual(BankStatementLine.objects.filter(match__isnull=True).count(), 3)
+
+        with self.assertRaises(ValueError):
+            manual_match(self.bank_account, statement_ids[:1], entry_ids)
+        with self.assertRaises(ValueError):
+            manual_match(self.bank_account, [], [])
+        manual = manual_match(self.bank_account, statement_ids, entry_ids)
+        self.assertEqual((manual.rule, manual.amount), ('MANUAL', Decimal('500')))
+
+    def test_manual_match_api_only_sees_tenant_bank_accounts(self):
+        other = self.create_tenant(name="Otra Empresa", nit="900999888")
+        foreign = BankAccount.objects.create(client=other, name='Ajena', account_number='999', bank_name='Bogotá',
+                                             gl_account=self.bank)
+        api = APIClient()
+        api.force_authenticate(user=User.objects.create_user(username='tesorero', password='password123'))
+        api.credentials(HTTP_X_CLIENT_ID=str(self.tenant.id))
+
+        response = api.post('/api/treasury/reconciliations/', {'bank_account': foreign.pk, 'statement_lines': [],
+                                                               'entry_lines': []}, format='json')
+        set_current_client_id(self.tenant.id)
+        self.assertEqual(response.status_code, 404)
+
+        response = api.post('/api/treasury/reconciliations/', {'bank_account': self.bank_account.pk,
+                                                               'statement_lines': [], 'entry_lines': []}, format='json')
+        set_current_client_id(self.tenant.id)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ReconciliationMatch.objects.exists())
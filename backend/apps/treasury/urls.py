@@ -1,8 +1,16 @@
 from rest_framework.routers import DefaultRouter
-from .views import BankAccountViewSet, PaymentOutViewSet
+from .views import (
+    BankAccountViewSet, PaymentOutViewSet, PaymentRunViewSet, CashReceiptViewSet, BankStatementViewSet,
+    BankStatementLineViewSet, ReconciliationMatchViewSet,
+)
 
 router = DefaultRouter()
 router.register(r'bank-accounts', BankAccountViewSet, basename='bank-account')
 router.register(r'payments', PaymentOutViewSet, basename='payment-out')
+router.register(r'receipts', CashReceiptViewSet, basename='cash-receipt')
+router.register(r'payment-runs', PaymentRunViewSet, basename='payment-run')
+router.register(r'bank-statements', BankStatementViewSet, basename='bank-statement')
+router.register(r'bank-statement-lines', BankStatementLineViewSet, basename='bank-statement-line')
+router.register(r'reconciliations', ReconciliationMatchViewSet, basename='reconciliation')
 
 urlpatterns = router.urls
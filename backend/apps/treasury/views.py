@@ -1,9 +1,18 @@
-from rest_framework import viewsets, status
+from django.core.exceptions import ValidationError
+from django.utils.dateparse import parse_date
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import BankAccount, PaymentOut
-from .serializers import BankAccountSerializer, PaymentOutSerializer
+from apps.common.mixins import QueryPlanMixin
+from apps.tenants.utils import get_current_client_id
+from .models import BankAccount, PaymentOut, PaymentRun, CashReceipt, BankStatement, BankStatementLine, ReconciliationMatch
+from .serializers import (
+    BankAccountSerializer, PaymentOutSerializer, PaymentRunSerializer, CashReceiptSerializer, BankStatementSerializer,
+    BankStatementLineSerializer, ReconciliationMatchSerializer,
+)
 from .services.treasury_service import TreasuryService
+from .services.statement_parser import BANK_PROFILES, StatementFormatError
+from .services import payment_run_service, reconciliation_service, receivables_service
 
 class BankAccountViewSet(viewsets.ModelViewSet):
     serializer_class = BankAccountSerializer
@@ -11,8 +20,54 @@ class BankAccountViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return BankAccount.objects.all()
 
-class PaymentOutViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['post'], url_path='import-statement')
+    def import_statement(self, request, pk=None):
+        """
+        Importa un extracto (multipart: file, source_format opcional:
+        CSV, OFX, BANCOLOMBIA, DAVIVIENDA, BOGOTA).
+        """
+        bank_account = self.get_object()
+        upload = request.FILES.get('file')
+        source_format = request.data.get('source_format') or None
+        if upload is None:
+            return Response({'error': "Archivo 'file' requerido."}, status=status.HTTP_400_BAD_REQUEST)
+        if source_format and source_format != 'OFX' and source_format not in BANK_PROFILES:
+            return Response({'error': f"Formato no soportado: {source_format}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            statement = reconciliation_service.import_statement(bank_account, upload, source_format, user=request.user)
+        except StatementFormatError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(BankStatementSerializer(statement).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def reconcile(self, request, pk=None):
+        """Conciliación automática de lo pendiente. Body opcional: {date_from, date_to}."""
+        bank_account = self.get_object()
+        engine = reconciliation_service.ReconciliationEngine(
+            bank_account,
+            date_from=parse_date(request.data.get('date_from') or ''),
+            date_to=parse_date(request.data.get('date_to') or ''),
+            user=request.user,
+        )
+        return Response(engine.run())
+
+    @action(detail=True, methods=['get'])
+    def reconciliation(self, request, pk=None):
+        """Resumen de conciliación (saldo en libros y partidas pendientes). Parámetro: as_of."""
+        bank_account = self.get_object()
+        as_of = parse_date(request.query_params.get('as_of') or '')
+        return Response(reconciliation_service.reconciliation_summary(bank_account, as_of))
+
+class PaymentOutViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     serializer_class = PaymentOutSerializer
+    select_related_plan = {'bank_account_name': ['bank_account']}
+    prefetch_related_plan = {'details': ['details__invoice']}
+    values_fields = {
+        'id': 'id', 'consecutive': 'consecutive', 'payment_date': 'payment_date',
+        'third_party': 'third_party_id', 'bank_account': 'bank_account_id',
+        'payment_method': 'payment_method', 'total_amount': 'total_amount',
+        'status': 'status', 'created_at': 'created_at',
+    }
 
     def get_queryset(self):
         return PaymentOut.objects.all().order_by('-created_at')
@@ -34,3 +89,127 @@ class PaymentOutViewSet(viewsets.ModelViewSet):
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'error': f"Error interno: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Anula el pago; si estaba contabilizado reversa el asiento y el saldo de las facturas."""
+        payment = self.get_object()
+        try:
+            payment = TreasuryService.cancel_payment(payment.pk)
+        except (ValueError, ValidationError) as e:
+            return Response({'error': ' '.join(getattr(e, 'messages', [str(e)]))}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(payment).data)
+
+
+class CashReceiptViewSet(QueryPlanMixin, viewsets.ModelViewSet):
+    """Recibos de caja. post_receipt aplica el valor a las facturas y contabiliza."""
+    serializer_class = CashReceiptSerializer
+    filterset_fields = ['status', 'customer']
+    prefetch_related_plan = {'applications': ['applications__invoice']}
+
+    def get_queryset(self):
+        return CashReceipt.objects.all().order_by('-receipt_date', '-consecutive')
+
+    def perform_create(self, serializer):
+        serializer.save(client_id=int(get_current_client_id()))
+
+    @action(detail=True, methods=['post'])
+    def post_receipt(self, request, pk=None):
+        receipt = self.get_object()
+        try:
+            receipt = receivables_service.post_receipt(receipt.pk, user=request.user)
+        except (ValueError, ValidationError) as e:
+            return Response({'error': ' '.join(getattr(e, 'messages', [str(e)]))}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(receipt).data)
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        receipt = self.get_object()
+        try:
+            receipt = receivables_service.cancel_receipt(receipt.pk)
+        except (ValueError, ValidationError) as e:
+            return Response({'error': ' '.join(getattr(e, 'messages', [str(e)]))}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(receipt).data)
+
+
+class PaymentRunViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Corridas de pago a proveedores. POST crea la corrida con sus criterios
+    (bank_account, payment_date, due_before, supplier_ids, max_amount,
+    grouping, file_format) y encola su ejecución completa.
+    """
+    serializer_class = PaymentRunSerializer
+    filterset_fields = ['status', 'bank_account']
+
+    def get_queryset(self):
+        return PaymentRun.objects.all()
+
+    def create(self, request, *args, **kwargs):
+        from .tasks import execute_payment_run
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        client_id = int(get_current_client_id())
+        run = serializer.save(client_id=client_id, created_by=request.user)
+        task = execute_payment_run.delay(client_id, run.id)
+        data = self.get_serializer(run).data
+        data['task_id'] = task.id
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'], url_path='regenerate-file')
+    def regenerate_file(self, request, pk=None):
+        """Vuelve a generar el archivo del banco (corridas en FILE_ERROR o contabilizadas)."""
+        try:
+            run = payment_run_service.PaymentRunService(self.get_object(), user=request.user).regenerate_file()
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(run).data)
+
+
+class BankStatementViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = BankStatementSerializer
+    filterset_fields = ['bank_account']
+
+    def get_queryset(self):
+        return BankStatement.objects.all()
+
+
+class BankStatementLineViewSet(viewsets.ReadOnlyModelViewSet):
+    """Movimientos de extracto. ?pending=true solo los no conciliados."""
+    serializer_class = BankStatementLineSerializer
+    filterset_fields = ['bank_account', 'statement', 'date']
+
+    def get_queryset(self):
+        lines = BankStatementLine.objects.all()
+        if self.request.query_params.get('pending') == 'true':
+            lines = lines.filter(match__isnull=True)
+        return lines
+
+
+class ReconciliationMatchViewSet(mixins.CreateModelMixin, mixins.DestroyModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Conciliaciones. POST crea una conciliación manual
+    {bank_account, statement_lines: [...], entry_lines: [...]}; DELETE la deshace.
+    """
+    serializer_class = ReconciliationMatchSerializer
+    filterset_fields = ['bank_account', 'rule', 'match_type']
+
+    def get_queryset(self):
+        return ReconciliationMatch.objects.prefetch_related('statement_lines', 'entry_lines')
+
+    def create(self, request, *args, **kwargs):
+        bank_account = BankAccount.objects.filter(
+            client_id=int(get_current_client_id()), pk=request.data.get('bank_account') or None,
+        ).first()
+        if bank_account is None:
+            return Response({'error': "Cuenta bancaria no encontrada."}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            match = reconciliation_service.manual_match(
+                bank_account,
+                [int(pk) for pk in request.data.get('statement_lines', [])],
+                [int(pk) for pk in request.data.get('entry_lines', [])],
+                user=request.user,
+            )
+        except (TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(match).data, status=status.HTTP_201_CREATED)
@@ -29,6 +29,11 @@ app.conf.beat_schedule = {
         'task': 'apps.reports.tasks.generate_daily_reports',
         'schedule': crontab(hour=23, minute=0),
     },
+    # Recálculo de snapshots de reportes desactualizados
+    'refresh-stale-reports': {
+        'task': 'apps.reports.tasks.refresh_stale_reports',
+        'schedule': crontab(minute='*/30'),
+    },
     # Verificación de documentos DIAN pendientes
     'check-dian-documents': {
         'task': 'apps.dian.tasks.check_pending_documents',
@@ -59,6 +59,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.sites',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third-party apps
     'rest_framework',
@@ -140,6 +141,7 @@ LOGOUT_REDIRECT_URL = '/'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'apps.common.middleware.CompressionMiddleware',  # gzip / brotli negociado
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -198,6 +200,20 @@ if os.getenv('USE_SQLITE', 'False') == 'True':
         }
     }
 
+# Caché compartida (Redis) para que las versiones de catálogo (ETag) sean
+# consistentes entre workers; en local con SQLite basta la caché en memoria.
+if os.getenv('USE_SQLITE', 'False') == 'True':
+    CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_URL', f"redis://{os.getenv('REDIS_HOST', 'localhost')}:6379/1"),
+        }
+    }
+
 # DATABASE_ROUTERS = [
 #     'django_tenants.routers.TenantSyncRouter',
 # ]
@@ -250,7 +266,7 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 50,
     # 'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'apps.common.renderers.FastJSONRenderer',
     ],
 }
 
@@ -323,6 +339,162 @@ TAX_CONFIG = {
     'RETEICA_CALI': 0.00966,  # 9.66 por mil
 }
 
+# Cierre contable
+ACCOUNTING_CONFIG = {
+    # Clases PUC de resultado que se cancelan en el cierre anual
+    'RESULT_CLASSES': ['4', '5', '6', '7'],
+    # Cuentas (PUC 4 dígitos) para el resultado del ejercicio
+    'PROFIT_ACCOUNT': '3605',  # Utilidad del ejercicio
+    'LOSS_ACCOUNT': '3610',    # Pérdida del ejercicio
+    # Importación masiva de comprobantes: filas por lote y errores guardados
+    'IMPORT_BATCH_SIZE': int(os.getenv('ACCOUNTING_IMPORT_BATCH_SIZE', '5000')),
+    'IMPORT_MAX_ERRORS': 1000,
+}
+
+# Información Exógena (Medios Magnéticos)
+EXOGENA_CONFIG = {
+    # Máximo de registros por archivo XML (la DIAN rechaza envíos más grandes)
+    'ROW_LIMIT': int(os.getenv('EXOGENA_ROW_LIMIT', '5000')),
+    # NIT genérico para agrupar cuantías menores
+    'MINOR_AMOUNTS_NIT': '222222222',
+    'MINOR_AMOUNTS_ID_TYPE': '43',
+    # Cuantía mínima por tercero y formato para reportarlo individualmente (pesos)
+    'THRESHOLDS': {
+        '1001': 100000,
+        '1003': 0,
+        '1005': 0,
+        '1006': 0,
+        '1007': 0,
+        '1008': 1000000,
+        '1009': 1000000,
+    },
+    # Formatos que reportan saldo a 31 de diciembre (no movimiento del año)
+    'BALANCE_FORMATS': ['1008', '1009'],
+    'MAX_WORKERS': int(os.getenv('EXOGENA_MAX_WORKERS', '4')),
+}
+
+# Tesorería: conciliación bancaria automática
+TREASURY_CONFIG = {
+    # Días de diferencia aceptados entre extracto y contabilidad (valor y fecha)
+    'MATCH_WINDOW_DAYS': int(os.getenv('TREASURY_MATCH_WINDOW_DAYS', '3')),
+    # Ventana cuando coincide además la referencia (cheques cobrados tarde)
+    'REFERENCE_WINDOW_DAYS': 30,
+}
+
+# Nómina: provisión de prestaciones sociales
+PAYROLL_CONFIG = {
+    # Concepto -> (cuenta de gasto, cuenta de pasivo estimado) PUC
+    'PROVISION_ACCOUNTS': {
+        'severance': ('510530', '261005'),           # Cesantías
+        'severance_interest': ('510533', '261010'),  # Intereses sobre cesantías
+        'service_bonus': ('510536', '261020'),       # Prima de servicios
+        'vacation': ('510539', '261015'),            # Vacaciones
+    },
+    'SEVERANCE_INTEREST_RATE': '0.12',
+    # Empleados procesados por lote
+    'PROVISION_BATCH_SIZE': int(os.getenv('PAYROLL_PROVISION_BATCH_SIZE', '2000')),
+    # PILA: tarifas totales (empleador + empleado) por subsistema
+    'PILA_RATES': {
+        'pension': '0.16',
+        'health': '0.125',
+        'health_exonerated': '0.04',  # Art. 114-1 E.T.: sin el 8.5% del empleador
+        'ccf': '0.04',
+        'sena': '0.02',
+        'icbf': '0.03',
+    },
+    # Exoneración de salud empleador, SENA e ICBF por debajo de este salario (en SMMLV)
+    'PILA_EXONERATION_SMMLV': 10,
+    # Nómina electrónica: numeración, endpoint y concurrencia de la transmisión
+    'ELECTRONIC_PAYROLL': {
+        'PREFIX': os.getenv('PAYROLL_XML_PREFIX', 'NE'),
+        'ADJUSTMENT_PREFIX': os.getenv('PAYROLL_XML_ADJUSTMENT_PREFIX', 'NA'),
+        # Apunta al stub local (manage.py payroll_dian_stub) en desarrollo
+        'WEBSERVICE_URL': os.getenv('DIAN_PAYROLL_WEBSERVICE_URL', DIAN_CONFIG['WEBSERVICE_URL']),
+        'SIGN_WORKERS': int(os.getenv('PAYROLL_SIGN_WORKERS', '4')),
+        'SEND_CONCURRENCY': int(os.getenv('PAYROLL_SEND_CONCURRENCY', '8')),
+        'SEND_TIMEOUT': int(os.getenv('PAYROLL_SEND_TIMEOUT', '60')),
+    },
+    # Retención en la fuente: límites mensuales de depuración (Arts. 126-1, 206, 336, 387 y 387-1 E.T.)
+    'WITHHOLDING': {
+        'DEPENDENTS_RATE': '0.10',
+        'DEPENDENTS_MAX_UVT': '32',
+        'PREPAID_HEALTH_MAX_UVT': '16',
+        'HOUSING_INTEREST_MAX_UVT': '100',
+        'VOLUNTARY_RATE': '0.30',
+        'VOLUNTARY_MAX_UVT': '316.67',      # 3.800 UVT anuales
+        'LABOR_EXEMPT_RATE': '0.25',
+        'LABOR_EXEMPT_MAX_UVT': '65.83',    # 790 UVT anuales
+        'TOTAL_RATE': '0.40',
+        'TOTAL_MAX_UVT': '111.67',          # 1.340 UVT anuales
+    },
+}
+
+# Declaraciones tributarias periódicas (apps.taxes.declaration_service)
+# Cada casilla sale de:
+#   - 'tax' + 'operation': cuentas de las TaxRule del impuesto (y de los TaxType
+#     de facturación electrónica para ventas), con la medida DEBIT, CREDIT,
+#     DEBIT_NET, CREDIT_NET o BASE (base de retención del movimiento).
+#   - 'prefixes': cuentas del PUC que empiezan por esos códigos, misma medida.
+#   - 'category' + 'document_types': ElectronicDocumentTax (TAXABLE o TAX) con
+#     el signo de cada tipo de documento.
+#   - 'formula': {casilla: signo} sobre casillas anteriores.
+TAX_DECLARATION_CONFIG = {
+    # Documentos electrónicos que no cuentan en las casillas
+    'EXCLUDED_DOCUMENT_STATUS': ['DRAFT', 'REJECTED', 'CANCELLED'],
+    'FORMS': {
+        # Formulario 300: IVA bimestral
+        '300': {
+            'MONTHS': int(os.getenv('TAX_IVA_PERIOD_MONTHS', '2')),
+            'BOXES': [
+                {'box': 'INGRESOS_GRAVADOS', 'label': 'Ingresos brutos por operaciones gravadas', 'category': 'IVA',
+                 'document_types': {'INVOICE': 1, 'DEBIT_NOTE': 1, 'CREDIT_NOTE': -1}, 'measure': 'TAXABLE'},
+                {'box': 'IVA_FACTURADO', 'label': 'IVA en facturas electrónicas', 'category': 'IVA',
+                 'document_types': {'INVOICE': 1, 'DEBIT_NOTE': 1, 'CREDIT_NOTE': -1}, 'measure': 'TAX'},
+                {'box': 'IVA_GENERADO', 'label': 'Total impuesto generado', 'tax': 'IVA', 'operation': 'SALE',
+                 'measure': 'CREDIT'},
+                {'box': 'IVA_DESCONTABLE', 'label': 'Total impuesto descontable', 'tax': 'IVA', 'operation': 'PURCHASE',
+                 'measure': 'DEBIT'},
+                {'box': 'RETEIVA_SUFRIDA', 'label': 'Retenciones de IVA que le practicaron', 'tax': 'RETEIVA',
+                 'operation': 'SALE', 'measure': 'DEBIT_NET'},
+                {'box': 'SALDO', 'label': 'Saldo a pagar (negativo: saldo a favor)',
+                 'formula': {'IVA_GENERADO': 1, 'IVA_DESCONTABLE': -1, 'RETEIVA_SUFRIDA': -1}},
+            ],
+        },
+        # Formulario 350: retenciones en la fuente mensual
+        '350': {
+            'MONTHS': 1,
+            'BOXES': [
+                {'box': 'BASE_RETEFUENTE', 'label': 'Base de retenciones a título de renta', 'tax': 'RETEFUENTE',
+                 'operation': 'PURCHASE', 'measure': 'BASE'},
+                {'box': 'RETEFUENTE', 'label': 'Retenciones a título de renta', 'tax': 'RETEFUENTE',
+                 'operation': 'PURCHASE', 'measure': 'CREDIT_NET'},
+                {'box': 'BASE_RETEIVA', 'label': 'Base de retenciones a título de IVA', 'tax': 'RETEIVA',
+                 'operation': 'PURCHASE', 'measure': 'BASE'},
+                {'box': 'RETEIVA', 'label': 'Retenciones a título de IVA', 'tax': 'RETEIVA',
+                 'operation': 'PURCHASE', 'measure': 'CREDIT_NET'},
+                {'box': 'TOTAL', 'label': 'Total retenciones', 'formula': {'RETEFUENTE': 1, 'RETEIVA': 1}},
+            ],
+        },
+        # Industria y comercio (periodicidad del municipio; Bogotá: bimestral)
+        'ICA': {
+            'MONTHS': int(os.getenv('TAX_ICA_PERIOD_MONTHS', '2')),
+            'BOXES': [
+                {'box': 'INGRESOS', 'label': 'Ingresos operacionales', 'prefixes': ['41'], 'measure': 'CREDIT_NET'},
+                {'box': 'RETEICA_PRACTICADA', 'label': 'Retenciones de ICA practicadas', 'tax': 'RETEICA',
+                 'operation': 'PURCHASE', 'measure': 'CREDIT_NET'},
+                {'box': 'RETEICA_SUFRIDA', 'label': 'Retenciones de ICA que le practicaron', 'tax': 'RETEICA',
+                 'operation': 'SALE', 'measure': 'DEBIT_NET'},
+            ],
+        },
+    },
+}
+
+# Reports Configuration (Snapshots nocturnos)
+REPORTS_CONFIG = {
+    # Tenants procesados en paralelo por el job de snapshots
+    'SNAPSHOT_MAX_WORKERS': int(os.getenv('REPORTS_SNAPSHOT_MAX_WORKERS', '4')),
+}
+
 # API Documentation
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Satori Accounting System API',
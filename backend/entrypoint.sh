@@ -13,7 +13,8 @@ fi
 
 # Ejecutar migraciones automáticas al desplegar
 echo "Running migrations..."
-python manage.py migrate
+# --fake-initial: bases donde las tablas de tesorería ya existían antes de sus migraciones
+python manage.py migrate --fake-initial
 
 echo "Configuring Site and SocialApp..."
 python manage.py shell < scripts/ensure_site_config.py
@@ -57,6 +57,28 @@ apiClient.interceptors.response.use(
   }
 );
 
+/**
+ * Trae todas las páginas de un listado siguiendo los enlaces `next`
+ * (paginación por cursor o por número de página). Si el endpoint no
+ * pagina, devuelve la lista tal cual.
+ */
+export const fetchAllPages = async (url: string, params: Record<string, any> = {}) => {
+  const items: any[] = [];
+  let next: string | null = url;
+  let query: Record<string, any> | undefined = params;
+  while (next) {
+    const response: { data: any } = await apiClient.get(next, { params: query });
+    if (Array.isArray(response.data)) {
+      return response.data;
+    }
+    items.push(...(response.data.results || []));
+    next = response.data.next || null;
+    // El enlace `next` ya incluye los filtros
+    query = undefined;
+  }
+  return items;
+};
+
 /**
  * Servicio de Cuentas (PUC)
  */
@@ -357,8 +379,7 @@ export const journalEntriesService = {
       const result = await window.db.getJournalEntries(filters);
       return result.data || [];
     } else {
-      const response = await apiClient.get('/accounting/journal-entries/', { params: filters });
-      return Array.isArray(response.data) ? response.data : (response.data.results || []);
+      return fetchAllPages('/accounting/journal-entries/', filters);
     }
   },
 
@@ -1,4 +1,4 @@
-import { apiClient, isDesktop } from './api';
+import { apiClient, fetchAllPages, isDesktop } from './api';
 
 export interface Resolution {
   id?: number;
@@ -89,8 +89,8 @@ const getInvoices = async () => {
      if (isDesktop()) {
         return (await window.electronAPI!.invoke('get-invoices'));
     }
-    const response = await apiClient.get('/invoicing/invoices/');
-    return response.data;
+    // Paginado por cursor: se traen todas las páginas
+    return fetchAllPages('/invoicing/invoices/');
 };
 
 const deleteInvoice = async (id: any) => {
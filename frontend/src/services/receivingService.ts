@@ -1,4 +1,4 @@
-import { apiClient } from './api';
+import { apiClient, fetchAllPages } from './api';
 
 export const receivingService = {
     // Subir XML
@@ -13,8 +13,8 @@ export const receivingService = {
 
     // Listar Facturas
     listInvoices: async () => {
-        const response = await apiClient.get('/radian/receive/list/');
-        return response.data;
+        // Respuesta paginada por cursor: se traen todas las páginas
+        return fetchAllPages('/radian/receive/list/');
     },
 
     // Enviar Evento (030, 032, etc)
@@ -1,4 +1,4 @@
-import { apiClient } from './api';
+import { apiClient, fetchAllPages } from './api';
 
 export interface BankAccount {
   id?: number;
@@ -73,9 +73,8 @@ const treasuryService = {
   getPendingInvoices: async (supplierId?: number) => {
     // Assuming we can filter by client or issuer_nit if we had that mapping. 
     // In MVP, we might list all and filter frontend or just list all.
-    // Let's call the radian endpoint
-    const response = await apiClient.get('/radian/invoices/'); 
-    return response.data;
+    // Let's call the radian endpoint (paginado por cursor: se traen todas las páginas)
+    return fetchAllPages('/radian/invoices/');
   }
 };
 